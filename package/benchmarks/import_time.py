@@ -0,0 +1,108 @@
+"""
+Import-time benchmark of wiser.gcloud.storage, based on `python -X importtime`.
+
+Each module is imported in a fresh interpreter several times and the median
+cumulative import time is compared with the budget. Bytecode is cached in a
+temporary folder by a first, untimed import, so that compilation is not measured
+even when PYTHONDONTWRITEBYTECODE is set. The benchmark fails if a
+budget is exceeded or if a heavy dependency is imported eagerly.
+
+Usage, from the `package` folder:
+    python benchmarks/import_time.py [--runs 7] [--budget-ms 50]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Tuple
+
+# Cumulative import time budget of each module, in milliseconds
+BUDGETS_MS = {
+    "wiser.gcloud.storage.services": 50,
+    "wiser.gcloud.storage.connectors": 25,
+}
+
+# Dependencies that must be imported only by the code paths needing them
+HEAVY_DEPENDENCIES = [
+    "numpy",
+    "google.cloud.storage",
+    "pydantic",
+    "pkg_resources",
+    "pandas",
+    "pyarrow",
+]
+
+
+def import_times(module: str, env: Dict[str, str]) -> Dict[str, Tuple[int, int]]:
+    """
+    Imports a module in a new interpreter and returns the import times
+
+    @param module: the module to import
+    @param env: the environment of the interpreter
+    @return: self and cumulative import time in microseconds of each imported module
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+        env=env,
+    )
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="overrides the budget of every module",
+    )
+    args = parser.parse_args()
+
+    pycache = tempfile.TemporaryDirectory()
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache.name)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    failed = False
+    for module, budget_ms in BUDGETS_MS.items():
+        if args.budget_ms is not None:
+            budget_ms = args.budget_ms
+
+        import_times(module=module, env=env)
+        runs = [import_times(module=module, env=env) for _ in range(args.runs)]
+        median_ms = statistics.median(times[module][1] for times in runs) / 1000
+        heavy = [dep for dep in HEAVY_DEPENDENCIES if dep in runs[0]]
+
+        status = "OK"
+        if median_ms > budget_ms or len(heavy) > 0:
+            status = "FAIL"
+            failed = True
+        print(
+            "{status:4} {module}: {median:.1f} ms (budget {budget:.0f} ms){heavy}".format(
+                status=status,
+                module=module,
+                median=median_ms,
+                budget=budget_ms,
+                heavy=", imports " + ", ".join(heavy) if heavy else "",
+            )
+        )
+
+    pycache.cleanup()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
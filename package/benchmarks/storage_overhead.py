@@ -0,0 +1,94 @@
+"""
+Overhead benchmark of wiser.gcloud.storage, run against the in-memory connector.
+
+Each operation of `Storage` is timed on 'mem://' locations, so that the reported
+times are the cost of the library (serialization, dispatching, copies) without the
+network. Comparing them with the same operations on 'gs://' locations separates the
+library overhead from the network cost.
+
+Usage, from the `package` folder:
+    python benchmarks/storage_overhead.py [--runs 200] [--size-kb 1024]
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable
+
+
+def median_ms(operation: Callable[[], object], runs: int) -> float:
+    """
+    Runs an operation several times and returns the median duration
+
+    @param operation: the operation to time
+    @param runs: the number of runs
+    @return: the median duration in milliseconds
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from wiser.gcloud.storage.services import Storage
+    from wiser.gcloud.storage.types import StorageLocationBuilder
+
+    size = args.size_kb * 1024
+    array = np.random.default_rng(0).random(size // 8)
+    text = "x" * (size - 1) + "\n"
+    locations = {
+        extension: StorageLocationBuilder()
+        .from_uri(uri="mem://benchmark/data" + extension)
+        .build()
+        for extension in [".npy", ".txt", ".json"]
+    }
+    payloads = {".npy": array, ".txt": text, ".json": {"data": text}}
+
+    print("{:<24}{:>12}".format("operation", "median ms"))
+    for extension, location in locations.items():
+        payload = payloads[extension]
+        print(
+            "{:<24}{:>12.3f}".format(
+                "save " + extension,
+                median_ms(
+                    lambda: Storage.save(obj=payload, location=location), args.runs
+                ),
+            )
+        )
+        print(
+            "{:<24}{:>12.3f}".format(
+                "get " + extension,
+                median_ms(lambda: Storage.get(location=location), args.runs),
+            )
+        )
+    print(
+        "{:<24}{:>12.3f}".format(
+            "get_array_slice .npy",
+            median_ms(
+                lambda: Storage.get_array_slice(
+                    location=locations[".npy"], index=slice(0, 1024)
+                ),
+                args.runs,
+            ),
+        )
+    )
+    print(
+        "{:<24}{:>12.3f}".format(
+            "exists",
+            median_ms(lambda: Storage.exists(location=locations[".txt"]), args.runs),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,20 +12,16 @@ author = "Nicola Massarenti"
 author_email = "nicola.massarenti@gmail.com"
 description = "Google Cloud Storage APIs for wiser"
 
-# Requirements, dependencies and namespaces
-extra_requirements = dict()
+# Requirements and dependencies
+extra_requirements = {"dataframe": ["pandas", "pyarrow"]}
 dependencies = ["google-cloud-storage", "pydantic"]
+entry_points = {"console_scripts": ["wiser-gcs=wiser.gcloud.storage.cli:main"]}
 # Only include packages under the 'wiser' namespace. Do not include tests,
-# benchmarks, etc.
+# benchmarks, etc. The namespaces are pkgutil-style, declared by their __init__.py:
+# setuptools' namespace_packages would mix in the pkg_resources style.
 packages = [
     package for package in setuptools.find_packages() if package.startswith("wiser")
 ]
-namespaces = ["wiser"]
-if "wiser.gcloud" in packages:
-    namespaces.append("wiser.gcloud")
-if "wiser.gcloud.storage" in packages:
-    namespaces.append("wiser.gcloud.storage")
-
 # Setup
 setuptools.setup(
     name=name,
@@ -46,7 +42,7 @@ setuptools.setup(
     ],
     install_requires=dependencies,
     extras_require=extra_requirements,
-    namespace_packages=namespaces,
+    entry_points=entry_points,
     packages=packages,
     python_requires=">=3.8",
     platforms="Posix; MacOS X; Windows",
@@ -0,0 +1,342 @@
+import io
+
+BUCKET_NAME = "bucket"
+
+
+class ConnectorContract:
+    """
+    Tests shared by the connectors, mixed into a TestCase defining `make_connector()`
+    """
+
+    def make_connector(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.connector = self.make_connector()
+
+    def test_upload_and_download_round_trip(self):
+        """
+        GIVEN a connector
+        WHEN  bytes, text and a file handle are uploaded
+        THEN  the same content is downloaded
+        """
+        self.connector.upload_from_string(
+            data=b"bytes", bucket_name=BUCKET_NAME, destination_blob_name="a/b.bin"
+        )
+        self.connector.upload_from_string(
+            data="text", bucket_name=BUCKET_NAME, destination_blob_name="a/c.txt"
+        )
+        self.connector.upload_from_file(
+            file_handle=io.BytesIO(b"file"),
+            bucket_name=BUCKET_NAME,
+            destination_blob_name="d.bin",
+        )
+
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name="a/b.bin"
+            ),
+            b"bytes",
+        )
+        self.assertEqual(
+            self.connector.download_as_string(
+                bucket_name=BUCKET_NAME, source_blob_name="a/c.txt"
+            ),
+            "text",
+        )
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name="d.bin"
+            ),
+            b"file",
+        )
+
+    def test_open_writer(self):
+        """
+        GIVEN a connector
+        WHEN  blobs are written through writers, one of them raising
+        THEN  the content is uploaded when the writer closes, nothing if it raised
+        """
+        with self.connector.open_writer(
+            bucket_name=BUCKET_NAME, destination_blob_name="a/w.bin"
+        ) as writer:
+            writer.write(b"hello ")
+            writer.write(b"world")
+            self.assertEqual(writer.tell(), 11)
+        with self.assertRaises(RuntimeError):
+            with self.connector.open_writer(
+                bucket_name=BUCKET_NAME, destination_blob_name="a/x.bin"
+            ) as writer:
+                writer.write(b"partial")
+                raise RuntimeError()
+
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name="a/w.bin"
+            ),
+            b"hello world",
+        )
+        self.assertFalse(
+            self.connector.exists(bucket_name=BUCKET_NAME, source_blob_name="a/x.bin")
+        )
+
+    def test_download_range_and_size(self):
+        """
+        GIVEN a connector and a blob
+        WHEN  a byte range and the size are requested
+        THEN  the inclusive range and the size are returned
+        """
+        self.connector.upload_from_string(
+            data=b"0123456789", bucket_name=BUCKET_NAME, destination_blob_name="r"
+        )
+
+        self.assertEqual(
+            self.connector.download_range(
+                bucket_name=BUCKET_NAME, source_blob_name="r", start=2, end=4
+            ),
+            b"234",
+        )
+        self.assertEqual(
+            self.connector.get_size(bucket_name=BUCKET_NAME, source_blob_name="r"), 10
+        )
+
+    def test_missing_blob_raises_not_found(self):
+        """
+        GIVEN a connector
+        WHEN  a missing blob is downloaded or deleted
+        THEN  NotFound is raised, exists is False and the metadata is None
+        """
+        from google.api_core.exceptions import NotFound
+
+        with self.assertRaises(NotFound):
+            self.connector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name="missing"
+            )
+        with self.assertRaises(NotFound):
+            self.connector.delete(bucket_name=BUCKET_NAME, blob_name="missing")
+        self.assertFalse(
+            self.connector.exists(bucket_name=BUCKET_NAME, source_blob_name="missing")
+        )
+        self.assertIsNone(
+            self.connector.get_metadata(
+                bucket_name=BUCKET_NAME, source_blob_name="missing"
+            )
+        )
+
+    def test_metadata_matches_content(self):
+        """
+        GIVEN a connector and a blob
+        WHEN  the metadata is requested
+        THEN  size and crc32c match the content
+        """
+        from wiser.gcloud.storage.utils import checksums
+
+        self.connector.upload_from_string(
+            data=b"content", bucket_name=BUCKET_NAME, destination_blob_name="m"
+        )
+
+        metadata = self.connector.get_metadata(
+            bucket_name=BUCKET_NAME, source_blob_name="m"
+        )
+
+        self.assertEqual(metadata.bucket, BUCKET_NAME)
+        self.assertEqual(metadata.name, "m")
+        self.assertEqual(metadata.size, 7)
+        self.assertEqual(metadata.crc32c, checksums.crc32c(b"content"))
+        self.assertGreater(metadata.generation, 0)
+
+    def test_generation_preconditions(self):
+        """
+        GIVEN a connector and a blob
+        WHEN  writes use generation preconditions
+        THEN  create-only and stale writes fail, matching writes succeed
+        """
+        from google.api_core.exceptions import PreconditionFailed
+
+        self.connector.upload_from_string(
+            data=b"v1",
+            bucket_name=BUCKET_NAME,
+            destination_blob_name="g",
+            if_generation_match=0,
+        )
+        generation = self.connector.get_metadata(
+            bucket_name=BUCKET_NAME, source_blob_name="g"
+        ).generation
+
+        with self.assertRaises(PreconditionFailed):
+            self.connector.upload_from_string(
+                data=b"v2",
+                bucket_name=BUCKET_NAME,
+                destination_blob_name="g",
+                if_generation_match=0,
+            )
+        with self.assertRaises(PreconditionFailed):
+            self.connector.delete(
+                bucket_name=BUCKET_NAME,
+                blob_name="g",
+                if_generation_match=generation + 1,
+            )
+
+        self.connector.upload_from_string(
+            data=b"v2",
+            bucket_name=BUCKET_NAME,
+            destination_blob_name="g",
+            if_generation_match=generation,
+        )
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name="g"
+            ),
+            b"v2",
+        )
+
+    def test_list_blobs_with_prefix_and_delimiter(self):
+        """
+        GIVEN a connector and nested blobs
+        WHEN  the blobs are listed with a prefix, with and without delimiter
+        THEN  the matching names are returned sorted
+        """
+        for name in ["a/1", "a/2", "a/b/3", "c/4"]:
+            self.connector.upload_from_string(
+                data=b"x", bucket_name=BUCKET_NAME, destination_blob_name=name
+            )
+
+        self.assertEqual(
+            self.connector.list_blobs(bucket_name=BUCKET_NAME, prefix="a/"),
+            ["a/1", "a/2", "a/b/3"],
+        )
+        self.assertEqual(
+            self.connector.list_blobs(
+                bucket_name=BUCKET_NAME, prefix="a/", delimiter="/"
+            ),
+            ["a/1", "a/2"],
+        )
+        self.assertEqual(
+            self.connector.list_blobs(bucket_name=BUCKET_NAME),
+            ["a/1", "a/2", "a/b/3", "c/4"],
+        )
+
+    def test_scan_returns_sizes_and_sub_prefixes(self):
+        """
+        GIVEN a connector and nested blobs of different sizes
+        WHEN  the blobs are scanned with a prefix, with and without delimiter
+        THEN  the blobs come with their size and the sub-prefixes once each
+        """
+        for name, size in [
+            ("a/1", 1),
+            ("a/22", 2),
+            ("a/b/3", 3),
+            ("a/b/c/4", 4),
+            ("d", 5),
+        ]:
+            self.connector.upload_from_string(
+                data=b"x" * size, bucket_name=BUCKET_NAME, destination_blob_name=name
+            )
+
+        self.assertEqual(
+            sorted(self.connector.scan(bucket_name=BUCKET_NAME, prefix="a/")),
+            [("a/1", 1), ("a/22", 2), ("a/b/3", 3), ("a/b/c/4", 4)],
+        )
+        listing = sorted(
+            self.connector.scan(bucket_name=BUCKET_NAME, prefix="a/", delimiter="/")
+        )
+        self.assertEqual(listing, [("a/1", 1), ("a/22", 2), ("a/b/", None)])
+        self.assertTrue(listing[-1].is_prefix)
+        self.assertEqual(
+            sorted(self.connector.scan(bucket_name=BUCKET_NAME, prefix="a/2")),
+            [("a/22", 2)],
+        )
+        self.assertEqual(
+            sorted(self.connector.scan(bucket_name=BUCKET_NAME, delimiter="/")),
+            [("a/", None), ("d", 5)],
+        )
+        self.assertEqual(
+            list(self.connector.scan(bucket_name=BUCKET_NAME, prefix="missing/")), []
+        )
+
+    def test_list_entries(self):
+        """
+        GIVEN a connector and some blobs
+        WHEN  the blobs are listed with their generations
+        THEN  the blobs under the prefix are returned sorted, with their sizes
+        """
+        for name, data in [("a/2", b"xy"), ("a/1", b"x"), ("b/3", b"xyz")]:
+            self.connector.upload_from_string(
+                data=data, bucket_name=BUCKET_NAME, destination_blob_name=name
+            )
+
+        entries = list(
+            self.connector.list_entries(bucket_name=BUCKET_NAME, prefix="a/")
+        )
+
+        self.assertEqual(
+            [(entry.name, entry.size) for entry in entries], [("a/1", 1), ("a/2", 2)]
+        )
+        for entry in entries:
+            if entry.generation is not None:
+                self.assertEqual(
+                    entry.generation,
+                    self.connector.get_metadata(
+                        bucket_name=BUCKET_NAME, source_blob_name=entry.name
+                    ).generation,
+                )
+
+    def test_scan_with_match_glob(self):
+        """
+        GIVEN a connector and nested blobs
+        WHEN  the blobs are scanned with a glob pattern
+        THEN  only the matching blobs are returned, the sub-prefixes are kept
+        """
+        for name in ["a/1.npy", "a/2.txt", "a/b/3.npy"]:
+            self.connector.upload_from_string(
+                data=b"x", bucket_name=BUCKET_NAME, destination_blob_name=name
+            )
+
+        self.assertEqual(
+            sorted(
+                self.connector.scan(
+                    bucket_name=BUCKET_NAME, prefix="a/", match_glob="a/**.npy"
+                )
+            ),
+            [("a/1.npy", 1), ("a/b/3.npy", 1)],
+        )
+        self.assertEqual(
+            sorted(
+                self.connector.scan(
+                    bucket_name=BUCKET_NAME,
+                    prefix="a/",
+                    delimiter="/",
+                    match_glob="a/*.npy",
+                )
+            ),
+            [("a/1.npy", 1), ("a/b/", None)],
+        )
+
+    def test_copy_and_delete(self):
+        """
+        GIVEN a connector and a blob
+        WHEN  the blob is copied and the source deleted
+        THEN  only the copy exists, with the same content
+        """
+        self.connector.upload_from_string(
+            data=b"x", bucket_name=BUCKET_NAME, destination_blob_name="src/x"
+        )
+
+        self.connector.copy(
+            source_bucket_name=BUCKET_NAME,
+            source_blob_name="src/x",
+            dest_bucket_name="other",
+            dest_blob_name="dst/x",
+        )
+        self.connector.delete(bucket_name=BUCKET_NAME, blob_name="src/x")
+
+        self.assertFalse(
+            self.connector.exists(bucket_name=BUCKET_NAME, source_blob_name="src/x")
+        )
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name="other", source_blob_name="dst/x"
+            ),
+            b"x",
+        )
+        self.assertEqual(self.connector.list_blobs(bucket_name=BUCKET_NAME), [])
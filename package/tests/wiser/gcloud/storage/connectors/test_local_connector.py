@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from tests.wiser.gcloud.storage.connectors.connector_contract import ConnectorContract
+
+
+class LocalConnectorTest(ConnectorContract, unittest.TestCase):
+    def make_connector(self):
+        from wiser.gcloud.storage.connectors import LocalConnector
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        return LocalConnector(root=self.tmp_dir.name)
+
+    def test_blobs_are_files_under_the_root(self):
+        """
+        GIVEN a local connector
+        WHEN  a blob is uploaded and then deleted
+        THEN  it is stored as root/bucket/blob and no empty folder or temporary file is left
+        """
+        self.connector.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a/b/c.bin"
+        )
+
+        path = os.path.join(self.tmp_dir.name, "bucket", "a", "b", "c.bin")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"x")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["c.bin"])
+
+        self.connector.delete(bucket_name="bucket", blob_name="a/b/c.bin")
+
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name, "bucket")), [])
+
+    def test_checksums_are_computed_once_per_content(self):
+        """
+        GIVEN a local connector and a blob
+        WHEN  its metadata is read twice, then after the blob is written again
+        THEN  its checksum is computed for the first read and after the write only
+        """
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.utils import checksums
+
+        self.connector.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a.bin"
+        )
+
+        with patch.object(checksums, "crc32c", wraps=checksums.crc32c) as crc32c:
+            first = self.connector.get_metadata(
+                bucket_name="bucket", source_blob_name="a.bin"
+            )
+            second = self.connector.get_metadata(
+                bucket_name="bucket", source_blob_name="a.bin"
+            )
+            self.assertEqual(crc32c.call_count, 1)
+            self.assertEqual(first.crc32c, second.crc32c)
+
+            self.connector.upload_from_string(
+                data=b"yz", bucket_name="bucket", destination_blob_name="a.bin"
+            )
+            third = self.connector.get_metadata(
+                bucket_name="bucket", source_blob_name="a.bin"
+            )
+
+        self.assertEqual(crc32c.call_count, 2)
+        self.assertEqual(third.crc32c, checksums.crc32c(b"yz"))
@@ -0,0 +1,24 @@
+import unittest
+
+from tests.wiser.gcloud.storage.connectors.connector_contract import ConnectorContract
+
+
+class MemoryConnectorTest(ConnectorContract, unittest.TestCase):
+    def make_connector(self):
+        from wiser.gcloud.storage.connectors import MemoryConnector
+
+        return MemoryConnector()
+
+    def test_clear_removes_every_blob(self):
+        """
+        GIVEN a memory connector with blobs
+        WHEN  'clear()' is invoked
+        THEN  no blob is left
+        """
+        self.connector.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="x"
+        )
+
+        self.connector.clear()
+
+        self.assertEqual(self.connector.list_blobs(bucket_name="bucket"), [])
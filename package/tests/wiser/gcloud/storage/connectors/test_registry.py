@@ -0,0 +1,39 @@
+import unittest
+
+
+class ConnectorRegistryTest(unittest.TestCase):
+    def test_default_prefixes(self):
+        """
+        GIVEN the connector registry
+        WHEN  the default prefixes are resolved
+        THEN  Google Cloud Storage, local and in-memory connectors are returned
+        """
+        from wiser.gcloud.storage.connectors import (
+            ConnectorRegistry,
+            LocalConnector,
+            MemoryConnector,
+            StorageConnector,
+        )
+
+        self.assertIs(ConnectorRegistry.get(prefix="gs://"), StorageConnector)
+        self.assertIsInstance(ConnectorRegistry.get(prefix="file://"), LocalConnector)
+        self.assertIsInstance(ConnectorRegistry.get(prefix="mem://"), MemoryConnector)
+
+    def test_register_and_unknown_prefix(self):
+        """
+        GIVEN the connector registry
+        WHEN  a connector is registered, and an unknown or invalid prefix is used
+        THEN  the connector is returned for its prefix, ValueError is raised otherwise
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="test://", connector=connector)
+        self.addCleanup(ConnectorRegistry._connectors.pop, "test://")
+
+        self.assertIs(ConnectorRegistry.get(prefix="test://"), connector)
+        self.assertIn("test://", ConnectorRegistry.prefixes())
+        with self.assertRaises(ValueError):
+            ConnectorRegistry.get(prefix="unknown://")
+        with self.assertRaises(ValueError):
+            ConnectorRegistry.register(prefix="test", connector=connector)
@@ -9,6 +9,12 @@ BLOB_NAME = "BLOB"
 
 
 class StorageConnectorTest(unittest.TestCase):
+    def setUp(self):
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        # Tests patching the client class need a client built after the patch
+        StorageConnector.reset()
+
     @staticmethod
     def _get_bucket(
         client: google.cloud.storage.Client, name: str
@@ -56,6 +62,125 @@ class StorageConnectorTest(unittest.TestCase):
             )
         )
 
+    @patch("google.cloud.storage.Blob.upload_from_string")
+    def test_upload_from_string_with_precondition(self, upload_from_string_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    a generation to match is passed to function `upload_from_string`
+        THEN    the precondition is forwarded to the upload
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        StorageConnector.upload_from_string(
+            data="hello",
+            bucket_name=BUCKET_NAME,
+            destination_blob_name=BLOB_NAME,
+            if_generation_match=0,
+        )
+
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        upload_from_string_mock.assert_called_once_with(
+            data="hello", if_generation_match=0, checksum=transfer_checksum()
+        )
+
+    @patch("google.cloud.storage.Blob.upload_from_file")
+    def test_corrupted_upload_is_retried_from_the_same_position(self, upload_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    an upload from a file fails its checksum once
+        THEN    the file is rewound and uploaded again
+        """
+        import io
+
+        from google.cloud.storage.exceptions import DataCorruption
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        file_handle = io.BytesIO(b"headerpayload")
+        file_handle.seek(6)
+        positions = []
+
+        def upload(file_obj, **kwargs):
+            positions.append(file_obj.tell())
+            file_obj.read()
+            if len(positions) == 1:
+                raise DataCorruption(None, "Checksum mismatch")
+
+        upload_mock.side_effect = upload
+
+        StorageConnector.upload_from_file(
+            file_handle=file_handle,
+            bucket_name=BUCKET_NAME,
+            destination_blob_name=BLOB_NAME,
+        )
+
+        self.assertEqual(positions, [6, 6])
+
+    @patch("google.cloud.storage.Blob.download_to_filename", autospec=True)
+    @patch("google.cloud.storage.Blob.upload_from_string", autospec=True)
+    def test_transfers_return_the_verified_checksum(self, upload_mock, download_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    a blob is uploaded, then downloaded to a file
+        THEN    both return the checksum the service reported with the transfer
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+        from wiser.gcloud.storage.utils.checksums import crc32c, md5, transfer_checksum
+
+        def transfer(blob, **kwargs):
+            blob._set_properties({"crc32c": crc32c(b"hello"), "md5Hash": md5(b"hello")})
+
+        upload_mock.side_effect = transfer
+        download_mock.side_effect = transfer
+        expected = (
+            crc32c(b"hello") if transfer_checksum() == "crc32c" else md5(b"hello")
+        )
+
+        self.assertEqual(
+            StorageConnector.upload_from_string(
+                data=b"hello", bucket_name=BUCKET_NAME, destination_blob_name=BLOB_NAME
+            ),
+            expected,
+        )
+        self.assertEqual(
+            StorageConnector.download_to_filename(
+                filename="/tmp/unused",
+                bucket_name=BUCKET_NAME,
+                source_blob_name=BLOB_NAME,
+            ),
+            expected,
+        )
+
+    @patch("google.cloud.storage.Blob.download_as_bytes")
+    def test_corrupted_download_is_retried_then_raised(self, download_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    downloads fail their checksum
+        THEN    they are retried a bounded number of times, then the error is raised
+        """
+        from google.cloud.storage.exceptions import DataCorruption
+        from wiser.gcloud.storage.connectors import StorageConnector
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        download_mock.side_effect = [DataCorruption(None, "Checksum mismatch"), b"ok"]
+        self.assertEqual(
+            StorageConnector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name=BLOB_NAME
+            ),
+            b"ok",
+        )
+        download_mock.assert_called_with(checksum=transfer_checksum())
+
+        download_mock.side_effect = DataCorruption(None, "Checksum mismatch")
+        download_mock.reset_mock()
+        with self.assertRaises(DataCorruption):
+            StorageConnector.download_as_bytes(
+                bucket_name=BUCKET_NAME, source_blob_name=BLOB_NAME
+            )
+        self.assertEqual(
+            download_mock.call_count, StorageConnector.corruption_retries + 1
+        )
+
     @patch("google.cloud.storage.Blob.upload_from_file")
     def test_upload_from_filename(self, upload_from_filename_mock):
         """
@@ -97,6 +222,73 @@ class StorageConnectorTest(unittest.TestCase):
         bucket_mock.return_value.list_blobs.return_value = iter(blobs_stubs)
 
         self.assertEqual(blob_names, StorageConnector.list_blobs(bucket_name="BUCKET"))
+        self.assertEqual(
+            bucket_mock.return_value.list_blobs.call_args.kwargs["fields"],
+            "items(name),nextPageToken",
+        )
+
+    @patch("google.cloud.storage.Client")
+    @patch("google.cloud.storage.Bucket")
+    def test_scan(self, bucket_mock, client_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    blobs are scanned with a delimiter
+        THEN    the names and sizes of each page are returned, then its sub-prefixes
+        """
+        from unittest.mock import MagicMock
+
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        bucket = self._get_bucket(client=client_mock, name="BUCKET")
+        pages = []
+        for names, prefixes in [(["a/1"], {"a/c/", "a/b/"}), (["a/2"], set())]:
+            page = MagicMock()
+            blobs = [self._get_blob(blob_name=name, bucket=bucket) for name in names]
+            for blob in blobs:
+                blob._properties["size"] = "7"
+            page.__iter__.return_value = iter(blobs)
+            page.prefixes = prefixes
+            pages.append(page)
+        bucket_mock.return_value.list_blobs.return_value.pages = iter(pages)
+
+        self.assertEqual(
+            list(
+                StorageConnector.scan(bucket_name="BUCKET", prefix="a/", delimiter="/")
+            ),
+            [("a/1", 7), ("a/b/", None), ("a/c/", None), ("a/2", 7)],
+        )
+        self.assertEqual(
+            bucket_mock.return_value.list_blobs.call_args.kwargs["fields"],
+            "items(name,size),prefixes,nextPageToken",
+        )
+
+    @patch("google.cloud.storage.Client")
+    @patch("google.cloud.storage.Bucket")
+    def test_list_entries(self, bucket_mock, client_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    blobs are listed with their generations
+        THEN    the names, sizes and generations are returned, requesting only these fields
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        bucket = self._get_bucket(client=client_mock, name="BUCKET")
+        blobs = []
+        for name, generation in [("a/1", "11"), ("a/2", "12")]:
+            blob = self._get_blob(blob_name=name, bucket=bucket)
+            blob._properties["size"] = "7"
+            blob._properties["generation"] = generation
+            blobs.append(blob)
+        bucket_mock.return_value.list_blobs.return_value = iter(blobs)
+
+        self.assertEqual(
+            list(StorageConnector.list_entries(bucket_name="BUCKET", prefix="a/")),
+            [("a/1", 7, 11), ("a/2", 7, 12)],
+        )
+        self.assertEqual(
+            bucket_mock.return_value.list_blobs.call_args.kwargs["fields"],
+            "items(name,size,generation),nextPageToken",
+        )
 
     @patch("google.cloud.storage.Blob.exists")
     def test_exists_returns_True(self, exists_mock):
@@ -160,6 +352,204 @@ class StorageConnectorTest(unittest.TestCase):
             data,
         )
 
+    @patch("google.cloud.storage.Blob.download_as_bytes")
+    def test_download_range(self, download_as_bytes_mock):
+        """
+        GIVEN   a bucket, a blob name and a byte range
+        WHEN    is used function `download_range`
+        THEN    the range is requested and its content is retrieved
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        data = bytes("content".encode(encoding="utf-8"))
+        download_as_bytes_mock.return_value = data
+
+        self.assertEqual(
+            StorageConnector.download_range(
+                bucket_name=BUCKET_NAME, source_blob_name=BLOB_NAME, start=10, end=16
+            ),
+            data,
+        )
+        download_as_bytes_mock.assert_called_once_with(start=10, end=16)
+
+    @patch("google.cloud.storage.Client")
+    def test_get_size(self, client_mock):
+        """
+        GIVEN   a bucket and a blob name
+        WHEN    is used function `get_size`
+        THEN    the size of the blob is returned
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        client_mock.return_value.bucket.return_value.blob.return_value.size = 42
+
+        self.assertEqual(
+            StorageConnector.get_size(
+                bucket_name=BUCKET_NAME, source_blob_name=BLOB_NAME
+            ),
+            42,
+        )
+
+    @patch("google.cloud.storage.Client")
+    def test_get_metadata(self, client_mock):
+        """
+        GIVEN   a bucket and a blob name
+        WHEN    is used function `get_metadata`
+        THEN    the metadata of the blob is returned
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        blob = client_mock.return_value.bucket.return_value.get_blob.return_value
+        blob.name = BLOB_NAME
+        blob.size = 11
+        blob.generation = 123
+        blob.crc32c = "yZRlqg=="
+        blob.md5_hash = "XrY7u+Ae7tCTyyK7j1rNww=="
+        blob.updated = None
+        blob.content_type = "application/json"
+        blob.cache_control = "no-cache"
+        blob.storage_class = "STANDARD"
+        blob.metadata = {"source": "test"}
+
+        metadata = StorageConnector.get_metadata(
+            bucket_name=BUCKET_NAME, source_blob_name=BLOB_NAME
+        )
+
+        self.assertEqual(metadata.bucket, BUCKET_NAME)
+        self.assertEqual(metadata.name, BLOB_NAME)
+        self.assertEqual(metadata.size, 11)
+        self.assertEqual(metadata.generation, 123)
+        self.assertEqual(metadata.crc32c, "yZRlqg==")
+        self.assertEqual(metadata.content_type, "application/json")
+        self.assertEqual(metadata.metadata, {"source": "test"})
+
+    @patch("google.cloud.storage.Blob.open")
+    def test_open_writer(self, open_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    a writer is opened with object metadata
+        THEN    a resumable upload is opened with the content type and a checksum
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+        from wiser.gcloud.storage.types import ObjectMetadata
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        writer = StorageConnector.open_writer(
+            bucket_name=BUCKET_NAME,
+            destination_blob_name="a.csv",
+            if_generation_match=0,
+            metadata=ObjectMetadata(content_type="text/csv"),
+        )
+
+        self.assertIs(writer, open_mock.return_value)
+        open_mock.assert_called_once_with(
+            "wb",
+            chunk_size=StorageConnector.writer_chunk_size,
+            if_generation_match=0,
+            checksum=transfer_checksum(),
+            content_type="text/csv",
+        )
+
+    @patch("google.cloud.storage.Client")
+    def test_generate_signed_urls(self, client_mock):
+        """
+        GIVEN   the StorageConnector with service account credentials
+        WHEN    URLs of many blobs are signed
+        THEN    each URL is signed locally with V4 by the credentials of the client
+        """
+        from unittest.mock import MagicMock
+
+        from google.auth.credentials import Signing
+
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        client = client_mock.return_value
+        client._credentials = MagicMock(spec=Signing)
+        blob = client.bucket.return_value.blob.return_value
+        blob.generate_signed_url.side_effect = ["URL_1", "URL_2"]
+
+        urls = StorageConnector.generate_signed_urls(
+            bucket_name=BUCKET_NAME,
+            blob_names=["a.png", "b.png"],
+            method="PUT",
+            expiration=60,
+            content_type="image/png",
+        )
+
+        self.assertEqual(urls, ["URL_1", "URL_2"])
+        client.bucket.assert_called_once_with(bucket_name=BUCKET_NAME)
+        kwargs = blob.generate_signed_url.call_args.kwargs
+        self.assertEqual(kwargs["version"], "v4")
+        self.assertEqual(kwargs["method"], "PUT")
+        self.assertEqual(kwargs["expiration"].total_seconds(), 60)
+        self.assertEqual(kwargs["content_type"], "image/png")
+        self.assertIs(kwargs["credentials"], client._credentials)
+        self.assertNotIn("access_token", kwargs)
+
+    @patch("google.cloud.storage.Client")
+    def test_generate_signed_urls_through_iam(self, client_mock):
+        """
+        GIVEN   the StorageConnector with credentials without a key, and user credentials
+        WHEN    URLs of many blobs are signed
+        THEN    they are signed in parallel through IAM, and user credentials raise
+        """
+        import threading
+        from unittest.mock import MagicMock
+
+        from google.oauth2.credentials import Credentials
+
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        client = client_mock.return_value
+        client._credentials = MagicMock(
+            spec=["valid", "token", "service_account_email"],
+            valid=True,
+            token="TOKEN",
+            service_account_email="sa@project.iam.gserviceaccount.com",
+        )
+        blob_names = ["{}.png".format(i) for i in range(8)]
+        barrier = threading.Barrier(len(blob_names), timeout=5)
+
+        def blob(blob_name):
+            def generate_signed_url(**kwargs):
+                # Every URL is signed while the others are in flight
+                barrier.wait()
+                self.assertEqual(kwargs["access_token"], "TOKEN")
+                return "URL_" + blob_name
+
+            return MagicMock(generate_signed_url=generate_signed_url)
+
+        client.bucket.return_value.blob.side_effect = blob
+
+        urls = StorageConnector.generate_signed_urls(
+            bucket_name=BUCKET_NAME, blob_names=blob_names
+        )
+
+        self.assertEqual(urls, ["URL_" + blob_name for blob_name in blob_names])
+
+        client._credentials = Credentials(token="TOKEN")
+        with self.assertRaises(ValueError):
+            StorageConnector.generate_signed_urls(
+                bucket_name=BUCKET_NAME, blob_names=blob_names
+            )
+
+    @patch("google.cloud.storage.Client")
+    def test_get_metadata_returns_none_if_not_exists(self, client_mock):
+        """
+        GIVEN   a bucket and the name of a blob that does not exist
+        WHEN    is used function `get_metadata`
+        THEN    None is returned
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        client_mock.return_value.bucket.return_value.get_blob.return_value = None
+
+        self.assertIsNone(
+            StorageConnector.get_metadata(
+                bucket_name=BUCKET_NAME, source_blob_name=BLOB_NAME
+            )
+        )
+
     @patch("google.cloud.storage.Blob.download_as_bytes")
     def test_download_as_string(self, download_as_bytes_mock):
         """
@@ -222,3 +612,73 @@ class StorageConnectorTest(unittest.TestCase):
         )
 
         self.assertIsNone(StorageConnector.delete(bucket_name=bucket, blob_name=blob))
+
+    @patch("google.cloud.storage.Client")
+    def test_delete_with_precondition(self, client_mock):
+        """
+        GIVEN   a blob and a generation
+        WHEN    is called function `delete` with the generation to match
+        THEN    the precondition is forwarded to the deletion
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        blob_mock = client_mock.return_value.bucket.return_value.blob.return_value
+
+        StorageConnector.delete(
+            bucket_name=BUCKET_NAME, blob_name=BLOB_NAME, if_generation_match=7
+        )
+
+        blob_mock.delete.assert_called_once_with(if_generation_match=7)
+
+    @patch("google.cloud.storage.Client")
+    def test_client_is_reused_in_the_same_process(self, client_mock):
+        """
+        GIVEN   the StorageConnector
+        WHEN    the client is requested twice in the same process
+        THEN    the client is built once
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        self.assertIs(StorageConnector.client(), StorageConnector.client())
+        self.assertEqual(client_mock.call_count, 1)
+
+    @patch("os.getpid")
+    @patch("google.cloud.storage.Client")
+    def test_client_is_rebuilt_after_fork(self, client_mock, getpid_mock):
+        """
+        GIVEN   a client built in a process
+        WHEN    the client is requested from a process with another PID
+        THEN    a new client is built and the warm-up hooks run again
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        client_mock.side_effect = [object(), object()]
+        warmed_up = []
+        StorageConnector.add_warm_up_hook(warmed_up.append)
+        self.addCleanup(StorageConnector._warm_up_hooks.remove, warmed_up.append)
+
+        getpid_mock.return_value = 1
+        StorageConnector.worker_init()
+        parent_client = StorageConnector.client()
+        getpid_mock.return_value = 2
+        child_client = StorageConnector.client()
+
+        self.assertIsNot(parent_client, child_client)
+        self.assertEqual(warmed_up, [parent_client, child_client])
+
+    @patch("google.cloud.storage.Client")
+    def test_after_fork_drops_the_inherited_client(self, client_mock):
+        """
+        GIVEN   a client built in the parent process
+        WHEN    the process forks
+        THEN    the child builds its own client
+        """
+        from wiser.gcloud.storage.connectors import StorageConnector
+
+        client_mock.side_effect = [object(), object()]
+        parent_client = StorageConnector.client()
+
+        StorageConnector._after_fork_in_child()
+
+        self.assertIsNot(StorageConnector.client(), parent_client)
+        self.assertIn(parent_client, StorageConnector._inherited_clients)
@@ -0,0 +1,140 @@
+import unittest
+
+from tests.wiser.gcloud.storage.connectors.connector_contract import ConnectorContract
+
+
+class ThrottledConnectorTest(ConnectorContract, unittest.TestCase):
+    def make_connector(self):
+        from wiser.gcloud.storage.connectors import MemoryConnector, ThrottledConnector
+
+        return ThrottledConnector(
+            inner=MemoryConnector(), bucket_rate=10000, prefix_rate=1000
+        )
+
+    def test_throttled_calls_are_retried_and_lower_the_limits(self):
+        """
+        GIVEN a throttled connector wrapping a backend answering 429 then 503
+        WHEN  a file is uploaded
+        THEN  the upload is retried from the start of the file and the limits are lowered
+        """
+        import io
+
+        from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+        from wiser.gcloud.storage.connectors import MemoryConnector, ThrottledConnector
+
+        errors = [TooManyRequests("slow down"), ServiceUnavailable("unavailable")]
+
+        class HotspotConnector(MemoryConnector):
+            def upload_from_file(self, file_handle, *args, **kwargs):
+                file_handle.read(1)
+                if errors:
+                    raise errors.pop(0)
+                return super().upload_from_file(file_handle, *args, **kwargs)
+
+        inner = HotspotConnector()
+        connector = ThrottledConnector(
+            inner=inner, prefix_rate=100, initial_backoff=0.001
+        )
+
+        connector.upload_from_file(
+            file_handle=io.BytesIO(b"xy"),
+            bucket_name="bucket",
+            destination_blob_name="logs/0001",
+        )
+
+        self.assertEqual(
+            inner.download_as_bytes(bucket_name="bucket", source_blob_name="logs/0001"),
+            b"y",
+        )
+        self.assertLess(connector.limiter.limit, 16)
+        self.assertLess(connector._buckets[("bucket", "logs")].rate, 100)
+
+    def test_retries_are_bounded(self):
+        """
+        GIVEN a throttled connector wrapping a backend always answering 429
+        WHEN  a blob is read
+        THEN  the error is raised after the maximum number of retries
+        """
+        from google.api_core.exceptions import TooManyRequests
+
+        from wiser.gcloud.storage.connectors import MemoryConnector, ThrottledConnector
+
+        calls = []
+
+        class ThrottlingConnector(MemoryConnector):
+            def download_as_bytes(self, bucket_name, source_blob_name):
+                calls.append(source_blob_name)
+                raise TooManyRequests("slow down")
+
+        connector = ThrottledConnector(
+            inner=ThrottlingConnector(), max_retries=2, initial_backoff=0.001
+        )
+
+        with self.assertRaises(TooManyRequests):
+            connector.download_as_bytes(bucket_name="bucket", source_blob_name="x")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(connector.limiter.in_flight, 0)
+
+    def test_throttled_listing_pages_are_retried(self):
+        """
+        GIVEN a throttled connector wrapping a backend throttling the first page of a
+              listing, then a page in the middle of it
+        WHEN  the prefix is scanned
+        THEN  the listing is retried and every blob is returned once
+        """
+        from unittest.mock import patch
+
+        from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+        from wiser.gcloud.storage.connectors import MemoryConnector, ThrottledConnector
+        from wiser.gcloud.storage.connectors import throttled_connector
+
+        errors = {0: TooManyRequests("slow down"), 3: ServiceUnavailable("unavailable")}
+
+        class ThrottlingConnector(MemoryConnector):
+            def scan(self, *args, **kwargs):
+                for index, item in enumerate(super().scan(*args, **kwargs)):
+                    if index in errors:
+                        raise errors.pop(index)
+                    yield item
+
+        inner = ThrottlingConnector()
+        names = ["p/{}".format(i) for i in range(5)]
+        for name in names:
+            inner.upload_from_string(
+                data=b"x", bucket_name="b", destination_blob_name=name
+            )
+        connector = ThrottledConnector(inner=inner, initial_backoff=0.001)
+
+        with patch.object(throttled_connector, "LISTING_PAGE_SIZE", 2):
+            listed = list(connector.scan(bucket_name="b", prefix="p/"))
+
+        self.assertEqual([blob.name for blob in listed], names)
+        self.assertEqual(errors, {})
+        self.assertEqual(connector.limiter.in_flight, 0)
+
+    def test_prefixes_are_folders_and_bounded(self):
+        """
+        GIVEN a throttled connector limiting the rate per prefix
+        WHEN  blobs at the root and in deep folders are written
+        THEN  the prefixes are their folders only, and the least recent ones are dropped
+        """
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import MemoryConnector, ThrottledConnector
+        from wiser.gcloud.storage.connectors import throttled_connector
+
+        connector = ThrottledConnector(
+            inner=MemoryConnector(), prefix_rate=1000, prefix_depth=2
+        )
+        with patch.object(throttled_connector, "MAX_TOKEN_BUCKETS", 3):
+            for name in ["a.json", "b.json", "x/c.json", "x/y/z/d.json", "w/e.json"]:
+                connector.upload_from_string(
+                    data=b"x", bucket_name="bucket", destination_blob_name=name
+                )
+
+        self.assertEqual(
+            list(connector._buckets),
+            [("bucket", "x"), ("bucket", "x/y"), ("bucket", "w")],
+        )
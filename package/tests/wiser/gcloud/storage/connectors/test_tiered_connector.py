@@ -0,0 +1,332 @@
+import os
+import tempfile
+import time
+import unittest
+
+from tests.wiser.gcloud.storage.connectors.connector_contract import ConnectorContract
+
+
+class TieredConnectorTest(ConnectorContract, unittest.TestCase):
+    def make_connector(self):
+        from wiser.gcloud.storage.connectors import MemoryConnector, TieredConnector
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.remote = MemoryConnector()
+        connector = TieredConnector(remote=self.remote, cache_dir=self.tmp_dir.name)
+        self.addCleanup(connector.close)
+        return connector
+
+    def test_miss_fills_the_local_tier(self):
+        """
+        GIVEN a tiered connector and a blob on the remote tier
+        WHEN  the blob is read twice
+        THEN  the first read fills the local tier, which serves the second one
+        """
+        self.remote.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a/b"
+        )
+
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name="bucket", source_blob_name="a/b"
+            ),
+            b"x",
+        )
+        self.connector.flush()
+        self.remote.clear()
+
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name="bucket", source_blob_name="a/b"
+            ),
+            b"x",
+        )
+        self.assertEqual(
+            self.connector.download_range(
+                bucket_name="bucket", source_blob_name="a/b", start=0, end=0
+            ),
+            b"x",
+        )
+
+    def test_write_back_uploads_in_background(self):
+        """
+        GIVEN a write-back tiered connector
+        WHEN  a blob is written
+        THEN  it is readable and listed at once, and on the remote tier after a flush
+        """
+        self.connector.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a/b"
+        )
+
+        self.assertEqual(
+            self.connector.download_as_bytes(
+                bucket_name="bucket", source_blob_name="a/b"
+            ),
+            b"x",
+        )
+        self.assertEqual(self.connector.list_blobs(bucket_name="bucket"), ["a/b"])
+
+        self.connector.flush()
+
+        self.assertEqual(
+            self.remote.download_as_bytes(bucket_name="bucket", source_blob_name="a/b"),
+            b"x",
+        )
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name, "pending")), [])
+
+    def test_write_through(self):
+        """
+        GIVEN a write-through tiered connector
+        WHEN  a blob is written
+        THEN  it is on the remote tier when the write returns
+        """
+        from wiser.gcloud.storage.connectors import TieredConnector
+
+        connector = TieredConnector(
+            remote=self.remote, cache_dir=self.tmp_dir.name, write_back=False
+        )
+        self.addCleanup(connector.close)
+
+        connector.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a/b"
+        )
+
+        self.assertTrue(
+            self.remote.exists(bucket_name="bucket", source_blob_name="a/b")
+        )
+
+    def test_signed_urls_settle_pending_writes(self):
+        """
+        GIVEN a write-back tiered connector with a pending write
+        WHEN  URLs of the blob are signed
+        THEN  the write is uploaded first and the remote tier signs the URLs
+        """
+        from wiser.gcloud.storage.connectors import MemoryConnector, TieredConnector
+
+        class SigningConnector(MemoryConnector):
+            def generate_signed_urls(self, bucket_name, blob_names, **kwargs):
+                return [
+                    "https://signed/{}/{}".format(bucket_name, name)
+                    for name in blob_names
+                ]
+
+        remote = SigningConnector()
+        connector = TieredConnector(remote=remote, cache_dir=self.tmp_dir.name)
+        self.addCleanup(connector.close)
+        connector.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a/b"
+        )
+
+        self.assertEqual(
+            connector.generate_signed_urls(bucket_name="bucket", blob_names=["a/b"]),
+            ["https://signed/bucket/a/b"],
+        )
+        self.assertEqual(
+            remote.download_as_bytes(bucket_name="bucket", source_blob_name="a/b"),
+            b"x",
+        )
+        with self.assertRaises(NotImplementedError):
+            self.connector.generate_signed_urls(
+                bucket_name="bucket", blob_names=["a/b"]
+            )
+
+    def test_pending_uploads_are_recovered(self):
+        """
+        GIVEN a write-back tiered connector whose remote tier fails the uploads
+        WHEN  a new connector is built on the same folder
+        THEN  the pending uploads are resumed
+        """
+        from wiser.gcloud.storage.connectors import MemoryConnector, TieredConnector
+
+        class FailingConnector(MemoryConnector):
+            def upload_from_file(self, *args, **kwargs):
+                raise ConnectionError("offline")
+
+        cache_dir = os.path.join(self.tmp_dir.name, "crashed")
+        crashed = TieredConnector(remote=FailingConnector(), cache_dir=cache_dir)
+        crashed.upload_from_string(
+            data=b"x", bucket_name="bucket", destination_blob_name="a/b"
+        )
+        with self.assertRaises(ConnectionError):
+            crashed.flush()
+
+        recovered = TieredConnector(remote=self.remote, cache_dir=cache_dir)
+        recovered.close()
+
+        self.assertEqual(
+            self.remote.download_as_bytes(bucket_name="bucket", source_blob_name="a/b"),
+            b"x",
+        )
+
+    def test_eviction_by_size_and_age(self):
+        """
+        GIVEN a tiered connector with size and age limits
+        WHEN  the local tier exceeds them
+        THEN  the least recently accessed and the expired local copies are evicted
+        """
+        from wiser.gcloud.storage.connectors import TieredConnector
+
+        connector = TieredConnector(
+            remote=self.remote, cache_dir=self.tmp_dir.name, max_age=3600
+        )
+        self.addCleanup(connector.close)
+        for name in ["a", "b", "c"]:
+            connector.upload_from_string(
+                data=b"x", bucket_name="bucket", destination_blob_name=name
+            )
+        connector.flush()
+        connector.max_bytes = 2
+        local_path = os.path.join(self.tmp_dir.name, "objects", "bucket", "{}").format
+        now = time.time_ns()
+        for age, name in enumerate(["a", "b", "c"]):
+            os.utime(local_path(name), ns=(now - (3 - age) * 10**9, now))
+
+        connector.evict()
+
+        self.assertFalse(os.path.exists(local_path("a")))
+        self.assertTrue(os.path.exists(local_path("b")))
+
+        connector.max_age = 0
+        connector.evict()
+
+        self.assertFalse(os.path.exists(local_path("b")))
+        self.assertEqual(
+            connector.download_as_bytes(bucket_name="bucket", source_blob_name="c"),
+            b"x",
+        )
+
+    def test_uploads_do_not_block_the_blob(self):
+        """
+        GIVEN a write-back tiered connector whose remote upload is blocked
+        WHEN  the blob is read and written again during the upload
+        THEN  neither waits for it, and the remote tier ends with the latest write
+        """
+        import threading
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import MemoryConnector
+
+        started, gate = threading.Event(), threading.Event()
+        upload = MemoryConnector.upload_from_file
+
+        def blocked_upload(connector, **kwargs):
+            started.set()
+            gate.wait(timeout=5)
+            return upload(connector, **kwargs)
+
+        with patch.object(MemoryConnector, "upload_from_file", blocked_upload):
+            self.connector.upload_from_string(
+                data=b"x", bucket_name="bucket", destination_blob_name="a/b"
+            )
+            self.assertTrue(started.wait(timeout=5))
+
+            reads = []
+
+            def read_and_write():
+                reads.append(
+                    self.connector.download_as_bytes(
+                        bucket_name="bucket", source_blob_name="a/b"
+                    )
+                )
+                self.connector.upload_from_string(
+                    data=b"y", bucket_name="bucket", destination_blob_name="a/b"
+                )
+
+            thread = threading.Thread(target=read_and_write)
+            thread.start()
+            thread.join(timeout=2)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(reads, [b"x"])
+
+            gate.set()
+            self.connector.flush()
+
+        self.assertEqual(
+            self.remote.download_as_bytes(bucket_name="bucket", source_blob_name="a/b"),
+            b"y",
+        )
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name, "pending")), [])
+
+    def test_fill_is_cancelled_by_a_delete_during_the_read(self):
+        """
+        GIVEN a tiered connector whose remote read of a blob is slow
+        WHEN  the blob is deleted while it is read
+        THEN  the read content is not filled into the local tier
+        """
+        import threading
+        from unittest.mock import patch
+
+        from google.api_core.exceptions import NotFound
+
+        from wiser.gcloud.storage.connectors import MemoryConnector
+
+        self.remote.upload_from_string(
+            data=b"old", bucket_name="bucket", destination_blob_name="a/b"
+        )
+        started, gate = threading.Event(), threading.Event()
+        download = MemoryConnector.download_as_bytes
+
+        def slow_download(connector, **kwargs):
+            data = download(connector, **kwargs)
+            started.set()
+            gate.wait(timeout=5)
+            return data
+
+        with patch.object(MemoryConnector, "download_as_bytes", slow_download):
+            reads = []
+            thread = threading.Thread(
+                target=lambda: reads.append(
+                    self.connector.download_as_bytes(
+                        bucket_name="bucket", source_blob_name="a/b"
+                    )
+                )
+            )
+            thread.start()
+            self.assertTrue(started.wait(timeout=5))
+            self.connector.delete(bucket_name="bucket", blob_name="a/b")
+            gate.set()
+            thread.join(timeout=5)
+        self.connector.flush()
+
+        self.assertEqual(reads, [b"old"])
+        self.assertFalse(
+            self.connector.exists(bucket_name="bucket", source_blob_name="a/b")
+        )
+        with self.assertRaises(NotFound):
+            self.connector.download_as_bytes(
+                bucket_name="bucket", source_blob_name="a/b"
+            )
+
+    def test_failed_local_write_leaves_no_pending_upload(self):
+        """
+        GIVEN a write-back tiered connector holding a blob
+        WHEN  a new write of the blob fails before its local copy is written
+        THEN  no upload is pending, so recovery never sends the older local copy
+        """
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import LocalConnector
+
+        self.connector.upload_from_string(
+            data=b"old", bucket_name="bucket", destination_blob_name="a/b"
+        )
+        self.connector.flush()
+        self.remote.upload_from_string(
+            data=b"newer", bucket_name="bucket", destination_blob_name="a/b"
+        )
+
+        with patch.object(
+            LocalConnector, "upload_from_string", side_effect=OSError("crash")
+        ):
+            with self.assertRaises(OSError):
+                self.connector.upload_from_string(
+                    data=b"new", bucket_name="bucket", destination_blob_name="a/b"
+                )
+        self.connector.flush()
+
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name, "pending")), [])
+        self.assertEqual(
+            self.remote.download_as_bytes(bucket_name="bucket", source_blob_name="a/b"),
+            b"newer",
+        )
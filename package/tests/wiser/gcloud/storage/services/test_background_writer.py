@@ -0,0 +1,211 @@
+import unittest
+
+
+class BackgroundWriterTest(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        class FailingConnector(MemoryConnector):
+            def __init__(self):
+                super().__init__()
+                self.failing = False
+
+            def upload_from_string(self, **kwargs):
+                if self.failing:
+                    from google.api_core.exceptions import ServiceUnavailable
+
+                    raise ServiceUnavailable("unavailable")
+                return super().upload_from_string(**kwargs)
+
+        self.connector = FailingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=self.connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _location(self, uri: str):
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        return StorageLocationBuilder().from_uri(uri=uri).build()
+
+    def _batches(self, uri: str):
+        from wiser.gcloud.storage.services import Storage
+
+        return [
+            Storage.get(location=location)
+            for location in Storage.get_list_content(location=self._location(uri))
+        ]
+
+    def test_save_and_flush(self):
+        """
+        GIVEN   a background writer
+        WHEN    objects are saved, then the writer is flushed
+        THEN    the futures complete and the blobs hold the encoded objects
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import BackgroundWriter, Storage
+
+        array = np.arange(10)
+        with BackgroundWriter(max_workers=2) as writer:
+            futures = [
+                writer.save(obj={"a": 1}, location=self._location("mem://b/a.json")),
+                writer.save(obj=array, location=self._location("mem://b/a.npy")),
+            ]
+            writer.flush()
+
+        self.assertEqual([future.result() for future in futures], [None, None])
+        self.assertEqual(
+            Storage.get(location=self._location("mem://b/a.json")), {"a": 1}
+        )
+        np.testing.assert_array_equal(
+            Storage.get(location=self._location("mem://b/a.npy")), array
+        )
+        with self.assertRaises(ValueError):
+            writer.save(obj={}, location=self._location("mem://b/c.json"))
+
+    def test_append_groups_records(self):
+        """
+        GIVEN   a background writer uploading batches of 3 records
+        WHEN    7 records are appended to a folder, then the writer is flushed
+        THEN    the records are uploaded in order as 3 JSON array objects
+        """
+        from wiser.gcloud.storage.services import BackgroundWriter
+
+        records = [{"i": i, "text": "é\n"} for i in range(7)]
+        with BackgroundWriter(batch_records=3) as writer:
+            for record in records:
+                writer.append(record=record, location=self._location("mem://b/logs/"))
+
+        batches = self._batches("mem://b/logs/")
+        self.assertEqual(sorted(len(batch) for batch in batches), [1, 3, 3])
+        self.assertEqual(
+            sorted(
+                (record for batch in batches for record in batch),
+                key=lambda record: record["i"],
+            ),
+            records,
+        )
+        for batch in batches:
+            self.assertEqual(batch, sorted(batch, key=lambda record: record["i"]))
+
+    def test_flush_interval(self):
+        """
+        GIVEN   a background writer with a short flush interval
+        WHEN    a record is appended
+        THEN    its batch is uploaded without any flush
+        """
+        import time
+
+        from wiser.gcloud.storage.services import BackgroundWriter
+
+        writer = BackgroundWriter(flush_interval=0.05)
+        self.addCleanup(writer.close)
+        writer.append(record={"a": 1}, location=self._location("mem://b/logs"))
+
+        deadline = time.monotonic() + 5
+        while not self._batches("mem://b/logs/") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._batches("mem://b/logs/"), [[{"a": 1}]])
+
+    def test_errors_are_surfaced(self):
+        """
+        GIVEN   a background writer
+        WHEN    a save fails its precondition
+        THEN    its future and the next flush raise the error, later flushes do not
+        """
+        from google.api_core.exceptions import PreconditionFailed
+
+        from wiser.gcloud.storage.services import BackgroundWriter
+
+        location = self._location("mem://b/a.txt")
+        with BackgroundWriter() as writer:
+            writer.save(obj="a", location=location).result()
+            future = writer.save(obj="b", location=location, if_not_exists=True)
+
+            self.assertIsInstance(future.exception(), PreconditionFailed)
+            with self.assertRaises(PreconditionFailed):
+                writer.flush()
+            writer.flush()
+
+    def test_pending_bytes_are_bounded(self):
+        """
+        GIVEN   a background writer whose uploads are blocked, with little memory
+        WHEN    a save would exceed the memory of the pending contents
+        THEN    it blocks until the previous upload completes
+        """
+        import threading
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import MemoryConnector
+        from wiser.gcloud.storage.services import BackgroundWriter
+
+        gate = threading.Event()
+        upload = MemoryConnector.upload_from_string
+
+        def blocked_upload(connector, **kwargs):
+            gate.wait()
+            return upload(connector, **kwargs)
+
+        with patch.object(MemoryConnector, "upload_from_string", blocked_upload):
+            with BackgroundWriter(max_pending_bytes=10) as writer:
+                writer.save(obj="12345678", location=self._location("mem://b/a.txt"))
+                thread = threading.Thread(
+                    target=writer.save,
+                    kwargs=dict(obj="1234", location=self._location("mem://b/b.txt")),
+                )
+                thread.start()
+                thread.join(timeout=0.2)
+                self.assertTrue(thread.is_alive())
+
+                gate.set()
+                thread.join(timeout=5)
+                self.assertFalse(thread.is_alive())
+
+        self.assertEqual(
+            self.connector.download_as_bytes(bucket_name="b", source_blob_name="b.txt"),
+            b"1234",
+        )
+
+    def test_spool_recovery(self):
+        """
+        GIVEN   a background writer with a spool, whose uploads fail
+        WHEN    a new writer is built on the same spool
+        THEN    it uploads the saves and the records the first one could not
+        """
+        import os
+
+        from google.api_core.exceptions import ServiceUnavailable
+
+        from wiser.gcloud.storage.services import BackgroundWriter, Storage
+        from wiser.gcloud.storage.types.metadata import ObjectMetadata
+
+        self.connector.failing = True
+        writer = BackgroundWriter(spool_dir=self.directory, fsync=True)
+        writer.save(
+            obj={"a": 1},
+            location=self._location("mem://b/a.json"),
+            metadata=ObjectMetadata(cache_control="no-cache"),
+        )
+        writer.append(record={"r": 1}, location=self._location("mem://b/logs/"))
+        with self.assertRaises(ServiceUnavailable):
+            writer.close()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+        self.connector.failing = False
+        with BackgroundWriter(spool_dir=self.directory):
+            pass
+
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(
+            Storage.get(location=self._location("mem://b/a.json")), {"a": 1}
+        )
+        metadata = self.connector.get_metadata(
+            bucket_name="b", source_blob_name="a.json"
+        )
+        self.assertEqual(metadata.cache_control, "no-cache")
+        self.assertEqual(metadata.content_type, "application/json")
+        self.assertEqual(self._batches("mem://b/logs/"), [[{"r": 1}]])
@@ -0,0 +1,178 @@
+import unittest
+
+
+class ChunkedArrayTest(unittest.TestCase):
+    def setUp(self):
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        class RecordingConnector(MemoryConnector):
+            def __init__(self):
+                super().__init__()
+                self.downloads = []
+
+            def download_as_bytes(self, bucket_name, source_blob_name):
+                self.downloads.append(source_blob_name)
+                return super().download_as_bytes(bucket_name, source_blob_name)
+
+        self.connector = RecordingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=self.connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+
+    @staticmethod
+    def _location(uri: str = "mem://bucket/arrays/a"):
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        return StorageLocationBuilder().from_uri(uri=uri).build()
+
+    def test_save_and_read_slices(self):
+        """
+        GIVEN   an array saved as a chunked array
+        WHEN    slices with steps, negative indices and integers are read
+        THEN    the values match numpy and only the overlapping chunks are downloaded
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import Storage
+
+        data = np.arange(20 * 30 * 4, dtype=np.float32).reshape(20, 30, 4)
+        Storage.save_chunked(obj=data, location=self._location(), chunks=(8, 8, 4))
+
+        array = Storage.open_array(location=self._location())
+
+        self.assertEqual(array.shape, (20, 30, 4))
+        self.assertEqual(array.dtype, np.float32)
+        self.assertEqual(array.grid, (3, 4, 1))
+        np.testing.assert_array_equal(array.read(), data)
+        for index in [
+            (slice(3, 12), slice(None, None, 7), 2),
+            (-1, Ellipsis),
+            (slice(None, None, -3), slice(29, 2, -5)),
+            (slice(5, 5),),
+        ]:
+            np.testing.assert_array_equal(array[index], data[index])
+
+        self.connector.downloads.clear()
+        array[0:8, 8:16]
+        self.assertEqual(self.connector.downloads, ["arrays/a/0.1.0"])
+
+    def test_strided_reads_touch_only_selected_chunks(self):
+        """
+        GIVEN   a chunked array of 31 chunks on one dimension
+        WHEN    a selection with a large step is read
+        THEN    only the chunks holding selected positions are downloaded
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import Storage
+
+        data = np.arange(3100 * 2, dtype=np.int64).reshape(3100, 2)
+        Storage.save_chunked(obj=data, location=self._location(), chunks=(100, 1))
+        array = Storage.open_array(location=self._location())
+
+        self.connector.downloads.clear()
+        np.testing.assert_array_equal(array[::1000, 1], data[::1000, 1])
+        self.assertEqual(
+            sorted(self.connector.downloads),
+            ["arrays/a/{}.1".format(i) for i in (0, 10, 20, 30)],
+        )
+
+    def test_partial_writes_and_fill_value(self):
+        """
+        GIVEN   an empty chunked array
+        WHEN    parts of it are written
+        THEN    the written chunks hold the values and the others the fill value
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import ChunkedArray
+
+        array = ChunkedArray.create(
+            location=self._location(),
+            shape=(10, 10),
+            dtype="int16",
+            chunks=(4, 4),
+            fill_value=-1,
+        )
+        expected = np.full((10, 10), -1, dtype=np.int16)
+
+        array[2:6, 3] = 7
+        expected[2:6, 3] = 7
+        array[8:, 8:] = np.arange(4).reshape(2, 2)
+        expected[8:, 8:] = np.arange(4).reshape(2, 2)
+
+        np.testing.assert_array_equal(
+            ChunkedArray.open(location=self._location()).read(), expected
+        )
+        names = self.connector.list_blobs(bucket_name="bucket", prefix="arrays/a/")
+        self.assertEqual(
+            names,
+            ["arrays/a/.array.json", "arrays/a/0.0", "arrays/a/1.0", "arrays/a/2.2"],
+        )
+        with self.assertRaises(IndexError):
+            array[::2] = 0
+
+    def test_writes_indexing_dimensions_by_integers(self):
+        """
+        GIVEN   a chunked array
+        WHEN    values are written to selections indexing dimensions by integers
+        THEN    they are broadcast to the selection as by numpy
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import ChunkedArray
+
+        array = ChunkedArray.create(
+            location=self._location(),
+            shape=(6, 5, 3),
+            dtype="int32",
+            chunks=(4, 2, 2),
+            fill_value=0,
+        )
+        expected = np.zeros((6, 5, 3), dtype=np.int32)
+
+        array[:, 3, 1] = np.arange(6)
+        expected[:, 3, 1] = np.arange(6)
+        array[2, :, 0] = np.arange(5) + 10
+        expected[2, :, 0] = np.arange(5) + 10
+        array[4, 1] = [20, 21, 22]
+        expected[4, 1] = [20, 21, 22]
+        array[1:3, 4] = 30
+        expected[1:3, 4] = 30
+
+        np.testing.assert_array_equal(array.read(), expected)
+        with self.assertRaises(ValueError):
+            array[:, 3, 1] = np.arange(5)
+
+    def test_structured_dtype_without_compression(self):
+        """
+        GIVEN   a structured array
+        WHEN    it is saved without compression and opened
+        THEN    the dtype and the values are preserved
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import Storage
+
+        data = np.zeros(5, dtype=[("a", "<i4"), ("b", "<f8", (2,))])
+        data["a"] = np.arange(5)
+
+        Storage.save_chunked(
+            obj=data, location=self._location(), chunks=(2,), compression=None
+        )
+        array = Storage.open_array(location=self._location())
+
+        self.assertEqual(array.dtype, data.dtype)
+        np.testing.assert_array_equal(array[1:4], data[1:4])
+
+    def test_default_chunks_fit_the_target(self):
+        """
+        GIVEN   a large shape
+        WHEN    the default chunks are computed
+        THEN    a chunk fits the target size
+        """
+        from wiser.gcloud.storage.services.chunked_array import default_chunks
+
+        chunks = default_chunks(shape=(10000, 10000), itemsize=8, target=1024 * 1024)
+
+        self.assertLessEqual(chunks[0] * chunks[1] * 8, 1024 * 1024)
+        self.assertEqual(default_chunks(shape=(), itemsize=8), ())
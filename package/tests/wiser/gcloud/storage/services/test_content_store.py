@@ -0,0 +1,140 @@
+import unittest
+
+
+class ContentStoreTest(unittest.TestCase):
+    def setUp(self):
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        class RecordingConnector(MemoryConnector):
+            def __init__(self):
+                super().__init__()
+                self.uploads = []
+
+            # Also records the uploads from files, which MemoryConnector delegates here
+            def upload_from_string(
+                self, data, bucket_name, destination_blob_name, **kw
+            ):
+                self.uploads.append(destination_blob_name)
+                return super().upload_from_string(
+                    data, bucket_name, destination_blob_name, **kw
+                )
+
+        self.connector = RecordingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=self.connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+
+    @staticmethod
+    def _store(grace_period: float = None):
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/cas").build()
+        return Storage.content_store(location=location, grace_period=grace_period)
+
+    def test_identical_contents_are_uploaded_once(self):
+        """
+        GIVEN   the same array saved under two names and a file with the same content
+        WHEN    they are put in the store
+        THEN    the content is uploaded once and every name reads it back
+        """
+        import io
+
+        import numpy as np
+
+        from wiser.gcloud.storage.utils.codecs import encode
+
+        store = self._store()
+        array = np.arange(100)
+
+        digest = store.put(name="run_1/a.npy", obj=array)
+        self.assertTrue(store.contains(digest))
+        self.assertEqual(store.put(name="run_2/a.npy", obj=array), digest)
+        self.assertEqual(
+            store.put_file(
+                name="run_3/a.npy", file=io.BytesIO(encode(obj=array, filename="a.npy"))
+            ),
+            digest,
+        )
+
+        content_uploads = [
+            name for name in self.connector.uploads if "/objects/" in name
+        ]
+        self.assertEqual(content_uploads, ["cas/objects/" + digest[:2] + "/" + digest])
+        self.assertEqual(store.names(), ["run_1/a.npy", "run_2/a.npy", "run_3/a.npy"])
+        self.assertEqual(store.names(prefix="run_2/"), ["run_2/a.npy"])
+        self.assertEqual(store.resolve(name="run_2/a.npy"), digest)
+        np.testing.assert_array_equal(store.get(name="run_3/a.npy"), array)
+        self.assertFalse(store.exists(name="run_4/a.npy"))
+        with self.assertRaises(KeyError):
+            store.get(name="run_4/a.npy")
+
+    def test_gc_deletes_unreferenced_contents(self):
+        """
+        GIVEN   contents referenced by zero, one or two names
+        WHEN    the garbage collection runs within and after the grace period
+        THEN    only the old unreferenced contents are deleted
+        """
+        store = self._store()
+        kept = store.put(name="a.txt", obj="kept")
+        shared = store.put(name="b.txt", obj="shared")
+        store.put(name="c.txt", obj="shared")
+        dropped = store.put(name="d.txt", obj="dropped")
+        store.delete(name="b.txt")
+        store.delete(name="d.txt")
+
+        self.assertEqual(store.gc(), [])
+
+        store.grace_period = 0
+        self.assertEqual(store.gc(), [dropped])
+        self.assertFalse(store.contains(dropped))
+        self.assertTrue(store.contains(kept))
+        self.assertEqual(store.get(name="c.txt"), "shared")
+        self.assertTrue(store.contains(shared))
+
+    def test_old_content_is_renewed_when_referenced_again(self):
+        """
+        GIVEN   an unreferenced content older than half the grace period
+        WHEN    it is put again under a new name
+        THEN    it is not uploaded but renewed, so that a collection keeps it
+        """
+        store = self._store(grace_period=0)
+        digest = store.put(name="a.txt", obj="content")
+        store.delete(name="a.txt")
+        generation = store._content_metadata(digest=digest).generation
+        self.connector.uploads.clear()
+
+        store.put(name="b.txt", obj="content")
+
+        self.assertEqual(self.connector.uploads, ["cas/refs/b.txt.ref"])
+        self.assertNotEqual(
+            store._content_metadata(digest=digest).generation, generation
+        )
+        self.assertEqual(store.gc(), [])
+        self.assertEqual(store.get(name="b.txt"), "content")
+
+    def test_content_collected_while_renewed_is_uploaded_again(self):
+        """
+        GIVEN   an old unreferenced content, collected after its metadata is read
+        WHEN    it is put again as a raw buffer
+        THEN    its renewal fails and it is uploaded again instead
+        """
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import MemoryConnector
+
+        store = self._store(grace_period=0)
+        digest = store.put(name="a.bin", obj=b"content", raw=True)
+        store.delete(name="a.bin")
+        copy = MemoryConnector.copy
+
+        def collected_copy(connector, **kwargs):
+            store.gc()
+            return copy(connector, **kwargs)
+
+        with patch.object(MemoryConnector, "copy", collected_copy):
+            self.assertEqual(
+                store.put(name="b.bin", obj=bytearray(b"content"), raw=True), digest
+            )
+
+        self.assertTrue(store.contains(digest))
+        self.assertEqual(store.get_bytes(name="b.bin"), b"content")
@@ -0,0 +1,232 @@
+import multiprocessing
+import unittest
+from unittest.mock import patch
+
+BUCKET = "bucket"
+
+
+@unittest.skipUnless(
+    "fork" in multiprocessing.get_all_start_methods(),
+    "Patches reach the workers only with fork",
+)
+class DecodePoolTest(unittest.TestCase):
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.download_to_filename"
+    )
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.download_as_string"
+    )
+    def test_get_decodes_in_worker_processes(self, download_string_mock, download_mock):
+        """
+        GIVEN   a decode pool
+        WHEN    Storage.get() is invoked with the pool
+        THEN    arrays and other objects are decoded by the workers and returned
+        """
+        import numpy as np
+        from wiser.gcloud.storage.services import DecodePool, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        data = np.arange(1000).reshape(10, 100)
+
+        def write_to_file(filename, bucket_name, source_blob_name):
+            with open(filename, "wb") as f:
+                np.save(f, data)
+
+        download_mock.side_effect = write_to_file
+        download_string_mock.return_value = '{"a": 1}'
+
+        array_location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.npy")
+            .build()
+        )
+        json_location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.json")
+            .build()
+        )
+
+        with DecodePool(
+            max_workers=2, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            np.testing.assert_array_equal(
+                Storage.get(location=array_location, decode_pool=pool), data
+            )
+            self.assertEqual(
+                list(pool.map(locations=[json_location, json_location])),
+                [{"a": 1}, {"a": 1}],
+            )
+
+    def test_errors_are_raised_to_the_caller(self):
+        """
+        GIVEN   a decode pool
+        WHEN    a location with an unknown extension is decoded
+        THEN    the error of the worker is raised
+        """
+        from wiser.gcloud.storage.services import DecodePool
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.xxpp")
+            .build()
+        )
+
+        with DecodePool(
+            max_workers=1, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            with self.assertRaises(ValueError):
+                pool.get(location=location)
+
+    def test_get_images_decodes_in_worker_processes(self):
+        """
+        GIVEN   images in the in-memory backend
+        WHEN    they are fetched in batch with a decode pool
+        THEN    resized images and arrays are returned in order
+        """
+        import numpy as np
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import DecodePool, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        locations = []
+        for i in range(3):
+            location = (
+                StorageLocationBuilder()
+                .from_uri(uri="mem://bucket/{}.png".format(i))
+                .build()
+            )
+            Storage.save_image(
+                obj=np.full((40, 80), i, dtype=np.uint8), location=location
+            )
+            locations.append(location)
+
+        with DecodePool(
+            max_workers=2, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            arrays = list(
+                Storage.get_images(
+                    locations=locations, size=(20, 20), as_array=True, decode_pool=pool
+                )
+            )
+            images = list(pool.map_images(locations=locations[:1]))
+
+        self.assertEqual([array.shape for array in arrays], [(10, 20)] * 3)
+        self.assertEqual([int(array[0, 0]) for array in arrays], [0, 1, 2])
+        self.assertEqual(images[0].size, (80, 40))
+
+    def test_signed_urls_are_downloaded_by_the_workers(self):
+        """
+        GIVEN   a decode pool downloading through signed URLs
+        WHEN    blobs and images are fetched
+        THEN    the workers download the URLs signed by the caller and decode them
+        """
+        import numpy as np
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import DecodePool
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+        from wiser.gcloud.storage.utils.codecs import encode
+
+        from tests.wiser.gcloud.storage.utils.test_http import serve
+
+        objects = {
+            "/bucket/a.json": encode(obj={"a": 1}, filename="a.json"),
+            "/bucket/b.npy": encode(obj=np.arange(6), filename="b.npy"),
+            "/bucket/c.png": encode(
+                obj=np.zeros((40, 80), dtype=np.uint8), filename="c.png"
+            ),
+        }
+        server = serve(objects=objects)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:{}".format(server.server_address[1])
+
+        class SigningConnector(MemoryConnector):
+            def generate_signed_urls(self, bucket_name, blob_names, **kwargs):
+                return [
+                    "{}/{}/{}?X-Goog-Signature=abc".format(url, bucket_name, name)
+                    for name in blob_names
+                ]
+
+        ConnectorRegistry.register(prefix="mem://", connector=SigningConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        a, b, c = [
+            StorageLocationBuilder().from_uri(uri="mem://bucket/" + name).build()
+            for name in ("a.json", "b.npy", "c.png")
+        ]
+
+        with DecodePool(
+            max_workers=2,
+            mp_context=multiprocessing.get_context("fork"),
+            signed_urls=True,
+        ) as pool:
+            self.assertEqual(list(pool.map(locations=[a])), [{"a": 1}])
+            np.testing.assert_array_equal(pool.get(location=b), np.arange(6))
+            images = list(pool.map_images(locations=[c], size=(20, 20), as_array=True))
+
+        self.assertEqual(images[0].shape, (10, 20))
+
+    def test_iter_csv_parses_chunks_in_worker_processes(self):
+        """
+        GIVEN   a decode pool and a .csv blob larger than the prefetched chunks
+        WHEN    its rows are iterated with the pool
+        THEN    the workers parse the chunks and the rows are returned in order
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import DecodePool, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.csv").build()
+        rows = [[str(i), "value {}".format(i)] for i in range(500)]
+        Storage.write_csv(location=location, rows=rows)
+
+        with DecodePool(
+            max_workers=2, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            read = list(
+                Storage.iter_csv(location=location, chunk_size=100, decode_pool=pool)
+            )
+
+        self.assertEqual(read, rows)
+
+    def test_workers_without_credentials_serve_other_backends(self):
+        """
+        GIVEN   a decode pool started without Google Cloud credentials
+        WHEN    blobs of the in-memory backend are read with the pool
+        THEN    the workers start and decode them
+        """
+        import os
+        import tempfile
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import DecodePool, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.json").build()
+        Storage.save(obj={"a": 1}, location=location)
+        config_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(config_dir.cleanup)
+        environ = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in ("GOOGLE_APPLICATION_CREDENTIALS", "GOOGLE_CLOUD_PROJECT")
+        }
+        # Neither a gcloud configuration nor a metadata server provides credentials
+        environ.update(CLOUDSDK_CONFIG=config_dir.name)
+
+        with patch.dict(os.environ, environ, clear=True), patch(
+            "google.auth.compute_engine._metadata.is_on_gce", return_value=False
+        ):
+            with DecodePool(
+                max_workers=1, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                self.assertEqual(pool.get(location=location), {"a": 1})
@@ -0,0 +1,205 @@
+import unittest
+
+
+class ListingCacheTest(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        class CountingConnector(MemoryConnector):
+            def __init__(self):
+                super().__init__()
+                self.listings = 0
+
+            def list_entries(self, bucket_name, prefix=None):
+                self.listings += 1
+                return super().list_entries(bucket_name=bucket_name, prefix=prefix)
+
+        self.connector = CountingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=self.connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for name in ["data/a.json", "data/b.json", "other/c.json"]:
+            self.connector.upload_from_string(
+                data=b"{}", bucket_name="bucket", destination_blob_name=name
+            )
+
+    def _names(self, uri: str):
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        return [
+            location.blob_name
+            for location in Storage.get_list_content(
+                location=StorageLocationBuilder().from_uri(uri=uri).build()
+            )
+        ]
+
+    def test_warm_restart_skips_listing(self):
+        """
+        GIVEN   a listing cache in a local folder
+        WHEN    a prefix is listed, then listed again by a new cache on the same folder
+        THEN    only the first call lists, until the listing expires
+        """
+        from wiser.gcloud.storage.services import ListingCache, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        self.addCleanup(Storage.set_listing_cache, None)
+        Storage.set_listing_cache(ListingCache(directory=self.directory))
+        self.assertEqual(
+            self._names("mem://bucket/data/"), ["data/a.json", "data/b.json"]
+        )
+
+        Storage.set_listing_cache(ListingCache(directory=self.directory))
+        self.assertEqual(
+            self._names("mem://bucket/data/"), ["data/a.json", "data/b.json"]
+        )
+        self.assertEqual(self.connector.listings, 1)
+
+        cache = ListingCache(directory=self.directory)
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/data/").build()
+        entries = cache.entries(location=location, connector=self.connector)
+        self.assertEqual(
+            [(entry.size, entry.generation is not None) for entry in entries],
+            [(2, True), (2, True)],
+        )
+
+        Storage.set_listing_cache(ListingCache(directory=self.directory, max_age=0))
+        self.connector.upload_from_string(
+            data=b"{}", bucket_name="bucket", destination_blob_name="data/z.json"
+        )
+        self.assertEqual(
+            self._names("mem://bucket/data/"),
+            ["data/a.json", "data/b.json", "data/z.json"],
+        )
+        self.assertEqual(self.connector.listings, 2)
+
+    def test_writes_are_applied_to_cached_listings(self):
+        """
+        GIVEN   a cached listing
+        WHEN    blobs are saved and moved through Storage
+        THEN    the listings reflect the writes without listing again, also after a restart
+        """
+        from wiser.gcloud.storage.services import ListingCache, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        self.addCleanup(Storage.set_listing_cache, None)
+        Storage.set_listing_cache(ListingCache(directory=self.directory))
+        self.assertEqual(
+            self._names("mem://bucket/data/"), ["data/a.json", "data/b.json"]
+        )
+        self.assertEqual(self._names("mem://bucket/other/"), ["other/c.json"])
+
+        Storage.save(
+            obj={"x": 1},
+            location=StorageLocationBuilder()
+            .from_uri(uri="mem://bucket/data/n.json")
+            .build(),
+        )
+        Storage.move(
+            source_location=StorageLocationBuilder()
+            .from_uri(uri="mem://bucket/data/a.json")
+            .build(),
+            dest_location=StorageLocationBuilder()
+            .from_uri(uri="mem://bucket/other/a.json")
+            .build(),
+        )
+
+        self.assertEqual(
+            self._names("mem://bucket/data/"), ["data/b.json", "data/n.json"]
+        )
+        self.assertEqual(
+            self._names("mem://bucket/other/"), ["other/a.json", "other/c.json"]
+        )
+        Storage.set_listing_cache(ListingCache(directory=self.directory))
+        self.assertEqual(
+            self._names("mem://bucket/data/"), ["data/b.json", "data/n.json"]
+        )
+        self.assertEqual(self.connector.listings, 2)
+
+    def test_corrupted_listing_is_listed_again(self):
+        """
+        GIVEN   a cached listing file that was corrupted
+        WHEN    the prefix is listed
+        THEN    the blobs are listed again
+        """
+        import glob
+        import os
+
+        from wiser.gcloud.storage.services import ListingCache
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        cache = ListingCache(directory=self.directory)
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/data/").build()
+        cache.entries(location=location, connector=self.connector)
+        for path in glob.glob(os.path.join(self.directory, "*", "*.listing")):
+            with open(path, "wb") as f:
+                f.write(b"garbage")
+
+        entries = cache.entries(location=location, connector=self.connector)
+
+        self.assertEqual(
+            [entry.name for entry in entries], ["data/a.json", "data/b.json"]
+        )
+        self.assertEqual(self.connector.listings, 2)
+        cache.invalidate(location=location)
+        cache.entries(location=location, connector=self.connector)
+        self.assertEqual(self.connector.listings, 3)
+
+    def test_expired_writes_are_pruned_and_journal_compacted(self):
+        """
+        GIVEN   two caches on the same folder, recording writes
+        WHEN    the writes expire and the journal is compacted
+        THEN    expired writes are dropped from memory, and the compaction keeps the
+                writes recorded by the other cache
+        """
+        import json
+        import os
+        import time
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.services import ListingCache, listing_cache
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        def location(name: str):
+            return StorageLocationBuilder().from_uri(uri="mem://bucket/" + name).build()
+
+        cache = ListingCache(directory=self.directory, max_age=0.5)
+        other = ListingCache(directory=self.directory, max_age=60)
+        cache.record_write(location=location("data/old.json"), size=1)
+        time.sleep(0.6)
+        other.record_write(location=location("data/other.json"), size=1)
+        cache.record_write(location=location("data/new.json"), size=1)
+
+        bucket_dir = cache._bucket_dir(location=location("data/new.json"))
+        self.assertEqual(
+            [write[1] for write in cache._writes[bucket_dir]], ["data/new.json"]
+        )
+        with patch.object(listing_cache, "COMPACT_EVERY", 1):
+            cache.record_write(location=location("data/last.json"), size=1)
+        with open(os.path.join(bucket_dir, listing_cache.WRITES_JOURNAL)) as f:
+            names = [json.loads(line)[1] for line in f]
+        self.assertEqual(names, ["data/other.json", "data/new.json", "data/last.json"])
+
+    def test_text_writes_record_their_size_in_bytes(self):
+        """
+        GIVEN   a listing cache
+        WHEN    a text with multi-byte characters is saved through Storage
+        THEN    its size in the cached listing is its size in bytes
+        """
+        from wiser.gcloud.storage.services import ListingCache, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        self.addCleanup(Storage.set_listing_cache, None)
+        cache = ListingCache(directory=self.directory)
+        Storage.set_listing_cache(cache)
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/t/a.txt").build()
+        cache.entries(location=location, connector=self.connector)
+
+        Storage.save(obj="é" * 10, location=location)
+
+        (entry,) = cache.entries(location=location, connector=self.connector)
+        self.assertEqual(entry.size, 20)
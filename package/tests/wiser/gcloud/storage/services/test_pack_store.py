@@ -0,0 +1,122 @@
+import unittest
+
+
+class PackStoreTest(unittest.TestCase):
+    def setUp(self):
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        class RecordingConnector(MemoryConnector):
+            def __init__(self):
+                super().__init__()
+                self.ranges = []
+
+            def download_range(self, bucket_name, source_blob_name, start, end, **kw):
+                self.ranges.append((source_blob_name, start, end))
+                return super().download_range(
+                    bucket_name, source_blob_name, start, end, **kw
+                )
+
+        self.connector = RecordingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=self.connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+
+    @staticmethod
+    def _location(uri: str = "mem://bucket/packs/small"):
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        return StorageLocationBuilder().from_uri(uri=uri).build()
+
+    def test_write_and_read(self):
+        """
+        GIVEN   small objects written with a pack writer
+        WHEN    they are read by name, by location and in batch
+        THEN    each read is a single range request and the objects are decoded
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services import Storage
+
+        with Storage.pack_writer(location=self._location()) as writer:
+            for i in range(10):
+                writer.add(name="docs/{}.json".format(i), obj={"i": i})
+            writer.add(name="arrays/a.npy", obj=np.arange(5))
+            writer.add(name="raw.txt", obj=b"raw", raw=True)
+
+        blobs = self.connector.list_blobs(bucket_name="bucket", prefix="packs/small/")
+        self.assertEqual(len(blobs), 2)
+
+        reader = Storage.open_packs(location=self._location())
+        self.assertEqual(len(reader), 12)
+        self.assertIn("docs/3.json", reader)
+        self.assertEqual(reader.get("docs/3.json"), {"i": 3})
+        self.assertEqual(len(self.connector.ranges), 1)
+        self.assertEqual(
+            reader.get(self._location("mem://bucket/packs/small/raw.txt")), "raw"
+        )
+        np.testing.assert_array_equal(reader.get("arrays/a.npy"), np.arange(5))
+
+        self.connector.ranges.clear()
+        names = ["docs/{}.json".format(i) for i in (7, 1, 4)]
+        self.assertEqual(reader.get_many(keys=names), [{"i": 7}, {"i": 1}, {"i": 4}])
+        self.assertEqual(len(self.connector.ranges), 1)
+
+        with self.assertRaises(KeyError):
+            reader.get("missing.json")
+        with self.assertRaises(ValueError):
+            reader.get(self._location("mem://bucket/other/a.json"))
+
+    def test_overwrite_delete_and_compact(self):
+        """
+        GIVEN   packs whose objects are overwritten and deleted by later packs
+        WHEN    the packs are compacted
+        THEN    the live objects are kept in fewer packs and deletions stay effective
+        """
+        from wiser.gcloud.storage.services import Storage
+
+        writer = Storage.pack_writer(location=self._location(), pack_size=64)
+        for i in range(8):
+            writer.add(name="{}.txt".format(i), obj="version 1 of {}".format(i) * 2)
+        writer.flush()
+        writer.add(name="0.txt", obj="version 2")
+        writer.delete(name="1.txt")
+        writer.close()
+        reader = Storage.open_packs(location=self._location())
+        packs_before = len(reader._indexes)
+
+        self.assertEqual(reader.get("0.txt"), "version 2")
+        self.assertNotIn("1.txt", reader)
+
+        rewritten = reader.compact()
+
+        self.assertEqual(len(rewritten), packs_before)
+        self.assertLess(len(reader._indexes), packs_before)
+        reader = Storage.open_packs(location=self._location())
+        self.assertEqual(len(reader), 7)
+        self.assertEqual(reader.get("0.txt"), "version 2")
+        self.assertNotIn("1.txt", reader)
+        self.assertEqual(reader.get("7.txt"), "version 1 of 7" * 2)
+        self.assertEqual(reader.compact(), [])
+
+    def test_compaction_keeps_shadowing_deletions(self):
+        """
+        GIVEN   a large pack and later small packs, one deleting an object of the large one
+        WHEN    only the small packs are compacted
+        THEN    the deleted object stays hidden
+        """
+        from wiser.gcloud.storage.services import Storage
+
+        with Storage.pack_writer(location=self._location()) as writer:
+            for i in range(4):
+                writer.add(name="{}.txt".format(i), obj="x" * 100)
+        with Storage.pack_writer(location=self._location()) as writer:
+            writer.delete(name="0.txt")
+            writer.add(name="4.txt", obj="y")
+        with Storage.pack_writer(location=self._location()) as writer:
+            writer.add(name="5.txt", obj="z")
+
+        reader = Storage.open_packs(location=self._location())
+        self.assertEqual(len(reader.compact(min_live_ratio=0.5, small_pack_size=50)), 2)
+
+        self.assertEqual(len(reader._indexes), 2)
+        self.assertEqual(reader.names(), ["1.txt", "2.txt", "3.txt", "4.txt", "5.txt"])
+        self.assertEqual(reader.get("4.txt"), "y")
@@ -1,3 +1,4 @@
+import os
 import unittest
 from unittest.mock import patch
 
@@ -212,6 +213,260 @@ class StorageServiceTest(unittest.TestCase):
 
         self.assertEqual(data, Storage.get(location=location))
 
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_metadata"
+    )
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.download_range"
+    )
+    def test_get_array_slice(self, download_range_mock, metadata_mock):
+        """
+        GIVEN   a valid location pointing to a numpy array data
+        WHEN    Storage.get_array_slice() is invoked
+        THEN    the slice is returned downloading only the header and the selected rows
+        """
+        import io
+        import numpy as np
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types import BlobMetadata
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.npy")
+            .build()
+        )
+
+        data = np.arange(1000 * 50, dtype=np.float64).reshape(1000, 50)
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        content = buffer.getvalue()
+
+        def read_range(bucket_name, source_blob_name, start, end, generation=None):
+            return content[start : end + 1]
+
+        download_range_mock.side_effect = read_range
+        metadata_mock.return_value = BlobMetadata(
+            bucket=BUCKET, name=location.blob_name, size=len(content), generation=42
+        )
+
+        np.testing.assert_array_equal(
+            Storage.get_array_slice(location=location, index=slice(10, 12)),
+            data[10:12],
+        )
+        self.assertEqual(download_range_mock.call_count, 2)
+        range_kwargs = download_range_mock.call_args.kwargs
+        self.assertEqual(range_kwargs["end"] - range_kwargs["start"] + 1, 2 * 50 * 8)
+        self.assertEqual(
+            [call.kwargs["generation"] for call in download_range_mock.call_args_list],
+            [42, 42],
+        )
+
+        np.testing.assert_array_equal(
+            Storage.get_array_slice(
+                location=location, index=(slice(None, None, 100), 3)
+            ),
+            data[::100, 3],
+        )
+        self.assertEqual(Storage.get_array_slice(location=location, index=(7, 7)), 357)
+
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_metadata"
+    )
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.download_range"
+    )
+    def test_get_array_slice_merges_close_ranges(
+        self, download_range_mock, metadata_mock
+    ):
+        """
+        GIVEN   a valid location pointing to a numpy array data
+        WHEN    Storage.get_array_slice() selects close ranges
+        THEN    the ranges are downloaded with a single request
+        """
+        import io
+        import numpy as np
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types import BlobMetadata
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.npy")
+            .build()
+        )
+
+        data = np.arange(100 * 10, dtype=np.int32).reshape(100, 10)
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        content = buffer.getvalue()
+
+        download_range_mock.side_effect = (
+            lambda bucket_name, source_blob_name, start, end, generation=None: content[
+                start : end + 1
+            ]
+        )
+        metadata_mock.return_value = BlobMetadata(
+            bucket=BUCKET, name=location.blob_name, size=len(content), generation=1
+        )
+
+        np.testing.assert_array_equal(
+            Storage.get_array_slice(location=location, index=(slice(0, 10), 2)),
+            data[0:10, 2],
+        )
+        # The header and one request for all the rows
+        self.assertEqual(download_range_mock.call_count, 2)
+
+        download_range_mock.reset_mock()
+        Storage.get_array_slice(location=location, index=(slice(0, 10), 2), max_gap=0)
+        self.assertEqual(download_range_mock.call_count, 11)
+
+    def test_get_array_slice_overwritten_during_the_read(self):
+        """
+        GIVEN   a .npy blob overwritten after its header is read
+        WHEN    Storage.get_array_slice() reads its data
+        THEN    the read fails instead of mixing the two arrays
+        """
+        from unittest.mock import patch
+
+        import numpy as np
+        from google.api_core.exceptions import NotFound
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.npy").build()
+        Storage.save(obj=np.arange(100, dtype=np.int64), location=location)
+        get_npy_header = Storage._get_npy_header
+
+        def overwritten(**kwargs):
+            header = get_npy_header(**kwargs)
+            Storage.save(obj=np.arange(100, dtype=np.int8), location=location)
+            return header
+
+        with patch.object(Storage, "_get_npy_header", side_effect=overwritten):
+            with self.assertRaises(NotFound):
+                Storage.get_array_slice(location=location, index=slice(10, 20))
+
+    @unittest.skipUnless(os.name == "posix", "Shared memory mode requires POSIX")
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_metadata"
+    )
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.download_range"
+    )
+    def test_get_numpy_shared_memory(self, download_range_mock, get_metadata_mock):
+        """
+        GIVEN   a valid location pointing to a numpy array data
+        WHEN    Storage.get() is invoked twice in shared memory mode
+        THEN    the data is downloaded once and read-only views are returned
+        """
+        import io
+        import uuid
+        import numpy as np
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types import BlobMetadata
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/{}.npy".format(uuid.uuid4()))
+            .build()
+        )
+
+        data = np.arange(1000 * 50, dtype=np.float64).reshape(1000, 50)
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        content = buffer.getvalue()
+
+        get_metadata_mock.return_value = BlobMetadata(
+            bucket=BUCKET, name=location.blob_name, generation=1
+        )
+        download_range_mock.side_effect = (
+            lambda bucket_name, source_blob_name, start, end, generation: content[
+                start : end + 1
+            ]
+        )
+
+        first = Storage.get(location=location, shared_memory=True)
+        second = Storage.get(location=location, shared_memory=True)
+
+        np.testing.assert_array_equal(first, data)
+        np.testing.assert_array_equal(second, data)
+        self.assertFalse(second.flags.writeable)
+        # Header and data of the first call only
+        self.assertEqual(download_range_mock.call_count, 2)
+        for call in download_range_mock.call_args_list:
+            self.assertEqual(call.kwargs["generation"], 1)
+
+    def test_get_array_slice_not_numpy_raises_value_error(self):
+        """
+        GIVEN   a location not pointing to a numpy array
+        WHEN    Storage.get_array_slice() is invoked
+        THEN    value error is raised
+        """
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.json")
+            .build()
+        )
+
+        with self.assertRaises(ValueError):
+            Storage.get_array_slice(location=location, index=0)
+
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_size"
+    )
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.download_range"
+    )
+    def test_get_lines(self, download_range_mock, get_size_mock):
+        """
+        GIVEN   a valid location pointing to a csv file
+        WHEN    Storage.get_lines() is invoked
+        THEN    the selected lines are returned
+        """
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.csv")
+            .build()
+        )
+
+        lines = ["a,b,c"] + ["{},{},{}".format(i, i * 2, i * 3) for i in range(100)]
+        for content in ["\n".join(lines), "\r\n".join(lines) + "\r\n"]:
+            content = content.encode("utf-8")
+            get_size_mock.return_value = len(content)
+            download_range_mock.side_effect = lambda bucket_name, source_blob_name, start, end, generation=None: content[
+                start : end + 1
+            ]
+
+            index = Storage.get_line_index(location=location, chunk_size=64)
+            self.assertEqual(len(index), len(lines) + 1)
+
+            download_range_mock.reset_mock()
+            self.assertEqual(
+                Storage.get_lines(location=location, start=10, stop=20, index=index),
+                lines[10:20],
+            )
+            self.assertEqual(download_range_mock.call_count, 1)
+            self.assertEqual(Storage.get_lines(location=location, start=-2), lines[-2:])
+            self.assertEqual(
+                Storage.get_lines(location=location, start=200, index=index), []
+            )
+
     @patch(
         "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.upload_from_file"
     )
@@ -440,16 +695,20 @@ class StorageServiceTest(unittest.TestCase):
         storage_mock.return_value = False
         self.assertEqual(Storage.exists(location=location), False)
 
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_metadata"
+    )
     @patch("wiser.gcloud.storage.connectors.storage_connector.StorageConnector.copy")
     @patch("wiser.gcloud.storage.connectors.storage_connector.StorageConnector.delete")
-    def test_move_returns_none(self, delete_mock, copy_mock):
+    def test_move_returns_none(self, delete_mock, copy_mock, get_metadata_mock):
         """
         GIVEN   two valid locations
         WHEN    Storage.move() is invoked
-        THEN    None is returned
+        THEN    None is returned and the copied generation is the deleted one
         """
 
         from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types import BlobMetadata
         from wiser.gcloud.storage.types.location import StorageLocationBuilder
 
         location_1 = (
@@ -467,7 +726,781 @@ class StorageServiceTest(unittest.TestCase):
 
         delete_mock.return_value = None
         copy_mock.return_value = None
+        get_metadata_mock.return_value = BlobMetadata(
+            bucket=BUCKET, name=location_1.blob_name, generation=42
+        )
 
         self.assertEqual(
             Storage.move(source_location=location_1, dest_location=location_2), None
         )
+        self.assertEqual(copy_mock.call_args.kwargs["if_source_generation_match"], 42)
+        self.assertEqual(delete_mock.call_args.kwargs["if_generation_match"], 42)
+
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_metadata"
+    )
+    def test_move_missing_source_raises_value_error(self, get_metadata_mock):
+        """
+        GIVEN   a source location that does not exist
+        WHEN    Storage.move() is invoked
+        THEN    value error is raised
+        """
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/a/file.json")
+            .build()
+        )
+        get_metadata_mock.return_value = None
+
+        with self.assertRaises(ValueError):
+            Storage.move(source_location=location, dest_location=location)
+
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.get_metadata"
+    )
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.upload_from_file"
+    )
+    def test_save_skip_if_identical(self, upload_mock, get_metadata_mock):
+        """
+        GIVEN   a numpy array already saved in a location
+        WHEN    Storage.save() is invoked with skip_if_identical
+        THEN    the upload is skipped only if the remote checksum matches
+        """
+        import io
+        import numpy as np
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types import BlobMetadata
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+        from wiser.gcloud.storage.utils.checksums import crc32c
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.npy")
+            .build()
+        )
+        data = np.arange(100)
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+
+        get_metadata_mock.return_value = BlobMetadata(
+            bucket=BUCKET,
+            name=location.blob_name,
+            generation=3,
+            crc32c=crc32c(buffer.getvalue()),
+        )
+        Storage.save(obj=data, location=location, skip_if_identical=True)
+        upload_mock.assert_not_called()
+
+        Storage.save(obj=data + 1, location=location, skip_if_identical=True)
+        upload_mock.assert_called_once()
+
+        upload_mock.reset_mock()
+        get_metadata_mock.return_value = None
+        Storage.save(obj=data, location=location, skip_if_identical=True)
+        upload_mock.assert_called_once()
+
+    def test_save_skip_if_identical_compares_metadata(self):
+        """
+        GIVEN   a blob saved with object metadata
+        WHEN    the same content is saved with skip_if_identical and other metadata
+        THEN    it is uploaded with the new metadata, and skipped when nothing changes
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+        from wiser.gcloud.storage.types.metadata import ObjectMetadata
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.json").build()
+
+        def save(**metadata):
+            Storage.save(
+                obj={"a": 1},
+                location=location,
+                skip_if_identical=True,
+                metadata=ObjectMetadata(**metadata),
+            )
+            return connector.get_metadata(
+                bucket_name="bucket", source_blob_name="a.json"
+            )
+
+        generation = save(cache_control="no-cache").generation
+        self.assertEqual(save(cache_control="no-cache").generation, generation)
+
+        for metadata in [
+            dict(cache_control="max-age=60"),
+            dict(cache_control="max-age=60", metadata={"source": "a"}),
+            dict(cache_control="max-age=60", content_type="text/plain"),
+        ]:
+            current = save(**metadata)
+            self.assertNotEqual(current.generation, generation)
+            generation = current.generation
+            self.assertEqual(current.cache_control, "max-age=60")
+        self.assertEqual(current.content_type, "text/plain")
+        self.assertEqual(current.metadata, None)
+
+    @patch(
+        "wiser.gcloud.storage.connectors.storage_connector.StorageConnector.upload_from_string"
+    )
+    def test_save_if_not_exists(self, upload_mock):
+        """
+        GIVEN   a valid location pointing to a json file
+        WHEN    Storage.save() is invoked with if_not_exists
+        THEN    the upload requires the blob not to exist
+        """
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = (
+            StorageLocationBuilder()
+            .set_bucket(bucket=BUCKET)
+            .set_blob_name(blob_name="path/to/data.json")
+            .build()
+        )
+
+        Storage.save(obj={"a": 1}, location=location, if_not_exists=True)
+        self.assertEqual(upload_mock.call_args.kwargs["if_generation_match"], 0)
+
+        Storage.save(obj={"a": 1}, location=location, if_generation_match=5)
+        self.assertEqual(upload_mock.call_args.kwargs["if_generation_match"], 5)
+
+        with self.assertRaises(ValueError):
+            Storage.save(
+                obj={"a": 1},
+                location=location,
+                if_not_exists=True,
+                if_generation_match=5,
+            )
+
+    def test_in_memory_backend_round_trip(self):
+        """
+        GIVEN   locations with the 'mem://' prefix
+        WHEN    content is saved, listed, read and moved to a 'file://' location
+        THEN    the in-memory and local connectors serve the calls
+        """
+        import tempfile
+
+        from wiser.gcloud.storage.connectors import (
+            ConnectorRegistry,
+            LocalConnector,
+            MemoryConnector,
+        )
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        ConnectorRegistry.register(
+            prefix="file://", connector=LocalConnector(root=tmp_dir.name)
+        )
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "file://", LocalConnector())
+
+        location = (
+            StorageLocationBuilder().from_uri(uri="mem://bucket/a/b.json").build()
+        )
+        Storage.save(obj={"a": 1}, location=location)
+
+        self.assertEqual(Storage.get(location=location), {"a": 1})
+        self.assertEqual(
+            [
+                l.complete_path()
+                for l in Storage.get_list_content(
+                    location=StorageLocationBuilder()
+                    .from_uri(uri="mem://bucket/a/")
+                    .build()
+                )
+            ],
+            ["mem://bucket/a/b.json"],
+        )
+
+        dest_location = (
+            StorageLocationBuilder().from_uri(uri="file:///bucket/c.json").build()
+        )
+        Storage.move(source_location=location, dest_location=dest_location)
+
+        self.assertFalse(Storage.exists(location=location))
+        self.assertEqual(Storage.get(location=dest_location), {"a": 1})
+        self.assertTrue(os.path.isfile(os.path.join(tmp_dir.name, "bucket", "c.json")))
+
+    def test_coalesced_get_downloads_once(self):
+        """
+        GIVEN   a blob and concurrent threads
+        WHEN    Storage.get() is invoked with coalesce by every thread
+        THEN    the blob is downloaded and decoded once and every thread receives it
+        """
+        import threading
+
+        from tests.wiser.gcloud.storage.utils.test_single_flight import (
+            wait_for_waiters,
+        )
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        release = threading.Event()
+        downloads = []
+
+        class SlowConnector(MemoryConnector):
+            def download_as_bytes(self, bucket_name, source_blob_name):
+                downloads.append(source_blob_name)
+                release.wait()
+                return super().download_as_bytes(
+                    bucket_name=bucket_name, source_blob_name=source_blob_name
+                )
+
+        ConnectorRegistry.register(prefix="mem://", connector=SlowConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = (
+            StorageLocationBuilder().from_uri(uri="mem://bucket/config.json").build()
+        )
+        Storage.save(obj={"a": 1}, location=location)
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    Storage.get(location=location, coalesce=True)
+                )
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        wait_for_waiters(
+            flight=Storage._single_flight,
+            key=("get", location.complete_path(), False),
+            waiters=3,
+        )
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(downloads), 1)
+        self.assertEqual(results, [{"a": 1}] * 4)
+
+    def test_get_dataframe_without_pyarrow_raises_install_hint(self):
+        """
+        GIVEN   an environment without pyarrow
+        WHEN    Storage.get_dataframe() is invoked
+        THEN    the ImportError names the extra to install
+        """
+        import sys
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.csv").build()
+
+        with patch.dict(sys.modules, {"pyarrow": None}):
+            with self.assertRaisesRegex(ImportError, r"\[dataframe\]"):
+                Storage.get_dataframe(location=location)
+
+    def test_parquet_reads_download_only_the_projected_columns(self):
+        """
+        GIVEN   a DataFrame saved as parquet
+        WHEN    Storage.get_dataframe() is invoked with a column and a row group
+        THEN    the values are returned and only a fraction of the blob is downloaded
+        """
+        import numpy as np
+        import pandas as pd
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ranges = []
+
+        class RecordingConnector(MemoryConnector):
+            def download_range(self, bucket_name, source_blob_name, start, end, **kw):
+                ranges.append(end - start + 1)
+                return super().download_range(
+                    bucket_name, source_blob_name, start, end, **kw
+                )
+
+        connector = RecordingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = (
+            StorageLocationBuilder().from_uri(uri="mem://bucket/data.parquet").build()
+        )
+        df = pd.DataFrame(
+            {name: np.random.default_rng(0).random(10000) for name in "abcdefgh"}
+        )
+        Storage.save_dataframe(obj=df, location=location, row_group_size=1000)
+
+        result = Storage.get_dataframe(location=location, columns=["c"], row_groups=[3])
+
+        np.testing.assert_array_equal(result["c"], df["c"][3000:4000])
+        size = connector.get_size(bucket_name="bucket", source_blob_name="data.parquet")
+        self.assertLess(sum(ranges), size / 10)
+        pd.testing.assert_frame_equal(Storage.get(location=location), df)
+
+    def test_du_aggregates_prefixes_down_to_depth(self):
+        """
+        GIVEN   blobs in nested folders of the in-memory backend
+        WHEN    the usage of a folder is measured down to two levels
+        THEN    every prefix is reported with its totals, before its parent
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        for name, size in [
+            ("data/top.bin", 1),
+            ("data/2020/01/a.bin", 10),
+            ("data/2020/01/b.bin", 20),
+            ("data/2020/02/deep/c.bin", 30),
+            ("data/2021/d.bin", 40),
+            ("other/e.bin", 50),
+        ]:
+            connector.upload_from_string(
+                data=b"x" * size, bucket_name="bucket", destination_blob_name=name
+            )
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/data").build()
+
+        usages = list(Storage.du(location=location, depth=2, max_workers=4))
+
+        by_prefix = {
+            usage.prefix: (usage.depth, usage.objects, usage.size) for usage in usages
+        }
+        self.assertEqual(
+            by_prefix,
+            {
+                "data/": (0, 5, 101),
+                "data/2020/": (1, 3, 60),
+                "data/2021/": (1, 1, 40),
+                "data/2020/01/": (2, 2, 30),
+                "data/2020/02/": (2, 1, 30),
+            },
+        )
+        prefixes = [usage.prefix for usage in usages]
+        self.assertEqual(prefixes[-1], "data/")
+        self.assertLess(prefixes.index("data/2020/01/"), prefixes.index("data/2020/"))
+        self.assertEqual(
+            [(u.prefix, u.size) for u in Storage.du(location=location, depth=0)],
+            [("data/", 101)],
+        )
+
+    def test_glob_lists_only_matching_folders(self):
+        """
+        GIVEN   blobs partitioned by folders
+        WHEN    they are matched with a glob pattern
+        THEN    the matching locations are returned and non-matching folders are not listed
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+
+        class RecordingConnector(MemoryConnector):
+            def __init__(self):
+                super().__init__()
+                self.scans = []
+
+            def scan(self, bucket_name, prefix=None, delimiter=None, match_glob=None):
+                self.scans.append((prefix, delimiter, match_glob))
+                return super().scan(bucket_name, prefix, delimiter, match_glob)
+
+        connector = RecordingConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        for name in [
+            "data/x/2024-01/part-0.npy",
+            "data/x/2024-01/part-1.npy",
+            "data/x/2024-01/other.npy",
+            "data/x/2023-12/part-0.npy",
+            "data/y/2024-02/part-0.npy",
+            "data/y/2024-02/deep/part-9.npy",
+            "other/x/2024-01/part-0.npy",
+        ]:
+            connector.upload_from_string(
+                data=b"x", bucket_name="bucket", destination_blob_name=name
+            )
+
+        locations = list(Storage.glob("mem://bucket/data/*/2024-*/part-*.npy"))
+
+        self.assertEqual(
+            [location.complete_path() for location in locations],
+            [
+                "mem://bucket/data/x/2024-01/part-0.npy",
+                "mem://bucket/data/x/2024-01/part-1.npy",
+                "mem://bucket/data/y/2024-02/part-0.npy",
+            ],
+        )
+        self.assertEqual(locations[0].filename, "part-0.npy")
+        listed = [prefix for prefix, _, _ in connector.scans]
+        self.assertEqual(listed[0], "data/")
+        self.assertNotIn("data/x/2023-12/", listed)
+        self.assertIn(
+            ("data/x/2024-01/", "/", "data/x/2024-01/part-*.npy"), connector.scans
+        )
+
+        self.assertEqual(
+            [
+                location.blob_name
+                for location in Storage.glob(
+                    "mem://bucket/data/**/part-*.npy", regex=r"/part-[1-9]"
+                )
+            ],
+            ["data/x/2024-01/part-1.npy", "data/y/2024-02/deep/part-9.npy"],
+        )
+
+    def test_save_and_get_image(self):
+        """
+        GIVEN   an image saved with encoding options
+        WHEN    it is read back with a target size
+        THEN    a resized PIL image or array is returned
+        """
+        import numpy as np
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.jpg").build()
+        array = np.full((600, 800, 3), 128, dtype=np.uint8)
+
+        Storage.save_image(obj=array, location=location, quality=80, progressive=True)
+
+        self.assertEqual(
+            Storage.get_image(location=location, size=(200, 200)).size, (200, 150)
+        )
+        self.assertEqual(
+            Storage.get_image(location=location, mode="L", as_array=True).shape,
+            (600, 800),
+        )
+        self.assertIsInstance(Storage.get(location=location), bytes)
+        with self.assertRaises(ValueError):
+            Storage.get_image(
+                location=StorageLocationBuilder()
+                .from_uri(uri="mem://bucket/a.json")
+                .build()
+            )
+
+    def test_save_with_metadata(self):
+        """
+        GIVEN   objects saved with and without object metadata
+        WHEN    their metadata is read
+        THEN    the content type is inferred and the given properties are stored
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types import ObjectMetadata
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.json").build()
+
+        Storage.save(
+            obj={"a": 1},
+            location=location,
+            metadata=ObjectMetadata(
+                cache_control="public, max-age=3600", metadata={"source": "camera-1"}
+            ),
+        )
+        metadata = connector.get_metadata(
+            bucket_name="bucket", source_blob_name="a.json"
+        )
+        self.assertEqual(metadata.content_type, "application/json")
+        self.assertEqual(metadata.cache_control, "public, max-age=3600")
+        self.assertEqual(metadata.metadata, {"source": "camera-1"})
+
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/b.txt").build()
+        Storage.save(obj="text", location=location)
+        metadata = connector.get_metadata(
+            bucket_name="bucket", source_blob_name="b.txt"
+        )
+        self.assertEqual(metadata.content_type, "text/plain; charset=utf-8")
+        self.assertIsNone(metadata.metadata)
+
+    def test_signed_urls(self):
+        """
+        GIVEN   locations in two buckets
+        WHEN    their signed URLs are requested
+        THEN    the URLs are signed in one batch per bucket and returned in order
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        batches = []
+
+        class SigningConnector(MemoryConnector):
+            def generate_signed_urls(self, bucket_name, blob_names, **kwargs):
+                batches.append((bucket_name, blob_names, kwargs))
+                return ["https://{}/{}".format(bucket_name, n) for n in blob_names]
+
+        ConnectorRegistry.register(prefix="mem://", connector=SigningConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        locations = [
+            StorageLocationBuilder().from_uri(uri=uri).build()
+            for uri in ("mem://a/1.png", "mem://b/2.png", "mem://a/3.png")
+        ]
+
+        self.assertEqual(
+            Storage.signed_urls(locations=locations, ttl=60),
+            ["https://a/1.png", "https://b/2.png", "https://a/3.png"],
+        )
+        self.assertEqual(
+            [(bucket, names) for bucket, names, _ in batches],
+            [("a", ["1.png", "3.png"]), ("b", ["2.png"])],
+        )
+        self.assertEqual(batches[0][2]["expiration"], 60)
+        self.assertEqual(
+            Storage.signed_url(location=locations[1], method="PUT"), "https://b/2.png"
+        )
+        self.assertEqual(batches[-1][2]["method"], "PUT")
+        with self.assertRaises(ValueError):
+            Storage.signed_url(location=locations[0], method="PATCH")
+        with self.assertRaises(ValueError):
+            Storage.signed_url(location=locations[0], ttl=8 * 24 * 3600)
+
+    def test_profile(self):
+        """
+        GIVEN   a recording profile
+        WHEN    objects are saved and read
+        THEN    their time is attributed to phases, by operation, extension and bucket
+        """
+        import numpy as np
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        array = StorageLocationBuilder().from_uri(uri="mem://bucket/a.npy").build()
+        other = StorageLocationBuilder().from_uri(uri="mem://other/b.json").build()
+
+        with Storage.profile() as profile:
+            Storage.save(obj=np.arange(10), location=array)
+            Storage.get(location=array)
+            Storage.save(obj={"a": 1}, location=other)
+        Storage.get(location=other)
+
+        by_operation = profile.summary(by="operation")
+        self.assertEqual(
+            set(by_operation["get"]), {"tempfile", "network", "decode", "other"}
+        )
+        self.assertEqual(by_operation["save"]["network"].count, 2)
+        self.assertEqual(set(profile.summary(by="extension")), {".npy", ".json"})
+        self.assertEqual(profile.summary(by="bucket")["mem://other"]["encode"].count, 1)
+
+    def test_profiled_writers_and_listings(self):
+        """
+        GIVEN   a recording profile
+        WHEN    rows are streamed to a .csv blob, a writer is opened and blobs are listed
+        THEN    the writers are returned as they are and write the blobs, and the
+                listings are attributed to the network
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://b/x.csv").build()
+        connector.upload_from_string(
+            data=b"old", bucket_name="b", destination_blob_name="x.csv"
+        )
+
+        with Storage.profile() as profile:
+            self.assertEqual(Storage.write_csv(location=location, rows=[["a"]]), 1)
+            with Storage._connector(location=location).open_writer(
+                bucket_name="b", destination_blob_name="y.bin"
+            ) as file:
+                file.write(b"y")
+            entries = list(
+                Storage._connector(location=location).list_entries(bucket_name="b")
+            )
+
+        self.assertEqual(connector.download_as_bytes("b", "x.csv"), b"a\r\n")
+        self.assertEqual(connector.download_as_bytes("b", "y.bin"), b"y")
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(
+            profile.summary(by="operation")["write_csv"]["network"].count, 1
+        )
+
+    def test_write_and_iter_csv(self):
+        """
+        GIVEN   rows streamed to a .csv blob
+        WHEN    its rows are iterated with small chunks
+        THEN    the same rows are returned, quoted newlines included
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.csv").build()
+        rows = [["id", "text"]] + [[str(i), "line\n{};è".format(i)] for i in range(100)]
+
+        count = Storage.write_csv(
+            location=location, rows=(row for row in rows), delimiter=";"
+        )
+
+        self.assertEqual(count, 101)
+        self.assertEqual(
+            list(Storage.iter_csv(location=location, chunk_size=64, delimiter=";")),
+            rows,
+        )
+        self.assertEqual(
+            connector.get_metadata(
+                bucket_name="bucket", source_blob_name="a.csv"
+            ).content_type,
+            "text/csv; charset=utf-8",
+        )
+        with self.assertRaises(ValueError):
+            next(
+                Storage.iter_csv(
+                    location=StorageLocationBuilder()
+                    .from_uri(uri="mem://bucket/a.txt")
+                    .build()
+                )
+            )
+
+        def failing_rows():
+            yield ["1"]
+            raise RuntimeError()
+
+        with self.assertRaises(RuntimeError):
+            Storage.write_csv(location=location, rows=failing_rows())
+        self.assertEqual(
+            len(list(Storage.iter_csv(location=location, delimiter=";"))), 101
+        )
+
+    def test_save_and_append_async(self):
+        """
+        GIVEN   a background writer set for Storage
+        WHEN    objects are saved and records appended asynchronously, then flushed
+        THEN    the blobs and the batch of the records are uploaded
+        """
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import BackgroundWriter, Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        writer = BackgroundWriter()
+        self.addCleanup(writer.close)
+        self.addCleanup(Storage.set_background_writer, None)
+        Storage.set_background_writer(writer)
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.json").build()
+        logs = StorageLocationBuilder().from_uri(uri="mem://bucket/logs/").build()
+
+        future = Storage.save_async(obj={"a": 1}, location=location)
+        Storage.append_async(record={"r": 1}, location=logs)
+        Storage.append_async(record={"r": 2}, location=logs)
+        Storage.flush_async()
+
+        self.assertIsNone(future.result())
+        self.assertEqual(Storage.get(location=location), {"a": 1})
+        (batch,) = Storage.get_list_content(location=logs)
+        self.assertTrue(batch.filename.endswith(".json"))
+        self.assertEqual(Storage.get(location=batch), [{"r": 1}, {"r": 2}])
+
+    def test_upload_and_download_file(self):
+        """
+        GIVEN   a local file uploaded to a blob
+        WHEN    it is downloaded in small ranges, then with a corrupted range
+        THEN    the same file is written, and the corrupted download leaves no file
+        """
+        import os
+        import tempfile
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        content = os.urandom(1000)
+        source = os.path.join(directory.name, "source.bin")
+        with open(source, "wb") as f:
+            f.write(content)
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.bin").build()
+
+        Storage.upload_file(path=source, location=location)
+        path = os.path.join(directory.name, "out", "a.bin")
+        size = Storage.download_file(location=location, path=path, chunk_size=128)
+
+        self.assertEqual(size, 1000)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+        download_range = connector.download_range
+        with patch.object(
+            connector,
+            "download_range",
+            side_effect=lambda **kwargs: download_range(**kwargs)[::-1],
+        ):
+            with self.assertRaises(IOError):
+                Storage.download_file(
+                    location=location,
+                    path=os.path.join(directory.name, "b.bin"),
+                    chunk_size=128,
+                )
+        self.assertEqual(sorted(os.listdir(directory.name)), ["out", "source.bin"])
+
+    def test_upload_and_download_files(self):
+        """
+        GIVEN   many local files
+        WHEN    they are uploaded then downloaded concurrently
+        THEN    each blob and each downloaded file holds the content of its source
+        """
+        import os
+        import tempfile
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+        from wiser.gcloud.storage.services import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        ConnectorRegistry.register(prefix="mem://", connector=MemoryConnector())
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        contents = [os.urandom(i * 100) for i in range(10)]
+        sources = [os.path.join(directory.name, "{}.bin".format(i)) for i in range(10)]
+        for source, content in zip(sources, contents):
+            with open(source, "wb") as f:
+                f.write(content)
+        locations = [
+            StorageLocationBuilder()
+            .from_uri(uri="mem://bucket/{}.bin".format(i))
+            .build()
+            for i in range(10)
+        ]
+        paths = [
+            os.path.join(directory.name, "out", "{}.bin".format(i)) for i in range(10)
+        ]
+
+        Storage.upload_files(paths=sources, locations=locations, max_workers=4)
+        sizes = Storage.download_files(locations=locations, paths=paths, max_workers=4)
+
+        self.assertEqual(sizes, [len(content) for content in contents])
+        for path, content in zip(paths, contents):
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), content)
+        with self.assertRaises(ValueError):
+            Storage.download_files(locations=locations, paths=paths[:1])
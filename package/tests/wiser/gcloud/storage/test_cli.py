@@ -0,0 +1,257 @@
+import unittest
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        from wiser.gcloud.storage.connectors import ConnectorRegistry, MemoryConnector
+
+        self.connector = MemoryConnector()
+        ConnectorRegistry.register(prefix="mem://", connector=self.connector)
+        self.addCleanup(ConnectorRegistry.register, "mem://", MemoryConnector())
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+
+    def _put(self, blob_name: str, data: bytes) -> None:
+        self.connector.upload_from_string(
+            data=data, bucket_name="bucket", destination_blob_name=blob_name
+        )
+
+    @staticmethod
+    def _main(*argv) -> int:
+        from wiser.gcloud.storage.cli import main
+
+        return main(list(argv))
+
+    def test_cp_recursive_between_backends(self):
+        """
+        GIVEN   blobs under a folder of the in-memory backend
+        WHEN    they are copied to a local folder and back to another folder
+        THEN    the contents are equal, and large blobs are downloaded as ranges
+        """
+        import os
+
+        self._put("data/a.txt", b"a" * 10)
+        self._put("data/sub/b.bin", bytes(range(256)) * 40)
+        self._put("other/c.txt", b"c")
+
+        self.assertEqual(
+            self._main(
+                "cp",
+                "-r",
+                "-q",
+                "--slice-threshold",
+                "1000",
+                "--slice-size",
+                "777",
+                "mem://bucket/data",
+                self.folder,
+            ),
+            0,
+        )
+        with open(os.path.join(self.folder, "sub", "b.bin"), "rb") as f:
+            self.assertEqual(f.read(), bytes(range(256)) * 40)
+
+        self.assertEqual(
+            self._main("cp", "-r", "-q", self.folder, "mem://bucket/copy/"), 0
+        )
+        self.assertEqual(
+            self.connector.list_blobs(bucket_name="bucket", prefix="copy/"),
+            ["copy/a.txt", "copy/sub/b.bin"],
+        )
+        self.assertEqual(
+            self.connector.download_as_bytes("bucket", "copy/a.txt"), b"a" * 10
+        )
+
+    def test_sliced_download_is_verified(self):
+        """
+        GIVEN   a large blob whose ranges are corrupted in transit
+        WHEN    it is downloaded as ranges
+        THEN    it is downloaded again while corrupted, and the copy fails if it stays so
+        """
+        import contextlib
+        import io
+        import os
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import MemoryConnector
+
+        data = bytes(range(256)) * 40
+        self._put("data/b.bin", data)
+        corruptions = [1]
+        original = MemoryConnector.download_range
+
+        def download_range(connector, *args, **kwargs):
+            content = original(connector, *args, **kwargs)
+            if corruptions[0] > 0 and kwargs["start"] == 0:
+                corruptions[0] -= 1
+                content = b"x" + content[1:]
+            return content
+
+        argv = ["cp", "-q", "--slice-threshold", "1000", "--slice-size", "777"]
+        destination = os.path.join(self.folder, "b.bin")
+        with patch.object(
+            MemoryConnector, "download_range", autospec=True, side_effect=download_range
+        ):
+            self.assertEqual(
+                self._main(*argv, "mem://bucket/data/b.bin", destination), 0
+            )
+            with open(destination, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+            corruptions[0] = 100
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(
+                    self._main(*argv, "mem://bucket/data/b.bin", destination + "2"), 1
+                )
+            self.assertIn("Checksum mismatch", stderr.getvalue())
+
+    def test_cp_single_blob_and_resume_from_journal(self):
+        """
+        GIVEN   a journal recording a completed copy
+        WHEN    the job is run again
+        THEN    the recorded copy is skipped and the others are done
+        """
+        import contextlib
+        import io
+        import os
+
+        from wiser.gcloud.storage.utils.journal import TransferJournal
+
+        self._put("data/a.txt", b"a")
+        self._put("data/b.txt", b"b")
+        journal_path = os.path.join(self.folder, "job.journal")
+        with TransferJournal(path=journal_path) as journal:
+            journal.record(key="mem://bucket/data/a.txt mem://bucket/copy/a.txt")
+
+        self.assertEqual(
+            self._main(
+                "cp",
+                "-r",
+                "-q",
+                "--journal",
+                journal_path,
+                "mem://bucket/data/",
+                "mem://bucket/copy/",
+            ),
+            0,
+        )
+        self.assertEqual(
+            self.connector.list_blobs(bucket_name="bucket", prefix="copy/"),
+            ["copy/b.txt"],
+        )
+        with TransferJournal(path=journal_path) as journal:
+            self.assertEqual(len(journal), 2)
+
+        self.assertEqual(
+            self._main("cp", "-q", "mem://bucket/data/a.txt", "mem://bucket/x.txt"), 0
+        )
+        self.assertEqual(self.connector.download_as_bytes("bucket", "x.txt"), b"a")
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(
+                self._main(
+                    "cp", "-q", "mem://bucket/missing.txt", "mem://bucket/y.txt"
+                ),
+                1,
+            )
+
+    def test_sync_with_delete(self):
+        """
+        GIVEN   a destination with an identical, a different and an extra blob
+        WHEN    the source is synchronized with deletion
+        THEN    only the different and missing blobs are copied and the extra one is deleted
+        """
+        import contextlib
+        import io
+
+        self._put("src/same.txt", b"same")
+        self._put("src/changed.txt", b"new")
+        self._put("src/new.txt", b"new")
+        self._put("dst/same.txt", b"same")
+        self._put("dst/changed.txt", b"old")
+        self._put("dst/extra.txt", b"extra")
+        generation = self.connector.get_metadata("bucket", "dst/same.txt").generation
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = self._main(
+                "sync", "--delete", "mem://bucket/src", "mem://bucket/dst"
+            )
+
+        self.assertEqual(code, 0)
+        self.assertEqual(
+            self.connector.list_blobs(bucket_name="bucket", prefix="dst/"),
+            ["dst/changed.txt", "dst/new.txt", "dst/same.txt"],
+        )
+        self.assertEqual(
+            self.connector.download_as_bytes("bucket", "dst/changed.txt"), b"new"
+        )
+        self.assertEqual(
+            self.connector.get_metadata("bucket", "dst/same.txt").generation, generation
+        )
+        self.assertIn("4/4 files", stderr.getvalue().splitlines()[-1])
+        self.assertIn("1 skipped", stderr.getvalue().splitlines()[-1])
+
+    def test_ls_du_rm(self):
+        """
+        GIVEN   blobs in nested folders
+        WHEN    they are listed, measured and deleted
+        THEN    the listings, sizes and remaining blobs are consistent
+        """
+        import contextlib
+        import io
+
+        self._put("data/a.txt", b"a" * 10)
+        self._put("data/sub/b.txt", b"b" * 2048)
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self._main("ls", "mem://bucket/data")
+            self._main("ls", "-r", "mem://bucket/data")
+            self._main("du", "-s", "-H", "mem://bucket/data")
+            self._main("du", "mem://bucket")
+        lines = stdout.getvalue().splitlines()
+
+        self.assertEqual(lines[0], "mem://bucket/data/a.txt")
+        self.assertEqual(
+            lines[1:3], ["mem://bucket/data/a.txt", "mem://bucket/data/sub/b.txt"]
+        )
+        self.assertEqual(lines[3].split(), ["2.0", "KiB", "2", "mem://bucket/data/"])
+        self.assertEqual(
+            [line.split() for line in lines[4:]],
+            [["2058", "2", "mem://bucket/data/"], ["2058", "2", "mem://bucket/"]],
+        )
+
+        self.assertEqual(self._main("rm", "-q", "mem://bucket/data/a.txt"), 0)
+        self.assertEqual(self._main("rm", "-q", "-r", "mem://bucket/data"), 0)
+        self.assertEqual(self.connector.list_blobs(bucket_name="bucket"), [])
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(self._main("rm", "-q", "mem://bucket/data/a.txt"), 1)
+
+    def test_download_to_local_writes_once(self):
+        """
+        GIVEN   a blob of the in-memory backend
+        WHEN    it is copied to a local file
+        THEN    it is downloaded straight to the file, not uploaded from a temporary copy
+        """
+        import os
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.connectors import LocalConnector
+
+        self._put("data/a.bin", b"a" * 100)
+        destination = os.path.join(self.folder, "out", "a.bin")
+
+        with patch.object(
+            LocalConnector, "upload_from_file", side_effect=AssertionError
+        ):
+            self.assertEqual(
+                self._main("cp", "-q", "mem://bucket/data/a.bin", destination), 0
+            )
+
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), b"a" * 100)
+        self.assertEqual(os.listdir(os.path.dirname(destination)), ["a.bin"])
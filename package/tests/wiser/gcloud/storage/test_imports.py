@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_DEPENDENCIES = [
+    "numpy",
+    "google.cloud.storage",
+    "pydantic",
+    "pkg_resources",
+    "pandas",
+    "pyarrow",
+]
+
+
+class ImportsTest(unittest.TestCase):
+    @staticmethod
+    def _imported_modules(module: str) -> list:
+        """
+        Imports a module in a new interpreter and returns the modules loaded
+
+        @param module: the module to import
+        @return: the names of the loaded modules
+        """
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, {}; print(' '.join(sys.modules))".format(module),
+            ],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        return process.stdout.split()
+
+    def test_services_import_no_heavy_dependency(self):
+        """
+        GIVEN   a new interpreter
+        WHEN    the services and the connectors are imported
+        THEN    numpy, pandas, pyarrow, pydantic and the Google Cloud client are not imported
+        """
+        for module in [
+            "wiser.gcloud.storage.services",
+            "wiser.gcloud.storage.connectors",
+        ]:
+            modules = self._imported_modules(module=module)
+            for dependency in HEAVY_DEPENDENCIES:
+                self.assertNotIn(dependency, modules, module)
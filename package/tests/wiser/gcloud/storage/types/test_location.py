@@ -101,4 +101,31 @@ class StorageLocationTest(unittest.TestCase):
             StorageLocationBuilder().from_uri(uri="https://something/to/docs.csc").build()
 
         with self.assertRaises(ValueError):
-            StorageLocationBuilder().from_uri(uri="gs:///path/to/docs.pdf").build()
\ No newline at end of file
+            StorageLocationBuilder().from_uri(uri="gs:///path/to/docs.pdf").build()
+
+    def test_from_uri_with_registered_prefixes(self):
+        """
+        GIVEN LocationBuilder and uris with the local and in-memory prefixes
+        WHEN  the 'from_uri()' is invoked
+        THEN  the prefix is kept and a local path maps its first folder to the bucket
+        """
+
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a/b.csv").build()
+
+        self.assertEqual(location.prefix, "mem://")
+        self.assertEqual(location.bucket, "bucket")
+        self.assertEqual(location.blob_name, "a/b.csv")
+        self.assertEqual(location.complete_path(), "mem://bucket/a/b.csv")
+
+        location = StorageLocationBuilder().from_uri(uri="file:///tmp/a/b.csv").build()
+
+        self.assertEqual(location.prefix, "file://")
+        self.assertEqual(location.bucket, "tmp")
+        self.assertEqual(location.blob_name, "a/b.csv")
+        self.assertEqual(location.complete_path(), "file:///tmp/a/b.csv")
+
+        for uri in ["file:///data.csv", "file://tmp/a/b.csv", "file:///"]:
+            with self.assertRaises(ValueError):
+                StorageLocationBuilder().from_uri(uri=uri).build()
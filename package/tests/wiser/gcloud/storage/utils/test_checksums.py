@@ -0,0 +1,77 @@
+import unittest
+
+
+class ChecksumsTest(unittest.TestCase):
+    def test_crc32c_and_md5_match_gcs_encoding(self):
+        """
+        GIVEN   some content
+        WHEN    the checksums are computed
+        THEN    the base64-encoded values reported by Google Cloud Storage are returned
+        """
+        import base64
+        import hashlib
+        from wiser.gcloud.storage.utils.checksums import crc32c, md5
+
+        data = b"hello world"
+
+        self.assertEqual(crc32c(data), "yZRlqg==")
+        self.assertEqual(
+            md5(data), base64.b64encode(hashlib.md5(data).digest()).decode()
+        )
+        self.assertEqual(crc32c("hello world"), crc32c(data))
+
+    def test_checksum_of_file_restores_the_position(self):
+        """
+        GIVEN   a file handle
+        WHEN    the checksum is computed
+        THEN    the content from the current position is hashed and the position is restored
+        """
+        from tempfile import TemporaryFile
+        from wiser.gcloud.storage.utils.checksums import crc32c
+
+        with TemporaryFile() as f:
+            f.write(b"xxhello world")
+            f.seek(2)
+
+            self.assertEqual(crc32c(f), crc32c(b"hello world"))
+            self.assertEqual(f.tell(), 2)
+
+    def test_sha256_of_file_is_streamed(self):
+        """
+        GIVEN   a file larger than the chunk size
+        WHEN    its SHA-256 is computed
+        THEN    it matches the hash of the whole content
+        """
+        import hashlib
+        from tempfile import TemporaryFile
+        from wiser.gcloud.storage.utils.checksums import CHECKSUM_CHUNK_SIZE, sha256
+
+        data = b"0123456789" * (CHECKSUM_CHUNK_SIZE // 4)
+        with TemporaryFile() as f:
+            f.write(data)
+            f.seek(0)
+
+            self.assertEqual(sha256(f), hashlib.sha256(data).hexdigest())
+            self.assertEqual(sha256(data), hashlib.sha256(data).hexdigest())
+
+    def test_combine_crc32c(self):
+        """
+        GIVEN   consecutive blocks of data
+        WHEN    their CRC32C checksums are combined
+        THEN    the checksum of the whole data is returned
+        """
+        import os
+
+        from wiser.gcloud.storage.utils import checksums
+
+        data = os.urandom(10_000)
+        for size in [1, 777, 4096, 10_000]:
+            blocks = [
+                (checksums.crc32c_value(data[i : i + size]), len(data[i : i + size]))
+                for i in range(0, len(data), size)
+            ]
+            self.assertEqual(
+                checksums.combine_crc32c(blocks=blocks), checksums.crc32c(data)
+            )
+        self.assertEqual(checksums.combine_crc32c(blocks=[]), checksums.crc32c(b""))
+        self.assertIn(checksums.transfer_checksum(), ("crc32c", "md5"))
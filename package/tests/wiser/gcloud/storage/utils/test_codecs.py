@@ -0,0 +1,64 @@
+import unittest
+
+
+class CodecsTest(unittest.TestCase):
+    def test_round_trip(self):
+        """
+        GIVEN   objects of the managed extensions
+        WHEN    they are encoded and decoded
+        THEN    the objects are returned as by Storage.get()
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.utils.codecs import decode, encode
+
+        array = np.arange(6).reshape(2, 3)
+        np.testing.assert_array_equal(
+            decode(data=encode(obj=array, filename="a.npy"), filename="a.npy"), array
+        )
+        self.assertEqual(
+            decode(
+                data=encode(obj={"b": [1, "è"]}, filename="a.json"), filename="a.json"
+            ),
+            {"b": [1, "è"]},
+        )
+        self.assertEqual(
+            decode(data=encode(obj="a,b\n1,2", filename="a.csv"), filename="a.csv"),
+            "a,b\n1,2",
+        )
+        self.assertEqual(encode(obj=b"\x89PNG", filename="a.png"), b"\x89PNG")
+
+    def test_image_and_unknown_extension(self):
+        """
+        GIVEN   a PIL image and an unmanaged extension
+        WHEN    they are encoded
+        THEN    the image is encoded by its extension and the extension is refused
+        """
+        import io
+
+        from PIL import Image
+
+        from wiser.gcloud.storage.utils.codecs import decode, encode
+
+        data = encode(obj=Image.new("RGB", (4, 3)), filename="a/b.png")
+        image = Image.open(io.BytesIO(decode(data=data, filename="a/b.png")))
+        self.assertEqual((image.format, image.size), ("PNG", (4, 3)))
+
+        with self.assertRaises(ValueError):
+            encode(obj=b"", filename="a.xyz")
+        with self.assertRaises(ValueError):
+            decode(data=b"", filename="a.xyz")
+
+    def test_content_type(self):
+        """
+        GIVEN   blob names of the managed extensions and an unmanaged one
+        WHEN    their content type is inferred
+        THEN    the MIME type of the extension is returned, None if unmanaged
+        """
+        from wiser.gcloud.storage.utils.codecs import content_type
+
+        self.assertEqual(content_type(filename="a/b.json"), "application/json")
+        self.assertEqual(content_type(filename="b.jpg"), "image/jpeg")
+        self.assertEqual(content_type(filename="b.csv"), "text/csv; charset=utf-8")
+        self.assertIsNone(content_type(filename="b.unknown"))
+        self.assertIsNone(content_type(filename=""))
@@ -0,0 +1,81 @@
+import unittest
+
+
+class CsvStreamTest(unittest.TestCase):
+    def test_chunks_return_each_row_once(self):
+        """
+        GIVEN   a CSV file split into chunks at any offsets
+        WHEN    the rows of each chunk are read
+        THEN    each row is returned once, by the chunk where it starts
+        """
+        from wiser.gcloud.storage.utils import csv_stream
+
+        rows = [[str(i), "x" * (i % 7), "é"] for i in range(50)]
+        data = "".join(",".join(row) + "\r\n" for row in rows).encode("utf-8")
+
+        def read_range(start: int, end: int) -> bytes:
+            return data[start : end + 1]
+
+        for chunk_size in (1, 2, 7, 13, 100, len(data), 2 * len(data)):
+            with self.subTest(chunk_size=chunk_size):
+                read = []
+                for start in range(0, len(data), chunk_size):
+                    read.extend(
+                        csv_stream.read_chunk(
+                            read_range=read_range,
+                            size=len(data),
+                            start=start,
+                            end=start + chunk_size,
+                        )
+                    )
+                self.assertEqual(read, rows)
+
+    def test_chunk_without_final_newline_and_lookahead(self):
+        """
+        GIVEN   a CSV file whose rows are longer than the lookahead and no final newline
+        WHEN    it is read in chunks, with a custom delimiter
+        THEN    the rows are read whole
+        """
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.utils import csv_stream
+
+        rows = [["a" * 30, "b"], ["c", "d" * 30], ["e", "f"]]
+        data = "\n".join(";".join(row) for row in rows).encode("utf-8")
+
+        with patch.object(csv_stream, "LOOKAHEAD", 4):
+            read = []
+            for start in range(0, len(data), 10):
+                read.extend(
+                    csv_stream.read_chunk(
+                        read_range=lambda start, end: data[start : end + 1],
+                        size=len(data),
+                        start=start,
+                        end=start + 10,
+                        delimiter=";",
+                    )
+                )
+
+        self.assertEqual(read, rows)
+
+    def test_write_rows(self):
+        """
+        GIVEN   rows with quotes, delimiters and newlines in their values
+        WHEN    they are written in several blocks
+        THEN    the CSV file reads back as the same rows
+        """
+        import csv
+        import io
+        from unittest.mock import patch
+
+        from wiser.gcloud.storage.utils import csv_stream
+
+        rows = [["a", 'b "q"', "c,d"], ["multi\nline", "", "è"]] * 10
+        file = io.BytesIO()
+
+        with patch.object(csv_stream, "WRITE_BLOCK_SIZE", 16):
+            count = csv_stream.write_rows(file=file, rows=iter(rows))
+
+        self.assertEqual(count, 20)
+        text = file.getvalue().decode("utf-8")
+        self.assertEqual(list(csv.reader(io.StringIO(text, newline=""))), rows)
@@ -0,0 +1,90 @@
+import io
+import unittest
+
+
+class DataFramesTest(unittest.TestCase):
+    def test_round_trip_of_every_format(self):
+        """
+        GIVEN a pandas DataFrame
+        WHEN  it is written and read as parquet, feather and csv with a column projection
+        THEN  the projected columns are read back
+        """
+        import pandas as pd
+
+        from wiser.gcloud.storage.utils.dataframes import (
+            DATAFRAME_EXTENSIONS,
+            read_table,
+            to_table,
+            write_table,
+        )
+
+        df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+
+        for extension in DATAFRAME_EXTENSIONS:
+            file = io.BytesIO()
+            write_table(table=to_table(obj=df), file=file, extension=extension)
+            file.seek(0)
+
+            table = read_table(file=file, extension=extension, columns=["b"])
+
+            self.assertEqual(table.column_names, ["b"])
+            self.assertEqual(table.to_pandas()["b"].tolist(), ["x", "y", "z"])
+
+    def test_parquet_row_groups_and_filters(self):
+        """
+        GIVEN a parquet file with several row groups
+        WHEN  it is read with row groups and filters
+        THEN  only the selected rows are returned
+        """
+        import pandas as pd
+
+        from wiser.gcloud.storage.utils.dataframes import (
+            PARQUET,
+            read_table,
+            to_table,
+            write_table,
+        )
+
+        file = io.BytesIO()
+        write_table(
+            table=to_table(obj=pd.DataFrame({"a": range(100)})),
+            file=file,
+            extension=PARQUET,
+            compression="zstd",
+            row_group_size=10,
+        )
+
+        table = read_table(file=file, extension=PARQUET, row_groups=[2, 3])
+        self.assertEqual(table["a"].to_pylist(), list(range(20, 40)))
+
+        table = read_table(
+            file=file, extension=PARQUET, row_groups=[2], filters=[("a", ">=", 25)]
+        )
+        self.assertEqual(table["a"].to_pylist(), list(range(25, 30)))
+
+        table = read_table(file=file, extension=PARQUET, filters=[("a", "<", 3)])
+        self.assertEqual(table["a"].to_pylist(), [0, 1, 2])
+
+    def test_parquet_options_on_other_formats_raise_value_error(self):
+        """
+        GIVEN a csv file
+        WHEN  it is read with row groups or written with a row group size
+        THEN  value error is raised
+        """
+        import pandas as pd
+
+        from wiser.gcloud.storage.utils.dataframes import (
+            read_table,
+            to_table,
+            write_table,
+        )
+
+        with self.assertRaises(ValueError):
+            read_table(file=io.BytesIO(b"a\n1\n"), extension=".csv", row_groups=[0])
+        with self.assertRaises(ValueError):
+            write_table(
+                table=to_table(obj=pd.DataFrame({"a": [1]})),
+                file=io.BytesIO(),
+                extension=".csv",
+                row_group_size=10,
+            )
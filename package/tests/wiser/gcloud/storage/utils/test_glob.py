@@ -0,0 +1,51 @@
+import unittest
+
+
+class GlobTest(unittest.TestCase):
+    def test_split_pattern(self):
+        """
+        GIVEN   blob name patterns
+        WHEN    they are split
+        THEN    the longest literal folder prefix is separated from the wildcard segments
+        """
+        from wiser.gcloud.storage.utils.glob import split_pattern
+
+        self.assertEqual(
+            split_pattern("data/*/2024-*/part-*.npy"),
+            ("data/", ["*", "2024-*", "part-*.npy"]),
+        )
+        self.assertEqual(split_pattern("a/b/c.npy"), ("a/b/", ["c.npy"]))
+        self.assertEqual(split_pattern("*.npy"), ("", ["*.npy"]))
+        self.assertEqual(split_pattern("a/**/c"), ("a/", ["**", "c"]))
+
+    def test_translate_matches_gcs_glob_syntax(self):
+        """
+        GIVEN   glob patterns with every wildcard
+        WHEN    they are compiled
+        THEN    they match like the matchGlob listings of Google Cloud Storage
+        """
+        from wiser.gcloud.storage.utils.glob import compile_pattern
+
+        cases = [
+            ("data/*.npy", "data/a.npy", True),
+            ("data/*.npy", "data/x/a.npy", False),
+            ("data/**.npy", "data/x/a.npy", True),
+            ("data/**/a.npy", "data/a.npy", True),
+            ("data/**/a.npy", "data/x/y/a.npy", True),
+            ("part-?.npy", "part-1.npy", True),
+            ("part-?.npy", "part-10.npy", False),
+            ("[ab].txt", "b.txt", True),
+            ("[!ab].txt", "b.txt", False),
+            ("[!ab].txt", "c.txt", True),
+            ("*.{jpg,png}", "x.png", True),
+            ("*.{jpg,png}", "x.gif", False),
+            ("a+b(1).txt", "a+b(1).txt", True),
+        ]
+        for pattern, name, expected in cases:
+            with self.subTest(pattern=pattern, name=name):
+                self.assertEqual(
+                    compile_pattern(pattern).match(name) is not None, expected
+                )
+
+        with self.assertRaises(ValueError):
+            compile_pattern("{a,b")
@@ -0,0 +1,85 @@
+import io
+import unittest
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    import numpy as np
+    from PIL import Image
+
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:, : width // 2] = (255, 0, 0)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class ImagesTest(unittest.TestCase):
+    def test_decode_reduces_jpeg_while_decoding(self):
+        """
+        GIVEN   a large JPEG image
+        WHEN    it is decoded to a target size
+        THEN    the decoder runs at a reduced DCT scale and the image fits the target size
+        """
+        from unittest.mock import patch
+
+        from PIL import JpegImagePlugin
+        from wiser.gcloud.storage.utils.images import decode_image
+
+        data = _jpeg(width=2000, height=1000)
+
+        with patch.object(
+            JpegImagePlugin.JpegImageFile,
+            "draft",
+            autospec=True,
+            side_effect=JpegImagePlugin.JpegImageFile.draft,
+        ) as draft_mock:
+            image = decode_image(data=data, size=(250, 250))
+
+        draft_mock.assert_called()
+        self.assertEqual(draft_mock.call_args[0][2], (500, 500))
+        self.assertEqual(image.size, (250, 125))
+        self.assertEqual(image.getpixel((10, 60))[0] > 200, True)
+
+    def test_decode_does_not_enlarge(self):
+        """
+        GIVEN   a small image
+        WHEN    it is decoded to a larger target size, as an array in grayscale
+        THEN    the image keeps its size and is converted
+        """
+        from wiser.gcloud.storage.utils.images import decode_image
+
+        array = decode_image(
+            data=_jpeg(width=40, height=20), size=(400, 400), mode="L", as_array=True
+        )
+
+        self.assertEqual(array.shape, (20, 40))
+        with self.assertRaises(ValueError):
+            decode_image(data=_jpeg(width=40, height=20), size=(0, 10))
+
+    def test_encode_arrays_and_images(self):
+        """
+        GIVEN   arrays and PIL images
+        WHEN    they are encoded by the extension of the blob
+        THEN    PNG is lossless, JPEG honours the quality and RGBA images are converted
+        """
+        import numpy as np
+        from PIL import Image
+        from wiser.gcloud.storage.utils.images import decode_image, encode_image
+
+        rng = np.random.default_rng(0)
+        array = rng.integers(0, 255, size=(64, 64, 3), dtype=np.uint8)
+
+        png = encode_image(obj=array, filename="a.png", compress_level=1)
+        np.testing.assert_array_equal(decode_image(data=png, as_array=True), array)
+
+        low = encode_image(obj=array, filename="a.jpg", quality=10)
+        high = encode_image(obj=array, filename="a.jpg", quality=95, optimize=True)
+        self.assertLess(len(low), len(high))
+
+        rgba = Image.new("RGBA", (8, 8), (0, 0, 255, 128))
+        self.assertEqual(
+            decode_image(data=encode_image(obj=rgba, filename="a.jpg")).mode, "RGB"
+        )
+        self.assertEqual(encode_image(obj=b"raw", filename="a.jpg"), b"raw")
+        with self.assertRaises(ValueError):
+            encode_image(obj=array, filename="a.gif")
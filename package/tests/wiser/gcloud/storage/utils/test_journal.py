@@ -0,0 +1,32 @@
+import unittest
+
+
+class TransferJournalTest(unittest.TestCase):
+    def test_resume_skips_recorded_and_truncated_lines(self):
+        """
+        GIVEN   a journal whose last line was truncated by a crash
+        WHEN    it is opened again and new tasks are recorded
+        THEN    the complete records are kept and the new ones are readable
+        """
+        import os
+        import tempfile
+
+        from wiser.gcloud.storage.utils.journal import TransferJournal
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "job.journal")
+            with TransferJournal(path=path) as journal:
+                journal.record(key="a", bytes=1)
+                journal.record(key="b", bytes=2)
+            with open(path, "a") as f:
+                f.write('{"key": "c", "by')
+
+            with TransferJournal(path=path) as journal:
+                self.assertEqual(len(journal), 2)
+                self.assertIn("b", journal)
+                self.assertNotIn("c", journal)
+                journal.record(key="c")
+
+            with TransferJournal(path=path) as journal:
+                self.assertEqual(len(journal), 3)
+                self.assertIn("c", journal)
@@ -0,0 +1,69 @@
+import unittest
+
+
+class LocalFilesTest(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_open_mapped(self):
+        """
+        GIVEN   a local file and an empty one
+        WHEN    they are opened through a memory map
+        THEN    they read and seek as regular files
+        """
+        import io
+        import os
+
+        from wiser.gcloud.storage.utils.local_files import MappedReader, open_mapped
+
+        path = os.path.join(self.directory, "data.bin")
+        with open(path, "wb") as f:
+            f.write(bytes(range(256)) * 10)
+
+        with open_mapped(path=path) as f:
+            self.assertIsInstance(f, MappedReader)
+            self.assertEqual(f.read(3), b"\x00\x01\x02")
+            buffer = bytearray(4)
+            self.assertEqual(f.readinto(buffer), 4)
+            self.assertEqual(bytes(buffer), b"\x03\x04\x05\x06")
+            self.assertEqual(f.seek(-2, io.SEEK_END), 2558)
+            self.assertEqual(f.read(), b"\xfe\xff")
+            self.assertEqual(f.read(10), b"")
+            f.seek(0)
+            self.assertEqual(f.read(), bytes(range(256)) * 10)
+
+        empty = os.path.join(self.directory, "empty.bin")
+        open(empty, "wb").close()
+        with open_mapped(path=empty) as f:
+            self.assertEqual(f.read(), b"")
+
+    def test_atomic_file(self):
+        """
+        GIVEN   a preallocated atomic file, and one whose block fails
+        WHEN    their blocks exit
+        THEN    the first is moved to its path, the second is removed and its path untouched
+        """
+        import os
+
+        from wiser.gcloud.storage.utils.local_files import atomic_file, preallocate
+
+        path = os.path.join(self.directory, "folder", "data.bin")
+        with atomic_file(path=path) as fd:
+            preallocate(fd=fd, size=10)
+            self.assertEqual(os.fstat(fd).st_size, 10)
+            os.pwrite(fd, b"abc", 7)
+            self.assertFalse(os.path.exists(path))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"\x00" * 7 + b"abc")
+
+        with self.assertRaises(RuntimeError):
+            with atomic_file(path=path) as fd:
+                os.write(fd, b"partial")
+                raise RuntimeError("interrupted")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"\x00" * 7 + b"abc")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["data.bin"])
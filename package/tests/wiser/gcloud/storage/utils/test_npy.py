@@ -0,0 +1,98 @@
+import io
+import unittest
+
+import numpy as np
+
+
+def _to_npy(array: np.ndarray, version=None) -> bytes:
+    buffer = io.BytesIO()
+    if version is None:
+        np.save(buffer, array)
+    else:
+        np.lib.format.write_array(buffer, array, version=version)
+    return buffer.getvalue()
+
+
+class NpyTest(unittest.TestCase):
+    def test_parse_header(self):
+        """
+        GIVEN   the content of .npy files of different versions
+        WHEN    the header is parsed
+        THEN    shape, order, dtype and data offset are returned
+        """
+        from wiser.gcloud.storage.utils.npy import npy_header_size, parse_npy_header
+
+        array = np.arange(12, dtype=np.float32).reshape(3, 4)
+        for version in [(1, 0), (2, 0)]:
+            content = _to_npy(array, version=version)
+            offset = npy_header_size(content[:12])
+            shape, fortran_order, dtype, data_offset = parse_npy_header(content)
+
+            self.assertEqual(shape, (3, 4))
+            self.assertFalse(fortran_order)
+            self.assertEqual(dtype, np.float32)
+            self.assertEqual(offset, data_offset)
+            self.assertEqual(len(content) - data_offset, array.nbytes)
+
+    def test_slice_ranges_match_numpy_indexing(self):
+        """
+        GIVEN   a C-contiguous array and several basic indices
+        WHEN    the byte ranges of the indices are computed
+        THEN    the bytes in the ranges are those of numpy indexing
+        """
+        from wiser.gcloud.storage.utils.npy import npy_slice_ranges
+
+        array = np.arange(4 * 5 * 6, dtype=np.int16).reshape(4, 5, 6)
+        data = array.tobytes()
+        indices = [
+            1,
+            -1,
+            slice(1, 3),
+            slice(None, None, 2),
+            slice(None, None, -1),
+            (1, 2),
+            (slice(None), 3),
+            (slice(1, 3), slice(0, 5, 2), slice(2, 4)),
+            (2, slice(None), 5),
+            (slice(None), slice(None), slice(None)),
+            (1, 2, 3),
+            slice(3, 1),
+        ]
+        for index in indices:
+            ranges, out_shape = npy_slice_ranges(
+                shape=array.shape, itemsize=array.itemsize, index=index
+            )
+            content = b"".join(data[start:stop] for start, stop in ranges)
+            result = np.frombuffer(content, dtype=array.dtype).reshape(out_shape)
+
+            np.testing.assert_array_equal(result, array[index])
+
+    def test_slice_ranges_of_rows_is_a_single_range(self):
+        """
+        GIVEN   a 2-d array
+        WHEN    a range of rows is selected
+        THEN    a single byte range is returned
+        """
+        from wiser.gcloud.storage.utils.npy import npy_slice_ranges
+
+        ranges, out_shape = npy_slice_ranges(
+            shape=(100, 10), itemsize=8, index=slice(5, 7)
+        )
+
+        self.assertEqual(ranges, [(400, 560)])
+        self.assertEqual(out_shape, (2, 10))
+
+    def test_slice_ranges_invalid_index_raises(self):
+        """
+        GIVEN   a 2-d array
+        WHEN    out of bounds, too many or unsupported indices are given
+        THEN    an error is raised
+        """
+        from wiser.gcloud.storage.utils.npy import npy_slice_ranges
+
+        with self.assertRaises(IndexError):
+            npy_slice_ranges(shape=(3, 3), itemsize=8, index=3)
+        with self.assertRaises(IndexError):
+            npy_slice_ranges(shape=(3, 3), itemsize=8, index=(0, 0, 0))
+        with self.assertRaises(TypeError):
+            npy_slice_ranges(shape=(3, 3), itemsize=8, index=[0, 1])
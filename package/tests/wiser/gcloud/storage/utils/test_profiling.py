@@ -0,0 +1,80 @@
+import unittest
+
+
+class ProfilingTest(unittest.TestCase):
+    def test_nested_phases_are_exclusive(self):
+        """
+        GIVEN   an operation with nested phases
+        WHEN    it is recorded by a profile
+        THEN    the time of each phase excludes the time of the phases nested in it
+        """
+        import time
+
+        from wiser.gcloud.storage.utils import profiling
+
+        with profiling.Profile() as profile:
+            with profiling.operation(name="get"):
+                with profiling.phase(name=profiling.DECODE):
+                    time.sleep(0.02)
+                    with profiling.phase(name=profiling.NETWORK):
+                        time.sleep(0.05)
+
+        phases = profile.summary(by="operation")["get"]
+        self.assertEqual(
+            set(phases), {profiling.DECODE, profiling.NETWORK, profiling.OTHER}
+        )
+        self.assertGreaterEqual(phases[profiling.NETWORK].wall, 0.05)
+        self.assertGreaterEqual(phases[profiling.DECODE].wall, 0.02)
+        self.assertLess(phases[profiling.DECODE].wall, 0.05)
+        self.assertLess(phases[profiling.OTHER].wall, 0.02)
+
+    def test_nothing_is_recorded_out_of_profiles(self):
+        """
+        GIVEN   no recording profile
+        WHEN    phases and operations are entered
+        THEN    no span is built, and a later profile does not see them
+        """
+        from wiser.gcloud.storage.utils import profiling
+
+        self.assertIs(profiling.phase(name=profiling.NETWORK), profiling._NULL_SPAN)
+        with profiling.operation(name="get"):
+            pass
+        profile = profiling.Profile()
+        with profile:
+            pass
+
+        self.assertEqual(profile.spans, [])
+        with self.assertRaises(ValueError):
+            profile.summary(by="phase")
+
+    def test_chrome_trace(self):
+        """
+        GIVEN   a profile with recorded spans
+        WHEN    it is dumped as a Chrome trace
+        THEN    each span is a complete event with its operation and location
+        """
+        import json
+        import os
+        import tempfile
+
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+        from wiser.gcloud.storage.utils import profiling
+
+        location = StorageLocationBuilder().from_uri(uri="mem://bucket/a.npy").build()
+        with profiling.Profile() as profile:
+            with profiling.operation(name="save", location=location):
+                with profiling.phase(name=profiling.ENCODE):
+                    pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            profile.dump_chrome_trace(path=path)
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+
+        self.assertEqual([event["name"] for event in events], ["encode", "save"])
+        self.assertEqual({event["ph"] for event in events}, {"X"})
+        self.assertEqual(events[0]["cat"], "save")
+        self.assertEqual(events[0]["args"]["bucket"], "mem://bucket")
+        self.assertEqual(events[0]["args"]["extension"], ".npy")
+        self.assertIn("save", profile.report())
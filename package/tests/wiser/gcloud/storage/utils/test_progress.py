@@ -0,0 +1,38 @@
+import unittest
+
+
+class ProgressTest(unittest.TestCase):
+    def test_format_bytes(self):
+        """
+        GIVEN   sizes in bytes
+        WHEN    they are formatted
+        THEN    the largest binary unit below the size is used
+        """
+        from wiser.gcloud.storage.utils.progress import format_bytes
+
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(1536), "1.5 KiB")
+        self.assertEqual(format_bytes(3 * 1024**3), "3.0 GiB")
+
+    def test_report(self):
+        """
+        GIVEN   a progress reporting without interval
+        WHEN    files are processed, skipped and failed
+        THEN    every update and the final report are written
+        """
+        import io
+
+        from wiser.gcloud.storage.utils.progress import Progress
+
+        stream = io.StringIO()
+        progress = Progress(stream=stream, interval=0)
+        progress.add_total(files=3)
+        progress.update(nbytes=2048)
+        progress.update(skipped=True)
+        progress.update(failed=True)
+        progress.close()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("1/3 files, 2.0 KiB, "))
+        self.assertTrue(lines[-1].endswith(", 1 skipped, 1 failed"))
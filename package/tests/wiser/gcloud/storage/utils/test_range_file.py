@@ -0,0 +1,37 @@
+import io
+import unittest
+
+
+class RangeFileTest(unittest.TestCase):
+    def test_reads_are_range_requests(self):
+        """
+        GIVEN a range file over some bytes
+        WHEN  it is read after seeks from the start, the current position and the end
+        THEN  the bytes are the ones of the file and only the read ranges are requested
+        """
+        from wiser.gcloud.storage.utils.range_file import RangeFile
+
+        data = bytes(range(100))
+        requests = []
+
+        def read_range(start, end):
+            requests.append((start, end))
+            return data[start : end + 1]
+
+        file = RangeFile(read_range=read_range, size=len(data))
+
+        self.assertEqual(file.read(4), data[:4])
+        file.seek(10, io.SEEK_CUR)
+        self.assertEqual(file.read(2), data[14:16])
+        file.seek(-3, io.SEEK_END)
+        self.assertEqual(file.read(), data[97:])
+        self.assertEqual(file.read(), b"")
+        buffer = bytearray(5)
+        file.seek(50)
+        self.assertEqual(file.readinto(buffer), 5)
+        self.assertEqual(bytes(buffer), data[50:55])
+
+        self.assertEqual(requests, [(0, 3), (14, 15), (97, 99), (50, 54)])
+        self.assertEqual(file.bytes_read, 14)
+        with self.assertRaises(ValueError):
+            file.seek(-1)
@@ -0,0 +1,50 @@
+import unittest
+
+
+class RangesTest(unittest.TestCase):
+    def test_coalesce_merges_close_ranges(self):
+        """
+        GIVEN   byte ranges, some of them closer than the maximum gap
+        WHEN    `coalesce_ranges()` is invoked
+        THEN    the close ranges are merged into a single request
+        """
+        from wiser.gcloud.storage.utils.ranges import coalesce_ranges
+
+        ranges = [(100, 110), (0, 10), (15, 20), (20, 30)]
+
+        self.assertEqual(
+            coalesce_ranges(ranges=ranges, max_gap=5), [(0, 30), (100, 110)]
+        )
+        self.assertEqual(
+            coalesce_ranges(ranges=ranges, max_gap=0),
+            [(0, 10), (15, 30), (100, 110)],
+        )
+
+    def test_coalesce_skips_empty_ranges(self):
+        """
+        GIVEN   byte ranges containing an empty range
+        WHEN    `coalesce_ranges()` is invoked
+        THEN    the empty range is not requested
+        """
+        from wiser.gcloud.storage.utils.ranges import coalesce_ranges
+
+        self.assertEqual(coalesce_ranges(ranges=[(5, 5)], max_gap=0), [])
+
+    def test_extract_ranges_keeps_the_requested_order(self):
+        """
+        GIVEN   downloaded requests and ranges in descending order
+        WHEN    `extract_ranges()` is invoked
+        THEN    the ranges are concatenated in the given order
+        """
+        from wiser.gcloud.storage.utils.ranges import coalesce_ranges, extract_ranges
+
+        content = bytes(range(100))
+        ranges = [(60, 62), (10, 12), (0, 2)]
+        requests = coalesce_ranges(ranges=ranges, max_gap=10)
+        data = [content[start:stop] for start, stop in requests]
+
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(
+            extract_ranges(ranges=ranges, requests=requests, data=data),
+            content[60:62] + content[10:12] + content[0:2],
+        )
@@ -0,0 +1,108 @@
+import time
+import unittest
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_acquire_waits_beyond_the_burst(self):
+        """
+        GIVEN a token bucket with a burst of 2 tokens at 20 tokens per second
+        WHEN  4 tokens are acquired
+        THEN  the first 2 are immediate and the next ones wait about 50ms each
+        """
+        from wiser.gcloud.storage.utils import TokenBucket
+
+        bucket = TokenBucket(rate=20, burst=2)
+
+        start = time.monotonic()
+        bucket.acquire()
+        bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.04)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_decrease_and_increase_are_bounded(self):
+        """
+        GIVEN a token bucket
+        WHEN  the rate is decreased and increased many times
+        THEN  it stays between the minimum and the configured rate
+        """
+        from wiser.gcloud.storage.utils import TokenBucket
+
+        bucket = TokenBucket(rate=100, min_rate=10)
+
+        for _ in range(10):
+            bucket.decrease()
+        self.assertEqual(bucket.rate, 10)
+
+        bucket.increase(step=5)
+        self.assertEqual(bucket.rate, 15)
+        for _ in range(100):
+            bucket.increase(step=5)
+        self.assertEqual(bucket.rate, 100)
+
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+    def test_additive_increase_multiplicative_decrease(self):
+        """
+        GIVEN an adaptive concurrency limiter
+        WHEN  calls succeed, then several are throttled at once
+        THEN  the limit grows by one per window and halves once per cooldown
+        """
+        from wiser.gcloud.storage.utils import AdaptiveConcurrencyLimiter
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, cooldown=60)
+
+        for _ in range(4):
+            limiter.acquire()
+        for _ in range(4):
+            limiter.release()
+        self.assertAlmostEqual(limiter.limit, 5, delta=0.2)
+
+        for _ in range(3):
+            limiter.acquire()
+        for _ in range(3):
+            limiter.release(throttled=True)
+        self.assertAlmostEqual(limiter.limit, 2.5, delta=0.1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_acquire_blocks_at_the_limit(self):
+        """
+        GIVEN an adaptive concurrency limiter with a limit of 1
+        WHEN  a second call starts while the first is in flight
+        THEN  it waits until the first call ends
+        """
+        import threading
+
+        from wiser.gcloud.storage.utils import AdaptiveConcurrencyLimiter
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        thread.start()
+
+        self.assertFalse(acquired.wait(timeout=0.05))
+        limiter.release()
+        self.assertTrue(acquired.wait(timeout=5))
+        thread.join()
+
+
+class HashedBlobNameTest(unittest.TestCase):
+    def test_hashed_blob_name_is_stable_and_spread(self):
+        """
+        GIVEN sequential blob names
+        WHEN  hashed prefixes are added
+        THEN  the names keep the original one, are stable and start differently
+        """
+        from wiser.gcloud.storage.utils import hashed_blob_name
+
+        names = [hashed_blob_name("logs/{:04d}.json".format(i)) for i in range(16)]
+
+        self.assertEqual(names[0], hashed_blob_name("logs/0000.json"))
+        self.assertTrue(names[0].endswith("/logs/0000.json"))
+        self.assertEqual(len(names[0].split("/")[0]), 4)
+        self.assertGreater(len({name.split("/")[0] for name in names}), 8)
@@ -0,0 +1,46 @@
+import unittest
+
+
+class SharedMemoryTest(unittest.TestCase):
+    def test_export_import_round_trip(self):
+        """
+        GIVEN   a numpy array
+        WHEN    the array is exported and imported through shared memory
+        THEN    an equal array is returned, whose views outlive it
+        """
+        import numpy as np
+        from wiser.gcloud.storage.utils.shared_memory import export_array, import_array
+
+        for data in [
+            np.arange(12, dtype=np.float32).reshape(3, 4),
+            np.zeros(3, dtype=[("a", "<i4"), ("b", "<f8")]),
+            np.array(5),
+        ]:
+            array = import_array(handle=export_array(array=data))
+            np.testing.assert_array_equal(array, data)
+            self.assertEqual(array.dtype, data.dtype)
+
+        array = import_array(handle=export_array(array=np.arange(10)))
+        view = array[2:4]
+        del array
+        np.testing.assert_array_equal(view, [2, 3])
+
+    def test_readonly_array(self):
+        """
+        GIVEN   a shared memory segment
+        WHEN    a read-only array is built on it
+        THEN    the array cannot be written
+        """
+        import numpy as np
+        from multiprocessing.shared_memory import SharedMemory
+        from wiser.gcloud.storage.utils.shared_memory import shared_memory_array
+
+        shm = SharedMemory(create=True, size=16)
+        self.addCleanup(shm.unlink)
+        array = shared_memory_array(
+            shm=shm, shape=(2,), dtype=np.int64, offset=0, readonly=True
+        )
+
+        self.assertFalse(array.flags.writeable)
+        with self.assertRaises(ValueError):
+            array[0] = 1
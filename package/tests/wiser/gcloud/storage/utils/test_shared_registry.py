@@ -0,0 +1,148 @@
+import io
+import multiprocessing
+import os
+import unittest
+import uuid
+
+import numpy as np
+
+
+def _npy(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def _callbacks(array: np.ndarray, calls: list):
+    content = _npy(array)
+
+    def read_header():
+        return content[:4096]
+
+    def fill(buffer, data_offset):
+        calls.append(data_offset)
+        buffer[:] = content[data_offset:]
+
+    return read_header, fill
+
+
+def _acquire_in_child(key: str, expected: np.ndarray) -> None:
+    from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+    def fail(*args):
+        raise AssertionError("The segment must not be filled again")
+
+    array = acquire_shared_array(key=key, read_header=fail, fill=fail)
+    os._exit(0 if np.array_equal(array, expected) else 1)
+
+
+@unittest.skipUnless(os.name == "posix", "Shared registry requires POSIX")
+class SharedRegistryTest(unittest.TestCase):
+    def test_array_is_filled_once_and_shared(self):
+        """
+        GIVEN   a key acquired twice
+        WHEN    the arrays are returned
+        THEN    the data is filled once and both arrays are read-only views of it
+        """
+        from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+        data = np.arange(20, dtype=np.float32).reshape(4, 5)
+        calls = []
+        read_header, fill = _callbacks(data, calls)
+        key = str(uuid.uuid4())
+
+        first = acquire_shared_array(key=key, read_header=read_header, fill=fill)
+        second = acquire_shared_array(key=key, read_header=read_header, fill=fill)
+
+        self.assertEqual(len(calls), 1)
+        np.testing.assert_array_equal(first, data)
+        np.testing.assert_array_equal(second, data)
+        self.assertFalse(first.flags.writeable)
+
+    def test_segment_is_removed_when_released(self):
+        """
+        GIVEN   an array acquired and garbage collected
+        WHEN    the key is acquired again
+        THEN    a new segment is filled
+        """
+        import gc
+        from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+        data = np.arange(10)
+        calls = []
+        read_header, fill = _callbacks(data, calls)
+        key = str(uuid.uuid4())
+
+        view = acquire_shared_array(key=key, read_header=read_header, fill=fill)[2:]
+        gc.collect()
+        acquire_shared_array(key=key, read_header=read_header, fill=fill)
+        self.assertEqual(len(calls), 1)
+
+        del view
+        gc.collect()
+        acquire_shared_array(key=key, read_header=read_header, fill=fill)
+        self.assertEqual(len(calls), 2)
+
+    def test_failed_fill_is_retried(self):
+        """
+        GIVEN   a fill function failing the first time
+        WHEN    the key is acquired twice
+        THEN    the error is raised and the second acquisition fills the data
+        """
+        from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+        data = np.arange(10)
+        calls = []
+        read_header, fill = _callbacks(data, calls)
+        key = str(uuid.uuid4())
+
+        def failing_fill(buffer, data_offset):
+            raise IOError("Network error")
+
+        with self.assertRaises(IOError):
+            acquire_shared_array(key=key, read_header=read_header, fill=failing_fill)
+
+        array = acquire_shared_array(key=key, read_header=read_header, fill=fill)
+        np.testing.assert_array_equal(array, data)
+
+    def test_fortran_ordered_array(self):
+        """
+        GIVEN   a Fortran-ordered array
+        WHEN    the array is shared
+        THEN    the returned array is equal to it
+        """
+        from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+        data = np.asfortranarray(np.arange(12).reshape(3, 4))
+        read_header, fill = _callbacks(data, [])
+
+        array = acquire_shared_array(
+            key=str(uuid.uuid4()), read_header=read_header, fill=fill
+        )
+
+        np.testing.assert_array_equal(array, data)
+
+    @unittest.skipUnless(
+        "fork" in multiprocessing.get_all_start_methods(), "Requires fork"
+    )
+    def test_array_is_shared_with_other_processes(self):
+        """
+        GIVEN   an array acquired by a process
+        WHEN    another process acquires the same key
+        THEN    it maps the same data without filling it again
+        """
+        from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+        data = np.arange(100).reshape(10, 10)
+        read_header, fill = _callbacks(data, [])
+        key = str(uuid.uuid4())
+        array = acquire_shared_array(key=key, read_header=read_header, fill=fill)
+
+        process = multiprocessing.get_context("fork").Process(
+            target=_acquire_in_child, args=(key, data)
+        )
+        process.start()
+        process.join()
+
+        self.assertEqual(process.exitcode, 0)
+        np.testing.assert_array_equal(array, data)
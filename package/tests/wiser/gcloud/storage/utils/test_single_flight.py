@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+
+
+def wait_for_waiters(flight, key, waiters: int) -> None:
+    """
+    Waits until the given number of callers wait for the call in flight for the key
+    """
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+        # The waiting callers are blocked on the condition of the call's event
+        if call is not None and len(call.done._cond._waiters) == waiters:
+            return
+        time.sleep(0.001)
+    raise TimeoutError("Callers not waiting")
+
+
+def _call_in_child(flight) -> None:
+    os._exit(0 if flight.do(key="k", fn=lambda: "child") == "child" else 1)
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_calls_share_the_result(self):
+        """
+        GIVEN a single flight and a slow function
+        WHEN  several threads call it concurrently with the same key
+        THEN  the function runs once and every thread receives its result
+        """
+        from wiser.gcloud.storage.utils import SingleFlight
+
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait()
+            return object()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do(key="k", fn=fn)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        wait_for_waiters(flight=flight, key="k", waiters=7)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_concurrent_calls_share_the_error(self):
+        """
+        GIVEN a single flight and a slow failing function
+        WHEN  several threads call it concurrently with the same key
+        THEN  every thread receives the error
+        """
+        from wiser.gcloud.storage.utils import SingleFlight
+
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait()
+            raise KeyError("missing")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do(key="k", fn=fn)
+            except KeyError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        wait_for_waiters(flight=flight, key="k", waiters=3)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 4)
+
+    def test_sequential_calls_and_other_keys_run_again(self):
+        """
+        GIVEN a single flight
+        WHEN  calls are sequential or have different keys
+        THEN  the function runs for each call
+        """
+        from wiser.gcloud.storage.utils import SingleFlight
+
+        flight = SingleFlight()
+        calls = []
+
+        for key in ["a", "a", "b"]:
+            flight.do(key=key, fn=lambda: calls.append(key))
+
+        self.assertEqual(calls, ["a", "a", "b"])
+        self.assertEqual(flight._calls, {})
+
+    @unittest.skipUnless(
+        "fork" in multiprocessing.get_all_start_methods(), "Requires fork"
+    )
+    def test_forked_child_runs_its_own_calls(self):
+        """
+        GIVEN a single flight with a call in flight and its lock held
+        WHEN  the process forks and the child calls it with the same key
+        THEN  the child runs the function instead of waiting for the parent
+        """
+        from wiser.gcloud.storage.utils import SingleFlight
+
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(
+            target=flight.do, kwargs=dict(key="k", fn=release.wait)
+        )
+        leader.start()
+        self.addCleanup(leader.join)
+        self.addCleanup(release.set)
+        wait_for_waiters(flight=flight, key="k", waiters=0)
+
+        with flight._lock:
+            process = multiprocessing.get_context("fork").Process(
+                target=_call_in_child, args=(flight,)
+            )
+            process.start()
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+
+        self.assertEqual(process.exitcode, 0)
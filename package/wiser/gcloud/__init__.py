@@ -1,8 +1,5 @@
-try:
-    import pkg_resources
+# pkgutil-style namespace package: it is compatible with the other wiser
+# distributions and, unlike pkg_resources, it does not slow down the import
+import pkgutil
 
-    pkg_resources.declare_namespace(__name__)
-except ImportError:
-    import pkgutil
-
-    __path__ = pkgutil.extend_path(__path__, __name__)
+__path__ = pkgutil.extend_path(__path__, __name__)
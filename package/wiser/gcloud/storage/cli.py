@@ -0,0 +1,522 @@
+"""
+Command line interface of wiser-gcloud-storage, installed as `wiser-gcs`:
+
+    wiser-gcs cp [-r] SOURCE DESTINATION
+    wiser-gcs sync [--delete] SOURCE DESTINATION
+    wiser-gcs ls [-r] [-l] URI
+    wiser-gcs rm [-r] URI
+    wiser-gcs du [-s] [-d DEPTH] [-H] URI
+
+URIs are 'gs://', 'file://' or 'mem://' locations; local paths are 'file://' ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from wiser.gcloud.storage.utils.progress import Progress, format_bytes
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from wiser.gcloud.storage.connectors.base_connector import BaseConnector
+    from wiser.gcloud.storage.types.location import StorageLocation
+    from wiser.gcloud.storage.types.metadata import BlobMetadata
+    from wiser.gcloud.storage.utils.journal import TransferJournal
+
+# Number of files processed in parallel by default
+DEFAULT_WORKERS = 16
+# Blobs at least this large are downloaded as parallel ranges
+DEFAULT_SLICE_THRESHOLD = 128 * 1024 * 1024
+# Size of the ranges of the sliced downloads
+DEFAULT_SLICE_SIZE = 32 * 1024 * 1024
+
+
+class _Blob(NamedTuple):
+    location: StorageLocation
+    # Path of the blob relative to the listed prefix
+    relative: str
+
+
+class _Transfer(NamedTuple):
+    source: StorageLocation
+    destination: StorageLocation
+
+    @property
+    def key(self) -> str:
+        return self.source.complete_path() + " " + self.destination.complete_path()
+
+
+def _location(uri: str) -> StorageLocation:
+    from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+    if "://" not in uri:
+        path = os.path.abspath(os.path.expanduser(uri))
+        if uri.endswith(("/", os.sep)) or os.path.isdir(path):
+            path += "/"
+        uri = "file://" + path.replace(os.sep, "/")
+    if uri.split("://", 1)[1].lstrip("/").count("/") == 0:
+        # A bucket alone, e.g. 'gs://bucket'
+        uri += "/"
+    return StorageLocationBuilder().from_uri(uri=uri).build()
+
+
+def _child(location: StorageLocation, blob_name: str) -> StorageLocation:
+    from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+    return (
+        StorageLocationBuilder()
+        .set_prefix(prefix=location.prefix)
+        .set_bucket(bucket=location.bucket)
+        .set_blob_name(blob_name=blob_name)
+        .build()
+    )
+
+
+def _connector(location: StorageLocation) -> BaseConnector:
+    from wiser.gcloud.storage.services.storage_service import Storage
+
+    return Storage._connector(location=location)
+
+
+def _is_folder(location: StorageLocation) -> bool:
+    return location.blob_name is None or location.blob_name.endswith("/")
+
+
+def _list(location: StorageLocation, recursive: bool) -> List[_Blob]:
+    """
+    Returns the blobs of a location: the blob itself, or the blobs under the folder
+    """
+    connector = _connector(location=location)
+    if not _is_folder(location=location) and connector.exists(
+        bucket_name=location.bucket, source_blob_name=location.blob_name
+    ):
+        return [_Blob(location=location, relative=location.blob_name.split("/")[-1])]
+
+    prefix = (location.blob_name or "").rstrip("/")
+    prefix = prefix + "/" if prefix else ""
+    blob_names = connector.list_blobs(
+        bucket_name=location.bucket,
+        prefix=prefix,
+        delimiter=None if recursive else "/",
+    )
+    return [
+        _Blob(location=_child(location, blob_name), relative=blob_name[len(prefix) :])
+        for blob_name in blob_names
+        if not blob_name.endswith("/")
+    ]
+
+
+def _transfers(
+    source: StorageLocation, destination: StorageLocation, recursive: bool
+) -> List[_Transfer]:
+    blobs = _list(location=source, recursive=recursive)
+    single = len(blobs) == 1 and blobs[0].location == source
+    if single and not _is_folder(location=destination):
+        return [_Transfer(source=source, destination=destination)]
+
+    prefix = (destination.blob_name or "").rstrip("/")
+    prefix = prefix + "/" if prefix else ""
+    return [
+        _Transfer(
+            source=blob.location,
+            destination=_child(destination, prefix + blob.relative),
+        )
+        for blob in blobs
+    ]
+
+
+def _download(
+    location: StorageLocation,
+    path: str,
+    slice_pool: Optional[ThreadPoolExecutor],
+    slice_threshold: int,
+    slice_size: int,
+) -> int:
+    """
+    Downloads a blob to a local path, as parallel ranges if large, and returns its size
+    """
+    from wiser.gcloud.storage.services.storage_service import Storage
+
+    return Storage.download_file(
+        location=location,
+        path=path,
+        chunk_size=slice_size,
+        max_workers=1,
+        slice_threshold=slice_threshold if slice_pool is not None else None,
+        executor=slice_pool,
+    )
+
+
+def _copy(
+    transfer: _Transfer,
+    slice_pool: Optional[ThreadPoolExecutor],
+    slice_threshold: int,
+    slice_size: int,
+) -> int:
+    """
+    Copies a blob and returns the number of bytes transferred by this process
+    """
+    from tempfile import TemporaryDirectory
+
+    from wiser.gcloud.storage.connectors.local_connector import LocalConnector
+
+    source, destination = transfer.source, transfer.destination
+    source_connector = _connector(location=source)
+    destination_connector = _connector(location=destination)
+
+    if source_connector is destination_connector:
+        # Copied by the backend, without going through this process
+        source_connector.copy(
+            source_bucket_name=source.bucket,
+            source_blob_name=source.blob_name,
+            dest_bucket_name=destination.bucket,
+            dest_blob_name=destination.blob_name,
+        )
+        return 0
+
+    if isinstance(source_connector, LocalConnector):
+        with open(source_connector.path(source.bucket, source.blob_name), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            destination_connector.upload_from_file(
+                file_handle=f,
+                bucket_name=destination.bucket,
+                destination_blob_name=destination.blob_name,
+            )
+        return size
+
+    download = dict(
+        location=source,
+        slice_pool=slice_pool,
+        slice_threshold=slice_threshold,
+        slice_size=slice_size,
+    )
+    if isinstance(destination_connector, LocalConnector):
+        # Written once, to a temporary file renamed into place
+        return _download(
+            path=destination_connector.path(destination.bucket, destination.blob_name),
+            **download,
+        )
+
+    with TemporaryDirectory() as directory:
+        path = os.path.join(directory, "blob")
+        size = _download(path=path, **download)
+        with open(path, "rb") as f:
+            destination_connector.upload_from_file(
+                file_handle=f,
+                bucket_name=destination.bucket,
+                destination_blob_name=destination.blob_name,
+            )
+    return size
+
+
+def _is_up_to_date(transfer: _Transfer) -> bool:
+    source, destination = transfer.source, transfer.destination
+    destination_metadata = _connector(location=destination).get_metadata(
+        bucket_name=destination.bucket, source_blob_name=destination.blob_name
+    )
+    if destination_metadata is None:
+        return False
+    source_metadata = _connector(location=source).get_metadata(
+        bucket_name=source.bucket, source_blob_name=source.blob_name
+    )
+    if source_metadata is None or source_metadata.size != destination_metadata.size:
+        return False
+    for checksum in ("crc32c", "md5_hash"):
+        source_value = getattr(source_metadata, checksum)
+        destination_value = getattr(destination_metadata, checksum)
+        if source_value is not None and destination_value is not None:
+            return source_value == destination_value
+    return True
+
+
+def _run(
+    tasks: Iterable,
+    run: Callable,
+    workers: int,
+    progress: Progress,
+    journal: TransferJournal = None,
+    key: Callable = None,
+) -> int:
+    """
+    Runs the tasks in parallel, skipping the ones in the journal. `run` returns the
+    bytes transferred, or None for a skipped task. Returns the number of failures
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Bounds the tasks queued, so that millions of tasks are not held in memory
+    slots = threading.BoundedSemaphore(workers * 4)
+    failures = []
+
+    def execute(task) -> None:
+        try:
+            nbytes = run(task)
+        except Exception as e:
+            failures.append(task)
+            sys.stderr.write("error: {}: {}\n".format(key(task) if key else task, e))
+            progress.update(failed=True)
+        else:
+            if journal is not None:
+                journal.record(key=key(task), bytes=nbytes or 0)
+            progress.update(nbytes=nbytes or 0, skipped=nbytes is None)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for task in tasks:
+            if journal is not None and key(task) in journal:
+                progress.update(skipped=True)
+                continue
+            slots.acquire()
+            executor.submit(execute, task)
+    return len(failures)
+
+
+def _transfer_command(args: argparse.Namespace, sync: bool) -> int:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from wiser.gcloud.storage.utils.journal import TransferJournal
+
+    source, destination = _location(args.source), _location(args.destination)
+    transfers = _transfers(
+        source=source, destination=destination, recursive=sync or args.recursive
+    )
+    if not transfers and not sync:
+        sys.stderr.write("error: no blob matches {}\n".format(args.source))
+        return 1
+    progress = Progress(stream=None if args.quiet else sys.stderr)
+    progress.add_total(files=len(transfers))
+    journal = TransferJournal(path=args.journal) if args.journal else None
+
+    def run(transfer: _Transfer) -> Optional[int]:
+        if sync and _is_up_to_date(transfer=transfer):
+            return None
+        return _copy(
+            transfer=transfer,
+            slice_pool=slice_pool,
+            slice_threshold=args.slice_threshold,
+            slice_size=args.slice_size,
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as slice_pool:
+            failures = _run(
+                tasks=transfers,
+                run=run,
+                workers=args.workers,
+                progress=progress,
+                journal=journal,
+                key=lambda transfer: transfer.key,
+            )
+    finally:
+        if journal is not None:
+            journal.close()
+
+    if sync and args.delete and failures == 0:
+        expected = {transfer.destination.blob_name for transfer in transfers}
+        extra = [
+            blob.location
+            for blob in _list(location=destination, recursive=True)
+            if blob.location.blob_name not in expected
+        ]
+        progress.add_total(files=len(extra))
+        failures += _run(
+            tasks=extra,
+            run=_delete,
+            workers=args.workers,
+            progress=progress,
+            key=lambda location: location.complete_path(),
+        )
+    progress.close()
+    return 1 if failures else 0
+
+
+def _delete(location: StorageLocation) -> int:
+    _connector(location=location).delete(
+        bucket_name=location.bucket, blob_name=location.blob_name
+    )
+    return 0
+
+
+def _cp(args: argparse.Namespace) -> int:
+    return _transfer_command(args=args, sync=False)
+
+
+def _sync(args: argparse.Namespace) -> int:
+    return _transfer_command(args=args, sync=True)
+
+
+def _rm(args: argparse.Namespace) -> int:
+    location = _location(args.uri)
+    blobs = _list(location=location, recursive=args.recursive)
+    if not blobs:
+        sys.stderr.write("error: no blob matches {}\n".format(args.uri))
+        return 1
+    progress = Progress(stream=None if args.quiet else sys.stderr)
+    progress.add_total(files=len(blobs))
+    failures = _run(
+        tasks=[blob.location for blob in blobs],
+        run=_delete,
+        workers=args.workers,
+        progress=progress,
+        key=lambda location: location.complete_path(),
+    )
+    progress.close()
+    return 1 if failures else 0
+
+
+def _sizes(
+    locations: List[StorageLocation], workers: int
+) -> List[Tuple[int, Optional[BlobMetadata]]]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    def size(location: StorageLocation) -> Tuple[int, Optional[BlobMetadata]]:
+        metadata = _connector(location=location).get_metadata(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        return (metadata.size if metadata is not None else 0), metadata
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(size, locations))
+
+
+def _ls(args: argparse.Namespace) -> int:
+    blobs = _list(location=_location(args.uri), recursive=args.recursive)
+    if not args.long:
+        for blob in blobs:
+            print(blob.location.complete_path())
+        return 0
+
+    locations = [blob.location for blob in blobs]
+    for location, (size, metadata) in zip(
+        locations, _sizes(locations=locations, workers=args.workers)
+    ):
+        updated = metadata.updated if metadata is not None else None
+        print(
+            "{:>12}  {:<25}  {}".format(
+                size,
+                updated.strftime("%Y-%m-%dT%H:%M:%SZ") if updated else "",
+                location.complete_path(),
+            )
+        )
+    return 0
+
+
+def _du(args: argparse.Namespace) -> int:
+    from wiser.gcloud.storage.services.storage_service import Storage
+
+    location = _location(args.uri)
+    depth = 0 if args.summarize else args.depth
+    # The usages are printed as they come, the sub-prefixes before their parent
+    for usage in Storage.du(location=location, depth=depth, max_workers=args.workers):
+        size = format_bytes(usage.size) if args.human_readable else str(usage.size)
+        uri = _child(location, usage.prefix).complete_path()
+        print("{:>12}  {:>10}  {}".format(size, usage.objects, uri))
+    return 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="wiser-gcs",
+        description="Bulk operations on Google Cloud Storage and the other backends",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name: str, run: Callable, help: str) -> argparse.ArgumentParser:
+        subparser = commands.add_parser(name, help=help)
+        subparser.set_defaults(run=run)
+        subparser.add_argument(
+            "-j",
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help="number of files processed in parallel",
+        )
+        subparser.add_argument(
+            "-q", "--quiet", action="store_true", help="do not report the progress"
+        )
+        return subparser
+
+    for name, run, help in [
+        ("cp", _cp, "copy blobs and files"),
+        ("sync", _sync, "copy the blobs missing or different at the destination"),
+    ]:
+        subparser = command(name=name, run=run, help=help)
+        subparser.add_argument("source")
+        subparser.add_argument("destination")
+        subparser.add_argument(
+            "--journal",
+            help="journal of the completed copies: a job restarted with the same "
+            "journal skips them",
+        )
+        subparser.add_argument(
+            "--slice-threshold",
+            type=int,
+            default=DEFAULT_SLICE_THRESHOLD,
+            help="size from which blobs are downloaded as parallel ranges, in bytes",
+        )
+        subparser.add_argument(
+            "--slice-size",
+            type=int,
+            default=DEFAULT_SLICE_SIZE,
+            help="size of the ranges of the sliced downloads, in bytes",
+        )
+        if name == "cp":
+            subparser.add_argument(
+                "-r", "--recursive", action="store_true", help="copy folders"
+            )
+        else:
+            subparser.add_argument(
+                "--delete",
+                action="store_true",
+                help="delete the destination blobs missing at the source",
+            )
+
+    subparser = command(name="ls", run=_ls, help="list blobs")
+    subparser.add_argument("uri")
+    subparser.add_argument("-r", "--recursive", action="store_true")
+    subparser.add_argument(
+        "-l", "--long", action="store_true", help="show sizes and update times"
+    )
+
+    subparser = command(name="rm", run=_rm, help="delete blobs")
+    subparser.add_argument("uri")
+    subparser.add_argument(
+        "-r", "--recursive", action="store_true", help="delete folders"
+    )
+
+    subparser = command(name="du", run=_du, help="report the size of blobs")
+    subparser.add_argument("uri")
+    subparser.add_argument(
+        "-s", "--summarize", action="store_true", help="report only the total"
+    )
+    subparser.add_argument(
+        "-d",
+        "--depth",
+        type=int,
+        default=1,
+        help="number of folder levels reported below the location",
+    )
+    subparser.add_argument(
+        "-H", "--human-readable", action="store_true", help="sizes with units"
+    )
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Runs the command line interface
+
+    @param argv: the arguments, by default the ones of the process
+    @return: the exit code
+    """
+    args = _parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,23 @@
+from wiser.gcloud.storage.connectors.base_connector import (
+    BaseConnector,
+    BlobEntry,
+    ListedBlob,
+)
+from wiser.gcloud.storage.connectors.local_connector import LocalConnector
+from wiser.gcloud.storage.connectors.memory_connector import MemoryConnector
+from wiser.gcloud.storage.connectors.registry import ConnectorRegistry
 from wiser.gcloud.storage.connectors.storage_connector import StorageConnector
+from wiser.gcloud.storage.connectors.throttled_connector import ThrottledConnector
+from wiser.gcloud.storage.connectors.tiered_connector import TieredConnector
 
-__all__ = ["StorageConnector"]
+__all__ = [
+    "BaseConnector",
+    "BlobEntry",
+    "ConnectorRegistry",
+    "ListedBlob",
+    "LocalConnector",
+    "MemoryConnector",
+    "StorageConnector",
+    "ThrottledConnector",
+    "TieredConnector",
+]
@@ -0,0 +1,448 @@
+from __future__ import annotations
+
+import io
+from abc import ABC, abstractmethod
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+
+
+def not_found(bucket_name: str, blob_name: str) -> Exception:
+    """
+    Returns the error raised by Google Cloud Storage when a blob does not exist
+
+    @param bucket_name: the bucket name
+    @param blob_name: the blob name
+    @return: the exception to raise
+    """
+    from google.api_core.exceptions import NotFound
+
+    return NotFound("No such object: {}/{}".format(bucket_name, blob_name))
+
+
+def precondition_failed(bucket_name: str, blob_name: str) -> Exception:
+    """
+    Returns the error raised by Google Cloud Storage when a generation precondition fails
+
+    @param bucket_name: the bucket name
+    @param blob_name: the blob name
+    @return: the exception to raise
+    """
+    from google.api_core.exceptions import PreconditionFailed
+
+    return PreconditionFailed(
+        "Generation precondition failed for {}/{}".format(bucket_name, blob_name)
+    )
+
+
+# Content written to a `SpooledWriter` is kept in memory up to this size, then on disk
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+class SpooledWriter(io.BufferedIOBase):
+    """
+    Binary file uploaded when closed, spooled to a temporary file meanwhile. Used as
+    context manager, the content is discarded if the block raises
+    """
+
+    def __init__(self, upload: Callable[[BinaryIO], None]):
+        """
+        @param upload: the function uploading the content, from the file it receives
+        """
+        from tempfile import SpooledTemporaryFile
+
+        super().__init__()
+        self._upload = upload
+        self._file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self._file.write(data)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._file.seek(0)
+            self._upload(self._file)
+        finally:
+            self.terminate()
+
+    def terminate(self) -> None:
+        """
+        Discards the content without uploading it
+
+        @return: None
+        """
+        self._file.close()
+        super().close()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.terminate()
+        else:
+            self.close()
+
+
+class ListedBlob(NamedTuple):
+    """
+    Entry of a listing: a blob and its size, or a sub-prefix and no size
+    """
+
+    name: str
+    size: Optional[int]
+
+    @property
+    def is_prefix(self) -> bool:
+        return self.size is None
+
+
+class BlobEntry(NamedTuple):
+    """
+    Entry of a flat listing: a blob, its size and its generation, None if the
+    backend does not list generations
+    """
+
+    name: str
+    size: int
+    generation: Optional[int]
+
+
+def group_listing(
+    blobs: Iterable[Tuple[str, int]],
+    prefix: str = None,
+    delimiter: str = None,
+    match_glob: str = None,
+) -> Iterator[ListedBlob]:
+    """
+    Turns (name, size) pairs into a listing: with a delimiter, the blobs whose name
+    has the delimiter after the prefix are returned once per sub-prefix, as Google
+    Cloud Storage does
+
+    @param blobs: the (name, size) pairs of the blobs starting with the prefix
+    @param prefix: the prefix of the listing
+    @param delimiter: the delimiter of the sub-prefixes, None to return all blobs
+    @param match_glob: the glob pattern the returned blobs must match
+    @return: an iterator over the listed blobs and sub-prefixes
+    """
+    prefix = prefix or ""
+    pattern = None
+    if match_glob is not None:
+        from wiser.gcloud.storage.utils.glob import compile_pattern
+
+        pattern = compile_pattern(pattern=match_glob)
+    sub_prefixes = set()
+    for name, size in blobs:
+        position = name.find(delimiter, len(prefix)) if delimiter else -1
+        if position < 0:
+            if pattern is None or pattern.match(name):
+                yield ListedBlob(name=name, size=size)
+            continue
+        sub_prefix = name[: position + len(delimiter)]
+        if sub_prefix not in sub_prefixes:
+            sub_prefixes.add(sub_prefix)
+            yield ListedBlob(name=sub_prefix, size=None)
+
+
+class BaseConnector(ABC):
+    """
+    Interface of the storage backends used by `Storage`. Backends raise the
+    `google.api_core.exceptions` errors of Google Cloud Storage, so that callers
+    handle missing blobs and failed preconditions the same way on every backend.
+    """
+
+    @abstractmethod
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        """
+        Uploads data to the specified bucket with the specified blob name
+
+        @param data: data to upload, strings are utf-8 encoded
+        @param bucket_name: the destination bucket name
+        @param destination_blob_name: the destination blob name
+        @param if_generation_match: upload only if the current generation of the blob matches, 0 if it must not exist
+        @param metadata: the object metadata, e.g. the content type, ignored by the backends not storing it
+        @return: None
+        """
+
+    @abstractmethod
+    def upload_from_file(
+        self,
+        file_handle: Union[TextIO, BinaryIO],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        """
+        Uploads data read from a file handle, from its current position
+
+        @param file_handle: the file handle
+        @param bucket_name: the destination bucket name
+        @param destination_blob_name: the destination blob name
+        @param if_generation_match: upload only if the current generation of the blob matches, 0 if it must not exist
+        @param metadata: the object metadata, e.g. the content type, ignored by the backends not storing it
+        @return: None
+        """
+
+    def open_writer(
+        self,
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> BinaryIO:
+        """
+        Opens a binary file whose content is uploaded to a blob when it is closed. Used as
+        context manager, nothing is uploaded if the block raises. This default spools the
+        content to a temporary file uploaded by `upload_from_file()`: backends with
+        streaming uploads override it
+
+        @param bucket_name: the destination bucket name
+        @param destination_blob_name: the destination blob name
+        @param if_generation_match: upload only if the current generation of the blob matches, 0 if it must not exist
+        @param metadata: the object metadata, e.g. the content type, ignored by the backends not storing it
+        @return: the file, to be closed
+        """
+        return SpooledWriter(
+            upload=lambda file_handle: self.upload_from_file(
+                file_handle=file_handle,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
+            )
+        )
+
+    @abstractmethod
+    def download_as_bytes(self, bucket_name: str, source_blob_name: str) -> bytes:
+        """
+        Returns the content of a blob as bytes
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: the content of the blob as bytes
+        """
+
+    @abstractmethod
+    def download_range(
+        self,
+        bucket_name: str,
+        source_blob_name: str,
+        start: int,
+        end: int,
+        generation: int = None,
+    ) -> bytes:
+        """
+        Returns a range of the content of a blob as bytes
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @param start: the first byte to download
+        @param end: the last byte to download (included)
+        @param generation: the generation of the blob to read, the live one if None
+        @return: the content of the range as bytes
+        """
+
+    @abstractmethod
+    def get_size(self, bucket_name: str, source_blob_name: str) -> int:
+        """
+        Returns the size of a blob in bytes
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: the size of the blob in bytes
+        """
+
+    @abstractmethod
+    def get_metadata(
+        self, bucket_name: str, source_blob_name: str
+    ) -> Optional[BlobMetadata]:
+        """
+        Returns the metadata of a blob
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: the metadata of the blob, None if it does not exist
+        """
+
+    def download_as_string(self, bucket_name: str, source_blob_name: str) -> str:
+        """
+        Returns the content of a blob as a string
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: the content of the blob as a string
+        """
+        return self.download_as_bytes(
+            bucket_name=bucket_name, source_blob_name=source_blob_name
+        ).decode("utf-8")
+
+    @abstractmethod
+    def download_to_filename(
+        self, filename: str, bucket_name: str, source_blob_name: str
+    ) -> None:
+        """
+        Writes the content of a blob to a file
+
+        @param filename: the name of the file
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: None
+        """
+
+    @abstractmethod
+    def exists(self, bucket_name: str, source_blob_name: str) -> bool:
+        """
+        Returns True if the blob exists
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: True if the blob exists
+        """
+
+    @abstractmethod
+    def list_blobs(
+        self, bucket_name: str, prefix: str = None, delimiter: str = None
+    ) -> List[str]:
+        """
+        Returns the list of the blob names, sorted
+
+        @param bucket_name: the source bucket name
+        @param prefix: prefix to filter blobs
+        @param delimiter: Delimiter, used with ``prefix`` to emulate hierarchy.
+        @return: list of blob names that match the arguments
+        """
+
+    def scan(
+        self,
+        bucket_name: str,
+        prefix: str = None,
+        delimiter: str = None,
+        match_glob: str = None,
+    ) -> Iterator[ListedBlob]:
+        """
+        Lists the blobs with their size, and the sub-prefixes if a delimiter is given,
+        lazily so that any number of blobs can be listed in bounded memory. Backends
+        override it to get the sizes from the listing: this default asks each size
+
+        @param bucket_name: the source bucket name
+        @param prefix: prefix to filter blobs
+        @param delimiter: the delimiter of the sub-prefixes, e.g. '/'
+        @param match_glob: the glob pattern the blobs must match, the sub-prefixes are not filtered
+        @return: an iterator over the listed blobs and sub-prefixes
+        """
+        names = self.list_blobs(bucket_name=bucket_name, prefix=prefix)
+        if match_glob is not None:
+            from wiser.gcloud.storage.utils.glob import compile_pattern
+
+            # The sizes of the blobs filtered out are not asked
+            pattern = compile_pattern(pattern=match_glob)
+            prefix_length = len(prefix or "")
+            names = [
+                name
+                for name in names
+                if pattern.match(name)
+                or (delimiter and delimiter in name[prefix_length:])
+            ]
+        return group_listing(
+            blobs=(
+                (name, self.get_size(bucket_name=bucket_name, source_blob_name=name))
+                for name in names
+            ),
+            prefix=prefix,
+            delimiter=delimiter,
+            match_glob=match_glob,
+        )
+
+    def list_entries(self, bucket_name: str, prefix: str = None) -> Iterator[BlobEntry]:
+        """
+        Lists the blobs with their size and generation, lazily. Backends override it to
+        get the generations from the listing: this default lists no generation
+
+        @param bucket_name: the source bucket name
+        @param prefix: prefix to filter blobs
+        @return: an iterator over the listed blobs, sorted by name
+        """
+        for blob in self.scan(bucket_name=bucket_name, prefix=prefix):
+            yield BlobEntry(name=blob.name, size=blob.size, generation=None)
+
+    def generate_signed_urls(
+        self,
+        bucket_name: str,
+        blob_names: List[str],
+        method: str = "GET",
+        expiration: int = 3600,
+        content_type: str = None,
+    ) -> List[str]:
+        """
+        Returns URLs granting access to blobs without credentials, for a limited time.
+        Only backends served over HTTP sign URLs: this default raises NotImplementedError
+
+        @param bucket_name: the bucket name
+        @param blob_names: the blob names
+        @param method: the HTTP method the URLs are signed for, e.g. 'GET' or 'PUT'
+        @param expiration: the validity of the URLs, in seconds
+        @param content_type: the content type the requests must send, for 'PUT' URLs
+        @return: the signed URLs, in the order of the blob names
+        """
+        raise NotImplementedError("{} does not sign URLs".format(type(self).__name__))
+
+    @abstractmethod
+    def copy(
+        self,
+        source_bucket_name: str,
+        source_blob_name: str,
+        dest_bucket_name: str,
+        dest_blob_name: str,
+        if_source_generation_match: int = None,
+        if_generation_match: int = None,
+    ) -> None:
+        """
+        Copies a blob to another location of the same backend
+
+        @param source_bucket_name: the source bucket name
+        @param source_blob_name:  the source blob name
+        @param dest_bucket_name: the destination bucket name
+        @param dest_blob_name: the destination blob name
+        @param if_source_generation_match: copy only if the generation of the source blob matches
+        @param if_generation_match: copy only if the generation of the destination blob matches, 0 if it must not exist
+        @return: None
+        """
+
+    @abstractmethod
+    def delete(
+        self, bucket_name: str, blob_name: str, if_generation_match: int = None
+    ) -> None:
+        """
+        Deletes a blob
+
+        @param bucket_name: the source bucket name
+        @param blob_name: the source blob name
+        @param if_generation_match: delete only if the generation of the blob matches
+        @return: None
+        """
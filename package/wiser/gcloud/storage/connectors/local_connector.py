@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from wiser.gcloud.storage.connectors.base_connector import (
+    BaseConnector,
+    BlobEntry,
+    ListedBlob,
+    group_listing,
+    not_found,
+    precondition_failed,
+)
+from wiser.gcloud.storage.utils.local_files import TMP_PREFIX
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+
+# Prefix of the temporary files written next to the blobs, shared with atomic_file()
+# so that they are all hidden from listings
+_TMP_PREFIX = TMP_PREFIX
+
+# Size of the chunks copied from file handles
+_COPY_CHUNK_SIZE = 1024 * 1024
+# Maximum number of files whose checksum is kept, the least recently read are dropped
+MAX_CACHED_CHECKSUMS = 10000
+
+
+class LocalConnector(BaseConnector):
+    """
+    Backend storing each bucket as a folder of the local filesystem. Writes are atomic:
+    blobs are written to a temporary file that is then renamed. The generation of a
+    blob is the modification time of its file in nanoseconds; preconditions are
+    checked before the rename, so they are not atomic across processes except for
+    creation-only writes (`if_generation_match=0`). Object metadata is not stored.
+    """
+
+    def __init__(self, root: str = "/"):
+        """
+        @param root: the folder containing the buckets
+        """
+        self.root = root
+        # CRC32C of the files by path, with the modification time and size they match
+        self._checksums: OrderedDict[str, Tuple[int, int, str]] = OrderedDict()
+        self._checksums_lock = threading.Lock()
+
+    def path(self, bucket_name: str, blob_name: str = "") -> str:
+        """
+        Returns the path of a blob, or of the bucket folder if no blob name is given
+
+        @param bucket_name: the bucket name
+        @param blob_name: the blob name
+        @return: the path on the local filesystem
+        """
+        path = os.path.join(self.root, bucket_name)
+        if blob_name:
+            path = os.path.join(path, *blob_name.split("/"))
+        return path
+
+    def _generation(self, path: str) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _existing_path(self, bucket_name: str, blob_name: str) -> str:
+        path = self.path(bucket_name=bucket_name, blob_name=blob_name)
+        if not os.path.isfile(path):
+            raise not_found(bucket_name=bucket_name, blob_name=blob_name)
+        return path
+
+    def _write(
+        self,
+        write,
+        bucket_name: str,
+        blob_name: str,
+        if_generation_match: Optional[int],
+    ) -> None:
+        import tempfile
+
+        path = self.path(bucket_name=bucket_name, blob_name=blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=_TMP_PREFIX, dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+
+            if if_generation_match == 0:
+                # Linking fails if the destination exists, atomically
+                try:
+                    os.link(tmp_path, path)
+                except FileExistsError:
+                    raise precondition_failed(
+                        bucket_name=bucket_name, blob_name=blob_name
+                    )
+            else:
+                if (
+                    if_generation_match is not None
+                    and self._generation(path) != if_generation_match
+                ):
+                    raise precondition_failed(
+                        bucket_name=bucket_name, blob_name=blob_name
+                    )
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._write(
+            write=lambda f: f.write(data),
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            if_generation_match=if_generation_match,
+        )
+
+    def upload_from_file(
+        self,
+        file_handle: Union[TextIO, BinaryIO],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        def write(f):
+            chunk = file_handle.read(_COPY_CHUNK_SIZE)
+            while chunk:
+                f.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                chunk = file_handle.read(_COPY_CHUNK_SIZE)
+
+        self._write(
+            write=write,
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            if_generation_match=if_generation_match,
+        )
+
+    def download_as_bytes(self, bucket_name: str, source_blob_name: str) -> bytes:
+        path = self._existing_path(bucket_name=bucket_name, blob_name=source_blob_name)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def download_range(
+        self,
+        bucket_name: str,
+        source_blob_name: str,
+        start: int,
+        end: int,
+        generation: int = None,
+    ) -> bytes:
+        path = self._existing_path(bucket_name=bucket_name, blob_name=source_blob_name)
+        with open(path, "rb") as f:
+            if (
+                generation is not None
+                and os.fstat(f.fileno()).st_mtime_ns != generation
+            ):
+                raise not_found(bucket_name=bucket_name, blob_name=source_blob_name)
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def get_size(self, bucket_name: str, source_blob_name: str) -> int:
+        path = self._existing_path(bucket_name=bucket_name, blob_name=source_blob_name)
+        return os.path.getsize(path)
+
+    def get_metadata(
+        self, bucket_name: str, source_blob_name: str
+    ) -> Optional[BlobMetadata]:
+        from datetime import datetime, timezone
+
+        from wiser.gcloud.storage.types.metadata import BlobMetadata
+        from wiser.gcloud.storage.utils import checksums
+
+        path = self.path(bucket_name=bucket_name, blob_name=source_blob_name)
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                crc32c = self._cached_checksum(path=path, stat=stat)
+                if crc32c is None:
+                    # Writes replace the file, which changes its modification time
+                    crc32c = checksums.crc32c(f)
+                    self._cache_checksum(path=path, stat=stat, crc32c=crc32c)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+        return BlobMetadata(
+            bucket=bucket_name,
+            name=source_blob_name,
+            size=stat.st_size,
+            generation=stat.st_mtime_ns,
+            crc32c=crc32c,
+            updated=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        )
+
+    def _cached_checksum(self, path: str, stat: os.stat_result) -> Optional[str]:
+        with self._checksums_lock:
+            cached = self._checksums.get(path)
+            if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+                return None
+            self._checksums.move_to_end(path)
+            return cached[2]
+
+    def _cache_checksum(self, path: str, stat: os.stat_result, crc32c: str) -> None:
+        with self._checksums_lock:
+            self._checksums[path] = (stat.st_mtime_ns, stat.st_size, crc32c)
+            self._checksums.move_to_end(path)
+            if len(self._checksums) > MAX_CACHED_CHECKSUMS:
+                self._checksums.popitem(last=False)
+
+    def download_to_filename(
+        self, filename: str, bucket_name: str, source_blob_name: str
+    ) -> None:
+        path = self._existing_path(bucket_name=bucket_name, blob_name=source_blob_name)
+        shutil.copyfile(path, filename)
+
+    def exists(self, bucket_name: str, source_blob_name: str) -> bool:
+        return os.path.isfile(
+            self.path(bucket_name=bucket_name, blob_name=source_blob_name)
+        )
+
+    def list_blobs(
+        self, bucket_name: str, prefix: str = None, delimiter: str = None
+    ) -> List[str]:
+        prefix = prefix or ""
+        bucket_path = self.path(bucket_name=bucket_name)
+        # Only the folders that can contain blobs starting with the prefix are walked
+        top = self.path(bucket_name=bucket_name, blob_name=prefix.rsplit("/", 1)[0])
+        if "/" not in prefix:
+            top = bucket_path
+
+        names = []
+        for folder, _, filenames in os.walk(top):
+            relative = os.path.relpath(folder, bucket_path).replace(os.sep, "/")
+            for filename in filenames:
+                if filename.startswith(_TMP_PREFIX):
+                    continue
+                name = filename if relative == "." else relative + "/" + filename
+                if not name.startswith(prefix):
+                    continue
+                if delimiter and delimiter in name[len(prefix) :]:
+                    continue
+                names.append(name)
+
+        return sorted(names)
+
+    def scan(
+        self,
+        bucket_name: str,
+        prefix: str = None,
+        delimiter: str = None,
+        match_glob: str = None,
+    ) -> Iterator[ListedBlob]:
+        prefix = prefix or ""
+        bucket_path = self.path(bucket_name=bucket_name)
+        folder_prefix = prefix.rsplit("/", 1)[0] + "/" if "/" in prefix else ""
+        top = self.path(bucket_name=bucket_name, blob_name=folder_prefix.rstrip("/"))
+
+        if delimiter == "/":
+            pattern = None
+            if match_glob is not None:
+                from wiser.gcloud.storage.utils.glob import compile_pattern
+
+                pattern = compile_pattern(pattern=match_glob)
+            # A single folder is read: its files are blobs, its folders sub-prefixes
+            try:
+                entries = sorted(os.scandir(top), key=lambda entry: entry.name)
+            except (FileNotFoundError, NotADirectoryError):
+                return
+            for entry in entries:
+                name = folder_prefix + entry.name
+                if entry.name.startswith(_TMP_PREFIX) or not name.startswith(prefix):
+                    continue
+                if entry.is_dir():
+                    yield ListedBlob(name=name + "/", size=None)
+                elif entry.is_file() and (pattern is None or pattern.match(name)):
+                    yield ListedBlob(name=name, size=entry.stat().st_size)
+            return
+
+        def walk() -> Iterator:
+            for folder, _, filenames in os.walk(top):
+                relative = os.path.relpath(folder, bucket_path).replace(os.sep, "/")
+                for filename in filenames:
+                    name = filename if relative == "." else relative + "/" + filename
+                    if filename.startswith(_TMP_PREFIX) or not name.startswith(prefix):
+                        continue
+                    try:
+                        size = os.stat(os.path.join(folder, filename)).st_size
+                    except FileNotFoundError:
+                        continue
+                    yield name, size
+
+        yield from group_listing(
+            blobs=walk(), prefix=prefix, delimiter=delimiter, match_glob=match_glob
+        )
+
+    def list_entries(self, bucket_name: str, prefix: str = None) -> Iterator[BlobEntry]:
+        for name in self.list_blobs(bucket_name=bucket_name, prefix=prefix):
+            try:
+                stat = os.stat(self.path(bucket_name=bucket_name, blob_name=name))
+            except FileNotFoundError:
+                continue
+            yield BlobEntry(name=name, size=stat.st_size, generation=stat.st_mtime_ns)
+
+    def copy(
+        self,
+        source_bucket_name: str,
+        source_blob_name: str,
+        dest_bucket_name: str,
+        dest_blob_name: str,
+        if_source_generation_match: int = None,
+        if_generation_match: int = None,
+    ) -> None:
+        path = self._existing_path(
+            bucket_name=source_bucket_name, blob_name=source_blob_name
+        )
+        with open(path, "rb") as source:
+            if (
+                if_source_generation_match is not None
+                and os.fstat(source.fileno()).st_mtime_ns != if_source_generation_match
+            ):
+                raise precondition_failed(
+                    bucket_name=source_bucket_name, blob_name=source_blob_name
+                )
+            self._write(
+                write=lambda f: shutil.copyfileobj(source, f),
+                bucket_name=dest_bucket_name,
+                blob_name=dest_blob_name,
+                if_generation_match=if_generation_match,
+            )
+
+    def delete(
+        self, bucket_name: str, blob_name: str, if_generation_match: int = None
+    ) -> None:
+        path = self._existing_path(bucket_name=bucket_name, blob_name=blob_name)
+        if (
+            if_generation_match is not None
+            and self._generation(path) != if_generation_match
+        ):
+            raise precondition_failed(bucket_name=bucket_name, blob_name=blob_name)
+        os.remove(path)
+
+        # Folders do not exist on object storages: empty ones are removed
+        folder = os.path.dirname(path)
+        bucket_path = self.path(bucket_name=bucket_name)
+        while folder != bucket_path and len(os.listdir(folder)) == 0:
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
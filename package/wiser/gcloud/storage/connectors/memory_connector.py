@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from wiser.gcloud.storage.connectors.base_connector import (
+    BaseConnector,
+    BlobEntry,
+    ListedBlob,
+    group_listing,
+    not_found,
+    precondition_failed,
+)
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+
+
+class _MemoryBlob(NamedTuple):
+    data: bytes
+    generation: int
+    crc32c: str
+    updated: datetime
+    metadata: Optional[ObjectMetadata]
+
+
+class MemoryConnector(BaseConnector):
+    """
+    Backend keeping the blobs in the memory of the process, for tests and benchmarks
+    """
+
+    def __init__(self):
+        self._blobs: Dict[Tuple[str, str], _MemoryBlob] = {}
+        self._lock = threading.Lock()
+        self._last_generation = 0
+
+    def clear(self) -> None:
+        """
+        Deletes all the blobs
+
+        @return: None
+        """
+        with self._lock:
+            self._blobs.clear()
+
+    def _get(self, bucket_name: str, blob_name: str) -> _MemoryBlob:
+        blob = self._blobs.get((bucket_name, blob_name))
+        if blob is None:
+            raise not_found(bucket_name=bucket_name, blob_name=blob_name)
+        return blob
+
+    def _check(
+        self, bucket_name: str, blob_name: str, if_generation_match: Optional[int]
+    ) -> None:
+        if if_generation_match is None:
+            return
+        blob = self._blobs.get((bucket_name, blob_name))
+        generation = 0 if blob is None else blob.generation
+        if generation != if_generation_match:
+            raise precondition_failed(bucket_name=bucket_name, blob_name=blob_name)
+
+    def _put(
+        self,
+        data: bytes,
+        bucket_name: str,
+        blob_name: str,
+        if_generation_match: Optional[int],
+        metadata: Optional[ObjectMetadata] = None,
+    ) -> None:
+        from datetime import datetime, timezone
+
+        from wiser.gcloud.storage.utils import checksums
+
+        crc32c = checksums.crc32c(data)
+        with self._lock:
+            self._check(
+                bucket_name=bucket_name,
+                blob_name=blob_name,
+                if_generation_match=if_generation_match,
+            )
+            # Generations are increasing timestamps in microseconds, as on GCS
+            self._last_generation = max(
+                self._last_generation + 1, time.time_ns() // 1000
+            )
+            self._blobs[(bucket_name, blob_name)] = _MemoryBlob(
+                data=data,
+                generation=self._last_generation,
+                crc32c=crc32c,
+                updated=datetime.now(tz=timezone.utc),
+                metadata=metadata,
+            )
+
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._put(
+            data=bytes(data),
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            if_generation_match=if_generation_match,
+            metadata=metadata,
+        )
+
+    def upload_from_file(
+        self,
+        file_handle: Union[TextIO, BinaryIO],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        self.upload_from_string(
+            data=file_handle.read(),
+            bucket_name=bucket_name,
+            destination_blob_name=destination_blob_name,
+            if_generation_match=if_generation_match,
+            metadata=metadata,
+        )
+
+    def download_as_bytes(self, bucket_name: str, source_blob_name: str) -> bytes:
+        return self._get(bucket_name=bucket_name, blob_name=source_blob_name).data
+
+    def download_range(
+        self,
+        bucket_name: str,
+        source_blob_name: str,
+        start: int,
+        end: int,
+        generation: int = None,
+    ) -> bytes:
+        blob = self._get(bucket_name=bucket_name, blob_name=source_blob_name)
+        if generation is not None and blob.generation != generation:
+            raise not_found(bucket_name=bucket_name, blob_name=source_blob_name)
+        return blob.data[start : end + 1]
+
+    def get_size(self, bucket_name: str, source_blob_name: str) -> int:
+        return len(self._get(bucket_name=bucket_name, blob_name=source_blob_name).data)
+
+    def get_metadata(
+        self, bucket_name: str, source_blob_name: str
+    ) -> Optional[BlobMetadata]:
+        from wiser.gcloud.storage.types.metadata import BlobMetadata
+
+        blob = self._blobs.get((bucket_name, source_blob_name))
+        if blob is None:
+            return None
+        return BlobMetadata(
+            bucket=bucket_name,
+            name=source_blob_name,
+            size=len(blob.data),
+            generation=blob.generation,
+            crc32c=blob.crc32c,
+            updated=blob.updated,
+            content_type=blob.metadata and blob.metadata.content_type,
+            cache_control=blob.metadata and blob.metadata.cache_control,
+            storage_class=blob.metadata and blob.metadata.storage_class,
+            metadata=blob.metadata and blob.metadata.metadata,
+        )
+
+    def download_to_filename(
+        self, filename: str, bucket_name: str, source_blob_name: str
+    ) -> None:
+        data = self.download_as_bytes(
+            bucket_name=bucket_name, source_blob_name=source_blob_name
+        )
+        with open(filename, "wb") as f:
+            f.write(data)
+
+    def exists(self, bucket_name: str, source_blob_name: str) -> bool:
+        return (bucket_name, source_blob_name) in self._blobs
+
+    def list_blobs(
+        self, bucket_name: str, prefix: str = None, delimiter: str = None
+    ) -> List[str]:
+        prefix = prefix or ""
+        with self._lock:
+            names = [name for bucket, name in self._blobs if bucket == bucket_name]
+
+        return sorted(
+            name
+            for name in names
+            if name.startswith(prefix)
+            and not (delimiter and delimiter in name[len(prefix) :])
+        )
+
+    def scan(
+        self,
+        bucket_name: str,
+        prefix: str = None,
+        delimiter: str = None,
+        match_glob: str = None,
+    ) -> Iterator[ListedBlob]:
+        prefix = prefix or ""
+        with self._lock:
+            blobs = [
+                (name, len(blob.data))
+                for (bucket, name), blob in self._blobs.items()
+                if bucket == bucket_name and name.startswith(prefix)
+            ]
+        return group_listing(
+            blobs=sorted(blobs),
+            prefix=prefix,
+            delimiter=delimiter,
+            match_glob=match_glob,
+        )
+
+    def list_entries(self, bucket_name: str, prefix: str = None) -> Iterator[BlobEntry]:
+        prefix = prefix or ""
+        with self._lock:
+            entries = [
+                BlobEntry(name=name, size=len(blob.data), generation=blob.generation)
+                for (bucket, name), blob in self._blobs.items()
+                if bucket == bucket_name and name.startswith(prefix)
+            ]
+        return iter(sorted(entries))
+
+    def copy(
+        self,
+        source_bucket_name: str,
+        source_blob_name: str,
+        dest_bucket_name: str,
+        dest_blob_name: str,
+        if_source_generation_match: int = None,
+        if_generation_match: int = None,
+    ) -> None:
+        with self._lock:
+            # The metadata is copied with the content, as on GCS
+            source = self._get(
+                bucket_name=source_bucket_name, blob_name=source_blob_name
+            )
+            self._check(
+                bucket_name=source_bucket_name,
+                blob_name=source_blob_name,
+                if_generation_match=if_source_generation_match,
+            )
+        self._put(
+            data=source.data,
+            bucket_name=dest_bucket_name,
+            blob_name=dest_blob_name,
+            if_generation_match=if_generation_match,
+            metadata=source.metadata,
+        )
+
+    def delete(
+        self, bucket_name: str, blob_name: str, if_generation_match: int = None
+    ) -> None:
+        with self._lock:
+            self._get(bucket_name=bucket_name, blob_name=blob_name)
+            self._check(
+                bucket_name=bucket_name,
+                blob_name=blob_name,
+                if_generation_match=if_generation_match,
+            )
+            del self._blobs[(bucket_name, blob_name)]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Union
+
+from wiser.gcloud.storage.connectors.base_connector import BaseConnector
+from wiser.gcloud.storage.connectors.local_connector import LocalConnector
+from wiser.gcloud.storage.connectors.memory_connector import MemoryConnector
+from wiser.gcloud.storage.connectors.storage_connector import StorageConnector
+
+
+class ConnectorRegistry:
+    # The Google Cloud connector is registered as a class: its methods are static
+    _connectors: Dict[str, Union[BaseConnector, type]] = {
+        "gs://": StorageConnector,
+        "file://": LocalConnector(),
+        "mem://": MemoryConnector(),
+    }
+    _lock = threading.Lock()
+
+    @staticmethod
+    def register(prefix: str, connector: Union[BaseConnector, type]) -> None:
+        """
+        Registers the connector serving the locations with the given prefix, replacing
+        the previous one if any
+
+        @param prefix: the location prefix, e.g. 'mem://'
+        @param connector: the connector
+        @return: None
+        """
+        if not prefix.endswith("://"):
+            raise ValueError("The prefix must end with '://'")
+        with ConnectorRegistry._lock:
+            ConnectorRegistry._connectors[prefix] = connector
+
+    @staticmethod
+    def get(prefix: str) -> Union[BaseConnector, type]:
+        """
+        Returns the connector serving the locations with the given prefix
+
+        @param prefix: the location prefix, e.g. 'gs://'
+        @return: the connector
+        """
+        try:
+            return ConnectorRegistry._connectors[prefix]
+        except KeyError:
+            raise ValueError(
+                "No connector registered for prefix '{prefix}'".format(prefix=prefix)
+            )
+
+    @staticmethod
+    def prefixes() -> List[str]:
+        """
+        Returns the registered prefixes
+
+        @return: the list of prefixes
+        """
+        return list(ConnectorRegistry._connectors)
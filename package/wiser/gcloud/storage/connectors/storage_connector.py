@@ -1,44 +1,273 @@
-from typing import List
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Optional
 
-from google.cloud import storage
 from typing import TextIO, BinaryIO, Union
 
+from wiser.gcloud.storage.connectors.base_connector import (
+    BaseConnector,
+    BlobEntry,
+    ListedBlob,
+)
+from wiser.gcloud.storage.utils import profiling
+
+# The Google Cloud client is imported when the first client is built, so that
+# importing this module stays fast
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+
+
+class StorageConnector(BaseConnector):
+    # One client per process: clients hold pooled HTTP connections that must not be
+    # shared with a forked child
+    _client: storage.Client = None
+    _client_pid: int = None
+    _client_lock = threading.Lock()
+    _inherited_clients: List[storage.Client] = []
+    _warm_up_hooks: List[Callable[[storage.Client], None]] = []
+    # Whole-blob transfers failing their checksum are retried this many times
+    corruption_retries = 3
+    # Size of the chunks of the streamed uploads, a multiple of 256 KiB
+    writer_chunk_size = 8 * 1024 * 1024
+    # Number of URLs signed in parallel through the IAM API, one request each
+    signing_workers = 16
+
+    @staticmethod
+    def client() -> storage.Client:
+        """
+        Returns the client of the current process, building it on first use and after a fork
+
+        @return: the Google Cloud Storage client
+        """
+        if StorageConnector._client_pid != os.getpid():
+            with StorageConnector._client_lock:
+                if StorageConnector._client_pid != os.getpid():
+                    with profiling.phase(name=profiling.CLIENT):
+                        from google.cloud import storage
+
+                        client = storage.Client()
+                        for hook in StorageConnector._warm_up_hooks:
+                            hook(client)
+                    StorageConnector._client = client
+                    StorageConnector._client_pid = os.getpid()
+
+        return StorageConnector._client
+
+    @staticmethod
+    def reset() -> None:
+        """
+        Drops the client of the current process, a new one is built on next use
+
+        @return: None
+        """
+        with StorageConnector._client_lock:
+            StorageConnector._client = None
+            StorageConnector._client_pid = None
+
+    @staticmethod
+    def add_warm_up_hook(hook: Callable[[storage.Client], None]) -> None:
+        """
+        Registers a function invoked with every new client, e.g. once in each worker process
+
+        @param hook: a function receiving the new client
+        @return: None
+        """
+        StorageConnector._warm_up_hooks.append(hook)
+
+    @staticmethod
+    def worker_init(*args) -> None:
+        """
+        Builds the client of the current process and runs the warm-up hooks. It can be
+        used as `worker_init_fn` of a PyTorch DataLoader, as gunicorn `post_fork` hook
+        or as initializer of a process pool
+
+        @param args: ignored, accepted to match the signature of the callers
+        @return: None
+        """
+        StorageConnector.client()
+
+    @staticmethod
+    def _after_fork_in_child() -> None:
+        # The parent's lock may have been held while forking. Its client is kept
+        # referenced and never closed: its sockets are still in use by the parent
+        StorageConnector._client_lock = threading.Lock()
+        if StorageConnector._client is not None:
+            StorageConnector._inherited_clients.append(StorageConnector._client)
+        StorageConnector._client = None
+        StorageConnector._client_pid = None
+
+    @staticmethod
+    def _verified(
+        transfer: Callable[[], Any], rewind: Callable[[], None] = None
+    ) -> Any:
+        """
+        Runs a transfer whose checksum is verified by the client while streaming, and
+        runs it again if the checksum does not match. A corrupted upload is deleted by
+        the client before raising
+
+        @param transfer: the transfer
+        @param rewind: the function rewinding the source of an upload, None if it cannot be rewound
+        @return: the result of the transfer
+        """
+        try:
+            from google.cloud.storage.exceptions import DataCorruption
+        except ImportError:
+            from google.resumable_media.common import DataCorruption
+
+        attempt = 0
+        while True:
+            try:
+                return transfer()
+            except DataCorruption:
+                attempt += 1
+                if rewind is None or attempt > StorageConnector.corruption_retries:
+                    raise
+            rewind()
+
+    @staticmethod
+    def _verified_checksum(blob: storage.Blob) -> Optional[str]:
+        """
+        Returns the checksum verified by the last transfer of a blob, as the service
+        reported it with the transfer
+        """
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        return blob.crc32c if transfer_checksum() == "crc32c" else blob.md5_hash
+
+    @staticmethod
+    def _blob_with_metadata(
+        bucket_name: str, blob_name: str, metadata: Optional[ObjectMetadata]
+    ) -> storage.Blob:
+        """
+        Returns a blob whose properties are the object metadata, sent with its upload
+        """
+        blob = (
+            StorageConnector.client()
+            .bucket(bucket_name=bucket_name)
+            .blob(blob_name=blob_name)
+        )
+        if metadata is not None:
+            blob.content_type = metadata.content_type
+            blob.cache_control = metadata.cache_control
+            blob.content_disposition = metadata.content_disposition
+            blob.content_language = metadata.content_language
+            blob.storage_class = metadata.storage_class
+            blob.metadata = metadata.metadata
+        return blob
 
-class StorageConnector:
     @staticmethod
     def upload_from_string(
-        data: Union[bytes, str], bucket_name: str, destination_blob_name: str
-    ) -> None:
+        data: Union[bytes, str],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> Optional[str]:
         """
         Uploads data to the specified bucket with the specified blob name
 
         @param data: data to upload in bytes
         @param bucket_name: the destination bucket name
         @param destination_blob_name: the destination blob name
-        @return: None
+        @param if_generation_match: upload only if the current generation of the blob matches, 0 if it must not exist
+        @param metadata: the object metadata, e.g. the content type
+        @return: the verified checksum of the upload, base64-encoded: CRC32C, or MD5 if `transfer_checksum()` is 'md5'
         """
 
-        storage.Client().bucket(bucket_name=bucket_name).blob(
-            blob_name=destination_blob_name
-        ).upload_from_string(data=data)
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        blob = StorageConnector._blob_with_metadata(
+            bucket_name=bucket_name, blob_name=destination_blob_name, metadata=metadata
+        )
+        # Without a content type the client sends 'text/plain'
+        kwargs = {}
+        if blob.content_type is not None:
+            kwargs["content_type"] = blob.content_type
+        StorageConnector._verified(
+            transfer=lambda: blob.upload_from_string(
+                data=data,
+                if_generation_match=if_generation_match,
+                checksum=transfer_checksum(),
+                **kwargs,
+            ),
+            rewind=lambda: None,
+        )
+        return StorageConnector._verified_checksum(blob=blob)
 
     @staticmethod
     def upload_from_file(
         file_handle: Union[TextIO, BinaryIO],
         bucket_name: str,
         destination_blob_name: str,
-    ) -> None:
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> Optional[str]:
         """
         Uploads data from filename
 
         @param source_file_name: the source filename
         @param bucket_name: the destination bucket name
         @param destination_blob_name: the destination blob name
-        @return: None
+        @param if_generation_match: upload only if the current generation of the blob matches, 0 if it must not exist
+        @param metadata: the object metadata, e.g. the content type
+        @return: the verified checksum of the upload, base64-encoded: CRC32C, or MD5 if `transfer_checksum()` is 'md5'
         """
-        storage.Client().bucket(bucket_name=bucket_name).blob(
-            blob_name=destination_blob_name
-        ).upload_from_file(file_handle)
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        blob = StorageConnector._blob_with_metadata(
+            bucket_name=bucket_name, blob_name=destination_blob_name, metadata=metadata
+        )
+        rewind = None
+        if file_handle.seekable():
+            position = file_handle.tell()
+            rewind = lambda: file_handle.seek(position)
+        StorageConnector._verified(
+            transfer=lambda: blob.upload_from_file(
+                file_handle,
+                if_generation_match=if_generation_match,
+                checksum=transfer_checksum(),
+            ),
+            rewind=rewind,
+        )
+        return StorageConnector._verified_checksum(blob=blob)
+
+    @staticmethod
+    def open_writer(
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> BinaryIO:
+        """
+        Opens a binary file streamed to a blob with a resumable upload, by chunks of
+        `writer_chunk_size` bytes: the memory used does not depend on the size of the
+        content. Used as context manager, the upload is cancelled if the block raises
+
+        @param bucket_name: the destination bucket name
+        @param destination_blob_name: the destination blob name
+        @param if_generation_match: upload only if the current generation of the blob matches, 0 if it must not exist
+        @param metadata: the object metadata, e.g. the content type
+        @return: the file, to be closed
+        """
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        blob = StorageConnector._blob_with_metadata(
+            bucket_name=bucket_name, blob_name=destination_blob_name, metadata=metadata
+        )
+        kwargs = {}
+        if blob.content_type is not None:
+            kwargs["content_type"] = blob.content_type
+        return blob.open(
+            "wb",
+            chunk_size=StorageConnector.writer_chunk_size,
+            if_generation_match=if_generation_match,
+            checksum=transfer_checksum(),
+            **kwargs,
+        )
 
     @staticmethod
     def download_as_bytes(bucket_name: str, source_blob_name: str) -> bytes:
@@ -50,11 +279,93 @@ class StorageConnector:
         @return: the content of the blob as bytes
         """
 
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        blob = (
+            StorageConnector.client()
+            .bucket(bucket_name=bucket_name)
+            .blob(blob_name=source_blob_name)
+        )
+        return StorageConnector._verified(
+            transfer=lambda: blob.download_as_bytes(checksum=transfer_checksum()),
+            rewind=lambda: None,
+        )
+
+    @staticmethod
+    def download_range(
+        bucket_name: str,
+        source_blob_name: str,
+        start: int,
+        end: int,
+        generation: int = None,
+    ) -> bytes:
+        """
+        Returns a range of the content of a blob as bytes
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @param start: the first byte to download
+        @param end: the last byte to download (included)
+        @param generation: the generation of the blob to read, the live one if None
+        @return: the content of the range as bytes
+        """
+
         return (
-            storage.Client()
+            StorageConnector.client()
+            .bucket(bucket_name=bucket_name)
+            .blob(blob_name=source_blob_name, generation=generation)
+            .download_as_bytes(start=start, end=end)
+        )
+
+    @staticmethod
+    def get_size(bucket_name: str, source_blob_name: str) -> int:
+        """
+        Returns the size of a blob in bytes
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: the size of the blob in bytes
+        """
+
+        blob = (
+            StorageConnector.client()
             .bucket(bucket_name=bucket_name)
             .blob(blob_name=source_blob_name)
-            .download_as_bytes()
+        )
+        blob.reload()
+        return blob.size
+
+    @staticmethod
+    def get_metadata(bucket_name: str, source_blob_name: str) -> Optional[BlobMetadata]:
+        """
+        Returns the metadata of a blob
+
+        @param bucket_name: the source bucket name
+        @param source_blob_name: the source blob name
+        @return: the metadata of the blob, None if it does not exist
+        """
+        from wiser.gcloud.storage.types.metadata import BlobMetadata
+
+        blob = (
+            StorageConnector.client()
+            .bucket(bucket_name=bucket_name)
+            .get_blob(blob_name=source_blob_name)
+        )
+        if blob is None:
+            return None
+
+        return BlobMetadata(
+            bucket=bucket_name,
+            name=blob.name,
+            size=blob.size,
+            generation=blob.generation,
+            crc32c=blob.crc32c,
+            md5_hash=blob.md5_hash,
+            updated=blob.updated,
+            content_type=blob.content_type,
+            cache_control=blob.cache_control,
+            storage_class=blob.storage_class,
+            metadata=blob.metadata,
         )
 
     @staticmethod
@@ -74,22 +385,31 @@ class StorageConnector:
     @staticmethod
     def download_to_filename(
         filename: str, bucket_name: str, source_blob_name: str
-    ) -> None:
+    ) -> Optional[str]:
         """
         Returns the content of a blob to a filename
 
         @param filename: the name of the file
         @param bucket_name: the source bucket name
         @param source_blob_name: the source blob name
-        @return: the content of the blob as a string
+        @return: the verified checksum of the download, base64-encoded: CRC32C, or MD5 if `transfer_checksum()` is 'md5'
         """
 
-        (
-            storage.Client()
+        from wiser.gcloud.storage.utils.checksums import transfer_checksum
+
+        blob = (
+            StorageConnector.client()
             .bucket(bucket_name=bucket_name)
             .blob(blob_name=source_blob_name)
-            .download_to_filename(filename=filename)
         )
+        # The file is checked while written, a corrupted file is removed by the client
+        StorageConnector._verified(
+            transfer=lambda: blob.download_to_filename(
+                filename=filename, checksum=transfer_checksum()
+            ),
+            rewind=lambda: None,
+        )
+        return StorageConnector._verified_checksum(blob=blob)
 
     @staticmethod
     def exists(bucket_name: str, source_blob_name: str) -> bool:
@@ -102,7 +422,7 @@ class StorageConnector:
         """
 
         return (
-            storage.Client()
+            StorageConnector.client()
             .bucket(bucket_name=bucket_name)
             .blob(blob_name=source_blob_name)
             .exists()
@@ -113,17 +433,19 @@ class StorageConnector:
         bucket_name: str, prefix: str = None, delimiter: str = None
     ) -> List[str]:
         """
-        Returns the list of the blob names
+        Returns the list of the blob names, requesting only the names
 
         @param bucket_name: the source bucket name
         @param prefix: prefix to filter blobs
         @param delimiter: Delimiter, used with ``prefix`` to emulate hierarchy.
         @return: list of blob names that match the arguments
         """
+        from google.cloud import storage
 
-        client = storage.Client()
+        client = StorageConnector.client()
+        # The other properties of the blobs are not sent, nor parsed
         blobs = storage.Bucket(client=client, name=bucket_name).list_blobs(
-            prefix=prefix, delimiter=delimiter
+            prefix=prefix, delimiter=delimiter, fields="items(name),nextPageToken"
         )
 
         blobs_names = []
@@ -132,12 +454,134 @@ class StorageConnector:
 
         return blobs_names
 
+    @staticmethod
+    def scan(
+        bucket_name: str,
+        prefix: str = None,
+        delimiter: str = None,
+        match_glob: str = None,
+    ) -> Iterator[ListedBlob]:
+        """
+        Lists the blobs with their size, and the sub-prefixes if a delimiter is given,
+        page by page and requesting only the names and sizes. The glob pattern is
+        matched by the server
+
+        @param bucket_name: the source bucket name
+        @param prefix: prefix to filter blobs
+        @param delimiter: the delimiter of the sub-prefixes, e.g. '/'
+        @param match_glob: the glob pattern the blobs must match
+        @return: an iterator over the listed blobs and sub-prefixes
+        """
+        from google.cloud import storage
+
+        client = StorageConnector.client()
+        kwargs = {"match_glob": match_glob} if match_glob is not None else {}
+        blobs = storage.Bucket(client=client, name=bucket_name).list_blobs(
+            prefix=prefix,
+            delimiter=delimiter,
+            fields="items(name,size),prefixes,nextPageToken",
+            **kwargs,
+        )
+        for page in blobs.pages:
+            for blob in page:
+                yield ListedBlob(name=blob.name, size=blob.size)
+            for sub_prefix in sorted(page.prefixes):
+                yield ListedBlob(name=sub_prefix, size=None)
+
+    @staticmethod
+    def list_entries(bucket_name: str, prefix: str = None) -> Iterator[BlobEntry]:
+        """
+        Lists the blobs with their size and generation, page by page and requesting
+        only these fields
+
+        @param bucket_name: the source bucket name
+        @param prefix: prefix to filter blobs
+        @return: an iterator over the listed blobs, sorted by name
+        """
+        from google.cloud import storage
+
+        client = StorageConnector.client()
+        blobs = storage.Bucket(client=client, name=bucket_name).list_blobs(
+            prefix=prefix, fields="items(name,size,generation),nextPageToken"
+        )
+        for blob in blobs:
+            yield BlobEntry(name=blob.name, size=blob.size, generation=blob.generation)
+
+    @staticmethod
+    def generate_signed_urls(
+        bucket_name: str,
+        blob_names: List[str],
+        method: str = "GET",
+        expiration: int = 3600,
+        content_type: str = None,
+    ) -> List[str]:
+        """
+        Returns V4 signed URLs of blobs. With service account keys the URLs are signed
+        locally by the credentials of the client, which keep their signer, so no request
+        is sent per URL; other service account credentials, e.g. on Compute Engine, sign
+        each URL through the IAM API, `signing_workers` at a time. User credentials
+        cannot sign URLs
+
+        @param bucket_name: the bucket name
+        @param blob_names: the blob names
+        @param method: the HTTP method the URLs are signed for, e.g. 'GET' or 'PUT'
+        @param expiration: the validity of the URLs, in seconds
+        @param content_type: the content type the requests must send, for 'PUT' URLs
+        @return: the signed URLs, in the order of the blob names
+        """
+        from datetime import timedelta
+
+        from google.auth.credentials import Signing
+
+        client = StorageConnector.client()
+        credentials = client._credentials
+        signer = {}
+        if not isinstance(credentials, Signing):
+            if getattr(credentials, "service_account_email", None) is None:
+                raise ValueError(
+                    "{} credentials cannot sign URLs, a service account is "
+                    "needed".format(type(credentials).__name__)
+                )
+            if not credentials.valid:
+                from google.auth.transport.requests import Request
+
+                # Also resolves the email of the default service account
+                credentials.refresh(Request())
+            signer = dict(
+                service_account_email=credentials.service_account_email,
+                access_token=credentials.token,
+            )
+
+        bucket = client.bucket(bucket_name=bucket_name)
+
+        def sign(blob_name: str) -> str:
+            return bucket.blob(blob_name=blob_name).generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=expiration),
+                method=method,
+                content_type=content_type,
+                credentials=credentials,
+                **signer,
+            )
+
+        if not signer or len(blob_names) <= 1:
+            return [sign(blob_name) for blob_name in blob_names]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(
+            max_workers=min(StorageConnector.signing_workers, len(blob_names))
+        ) as executor:
+            return list(executor.map(sign, blob_names))
+
     @staticmethod
     def copy(
         source_bucket_name: str,
         source_blob_name: str,
         dest_bucket_name: str,
         dest_blob_name: str,
+        if_source_generation_match: int = None,
+        if_generation_match: int = None,
     ) -> None:
         """
         Copies a blob to another location
@@ -146,30 +590,43 @@ class StorageConnector:
         @param source_blob_name:  the source blob name
         @param dest_bucket_name: the destination bucket name
         @param dest_blob_name: the destination blob name
+        @param if_source_generation_match: copy only if the generation of the source blob matches
+        @param if_generation_match: copy only if the generation of the destination blob matches, 0 if it must not exist
         @return: None
         """
-        client = storage.Client()
+        client = StorageConnector.client()
         source_bucket = client.bucket(bucket_name=source_bucket_name)
         source_blob = source_bucket.blob(blob_name=source_blob_name)
 
         dest_bucket = client.bucket(bucket_name=dest_bucket_name)
 
         return source_bucket.copy_blob(
-            blob=source_blob, destination_bucket=dest_bucket, new_name=dest_blob_name
+            blob=source_blob,
+            destination_bucket=dest_bucket,
+            new_name=dest_blob_name,
+            if_source_generation_match=if_source_generation_match,
+            if_generation_match=if_generation_match,
         )
 
     @staticmethod
-    def delete(bucket_name: str, blob_name: str) -> None:
+    def delete(
+        bucket_name: str, blob_name: str, if_generation_match: int = None
+    ) -> None:
         """
         Deletes a blob
 
         @param bucket_name: the source bucket name
         @param blob_name: the source blob name
+        @param if_generation_match: delete only if the generation of the blob matches
         @return: None
         """
         return (
-            storage.Client()
+            StorageConnector.client()
             .bucket(bucket_name=bucket_name)
             .blob(blob_name=blob_name)
-            .delete()
+            .delete(if_generation_match=if_generation_match)
         )
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=StorageConnector._after_fork_in_child)
@@ -0,0 +1,398 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from wiser.gcloud.storage.connectors.base_connector import (
+    BaseConnector,
+    BlobEntry,
+    ListedBlob,
+)
+from wiser.gcloud.storage.utils.rate_limit import (
+    AdaptiveConcurrencyLimiter,
+    TokenBucket,
+)
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+
+T = TypeVar("T")
+
+# Token buckets kept per connector, the least recently used ones are dropped beyond it
+MAX_TOKEN_BUCKETS = 10000
+# Items of a page of the listings of Google Cloud Storage: each page is a request
+LISTING_PAGE_SIZE = 1000
+
+
+class ThrottledConnector(BaseConnector):
+    """
+    Backend wrapping another connector with client-side flow control: an adaptive
+    limit on the calls in flight, shared by all the calls, and token buckets per
+    bucket and per prefix. Throttling responses (429 and 503) lower the limits and
+    the call is retried with exponential backoff and jitter; successful calls let
+    the limits grow back.
+    """
+
+    def __init__(
+        self,
+        inner: Union[BaseConnector, type],
+        limiter: AdaptiveConcurrencyLimiter = None,
+        bucket_rate: float = None,
+        prefix_rate: float = None,
+        prefix_depth: int = 1,
+        max_retries: int = 6,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 32.0,
+    ):
+        """
+        @param inner: the wrapped connector, e.g. StorageConnector
+        @param limiter: the limiter of the calls in flight, default a new one
+        @param bucket_rate: the maximum calls per second on each bucket, None for no limit
+        @param prefix_rate: the maximum calls per second on each prefix, None for no limit
+        @param prefix_depth: the number of folders of the blob name forming its prefix
+        @param max_retries: the maximum number of retries of a throttled call
+        @param initial_backoff: the wait before the first retry, in seconds
+        @param max_backoff: the maximum wait before a retry, in seconds
+        """
+        self.inner = inner
+        self.limiter = limiter if limiter is not None else AdaptiveConcurrencyLimiter()
+        self.bucket_rate = bucket_rate
+        self.prefix_rate = prefix_rate
+        self.prefix_depth = prefix_depth
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._buckets: OrderedDict[Tuple[str, Optional[str]], TokenBucket] = (
+            OrderedDict()
+        )
+        self._buckets_lock = threading.Lock()
+
+    def _token_buckets(self, bucket_name: str, blob_name: str) -> List[TokenBucket]:
+        keys = []
+        if self.bucket_rate is not None:
+            keys.append(((bucket_name, None), self.bucket_rate))
+        if self.prefix_rate is not None:
+            # Only the folders form the prefix, never the name of the blob itself
+            folders = blob_name.split("/")[:-1]
+            prefix = "/".join(folders[: self.prefix_depth])
+            keys.append(((bucket_name, prefix), self.prefix_rate))
+
+        token_buckets = []
+        with self._buckets_lock:
+            for key, rate in keys:
+                token_bucket = self._buckets.get(key)
+                if token_bucket is None:
+                    token_bucket = self._buckets[key] = TokenBucket(rate=rate)
+                    if len(self._buckets) > MAX_TOKEN_BUCKETS:
+                        self._buckets.popitem(last=False)
+                else:
+                    self._buckets.move_to_end(key)
+                token_buckets.append(token_bucket)
+        return token_buckets
+
+    def _call(
+        self,
+        bucket_name: str,
+        blob_name: str,
+        fn: Callable[[], T],
+        rewind: Callable[[], None] = None,
+    ) -> T:
+        from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+        token_buckets = self._token_buckets(
+            bucket_name=bucket_name, blob_name=blob_name or ""
+        )
+        attempt = 0
+        while True:
+            for token_bucket in token_buckets:
+                token_bucket.acquire()
+            self.limiter.acquire()
+            try:
+                result = fn()
+            except (TooManyRequests, ServiceUnavailable):
+                self.limiter.release(throttled=True)
+                for token_bucket in token_buckets:
+                    token_bucket.decrease()
+                if attempt >= self.max_retries:
+                    raise
+            except BaseException:
+                self.limiter.release()
+                raise
+            else:
+                self.limiter.release()
+                for token_bucket in token_buckets:
+                    token_bucket.increase()
+                return result
+
+            # Full jitter spreads the retries of the throttled callers
+            time.sleep(
+                random.uniform(
+                    0, min(self.max_backoff, self.initial_backoff * 2**attempt)
+                )
+            )
+            attempt += 1
+            if rewind is not None:
+                rewind()
+
+    def _listing(
+        self,
+        bucket_name: str,
+        prefix: Optional[str],
+        open_listing: Callable[[], Iterator[T]],
+    ) -> Iterator[T]:
+        """
+        Iterates over a listing with each page fetched under flow control. A listing
+        broken by an error cannot be resumed: it is opened again and the items already
+        returned are skipped.
+        """
+        from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+        end = object()
+        state = {"listing": None, "returned": 0}
+
+        def fetch():
+            try:
+                if state["listing"] is None:
+                    listing = open_listing()
+                    for _ in range(state["returned"]):
+                        next(listing)
+                    state["listing"] = listing
+                return next(state["listing"], end)
+            except BaseException:
+                state["listing"] = None
+                raise
+
+        while True:
+            # The items are not tied to their pages: the calls expected to fetch a page
+            # are the controlled ones, the others are retried under control if throttled
+            if state["returned"] % LISTING_PAGE_SIZE == 0:
+                item = self._call(bucket_name=bucket_name, blob_name=prefix, fn=fetch)
+            else:
+                try:
+                    item = fetch()
+                except (TooManyRequests, ServiceUnavailable):
+                    item = self._call(
+                        bucket_name=bucket_name, blob_name=prefix, fn=fetch
+                    )
+            if item is end:
+                return
+            state["returned"] += 1
+            yield item
+
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            fn=lambda: self.inner.upload_from_string(
+                data=data,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
+            ),
+        )
+
+    def upload_from_file(
+        self,
+        file_handle: Union[TextIO, BinaryIO],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        # A retried upload reads the file again from the same position
+        start = file_handle.tell()
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            fn=lambda: self.inner.upload_from_file(
+                file_handle=file_handle,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
+            ),
+            rewind=lambda: file_handle.seek(start),
+        )
+
+    def download_as_bytes(self, bucket_name: str, source_blob_name: str) -> bytes:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            fn=lambda: self.inner.download_as_bytes(
+                bucket_name=bucket_name, source_blob_name=source_blob_name
+            ),
+        )
+
+    def download_range(
+        self,
+        bucket_name: str,
+        source_blob_name: str,
+        start: int,
+        end: int,
+        generation: int = None,
+    ) -> bytes:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            fn=lambda: self.inner.download_range(
+                bucket_name=bucket_name,
+                source_blob_name=source_blob_name,
+                start=start,
+                end=end,
+                generation=generation,
+            ),
+        )
+
+    def get_size(self, bucket_name: str, source_blob_name: str) -> int:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            fn=lambda: self.inner.get_size(
+                bucket_name=bucket_name, source_blob_name=source_blob_name
+            ),
+        )
+
+    def get_metadata(
+        self, bucket_name: str, source_blob_name: str
+    ) -> Optional[BlobMetadata]:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            fn=lambda: self.inner.get_metadata(
+                bucket_name=bucket_name, source_blob_name=source_blob_name
+            ),
+        )
+
+    def download_to_filename(
+        self, filename: str, bucket_name: str, source_blob_name: str
+    ) -> None:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            fn=lambda: self.inner.download_to_filename(
+                filename=filename,
+                bucket_name=bucket_name,
+                source_blob_name=source_blob_name,
+            ),
+        )
+
+    def exists(self, bucket_name: str, source_blob_name: str) -> bool:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            fn=lambda: self.inner.exists(
+                bucket_name=bucket_name, source_blob_name=source_blob_name
+            ),
+        )
+
+    def list_blobs(
+        self, bucket_name: str, prefix: str = None, delimiter: str = None
+    ) -> List[str]:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=prefix,
+            fn=lambda: self.inner.list_blobs(
+                bucket_name=bucket_name, prefix=prefix, delimiter=delimiter
+            ),
+        )
+
+    def scan(
+        self,
+        bucket_name: str,
+        prefix: str = None,
+        delimiter: str = None,
+        match_glob: str = None,
+    ) -> Iterator[ListedBlob]:
+        return self._listing(
+            bucket_name=bucket_name,
+            prefix=prefix,
+            open_listing=lambda: self.inner.scan(
+                bucket_name=bucket_name,
+                prefix=prefix,
+                delimiter=delimiter,
+                match_glob=match_glob,
+            ),
+        )
+
+    def list_entries(self, bucket_name: str, prefix: str = None) -> Iterator[BlobEntry]:
+        return self._listing(
+            bucket_name=bucket_name,
+            prefix=prefix,
+            open_listing=lambda: self.inner.list_entries(
+                bucket_name=bucket_name, prefix=prefix
+            ),
+        )
+
+    def generate_signed_urls(
+        self,
+        bucket_name: str,
+        blob_names: List[str],
+        method: str = "GET",
+        expiration: int = 3600,
+        content_type: str = None,
+    ) -> List[str]:
+        # Signing sends no request to the bucket
+        return self.inner.generate_signed_urls(
+            bucket_name=bucket_name,
+            blob_names=blob_names,
+            method=method,
+            expiration=expiration,
+            content_type=content_type,
+        )
+
+    def copy(
+        self,
+        source_bucket_name: str,
+        source_blob_name: str,
+        dest_bucket_name: str,
+        dest_blob_name: str,
+        if_source_generation_match: int = None,
+        if_generation_match: int = None,
+    ) -> None:
+        return self._call(
+            bucket_name=dest_bucket_name,
+            blob_name=dest_blob_name,
+            fn=lambda: self.inner.copy(
+                source_bucket_name=source_bucket_name,
+                source_blob_name=source_blob_name,
+                dest_bucket_name=dest_bucket_name,
+                dest_blob_name=dest_blob_name,
+                if_source_generation_match=if_source_generation_match,
+                if_generation_match=if_generation_match,
+            ),
+        )
+
+    def delete(
+        self, bucket_name: str, blob_name: str, if_generation_match: int = None
+    ) -> None:
+        return self._call(
+            bucket_name=bucket_name,
+            blob_name=blob_name,
+            fn=lambda: self.inner.delete(
+                bucket_name=bucket_name,
+                blob_name=blob_name,
+                if_generation_match=if_generation_match,
+            ),
+        )
@@ -0,0 +1,728 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from wiser.gcloud.storage.connectors.base_connector import (
+    BaseConnector,
+    BlobEntry,
+    ListedBlob,
+)
+from wiser.gcloud.storage.connectors.local_connector import LocalConnector
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+
+# Number of locks serializing the operations on the same blob
+_LOCK_STRIPES = 64
+
+
+class TieredConnector(BaseConnector):
+    """
+    Backend serving reads from a local folder, e.g. on a local SSD, in front of a
+    remote connector. A read missing the local tier is served by the remote one and
+    the local copy is filled in background.
+
+    With write-back, writes are acknowledged once written locally and uploaded in
+    background. Each pending upload is recorded by a marker file written once the
+    local copy is on disk, so the uploads interrupted by a crash are resumed when a
+    connector is built on the same folder, and never send an older local copy. Writes with generation preconditions, deletes and
+    copies are always executed on the remote tier, after the pending upload of the
+    involved blobs; metadata and generations are the remote ones.
+
+    Local copies are evicted when older than `max_age`, and by least recent access
+    when the local tier exceeds `max_bytes`. Blobs pending upload are never evicted.
+    """
+
+    def __init__(
+        self,
+        remote: Union[BaseConnector, type],
+        cache_dir: str,
+        write_back: bool = True,
+        max_bytes: int = None,
+        max_age: float = None,
+        max_workers: int = 4,
+    ):
+        """
+        @param remote: the connector of the remote tier, e.g. StorageConnector
+        @param cache_dir: the folder of the local tier
+        @param write_back: True to upload writes in background, False to write through
+        @param max_bytes: the maximum size of the local tier, None for no limit
+        @param max_age: the maximum age of local copies in seconds, None for no limit
+        @param max_workers: the number of threads filling the local tier and uploading
+        """
+        self.remote = remote
+        self.write_back = write_back
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_workers = max_workers
+
+        self._local = LocalConnector(root=os.path.join(cache_dir, "objects"))
+        self._pending_dir = os.path.join(cache_dir, "pending")
+        os.makedirs(self._local.root, exist_ok=True)
+        os.makedirs(self._pending_dir, exist_ok=True)
+
+        self._locks = [threading.RLock() for _ in range(_LOCK_STRIPES)]
+        # Uploads hold their own locks, so that reads and writes never wait on the network
+        self._upload_locks = [threading.RLock() for _ in range(_LOCK_STRIPES)]
+        # Writes and deletes bump the epoch of a blob, cancelling the fills started before
+        self._epochs: Dict[Tuple[str, str], int] = {}
+        self._futures: Set[Future] = set()
+        self._futures_lock = threading.Lock()
+        self._executor_pool: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._evicting = threading.Lock()
+        self._bytes_lock = threading.Lock()
+        self._local_bytes = sum(size for _, _, size, _ in self._local_files())
+
+        # Recovering the uploads interrupted by a crash
+        for bucket_name, blob_name, token in self._pending():
+            self._submit(self._upload, bucket_name, blob_name, token)
+
+    # Background tasks ##################################################################
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork: a child process builds its own pool
+        if self._executor_pid != os.getpid():
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._executor_pid = os.getpid()
+            self._futures = set()
+        return self._executor_pool
+
+    def _submit(self, fn, *args) -> None:
+        future = self._executor().submit(fn, *args)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard_future)
+
+    def _discard_future(self, future: Future) -> None:
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def flush(self) -> None:
+        """
+        Waits for the background fills and uploads, then uploads the writes still
+        pending because their background upload failed, raising on failure
+
+        @return: None
+        """
+        from concurrent.futures import wait
+
+        with self._futures_lock:
+            futures = list(self._futures)
+        # Fills are best effort and failed uploads are retried below
+        wait(futures)
+
+        for bucket_name, blob_name, _ in self._pending():
+            self._settle(bucket_name=bucket_name, blob_name=blob_name)
+
+    def close(self) -> None:
+        """
+        Flushes the pending writes and stops the background threads
+
+        @return: None
+        """
+        self.flush()
+        if self._executor_pool is not None and self._executor_pid == os.getpid():
+            self._executor_pool.shutdown(wait=True)
+        self._executor_pool = None
+        self._executor_pid = None
+
+    # Local tier ########################################################################
+
+    def _lock(self, bucket_name: str, blob_name: str) -> threading.RLock:
+        return self._locks[hash((bucket_name, blob_name)) % _LOCK_STRIPES]
+
+    @contextmanager
+    def _exclusive(self, bucket_name: str, blob_name: str) -> Iterator[None]:
+        """
+        Holds the upload lock, then the lock of a blob, for the operations settling its
+        pending write before changing the remote tier. The upload lock is always taken
+        first, so that an upload never waits on a blob lock held by such an operation.
+        """
+        stripe = hash((bucket_name, blob_name)) % _LOCK_STRIPES
+        with self._upload_locks[stripe], self._locks[stripe]:
+            yield
+
+    def _bump_epoch(self, bucket_name: str, blob_name: str) -> None:
+        key = (bucket_name, blob_name)
+        self._epochs[key] = self._epochs.get(key, 0) + 1
+
+    def _local_path(self, bucket_name: str, blob_name: str) -> Optional[str]:
+        """
+        Returns the path of the local copy of a blob, None if missing or expired
+        """
+        path = self._local.path(bucket_name=bucket_name, blob_name=blob_name)
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        if self._expired(mtime_ns=stat.st_mtime_ns) and not self._is_pending(
+            bucket_name=bucket_name, blob_name=blob_name
+        ):
+            self._evict(bucket_name=bucket_name, blob_name=blob_name)
+            return None
+
+        # The access time orders the eviction, the modification time gives the age
+        os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        return path
+
+    def _expired(self, mtime_ns: int) -> bool:
+        return (
+            self.max_age is not None and time.time_ns() - mtime_ns > self.max_age * 1e9
+        )
+
+    def _local_files(self) -> Iterator[Tuple[str, str, int, os.stat_result]]:
+        """
+        Yields bucket, blob name, size and stat of the local copies
+        """
+        for bucket_name in os.listdir(self._local.root):
+            for blob_name in self._local.list_blobs(bucket_name=bucket_name):
+                path = self._local.path(bucket_name=bucket_name, blob_name=blob_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield bucket_name, blob_name, stat.st_size, stat
+
+    def _fill(
+        self, bucket_name: str, blob_name: str, epoch: int, data: bytes = None
+    ) -> None:
+        """
+        Writes the local copy of a blob read from the remote tier, unless the blob
+        was written or deleted since the read
+        """
+        if data is None:
+            data = self.remote.download_as_bytes(
+                bucket_name=bucket_name, source_blob_name=blob_name
+            )
+
+        with self._lock(bucket_name=bucket_name, blob_name=blob_name):
+            if self._epochs.get((bucket_name, blob_name), 0) != epoch:
+                return
+            if self._local.exists(bucket_name=bucket_name, source_blob_name=blob_name):
+                return
+            self._local.upload_from_string(
+                data=data, bucket_name=bucket_name, destination_blob_name=blob_name
+            )
+        self._added(size=len(data))
+
+    def _epoch(self, bucket_name: str, blob_name: str) -> int:
+        return self._epochs.get((bucket_name, blob_name), 0)
+
+    def _start_fill(
+        self, bucket_name: str, blob_name: str, epoch: int, data: bytes = None
+    ) -> None:
+        """
+        Fills the local copy of a blob in background, from data read from the remote
+        tier at the given epoch, read before the data so that a write or a delete
+        during the read cancels the fill
+        """
+        self._submit(self._fill, bucket_name, blob_name, epoch, data)
+
+    def _added(self, size: int) -> None:
+        with self._bytes_lock:
+            self._local_bytes += size
+            local_bytes = self._local_bytes
+        if (
+            self.max_bytes is not None
+            and local_bytes > self.max_bytes
+            and not self._evicting.locked()
+        ):
+            self._submit(self.evict)
+
+    def _evict(self, bucket_name: str, blob_name: str) -> int:
+        from google.api_core.exceptions import NotFound
+
+        with self._lock(bucket_name=bucket_name, blob_name=blob_name):
+            if self._is_pending(bucket_name=bucket_name, blob_name=blob_name):
+                return 0
+            try:
+                size = self._local.get_size(
+                    bucket_name=bucket_name, source_blob_name=blob_name
+                )
+                self._local.delete(bucket_name=bucket_name, blob_name=blob_name)
+            except NotFound:
+                # Evicted concurrently
+                return 0
+        with self._bytes_lock:
+            self._local_bytes -= size
+        return size
+
+    def evict(self) -> int:
+        """
+        Removes the expired local copies, then the least recently accessed ones until
+        the local tier fits `max_bytes`
+
+        @return: the number of bytes freed
+        """
+        with self._evicting:
+            files = sorted(self._local_files(), key=lambda file: file[3].st_atime_ns)
+            with self._bytes_lock:
+                self._local_bytes = sum(size for _, _, size, _ in files)
+
+            freed = 0
+            for bucket_name, blob_name, _, stat in files:
+                if self._expired(mtime_ns=stat.st_mtime_ns):
+                    freed += self._evict(bucket_name=bucket_name, blob_name=blob_name)
+
+            if self.max_bytes is not None:
+                for bucket_name, blob_name, _, _ in files:
+                    if self._local_bytes <= self.max_bytes:
+                        break
+                    freed += self._evict(bucket_name=bucket_name, blob_name=blob_name)
+
+            return freed
+
+    # Pending uploads ###################################################################
+
+    def _marker_path(self, bucket_name: str, blob_name: str) -> str:
+        import hashlib
+
+        key = "{}/{}".format(bucket_name, blob_name).encode("utf-8")
+        return os.path.join(self._pending_dir, hashlib.sha1(key).hexdigest() + ".json")
+
+    def _read_marker(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _is_pending(self, bucket_name: str, blob_name: str) -> bool:
+        return os.path.exists(
+            self._marker_path(bucket_name=bucket_name, blob_name=blob_name)
+        )
+
+    def _pending(self) -> List[Tuple[str, str, str]]:
+        """
+        Returns bucket, blob name and token of the pending uploads
+        """
+        pending = []
+        for filename in os.listdir(self._pending_dir):
+            if not filename.endswith(".json"):
+                continue
+            marker = self._read_marker(os.path.join(self._pending_dir, filename))
+            if marker is not None:
+                pending.append((marker["bucket"], marker["blob"], marker["token"]))
+        return pending
+
+    def _write_marker(
+        self, bucket_name: str, blob_name: str, metadata: Optional[ObjectMetadata]
+    ) -> str:
+        """
+        Durably records a pending upload, with the object metadata to upload, and
+        returns its token
+        """
+        token = os.urandom(16).hex()
+        path = self._marker_path(bucket_name=bucket_name, blob_name=blob_name)
+        tmp_path = path + "." + token + ".tmp"
+        marker = {"bucket": bucket_name, "blob": blob_name, "token": token}
+        if metadata is not None:
+            marker["metadata"] = metadata.dict(exclude_none=True)
+        with open(tmp_path, "w") as f:
+            json.dump(marker, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return token
+
+    def _upload(self, bucket_name: str, blob_name: str, token: str = None) -> None:
+        """
+        Uploads a pending write. With a token, the upload is skipped if a more recent
+        write replaced the marker: the upload of that write sends the latest content.
+
+        The local copy is opened under the blob lock, which keeps its content even if a
+        write replaces it, and uploaded outside of it: only the uploads of a blob are
+        serialized, so that they reach the remote tier in order.
+        """
+        with self._upload_locks[hash((bucket_name, blob_name)) % _LOCK_STRIPES]:
+            marker_path = self._marker_path(
+                bucket_name=bucket_name, blob_name=blob_name
+            )
+            with self._lock(bucket_name=bucket_name, blob_name=blob_name):
+                marker = self._read_marker(marker_path)
+                if marker is None or (token is not None and marker["token"] != token):
+                    return
+
+                path = self._local.path(bucket_name=bucket_name, blob_name=blob_name)
+                try:
+                    file_handle = open(path, "rb")
+                except FileNotFoundError:
+                    # The local copy was removed behind the connector: nothing to upload
+                    os.remove(marker_path)
+                    return
+
+            metadata = None
+            if "metadata" in marker:
+                from wiser.gcloud.storage.types.metadata import ObjectMetadata
+
+                metadata = ObjectMetadata(**marker["metadata"])
+            with file_handle:
+                self.remote.upload_from_file(
+                    file_handle=file_handle,
+                    bucket_name=bucket_name,
+                    destination_blob_name=blob_name,
+                    metadata=metadata,
+                )
+
+            with self._lock(bucket_name=bucket_name, blob_name=blob_name):
+                # A write during the upload left its own marker, to upload next
+                current = self._read_marker(marker_path)
+                if current is not None and current["token"] == marker["token"]:
+                    os.remove(marker_path)
+
+    def _settle(self, bucket_name: str, blob_name: str) -> None:
+        """
+        Uploads the pending write of a blob, if any, so that the remote tier is up to date
+        """
+        if self._is_pending(bucket_name=bucket_name, blob_name=blob_name):
+            self._upload(bucket_name=bucket_name, blob_name=blob_name)
+
+    def _write(
+        self,
+        bucket_name: str,
+        blob_name: str,
+        if_generation_match: Optional[int],
+        metadata: Optional[ObjectMetadata],
+        write_local,
+        write_remote,
+    ) -> None:
+        write_back = self.write_back and if_generation_match is None
+        lock = self._lock if write_back else self._exclusive
+        with lock(bucket_name=bucket_name, blob_name=blob_name):
+            self._bump_epoch(bucket_name=bucket_name, blob_name=blob_name)
+
+            if write_back:
+                # The local copy is renamed into place and synced before the marker
+                # points to it
+                write_local()
+                path = self._local.path(bucket_name=bucket_name, blob_name=blob_name)
+                with open(path, "rb") as f:
+                    os.fsync(f.fileno())
+                token = self._write_marker(
+                    bucket_name=bucket_name, blob_name=blob_name, metadata=metadata
+                )
+                self._submit(self._upload, bucket_name, blob_name, token)
+            else:
+                # Preconditions are checked by the remote tier, synchronously
+                self._settle(bucket_name=bucket_name, blob_name=blob_name)
+                write_remote()
+                write_local()
+
+        self._added(
+            size=self._local.get_size(
+                bucket_name=bucket_name, source_blob_name=blob_name
+            )
+        )
+
+    # Connector interface ###############################################################
+
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        self._write(
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            if_generation_match=if_generation_match,
+            metadata=metadata,
+            write_local=lambda: self._local.upload_from_string(
+                data=data,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+            ),
+            write_remote=lambda: self.remote.upload_from_string(
+                data=data,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
+            ),
+        )
+
+    def upload_from_file(
+        self,
+        file_handle: Union[TextIO, BinaryIO],
+        bucket_name: str,
+        destination_blob_name: str,
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        def write_remote():
+            # The local copy is then written from the remote content
+            start = file_handle.tell()
+            self.remote.upload_from_file(
+                file_handle=file_handle,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
+            )
+            file_handle.seek(start)
+
+        self._write(
+            bucket_name=bucket_name,
+            blob_name=destination_blob_name,
+            if_generation_match=if_generation_match,
+            metadata=metadata,
+            write_local=lambda: self._local.upload_from_file(
+                file_handle=file_handle,
+                bucket_name=bucket_name,
+                destination_blob_name=destination_blob_name,
+            ),
+            write_remote=write_remote,
+        )
+
+    def download_as_bytes(self, bucket_name: str, source_blob_name: str) -> bytes:
+        from google.api_core.exceptions import NotFound
+
+        if self._local_path(bucket_name=bucket_name, blob_name=source_blob_name):
+            try:
+                return self._local.download_as_bytes(
+                    bucket_name=bucket_name, source_blob_name=source_blob_name
+                )
+            except NotFound:
+                # Evicted concurrently
+                pass
+
+        epoch = self._epoch(bucket_name=bucket_name, blob_name=source_blob_name)
+        data = self.remote.download_as_bytes(
+            bucket_name=bucket_name, source_blob_name=source_blob_name
+        )
+        self._start_fill(
+            bucket_name=bucket_name, blob_name=source_blob_name, epoch=epoch, data=data
+        )
+        return data
+
+    def download_range(
+        self,
+        bucket_name: str,
+        source_blob_name: str,
+        start: int,
+        end: int,
+        generation: int = None,
+    ) -> bytes:
+        from google.api_core.exceptions import NotFound
+
+        # Generations are the remote ones: pinned reads are served by the remote tier
+        if generation is None and self._local_path(
+            bucket_name=bucket_name, blob_name=source_blob_name
+        ):
+            try:
+                return self._local.download_range(
+                    bucket_name=bucket_name,
+                    source_blob_name=source_blob_name,
+                    start=start,
+                    end=end,
+                )
+            except NotFound:
+                pass
+
+        data = self.remote.download_range(
+            bucket_name=bucket_name,
+            source_blob_name=source_blob_name,
+            start=start,
+            end=end,
+            generation=generation,
+        )
+        # The whole blob is filled, so that the next ranges are served locally
+        self._start_fill(
+            bucket_name=bucket_name,
+            blob_name=source_blob_name,
+            epoch=self._epoch(bucket_name=bucket_name, blob_name=source_blob_name),
+        )
+        return data
+
+    def get_size(self, bucket_name: str, source_blob_name: str) -> int:
+        path = self._local_path(bucket_name=bucket_name, blob_name=source_blob_name)
+        if path is not None:
+            try:
+                return os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return self.remote.get_size(
+            bucket_name=bucket_name, source_blob_name=source_blob_name
+        )
+
+    def get_metadata(
+        self, bucket_name: str, source_blob_name: str
+    ) -> Optional[BlobMetadata]:
+        self._settle(bucket_name=bucket_name, blob_name=source_blob_name)
+        return self.remote.get_metadata(
+            bucket_name=bucket_name, source_blob_name=source_blob_name
+        )
+
+    def download_to_filename(
+        self, filename: str, bucket_name: str, source_blob_name: str
+    ) -> None:
+        from google.api_core.exceptions import NotFound
+
+        if self._local_path(bucket_name=bucket_name, blob_name=source_blob_name):
+            try:
+                return self._local.download_to_filename(
+                    filename=filename,
+                    bucket_name=bucket_name,
+                    source_blob_name=source_blob_name,
+                )
+            except NotFound:
+                pass
+
+        epoch = self._epoch(bucket_name=bucket_name, blob_name=source_blob_name)
+        self.remote.download_to_filename(
+            filename=filename,
+            bucket_name=bucket_name,
+            source_blob_name=source_blob_name,
+        )
+        with open(filename, "rb") as f:
+            data = f.read()
+        self._start_fill(
+            bucket_name=bucket_name, blob_name=source_blob_name, epoch=epoch, data=data
+        )
+
+    def exists(self, bucket_name: str, source_blob_name: str) -> bool:
+        if self._local_path(bucket_name=bucket_name, blob_name=source_blob_name):
+            return True
+        return self.remote.exists(
+            bucket_name=bucket_name, source_blob_name=source_blob_name
+        )
+
+    def list_blobs(
+        self, bucket_name: str, prefix: str = None, delimiter: str = None
+    ) -> List[str]:
+        # The pending writes are not on the remote tier yet. They are read before the
+        # listing: a write uploaded meanwhile is then listed by the remote tier
+        pending = self._pending()
+        names = set(
+            self.remote.list_blobs(
+                bucket_name=bucket_name, prefix=prefix, delimiter=delimiter
+            )
+        )
+        prefix = prefix or ""
+        for pending_bucket, blob_name, _ in pending:
+            if pending_bucket != bucket_name or not blob_name.startswith(prefix):
+                continue
+            if delimiter and delimiter in blob_name[len(prefix) :]:
+                continue
+            names.add(blob_name)
+        return sorted(names)
+
+    def scan(
+        self,
+        bucket_name: str,
+        prefix: str = None,
+        delimiter: str = None,
+        match_glob: str = None,
+    ) -> Iterator[ListedBlob]:
+        pending = any(
+            pending_bucket == bucket_name and blob_name.startswith(prefix or "")
+            for pending_bucket, blob_name, _ in self._pending()
+        )
+        if pending:
+            # The pending writes are merged by list_blobs(), the sizes asked one by one
+            return super().scan(
+                bucket_name=bucket_name,
+                prefix=prefix,
+                delimiter=delimiter,
+                match_glob=match_glob,
+            )
+        return self.remote.scan(
+            bucket_name=bucket_name,
+            prefix=prefix,
+            delimiter=delimiter,
+            match_glob=match_glob,
+        )
+
+    def list_entries(self, bucket_name: str, prefix: str = None) -> Iterator[BlobEntry]:
+        pending = any(
+            pending_bucket == bucket_name and blob_name.startswith(prefix or "")
+            for pending_bucket, blob_name, _ in self._pending()
+        )
+        if pending:
+            # The generations of the pending writes are not known yet
+            return super().list_entries(bucket_name=bucket_name, prefix=prefix)
+        return self.remote.list_entries(bucket_name=bucket_name, prefix=prefix)
+
+    def generate_signed_urls(
+        self,
+        bucket_name: str,
+        blob_names: List[str],
+        method: str = "GET",
+        expiration: int = 3600,
+        content_type: str = None,
+    ) -> List[str]:
+        # The URLs are served by the remote tier: pending writes are uploaded first,
+        # and the local copies of blobs that may be replaced through them are evicted
+        for blob_name in blob_names:
+            with self._exclusive(bucket_name=bucket_name, blob_name=blob_name):
+                self._settle(bucket_name=bucket_name, blob_name=blob_name)
+                if method not in ("GET", "HEAD"):
+                    self._bump_epoch(bucket_name=bucket_name, blob_name=blob_name)
+                    self._evict(bucket_name=bucket_name, blob_name=blob_name)
+        return self.remote.generate_signed_urls(
+            bucket_name=bucket_name,
+            blob_names=blob_names,
+            method=method,
+            expiration=expiration,
+            content_type=content_type,
+        )
+
+    def copy(
+        self,
+        source_bucket_name: str,
+        source_blob_name: str,
+        dest_bucket_name: str,
+        dest_blob_name: str,
+        if_source_generation_match: int = None,
+        if_generation_match: int = None,
+    ) -> None:
+        self._settle(bucket_name=source_bucket_name, blob_name=source_blob_name)
+        with self._exclusive(bucket_name=dest_bucket_name, blob_name=dest_blob_name):
+            self._settle(bucket_name=dest_bucket_name, blob_name=dest_blob_name)
+            self.remote.copy(
+                source_bucket_name=source_bucket_name,
+                source_blob_name=source_blob_name,
+                dest_bucket_name=dest_bucket_name,
+                dest_blob_name=dest_blob_name,
+                if_source_generation_match=if_source_generation_match,
+                if_generation_match=if_generation_match,
+            )
+            self._bump_epoch(bucket_name=dest_bucket_name, blob_name=dest_blob_name)
+            self._evict(bucket_name=dest_bucket_name, blob_name=dest_blob_name)
+
+    def delete(
+        self, bucket_name: str, blob_name: str, if_generation_match: int = None
+    ) -> None:
+        with self._exclusive(bucket_name=bucket_name, blob_name=blob_name):
+            self._settle(bucket_name=bucket_name, blob_name=blob_name)
+            self.remote.delete(
+                bucket_name=bucket_name,
+                blob_name=blob_name,
+                if_generation_match=if_generation_match,
+            )
+            self._bump_epoch(bucket_name=bucket_name, blob_name=blob_name)
+            self._evict(bucket_name=bucket_name, blob_name=blob_name)
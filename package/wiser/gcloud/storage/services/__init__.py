@@ -1,3 +1,18 @@
+from wiser.gcloud.storage.services.background_writer import BackgroundWriter
+from wiser.gcloud.storage.services.chunked_array import ChunkedArray
+from wiser.gcloud.storage.services.content_store import ContentStore
+from wiser.gcloud.storage.services.decode_pool import DecodePool
+from wiser.gcloud.storage.services.listing_cache import ListingCache
+from wiser.gcloud.storage.services.pack_store import PackReader, PackWriter
 from wiser.gcloud.storage.services.storage_service import Storage
 
-__all__ = ["Storage"]
+__all__ = [
+    "BackgroundWriter",
+    "ChunkedArray",
+    "ContentStore",
+    "DecodePool",
+    "ListingCache",
+    "PackReader",
+    "PackWriter",
+    "Storage",
+]
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from wiser.gcloud.storage.types.location import StorageLocation
+    from wiser.gcloud.storage.types.metadata import ObjectMetadata
+
+# Spool files of the accepted saves, and of the records of the open batches: a JSON
+# header line, then the content or one record per line
+SAVE_SUFFIX = ".save"
+RECORDS_SUFFIX = ".records"
+
+
+class _Batch:
+    __slots__ = ("uri", "records", "size", "opened", "spool_path", "spool_file")
+
+    def __init__(self, uri: str, spool_path: Optional[str]):
+        self.uri = uri
+        self.records: List[bytes] = []
+        self.size = 0
+        self.opened = time.monotonic()
+        self.spool_path = spool_path
+        self.spool_file = None
+
+
+def _close_at_exit(reference: weakref.ref) -> None:
+    writer = reference()
+    if writer is not None and not writer._closed:
+        writer.close()
+
+
+class BackgroundWriter:
+    """
+    Write-behind buffer: saves are encoded by the caller, then acknowledged at once
+    and uploaded by a pool of threads. The contents waiting for upload are bounded by
+    `max_pending_bytes`, callers block beyond it. Records appended to a folder are
+    grouped into a JSON array object per batch, uploaded once the batch holds
+    `batch_records` records or `batch_bytes` bytes, or is `flush_interval` seconds old.
+
+    Upload errors are raised by the futures of the saves and by the next `flush()` or
+    `close()`; pending writes are flushed when the process exits. With a `spool_dir`,
+    the accepted writes are also kept in local files until uploaded, and uploaded by
+    the next writer built on the same folder if the process crashes or their upload
+    fails; with `fsync`, they survive a crash of the machine too.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_pending_bytes: int = 64 * 1024 * 1024,
+        batch_records: int = 10000,
+        batch_bytes: int = 4 * 1024 * 1024,
+        flush_interval: float = 5.0,
+        spool_dir: str = None,
+        fsync: bool = False,
+    ):
+        """
+        @param max_workers: the number of threads uploading
+        @param max_pending_bytes: the maximum size of the contents waiting for upload,
+        a single larger content is accepted when nothing else is pending
+        @param batch_records: the number of records uploading a batch
+        @param batch_bytes: the size of the records uploading a batch
+        @param flush_interval: the age in seconds uploading a batch
+        @param spool_dir: the folder keeping the writes until uploaded, None to keep
+        them in memory only
+        @param fsync: True to sync the spool files to disk before acknowledging
+        """
+        if max_workers <= 0 or max_pending_bytes <= 0:
+            raise ValueError("max_workers and max_pending_bytes must be positive")
+        if batch_records <= 0 or batch_bytes <= 0 or flush_interval <= 0:
+            raise ValueError(
+                "batch_records, batch_bytes and flush_interval must be positive"
+            )
+        if fsync and spool_dir is None:
+            raise ValueError("fsync needs a spool_dir")
+
+        self.max_workers = max_workers
+        self.max_pending_bytes = max_pending_bytes
+        self.batch_records = batch_records
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+
+        self._condition = threading.Condition()
+        self._pending_bytes = 0
+        self._in_flight = 0
+        self._errors: List[BaseException] = []
+        self._batches: Dict[str, _Batch] = {}
+        self._closed = False
+        self._timer: Optional[threading.Thread] = None
+        self._executor_pool: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+        # The writer is not kept alive by the exit hook
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+        if spool_dir is not None:
+            os.makedirs(spool_dir, exist_ok=True)
+            self._recover()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    # Writes ############################################################################
+
+    def save(
+        self,
+        obj: Any,
+        location: StorageLocation,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> Future:
+        """
+        Encodes an object as `Storage.save()` does and uploads it in background
+
+        @param obj: the object to save
+        @param location: the destination location
+        @param if_generation_match: save only if the current generation of the blob matches
+        @param if_not_exists: save only if the blob does not exist yet
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @return: the future of the upload, raising its error if any
+        """
+        from wiser.gcloud.storage.services.storage_service import Storage
+        from wiser.gcloud.storage.utils.codecs import encode
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        upload_kwargs = Storage._upload_kwargs(
+            location=location,
+            if_generation_match=if_generation_match,
+            if_not_exists=if_not_exists,
+            metadata=metadata,
+        )
+        data = encode(obj=obj, filename=location.filename)
+
+        self._check_open()
+        spool_path = None
+        if self.spool_dir is not None:
+            spool_path = self._spool_save(upload_kwargs=upload_kwargs, data=data)
+        with self._condition:
+            try:
+                self._reserve(size=len(data))
+            except ValueError:
+                if spool_path is not None:
+                    os.remove(spool_path)
+                raise
+            self._in_flight += 1
+            return self._submit(upload_kwargs, data, len(data), spool_path)
+
+    def append(self, record: Any, location: StorageLocation) -> None:
+        """
+        Appends a JSON-serializable record to the open batch of a folder, uploaded as
+        `<folder>/<UTC time>-<random>.json` holding the array of its records
+
+        @param record: the record
+        @param location: the location of the folder
+        @return: None
+        """
+        line = json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        folder = location.complete_path().rstrip("/")
+        # Records are separated by a comma and a newline in the uploaded array
+        size = len(line) + 2
+
+        with self._condition:
+            self._reserve(size=size)
+            batch = self._batches.get(folder)
+            if batch is None:
+                batch = self._open_batch(folder=folder)
+            batch.records.append(line)
+            batch.size += size
+            if batch.spool_file is not None:
+                batch.spool_file.write(line + b"\n")
+                self._sync(file=batch.spool_file)
+
+            if (
+                len(batch.records) >= self.batch_records
+                or batch.size >= self.batch_bytes
+            ):
+                self._upload_batch(folder=folder)
+
+    def flush(self) -> None:
+        """
+        Uploads the open batches and waits for all the pending uploads, raising the
+        first upload error since the last flush, if any
+
+        @return: None
+        """
+        with self._condition:
+            for folder in list(self._batches):
+                self._upload_batch(folder=folder)
+            while self._in_flight:
+                self._condition.wait()
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        """
+        Flushes the pending writes and stops the background threads, further writes
+        are refused
+
+        @return: None
+        """
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            if self._executor_pool is not None and self._executor_pid == os.getpid():
+                self._executor_pool.shutdown(wait=True)
+            self._executor_pool = None
+            self._executor_pid = None
+
+    # Background tasks ##################################################################
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise ValueError("The writer is closed")
+
+    def _reserve(self, size: int) -> None:
+        """
+        Accounts for a content waiting for upload, blocking while the pending contents
+        would exceed `max_pending_bytes`. Called with the condition held.
+        """
+        self._check_open()
+        while (
+            self._pending_bytes and self._pending_bytes + size > self.max_pending_bytes
+        ):
+            # Batches waiting for their thresholds are uploaded to free the memory
+            for folder in list(self._batches):
+                self._upload_batch(folder=folder)
+            self._condition.wait()
+            self._check_open()
+        self._pending_bytes += size
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork: a child process builds its own pool
+        if self._executor_pid != os.getpid():
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor_pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="background-writer"
+            )
+            self._executor_pid = os.getpid()
+        return self._executor_pool
+
+    def _submit(self, *args) -> Future:
+        from concurrent.futures import Future
+
+        try:
+            return self._executor().submit(self._upload, *args)
+        except RuntimeError:
+            # At interpreter exit, the pools no longer accept tasks: uploading inline
+            future = Future()
+            try:
+                future.set_result(self._upload(*args))
+            except BaseException as error:
+                future.set_exception(error)
+            return future
+
+    def _upload(
+        self, upload_kwargs: dict, data: bytes, size: int, spool_path: Optional[str]
+    ) -> None:
+        from wiser.gcloud.storage.services.storage_service import Storage
+
+        try:
+            Storage._upload(data=data, **upload_kwargs)
+        except BaseException as error:
+            from google.api_core.exceptions import PreconditionFailed
+
+            # Failed preconditions are final, other failures are retried from the spool
+            if spool_path is not None and isinstance(error, PreconditionFailed):
+                os.remove(spool_path)
+            with self._condition:
+                self._errors.append(error)
+            raise
+        else:
+            if spool_path is not None:
+                os.remove(spool_path)
+        finally:
+            with self._condition:
+                self._pending_bytes -= size
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    # Batches ###########################################################################
+
+    def _open_batch(self, folder: str) -> _Batch:
+        name = "{}-{}.json".format(
+            time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()), os.urandom(6).hex()
+        )
+        spool_path = None
+        if self.spool_dir is not None:
+            spool_path = self._spool_path(suffix=RECORDS_SUFFIX)
+        batch = _Batch(uri="{}/{}".format(folder, name), spool_path=spool_path)
+        if spool_path is not None:
+            batch.spool_file = open(spool_path, "wb")
+            batch.spool_file.write(
+                json.dumps({"uri": batch.uri, "if_generation_match": 0}).encode("utf-8")
+                + b"\n"
+            )
+        self._batches[folder] = batch
+
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(
+                target=self._run_timer, name="background-writer-timer", daemon=True
+            )
+            self._timer.start()
+        return batch
+
+    def _upload_batch(self, folder: str) -> None:
+        """
+        Submits the upload of the open batch of a folder. Called with the condition held.
+        """
+        from wiser.gcloud.storage.services.storage_service import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        batch = self._batches.pop(folder)
+        if batch.spool_file is not None:
+            batch.spool_file.close()
+        # Batch names are unique: an upload resumed after a crash never overwrites
+        upload_kwargs = Storage._upload_kwargs(
+            location=StorageLocationBuilder().from_uri(uri=batch.uri).build(),
+            if_not_exists=True,
+        )
+        self._in_flight += 1
+        self._submit(
+            upload_kwargs,
+            b"[" + b",\n".join(batch.records) + b"]",
+            batch.size,
+            batch.spool_path,
+        )
+
+    def _run_timer(self) -> None:
+        with self._condition:
+            # The thread stops with the last open batch, so that it does not keep the
+            # writer alive
+            while self._batches and not self._closed:
+                now = time.monotonic()
+                for folder, batch in list(self._batches.items()):
+                    if now - batch.opened >= self.flush_interval:
+                        self._upload_batch(folder=folder)
+                if self._batches:
+                    oldest = min(batch.opened for batch in self._batches.values())
+                    self._condition.wait(
+                        timeout=max(oldest + self.flush_interval - now, 0.0)
+                    )
+            self._timer = None
+
+    # Spool #############################################################################
+
+    def _spool_path(self, suffix: str) -> str:
+        # Named by acceptance time, so that the recovery uploads them in order
+        return os.path.join(
+            self.spool_dir,
+            "{:020d}-{}{}".format(time.time_ns(), os.urandom(6).hex(), suffix),
+        )
+
+    def _sync(self, file) -> None:
+        file.flush()
+        if self.fsync:
+            os.fsync(file.fileno())
+
+    def _spool_save(self, upload_kwargs: dict, data: bytes) -> str:
+        header = {
+            "uri": upload_kwargs["location"].complete_path(),
+            "if_generation_match": upload_kwargs["if_generation_match"],
+            "metadata": upload_kwargs["metadata"].dict(exclude_none=True),
+        }
+        path = self._spool_path(suffix=SAVE_SUFFIX)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(data)
+            self._sync(file=f)
+        os.replace(tmp_path, path)
+        return path
+
+    def _recover(self) -> None:
+        """
+        Submits the uploads of the writes left in the spool by a previous writer
+        """
+        from wiser.gcloud.storage.services.storage_service import Storage
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+        from wiser.gcloud.storage.types.metadata import ObjectMetadata
+
+        for filename in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, filename)
+            if not filename.endswith(SAVE_SUFFIX) and not filename.endswith(
+                RECORDS_SUFFIX
+            ):
+                if filename.endswith(".tmp"):
+                    # Interrupted before the save was acknowledged
+                    os.remove(path)
+                continue
+
+            with open(path, "rb") as f:
+                try:
+                    header = json.loads(f.readline())
+                except ValueError:
+                    header = None
+                if filename.endswith(SAVE_SUFFIX):
+                    data = f.read()
+                else:
+                    # A record interrupted by the crash was never acknowledged
+                    records = [line[:-1] for line in f if line.endswith(b"\n")]
+                    data = b"[" + b",\n".join(records) + b"]" if records else None
+            if header is None or data is None:
+                os.remove(path)
+                continue
+
+            metadata = header.get("metadata")
+            upload_kwargs = Storage._upload_kwargs(
+                location=StorageLocationBuilder().from_uri(uri=header["uri"]).build(),
+                if_generation_match=header["if_generation_match"],
+                metadata=ObjectMetadata(**metadata) if metadata else None,
+            )
+            with self._condition:
+                self._pending_bytes += len(data)
+                self._in_flight += 1
+            self._submit(upload_kwargs, data, len(data), path)
@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import base64
+import itertools
+import json
+import zlib
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from wiser.gcloud.storage.connectors.base_connector import BaseConnector
+    from wiser.gcloud.storage.types.location import StorageLocation
+
+# Name of the metadata blob, under the prefix of the array
+METADATA_NAME = ".array.json"
+# Version of the layout written in the metadata
+FORMAT_VERSION = 1
+# Target size of the chunks chosen by default, before compression
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+# Number of attempts of a read-modify-write of a chunk concurrently modified
+PARTIAL_WRITE_ATTEMPTS = 8
+
+_COMPRESSIONS = {None, "zlib"}
+
+
+def default_chunks(
+    shape: Tuple[int, ...], itemsize: int, target: int = DEFAULT_CHUNK_BYTES
+) -> Tuple[int, ...]:
+    """
+    Returns a chunk shape of at most `target` bytes, halving the largest dimension
+    until the chunk fits
+
+    @param shape: the shape of the array
+    @param itemsize: the size of an item in bytes
+    @param target: the maximum size of a chunk in bytes
+    @return: the chunk shape
+    """
+    chunks = [max(1, size) for size in shape]
+    while itemsize * _product(chunks) > target and max(chunks) > 1:
+        largest = chunks.index(max(chunks))
+        chunks[largest] = (chunks[largest] + 1) // 2
+    return tuple(chunks)
+
+
+def _product(values) -> int:
+    result = 1
+    for value in values:
+        result *= value
+    return result
+
+
+def _positions(selection):
+    if isinstance(selection, slice):
+        import numpy as np
+
+        return np.arange(selection.start, selection.stop)
+    return selection
+
+
+class ChunkedArray:
+    """
+    N-dimensional array stored as a grid of compressed chunk blobs under a prefix,
+    next to a JSON metadata blob. Reads and writes touch only the chunks overlapping
+    the selection, in parallel; missing chunks read as the fill value. Partial
+    writes of a chunk are read-modify-writes guarded by generation preconditions,
+    so concurrent writers of the same chunk do not lose updates.
+    """
+
+    def __init__(
+        self,
+        location: StorageLocation,
+        shape: Tuple[int, ...],
+        dtype: np.dtype,
+        chunks: Tuple[int, ...],
+        compression: Optional[str] = "zlib",
+        fill_value: Any = 0,
+        max_workers: int = 8,
+    ):
+        """
+        Use `ChunkedArray.create()` or `ChunkedArray.open()` to build an array
+
+        @param location: the location whose blob name is the prefix of the array
+        @param shape: the shape of the array
+        @param dtype: the numpy dtype
+        @param chunks: the shape of the chunks
+        @param compression: 'zlib' or None
+        @param fill_value: the value of the items of missing chunks
+        @param max_workers: the number of chunks transferred in parallel
+        """
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        if compression not in _COMPRESSIONS:
+            raise ValueError("Compression must be one of {}".format(_COMPRESSIONS))
+        if len(chunks) != len(shape) or any(size < 1 for size in chunks):
+            raise ValueError("Chunks must be positive, one per dimension")
+
+        self.location = location
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.chunks = tuple(chunks)
+        self.compression = compression
+        self.fill_value = fill_value
+        self.max_workers = max_workers
+        self._prefix = location.blob_name.rstrip("/")
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def grid(self) -> Tuple[int, ...]:
+        """
+        The number of chunks along each dimension
+        """
+        return tuple(-(-size // chunk) for size, chunk in zip(self.shape, self.chunks))
+
+    @staticmethod
+    def create(
+        location: StorageLocation,
+        shape: Tuple[int, ...],
+        dtype: Any,
+        chunks: Tuple[int, ...] = None,
+        compression: Optional[str] = "zlib",
+        fill_value: Any = 0,
+        max_workers: int = 8,
+    ) -> ChunkedArray:
+        """
+        Creates an empty array, writing its metadata. Existing chunks under the
+        prefix are not deleted
+
+        @param location: the location whose blob name is the prefix of the array
+        @param shape: the shape of the array
+        @param dtype: the numpy dtype
+        @param chunks: the shape of the chunks, default chunks of about 8 MiB
+        @param compression: 'zlib' or None
+        @param fill_value: the value of the items of missing chunks
+        @param max_workers: the number of chunks transferred in parallel
+        @return: the array
+        """
+        import numpy as np
+
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            raise ValueError("Object arrays cannot be chunked")
+        shape = tuple(int(size) for size in shape)
+        if chunks is None:
+            chunks = default_chunks(shape=shape, itemsize=dtype.itemsize)
+
+        array = ChunkedArray(
+            location=location,
+            shape=shape,
+            dtype=dtype,
+            chunks=tuple(int(size) for size in chunks),
+            compression=compression,
+            fill_value=fill_value,
+            max_workers=max_workers,
+        )
+        array._connector().upload_from_string(
+            data=json.dumps(array._metadata(), sort_keys=True, indent=4),
+            bucket_name=location.bucket,
+            destination_blob_name=array._blob_name(METADATA_NAME),
+        )
+        return array
+
+    @staticmethod
+    def open(location: StorageLocation, max_workers: int = 8) -> ChunkedArray:
+        """
+        Opens an existing array, reading its metadata
+
+        @param location: the location whose blob name is the prefix of the array
+        @param max_workers: the number of chunks transferred in parallel
+        @return: the array
+        """
+        import numpy as np
+
+        from wiser.gcloud.storage.services.storage_service import Storage
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        metadata = json.loads(
+            Storage._connector(location=location).download_as_string(
+                bucket_name=location.bucket,
+                source_blob_name=location.blob_name.rstrip("/") + "/" + METADATA_NAME,
+            )
+        )
+        if metadata["format"] > FORMAT_VERSION:
+            raise ValueError("Unsupported chunked array format")
+
+        dtype = np.lib.format.descr_to_dtype(_to_descr(metadata["dtype"]))
+        return ChunkedArray(
+            location=location,
+            shape=tuple(metadata["shape"]),
+            dtype=dtype,
+            chunks=tuple(metadata["chunks"]),
+            compression=metadata["compression"],
+            fill_value=np.frombuffer(
+                base64.b64decode(metadata["fill_value"]), dtype=dtype
+            )[0],
+            max_workers=max_workers,
+        )
+
+    def _metadata(self) -> dict:
+        import numpy as np
+
+        # The bytes of the fill value, so that any dtype is supported
+        fill_value = np.array(self.fill_value, dtype=self.dtype).tobytes()
+        return {
+            "format": FORMAT_VERSION,
+            "shape": list(self.shape),
+            "chunks": list(self.chunks),
+            "dtype": np.lib.format.dtype_to_descr(self.dtype),
+            "compression": self.compression,
+            "fill_value": base64.b64encode(fill_value).decode("ascii"),
+        }
+
+    def _connector(self) -> BaseConnector:
+        from wiser.gcloud.storage.services.storage_service import Storage
+
+        return Storage._connector(location=self.location)
+
+    def _blob_name(self, name: str) -> str:
+        return self._prefix + "/" + name
+
+    def _chunk_name(self, chunk_index: Tuple[int, ...]) -> str:
+        return self._blob_name(".".join(str(i) for i in chunk_index) or "0")
+
+    def _chunk_bounds(
+        self, chunk_index: Tuple[int, ...]
+    ) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        starts = tuple(i * size for i, size in zip(chunk_index, self.chunks))
+        stops = tuple(
+            min(start + size, total)
+            for start, size, total in zip(starts, self.chunks, self.shape)
+        )
+        return starts, stops
+
+    def _encode(self, chunk: np.ndarray) -> bytes:
+        import numpy as np
+
+        data = np.ascontiguousarray(chunk, dtype=self.dtype).tobytes()
+        if self.compression == "zlib":
+            data = zlib.compress(data, 1)
+        return data
+
+    def _decode(self, data: bytes, chunk_index: Tuple[int, ...]) -> np.ndarray:
+        import numpy as np
+
+        if self.compression == "zlib":
+            data = zlib.decompress(data)
+        starts, stops = self._chunk_bounds(chunk_index=chunk_index)
+        shape = tuple(stop - start for start, stop in zip(starts, stops))
+        return np.frombuffer(data, dtype=self.dtype).reshape(shape)
+
+    def _read_chunk(self, chunk_index: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """
+        Returns a chunk, None if missing
+        """
+        from google.api_core.exceptions import NotFound
+
+        try:
+            data = self._connector().download_as_bytes(
+                bucket_name=self.location.bucket,
+                source_blob_name=self._chunk_name(chunk_index=chunk_index),
+            )
+        except NotFound:
+            return None
+        return self._decode(data=data, chunk_index=chunk_index)
+
+    def _map(self, fn, items: List) -> List:
+        if len(items) <= 1 or self.max_workers <= 1:
+            return [fn(item) for item in items]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fn, items))
+
+    def _overlapping_chunks(
+        self, starts: Tuple[int, ...], stops: Tuple[int, ...]
+    ) -> Iterator[Tuple[int, ...]]:
+        if any(stop <= start for start, stop in zip(starts, stops)):
+            return iter(())
+        return itertools.product(
+            *(
+                range(start // size, (stop - 1) // size + 1)
+                for start, stop, size in zip(starts, stops, self.chunks)
+            )
+        )
+
+    def _normalize(self, index) -> Tuple[List[Tuple[int, int, int]], List[int]]:
+        """
+        Returns start, stop and step of the selection on each dimension, and the
+        dimensions indexed by an integer, removed from the result
+        """
+        if not isinstance(index, tuple):
+            index = (index,)
+        if sum(1 for item in index if item is Ellipsis) > 1:
+            raise IndexError("Only one ellipsis is allowed")
+        if Ellipsis in index:
+            position = index.index(Ellipsis)
+            missing = self.ndim - (len(index) - 1)
+            index = index[:position] + (slice(None),) * missing + index[position + 1 :]
+        if len(index) > self.ndim:
+            raise IndexError("Too many indices")
+        index = index + (slice(None),) * (self.ndim - len(index))
+
+        selection, dropped = [], []
+        for dimension, (item, size) in enumerate(zip(index, self.shape)):
+            if isinstance(item, slice):
+                selection.append(item.indices(size))
+            elif hasattr(item, "__index__"):
+                position = int(item)
+                if not -size <= position < size:
+                    raise IndexError("Index out of range")
+                position %= size
+                selection.append((position, position + 1, 1))
+                dropped.append(dimension)
+            else:
+                raise IndexError("Only integers, slices and ellipsis are supported")
+        return selection, dropped
+
+    def __getitem__(self, index) -> np.ndarray:
+        import numpy as np
+
+        selection, dropped = self._normalize(index=index)
+        positions = [
+            np.arange(start, stop, step, dtype=np.int64)
+            for start, stop, step in selection
+        ]
+        result = np.full(
+            tuple(len(p) for p in positions), self.fill_value, dtype=self.dtype
+        )
+        shape = tuple(len(p) for d, p in enumerate(positions) if d not in dropped)
+        if result.size == 0:
+            return result.reshape(shape)
+
+        # On each dimension, the chunks holding selected positions, with the positions
+        # of the result and of the chunk they map: only these chunks are read
+        dimensions = []
+        for position, size, (_, _, step) in zip(positions, self.chunks, selection):
+            chunk_ids = position // size
+            mappings = {}
+            for chunk_id in np.unique(chunk_ids):
+                selected = np.flatnonzero(chunk_ids == chunk_id)
+                offsets = position[selected] - chunk_id * size
+                if step == 1:
+                    selected = slice(selected[0], selected[-1] + 1)
+                    offsets = slice(offsets[0], offsets[-1] + 1)
+                mappings[int(chunk_id)] = (selected, offsets)
+            dimensions.append(mappings)
+        strided = any(step != 1 for _, _, step in selection)
+
+        def read(chunk_index):
+            chunk = self._read_chunk(chunk_index=chunk_index)
+            if chunk is None:
+                return
+            mapped = [mappings[i] for i, mappings in zip(chunk_index, dimensions)]
+            destination = tuple(selected for selected, _ in mapped)
+            source = tuple(offsets for _, offsets in mapped)
+            if strided:
+                # Slices and position arrays are combined as an open mesh
+                destination = np.ix_(*(_positions(d) for d in destination))
+                source = np.ix_(*(_positions(s) for s in source))
+            result[destination] = chunk[source]
+
+        self._map(read, list(itertools.product(*(sorted(d) for d in dimensions))))
+        return result.reshape(shape)
+
+    def __setitem__(self, index, value) -> None:
+        import numpy as np
+
+        selection, dropped = self._normalize(index=index)
+        if any(step != 1 for _, _, step in selection):
+            raise IndexError("Writes support only contiguous selections")
+        starts = tuple(start for start, _, _ in selection)
+        stops = tuple(max(start, stop) for start, stop, _ in selection)
+        shape = tuple(stop - start for start, stop in zip(starts, stops))
+        # As numpy does, the value is broadcast to the selection without the dimensions
+        # indexed by an integer, which are then restored
+        value = np.broadcast_to(
+            np.asarray(value, dtype=self.dtype),
+            tuple(size for axis, size in enumerate(shape) if axis not in dropped),
+        )
+        value = np.expand_dims(value, axis=tuple(dropped))
+
+        def write(chunk_index):
+            chunk_starts, chunk_stops = self._chunk_bounds(chunk_index=chunk_index)
+            source, destination = [], []
+            for start, stop, chunk_start, chunk_stop in zip(
+                starts, stops, chunk_starts, chunk_stops
+            ):
+                low, high = max(start, chunk_start), min(stop, chunk_stop)
+                source.append(slice(low - start, high - start))
+                destination.append(slice(low - chunk_start, high - chunk_start))
+
+            covered = all(
+                s.start == 0 and s.stop == chunk_stop - chunk_start
+                for s, chunk_start, chunk_stop in zip(
+                    destination, chunk_starts, chunk_stops
+                )
+            )
+            if covered:
+                self._connector().upload_from_string(
+                    data=self._encode(chunk=value[tuple(source)]),
+                    bucket_name=self.location.bucket,
+                    destination_blob_name=self._chunk_name(chunk_index=chunk_index),
+                )
+            else:
+                self._update_chunk(
+                    chunk_index=chunk_index,
+                    destination=tuple(destination),
+                    value=value[tuple(source)],
+                )
+
+        self._map(write, list(self._overlapping_chunks(starts=starts, stops=stops)))
+
+    def _update_chunk(
+        self, chunk_index: Tuple[int, ...], destination: Tuple[slice, ...], value
+    ) -> None:
+        """
+        Writes part of a chunk, retrying if the chunk is modified concurrently
+        """
+        import numpy as np
+        from google.api_core.exceptions import PreconditionFailed
+
+        connector = self._connector()
+        name = self._chunk_name(chunk_index=chunk_index)
+        starts, stops = self._chunk_bounds(chunk_index=chunk_index)
+        shape = tuple(stop - start for start, stop in zip(starts, stops))
+
+        for _ in range(PARTIAL_WRITE_ATTEMPTS):
+            metadata = connector.get_metadata(
+                bucket_name=self.location.bucket, source_blob_name=name
+            )
+            if metadata is None:
+                chunk = np.full(shape, self.fill_value, dtype=self.dtype)
+                generation = 0
+            else:
+                generation = metadata.generation
+                data = connector.download_range(
+                    bucket_name=self.location.bucket,
+                    source_blob_name=name,
+                    start=0,
+                    end=metadata.size - 1,
+                    generation=generation,
+                )
+                chunk = self._decode(data=data, chunk_index=chunk_index).copy()
+
+            chunk[destination] = value
+            try:
+                connector.upload_from_string(
+                    data=self._encode(chunk=chunk),
+                    bucket_name=self.location.bucket,
+                    destination_blob_name=name,
+                    if_generation_match=generation,
+                )
+                return
+            except PreconditionFailed:
+                continue
+        raise PreconditionFailed(
+            "Chunk {} modified concurrently {} times".format(
+                name, PARTIAL_WRITE_ATTEMPTS
+            )
+        )
+
+    def read(self) -> np.ndarray:
+        """
+        Reads the whole array
+
+        @return: the numpy array
+        """
+        return self[...]
+
+
+def _to_descr(descr):
+    # JSON turns the (name, dtype, shape) tuples of structured dtypes into lists
+    if not isinstance(descr, list):
+        return descr
+    fields = []
+    for field in descr:
+        name, field_descr, *shape = field
+        fields.append((name, _to_descr(field_descr), *(tuple(s) for s in shape)))
+    return fields
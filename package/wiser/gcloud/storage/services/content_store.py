@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any, BinaryIO, List, Optional, Union
+
+from wiser.core.types.extensions import FileExtension
+from wiser.gcloud.storage.utils import checksums, codecs
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.connectors.base_connector import BaseConnector
+    from wiser.gcloud.storage.types.location import StorageLocation
+    from wiser.gcloud.storage.types.metadata import BlobMetadata
+
+# Folder of the contents, named by their hash
+OBJECTS_FOLDER = "objects/"
+# Folder of the references, named by the logical names
+REFS_FOLDER = "refs/"
+# Suffix of the references, so that they are not decoded as the content they point to
+REF_SUFFIX = ".ref"
+# Unreferenced contents younger than this are kept by the garbage collection, in seconds
+DEFAULT_GRACE_PERIOD = 3600.0
+
+
+class ContentStore:
+    """
+    Deduplicating store under a prefix: every content is uploaded once, under its
+    SHA-256 hash, and the logical names are small reference blobs pointing to the
+    hashes. Contents already stored are not uploaded again. `gc()` deletes the
+    contents no longer referenced.
+    """
+
+    def __init__(
+        self, location: StorageLocation, grace_period: float = DEFAULT_GRACE_PERIOD
+    ):
+        """
+        @param location: the location whose blob name is the prefix of the store
+        @param grace_period: the age, in seconds, before an unreferenced content can be deleted
+        """
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        self.location = location
+        self.grace_period = grace_period
+        self._prefix = location.blob_name.rstrip("/") + "/"
+
+    def _connector(self) -> BaseConnector:
+        from wiser.gcloud.storage.services.storage_service import Storage
+
+        return Storage._connector(location=self.location)
+
+    def _object_name(self, digest: str) -> str:
+        return self._prefix + OBJECTS_FOLDER + digest[:2] + "/" + digest
+
+    def _ref_name(self, name: str) -> str:
+        return self._prefix + REFS_FOLDER + name + REF_SUFFIX
+
+    def _content_metadata(self, digest: str) -> Optional[BlobMetadata]:
+        return self._connector().get_metadata(
+            bucket_name=self.location.bucket,
+            source_blob_name=self._object_name(digest=digest),
+        )
+
+    def contains(self, digest: str) -> bool:
+        """
+        Returns True if a content is stored
+
+        @param digest: the hexadecimal SHA-256 hash of the content
+        @return: True if the content is stored
+        """
+        return self._content_metadata(digest=digest) is not None
+
+    def put(self, name: str, obj: Any, raw: bool = False) -> str:
+        """
+        Stores an object under a logical name, encoded by the extension of the name as
+        by `Storage.save()`. The content is uploaded only if not already stored
+
+        @param name: the logical name, e.g. 'images/cat.png'
+        @param obj: the object
+        @param raw: if True, the object is bytes or a buffer, stored as it is
+        @return: the hash of the content
+        """
+        # Buffers and arrays are streamed to a temporary file rather than copied in memory
+        streamed = (
+            not isinstance(obj, bytes) if raw else name.endswith(FileExtension.NUMPY)
+        )
+        if streamed:
+            import tempfile
+
+            with tempfile.TemporaryFile() as file:
+                if raw:
+                    file.write(memoryview(obj))
+                else:
+                    import numpy as np
+
+                    np.save(file, obj)
+                file.seek(0)
+                return self.put_file(name=name, file=file)
+
+        data = obj if raw else codecs.encode(obj=obj, filename=name)
+        digest = checksums.sha256(data)
+        self._store(
+            digest=digest,
+            upload=lambda object_name: self._connector().upload_from_string(
+                data=data,
+                bucket_name=self.location.bucket,
+                destination_blob_name=object_name,
+                if_generation_match=0,
+            ),
+        )
+        self._write_ref(name=name, digest=digest, size=len(data))
+        return digest
+
+    def put_file(self, name: str, file: Union[str, BinaryIO]) -> str:
+        """
+        Stores the content of a file under a logical name. The file is hashed by
+        chunks, without loading it, and uploaded only if not already stored
+
+        @param name: the logical name
+        @param file: the path of the file, or a binary file handle read from its position
+        @return: the hash of the content
+        """
+        if isinstance(file, str):
+            with open(file, "rb") as file_handle:
+                return self.put_file(name=name, file=file_handle)
+
+        start = file.tell()
+        size = file.seek(0, 2) - start
+        file.seek(start)
+        digest = checksums.sha256(file)
+        self._store(
+            digest=digest,
+            upload=lambda object_name: self._connector().upload_from_file(
+                file_handle=file,
+                bucket_name=self.location.bucket,
+                destination_blob_name=object_name,
+                if_generation_match=0,
+            ),
+        )
+        self._write_ref(name=name, digest=digest, size=size)
+        return digest
+
+    def _store(self, digest: str, upload) -> None:
+        from datetime import datetime, timezone
+
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+
+        object_name = self._object_name(digest=digest)
+        metadata = self._content_metadata(digest=digest)
+        if metadata is not None:
+            # An old content may be unreferenced and collected before the reference is
+            # written: copying it onto itself renews its age and generation, so that a
+            # concurrent collection skips it or fails its precondition
+            age = None
+            if metadata.updated is not None:
+                age = (datetime.now(tz=timezone.utc) - metadata.updated).total_seconds()
+            if age is None or age > self.grace_period / 2:
+                try:
+                    self._connector().copy(
+                        source_bucket_name=self.location.bucket,
+                        source_blob_name=object_name,
+                        dest_bucket_name=self.location.bucket,
+                        dest_blob_name=object_name,
+                    )
+                except NotFound:
+                    # Collected since its metadata was read: it is uploaded again
+                    metadata = None
+
+        if metadata is None:
+            try:
+                upload(object_name)
+            except PreconditionFailed:
+                # Uploaded concurrently by another writer
+                pass
+
+    def _write_ref(self, name: str, digest: str, size: int) -> None:
+        self._connector().upload_from_string(
+            data=json.dumps({"sha256": digest, "size": size}, sort_keys=True),
+            bucket_name=self.location.bucket,
+            destination_blob_name=self._ref_name(name=name),
+        )
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Returns the hash of the content of a logical name
+
+        @param name: the logical name
+        @return: the hexadecimal SHA-256 hash, None if the name does not exist
+        """
+        from google.api_core.exceptions import NotFound
+
+        try:
+            ref = self._connector().download_as_string(
+                bucket_name=self.location.bucket,
+                source_blob_name=self._ref_name(name=name),
+            )
+        except NotFound:
+            return None
+        return json.loads(ref)["sha256"]
+
+    def exists(self, name: str) -> bool:
+        """
+        Returns True if a logical name exists
+
+        @param name: the logical name
+        @return: True if the name exists
+        """
+        return self._connector().exists(
+            bucket_name=self.location.bucket,
+            source_blob_name=self._ref_name(name=name),
+        )
+
+    def get_bytes(self, name: str) -> bytes:
+        """
+        Returns the content of a logical name
+
+        @param name: the logical name
+        @return: the content
+        """
+        digest = self.resolve(name=name)
+        if digest is None:
+            raise KeyError(name)
+        return self._connector().download_as_bytes(
+            bucket_name=self.location.bucket,
+            source_blob_name=self._object_name(digest=digest),
+        )
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the object of a logical name, decoded by its extension as by `Storage.get()`
+
+        @param name: the logical name
+        @return: the decoded object
+        """
+        return codecs.decode(data=self.get_bytes(name=name), filename=name)
+
+    def delete(self, name: str) -> None:
+        """
+        Deletes a logical name. Its content is deleted by the next garbage collection
+        if no other name references it
+
+        @param name: the logical name
+        @return: None
+        """
+        self._connector().delete(
+            bucket_name=self.location.bucket, blob_name=self._ref_name(name=name)
+        )
+
+    def names(self, prefix: str = "") -> List[str]:
+        """
+        Returns the logical names starting with a prefix
+
+        @param prefix: the prefix of the names
+        @return: the sorted list of names
+        """
+        refs_prefix = self._prefix + REFS_FOLDER
+        return sorted(
+            blob_name[len(refs_prefix) : -len(REF_SUFFIX)]
+            for blob_name in self._connector().list_blobs(
+                bucket_name=self.location.bucket, prefix=refs_prefix + prefix
+            )
+            if blob_name.endswith(REF_SUFFIX)
+        )
+
+    def gc(self) -> List[str]:
+        """
+        Deletes the contents referenced by no logical name and older than the grace
+        period. A content referenced again while collected is kept
+
+        @return: the hashes of the deleted contents
+        """
+        from datetime import datetime, timezone
+
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+
+        referenced = {self.resolve(name=name) for name in self.names()}
+        connector = self._connector()
+        objects_prefix = self._prefix + OBJECTS_FOLDER
+
+        deleted = []
+        for blob_name in connector.list_blobs(
+            bucket_name=self.location.bucket, prefix=objects_prefix
+        ):
+            digest = blob_name.rsplit("/", 1)[-1]
+            if digest in referenced:
+                continue
+            metadata = self._content_metadata(digest=digest)
+            if metadata is None or metadata.updated is None:
+                continue
+            age = (datetime.now(tz=timezone.utc) - metadata.updated).total_seconds()
+            if age < self.grace_period:
+                continue
+            try:
+                connector.delete(
+                    bucket_name=self.location.bucket,
+                    blob_name=blob_name,
+                    if_generation_match=metadata.generation,
+                )
+            except (NotFound, PreconditionFailed):
+                continue
+            deleted.append(digest)
+        return deleted
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Tuple
+
+from wiser.gcloud.storage.connectors.storage_connector import StorageConnector
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from wiser.gcloud.storage.types.location import StorageLocation
+
+
+def _init_worker() -> None:
+    from google.auth.exceptions import DefaultCredentialsError
+
+    # Warming the client up is best effort: without credentials the workers still
+    # serve the other backends, and the first gs:// read raises the error
+    try:
+        StorageConnector.worker_init()
+    except DefaultCredentialsError:
+        pass
+
+
+def _get_in_worker(location: StorageLocation) -> Any:
+    import numpy as np
+    from wiser.gcloud.storage.services.storage_service import Storage
+    from wiser.gcloud.storage.utils.shared_memory import export_array
+
+    data = Storage.get(location=location)
+    # Arrays come back through shared memory instead of being pickled
+    if isinstance(data, np.ndarray) and not data.dtype.hasobject:
+        return export_array(array=data)
+    return data
+
+
+def _get_image_in_worker(
+    location: StorageLocation,
+    size: Optional[Tuple[int, int]],
+    mode: Optional[str],
+    as_array: bool,
+) -> Any:
+    from wiser.gcloud.storage.services.storage_service import Storage
+    from wiser.gcloud.storage.utils.shared_memory import export_array
+
+    image = Storage.get_image(
+        location=location, size=size, mode=mode, as_array=as_array
+    )
+    if as_array:
+        return export_array(array=image)
+    return image
+
+
+def _get_url_in_worker(url: str, filename: str) -> Any:
+    import numpy as np
+    from wiser.gcloud.storage.utils.codecs import decode
+    from wiser.gcloud.storage.utils.http import download_url
+    from wiser.gcloud.storage.utils.shared_memory import export_array
+
+    data = decode(data=download_url(url=url), filename=filename)
+    if isinstance(data, np.ndarray) and not data.dtype.hasobject:
+        return export_array(array=data)
+    return data
+
+
+def _get_image_url_in_worker(
+    url: str,
+    filename: str,
+    size: Optional[Tuple[int, int]],
+    mode: Optional[str],
+    as_array: bool,
+) -> Any:
+    from wiser.gcloud.storage.utils.http import download_url
+    from wiser.gcloud.storage.utils.images import decode_image, image_format
+    from wiser.gcloud.storage.utils.shared_memory import export_array
+
+    image_format(filename=filename)
+    image = decode_image(
+        data=download_url(url=url), size=size, mode=mode, as_array=as_array
+    )
+    if as_array:
+        return export_array(array=image)
+    return image
+
+
+def _get_csv_chunk_in_worker(
+    location: StorageLocation,
+    generation: Optional[int],
+    size: int,
+    start: int,
+    end: int,
+    fmtparams: dict,
+) -> List[List[str]]:
+    from wiser.gcloud.storage.services.storage_service import Storage
+    from wiser.gcloud.storage.utils.csv_stream import read_chunk
+
+    return read_chunk(
+        read_range=lambda first, last: Storage.get_range(
+            location=location, start=first, end=last, generation=generation
+        ),
+        size=size,
+        start=start,
+        end=end,
+        **fmtparams,
+    )
+
+
+def _from_worker(result: Any) -> Any:
+    from wiser.gcloud.storage.utils.shared_memory import (
+        SharedArrayHandle,
+        import_array,
+    )
+
+    if isinstance(result, SharedArrayHandle):
+        return import_array(handle=result)
+    return result
+
+
+class DecodePool:
+    """
+    Process pool downloading and decoding blobs out of the calling process, so that
+    CPU-heavy decoding does not hold its GIL. Numpy arrays are returned through shared
+    memory segments (POSIX only), the other objects are pickled.
+
+    With `signed_urls=True` the calling process signs the URLs of the blobs and the
+    workers download them with a pooled HTTP client: workers hold no credentials and
+    never build a Google Cloud client.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        mp_context=None,
+        signed_urls: bool = False,
+        ttl: int = 3600,
+    ):
+        """
+        @param max_workers: the number of worker processes, by default the number of CPUs
+        @param mp_context: the multiprocessing context used to start the workers
+        @param signed_urls: if True, workers download the blobs through signed URLs
+        @param ttl: the validity of the signed URLs, in seconds
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.signed_urls = signed_urls
+        self.ttl = ttl
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=None if signed_urls else _init_worker,
+        )
+
+    def _sign(self, locations: List[StorageLocation]) -> List[Optional[str]]:
+        if not self.signed_urls:
+            return [None] * len(locations)
+
+        from wiser.gcloud.storage.services.storage_service import Storage
+
+        return Storage.signed_urls(locations=locations, ttl=self.ttl)
+
+    def _submit_get(self, location: StorageLocation, url: Optional[str]) -> Future:
+        if url is None:
+            return self._submit(_get_in_worker, location)
+        return self._submit(_get_url_in_worker, url, location.filename)
+
+    def _submit_image(
+        self,
+        location: StorageLocation,
+        url: Optional[str],
+        size: Optional[Tuple[int, int]],
+        mode: Optional[str],
+        as_array: bool,
+    ) -> Future:
+        if url is None:
+            return self._submit(_get_image_in_worker, location, size, mode, as_array)
+        return self._submit(
+            _get_image_url_in_worker, url, location.filename, size, mode, as_array
+        )
+
+    def submit(self, location: StorageLocation) -> Future:
+        """
+        Schedules `Storage.get(location)` in a worker process
+
+        @param location: the location of the blob
+        @return: a future resolving to the decoded object
+        """
+        return self._submit_get(location=location, url=self._sign([location])[0])
+
+    def submit_image(
+        self,
+        location: StorageLocation,
+        size: Tuple[int, int] = None,
+        mode: str = None,
+        as_array: bool = False,
+    ) -> Future:
+        """
+        Schedules `Storage.get_image()` in a worker process
+
+        @param location: the location of the image
+        @param size: the (width, height) box the image is resized to fit
+        @param mode: the Pillow mode to convert the image to
+        @param as_array: if True, the image is decoded to a numpy array
+        @return: a future resolving to the decoded image
+        """
+        return self._submit_image(
+            location=location,
+            url=self._sign([location])[0],
+            size=size,
+            mode=mode,
+            as_array=as_array,
+        )
+
+    def submit_csv_chunk(
+        self,
+        location: StorageLocation,
+        size: int,
+        start: int,
+        end: int,
+        generation: int = None,
+        **fmtparams,
+    ) -> Future:
+        """
+        Schedules the parsing of the rows of a .csv blob starting in a byte range in a
+        worker process, see `csv_stream.read_chunk()`
+
+        @param location: the location of the blob
+        @param size: the size of the blob
+        @param start: the first byte of the chunk
+        @param end: the byte where the chunk stops (excluded)
+        @param generation: the generation of the blob to read, the live one if None
+        @param fmtparams: the formatting parameters of `csv.reader()`
+        @return: a future resolving to the rows
+        """
+        return self._submit(
+            _get_csv_chunk_in_worker, location, generation, size, start, end, fmtparams
+        )
+
+    def _submit(self, fn, *args) -> Future:
+        from concurrent.futures import Future
+
+        result = Future()
+
+        def _done(future: Future) -> None:
+            try:
+                result.set_result(_from_worker(future.result()))
+            except BaseException as e:
+                result.set_exception(e)
+
+        self._executor.submit(fn, *args).add_done_callback(_done)
+        return result
+
+    def get(self, location: StorageLocation) -> Any:
+        """
+        Returns `Storage.get(location)` computed in a worker process
+
+        @param location: the location of the blob
+        @return: the decoded object
+        """
+        return self.submit(location=location).result()
+
+    def map(self, locations: List[StorageLocation]) -> Iterator[Any]:
+        """
+        Returns the decoded objects of the locations, in order, fetched concurrently
+
+        @param locations: the locations of the blobs
+        @return: an iterator over the decoded objects
+        """
+        futures = [
+            self._submit_get(location=location, url=url)
+            for location, url in zip(locations, self._sign(locations))
+        ]
+        for future in futures:
+            yield future.result()
+
+    def map_images(
+        self,
+        locations: List[StorageLocation],
+        size: Tuple[int, int] = None,
+        mode: str = None,
+        as_array: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Returns the decoded images of the locations, in order, see `submit_image()`
+
+        @param locations: the locations of the images
+        @param size: the (width, height) box the images are resized to fit
+        @param mode: the Pillow mode to convert the images to
+        @param as_array: if True, the images are decoded to numpy arrays
+        @return: an iterator over the decoded images
+        """
+        futures = [
+            self._submit_image(
+                location=location, url=url, size=size, mode=mode, as_array=as_array
+            )
+            for location, url in zip(locations, self._sign(locations))
+        ]
+        for future in futures:
+            yield future.result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker processes
+
+        @param wait: whether to wait for the pending tasks
+        @return: None
+        """
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.connectors.base_connector import BaseConnector, BlobEntry
+    from wiser.gcloud.storage.types.location import StorageLocation
+
+# Listings older than this are listed again, in seconds
+DEFAULT_MAX_AGE = 600.0
+# Version of the format of the listing files
+FORMAT_VERSION = 1
+LISTING_SUFFIX = ".listing"
+WRITES_JOURNAL = "writes.journal"
+# Lock of the journal shared by the processes: appends hold it shared, compactions
+# exclusive, so that no line appended by another process is lost by a compaction
+WRITES_LOCK = "writes.lock"
+# The journal is compacted after this many writes recorded by the process
+COMPACT_EVERY = 1000
+
+# Write recorded through `Storage`: time, blob name, size, generation, deleted
+_Write = Tuple[float, str, Optional[int], Optional[int], bool]
+
+
+class ListingCache:
+    """
+    Listings of `Storage.get_list_content()` persisted in a local folder, one compact
+    file per bucket and prefix, so that processes restarted within `max_age` do not
+    list again. The writes made through `Storage` are appended to a journal per bucket
+    and applied on top of the listings they change, instead of invalidating them.
+    Writes made by other processes are seen once the listing expires.
+    """
+
+    def __init__(self, directory: str, max_age: float = DEFAULT_MAX_AGE):
+        """
+        @param directory: the folder of the listing files, created if missing
+        @param max_age: the age, in seconds, after which a listing is listed again
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Writes recorded per bucket folder, in time order, younger than the maximum age
+        self._writes: Dict[str, Deque[_Write]] = {}
+        self._appended: Dict[str, int] = {}
+
+    def _bucket_dir(self, location: StorageLocation) -> str:
+        from urllib.parse import quote
+
+        return os.path.join(
+            self.directory, quote(location.prefix + location.bucket, safe="")
+        )
+
+    def _listing_path(self, location: StorageLocation) -> str:
+        from wiser.gcloud.storage.utils import checksums
+
+        return os.path.join(
+            self._bucket_dir(location=location),
+            checksums.sha256((location.folders or "").encode("utf-8")) + LISTING_SUFFIX,
+        )
+
+    @contextmanager
+    def _journal_lock(self, bucket_dir: str, exclusive: bool):
+        import fcntl
+
+        os.makedirs(bucket_dir, exist_ok=True)
+        # The lock file is never removed, see `shared_registry`
+        with open(os.path.join(bucket_dir, WRITES_LOCK), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _compact(self, bucket_dir: str) -> List[_Write]:
+        """
+        Rewrites the journal without the writes older than the maximum age, which only
+        apply to expired listings, and returns the remaining writes
+        """
+        oldest = time.time() - self.max_age
+        writes = []
+        path = os.path.join(bucket_dir, WRITES_JOURNAL)
+        with self._journal_lock(bucket_dir=bucket_dir, exclusive=True):
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            write = tuple(json.loads(line))
+                        except ValueError:
+                            # Truncated by a crash
+                            continue
+                        if len(write) == 5 and write[0] >= oldest:
+                            writes.append(write)
+            tmp_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(write) + "\n" for write in writes)
+            os.replace(tmp_path, path)
+        return sorted(writes)
+
+    def _load_writes(self, bucket_dir: str) -> Deque[_Write]:
+        # Called with the lock held
+        writes = self._writes.get(bucket_dir)
+        if writes is None:
+            writes = self._writes[bucket_dir] = deque(self._compact(bucket_dir))
+            self._appended[bucket_dir] = 0
+
+        oldest = time.time() - self.max_age
+        while writes and writes[0][0] < oldest:
+            writes.popleft()
+        return writes
+
+    def _record(
+        self,
+        location: StorageLocation,
+        size: Optional[int],
+        generation: Optional[int],
+        deleted: bool,
+    ) -> None:
+        bucket_dir = self._bucket_dir(location=location)
+        with self._lock:
+            write = (time.time(), location.blob_name, size, generation, deleted)
+            self._load_writes(bucket_dir=bucket_dir).append(write)
+            with self._journal_lock(bucket_dir=bucket_dir, exclusive=False):
+                with open(
+                    os.path.join(bucket_dir, WRITES_JOURNAL), "a", encoding="utf-8"
+                ) as f:
+                    f.write(json.dumps(write) + "\n")
+
+            self._appended[bucket_dir] += 1
+            if self._appended[bucket_dir] >= COMPACT_EVERY:
+                self._compact(bucket_dir=bucket_dir)
+                self._appended[bucket_dir] = 0
+
+    def record_write(
+        self, location: StorageLocation, size: int = None, generation: int = None
+    ) -> None:
+        """
+        Records a blob written by this process, applied to the cached listings of its prefixes
+
+        @param location: the location of the blob
+        @param size: the size of the blob, None if not known
+        @param generation: the generation of the blob, None if not known
+        @return: None
+        """
+        self._record(location=location, size=size, generation=generation, deleted=False)
+
+    def record_delete(self, location: StorageLocation) -> None:
+        """
+        Records a blob deleted by this process, removed from the cached listings of its prefixes
+
+        @param location: the location of the blob
+        @return: None
+        """
+        self._record(location=location, size=None, generation=None, deleted=True)
+
+    def _read(self, path: str) -> Optional[Tuple[float, List[BlobEntry]]]:
+        import zlib
+
+        from wiser.gcloud.storage.connectors.base_connector import BlobEntry
+
+        try:
+            with open(path, "rb") as f:
+                listing = json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error):
+            return None
+        if listing.get("version") != FORMAT_VERSION:
+            return None
+        return listing["listed_at"], [BlobEntry(*entry) for entry in listing["entries"]]
+
+    def _write(self, path: str, listed_at: float, entries: List[BlobEntry]) -> None:
+        import zlib
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(
+            {
+                "version": FORMAT_VERSION,
+                "listed_at": listed_at,
+                "entries": [list(entry) for entry in entries],
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data, 1))
+        # Readers see the previous listing or the new one, never a partial one
+        os.replace(tmp_path, path)
+
+    def entries(
+        self, location: StorageLocation, connector: BaseConnector
+    ) -> List[BlobEntry]:
+        """
+        Returns the blobs whose name starts with the folders of a location, from the
+        cached listing if younger than the maximum age, else listed again
+
+        @param location: the location whose folders are the prefix of the listing
+        @param connector: the connector serving the location
+        @return: the blobs with their size and generation, sorted by name; the blobs
+        written by this process since the listing have no generation
+        """
+        from wiser.gcloud.storage.connectors.base_connector import BlobEntry
+
+        path = self._listing_path(location=location)
+        listing = self._read(path=path)
+        if listing is None or time.time() - listing[0] > self.max_age:
+            # Writes made while listing may be missed by the listing: the journal
+            # applies them again, from the time the listing started
+            listed_at = time.time()
+            entries = list(
+                connector.list_entries(
+                    bucket_name=location.bucket, prefix=location.folders
+                )
+            )
+            self._write(path=path, listed_at=listed_at, entries=entries)
+            listing = listed_at, entries
+
+        listed_at, entries = listing
+        prefix = location.folders or ""
+        with self._lock:
+            writes = [
+                write
+                for write in self._load_writes(
+                    bucket_dir=self._bucket_dir(location=location)
+                )
+                if write[0] >= listed_at and write[1].startswith(prefix)
+            ]
+        if not writes:
+            return entries
+
+        by_name = {entry.name: entry for entry in entries}
+        for _, name, size, generation, deleted in writes:
+            if deleted:
+                by_name.pop(name, None)
+            else:
+                by_name[name] = BlobEntry(name=name, size=size, generation=generation)
+        return sorted(by_name.values())
+
+    def invalidate(self, location: StorageLocation) -> None:
+        """
+        Removes the cached listing of the folders of a location
+
+        @param location: the location whose folders are the prefix of the listing
+        @return: None
+        """
+        try:
+            os.remove(self._listing_path(location=location))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,453 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+from wiser.gcloud.storage.utils import codecs
+from wiser.gcloud.storage.utils.ranges import (
+    DEFAULT_MAX_GAP,
+    coalesce_ranges,
+    extract_ranges,
+)
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.connectors.base_connector import BaseConnector
+    from wiser.gcloud.storage.types.location import StorageLocation
+
+# Suffix of the blobs holding the packed objects
+PACK_SUFFIX = ".pack"
+# Suffix of the blobs holding the index of a pack, written after the pack
+INDEX_SUFFIX = ".index.json"
+# Version of the index layout
+FORMAT_VERSION = 1
+# Size of the packs written by default
+DEFAULT_PACK_SIZE = 64 * 1024 * 1024
+
+
+def _new_pack_id(timestamp: int = None) -> str:
+    import uuid
+
+    # Pack ids sort by creation time, so that later packs override earlier ones
+    if timestamp is None:
+        timestamp = time.time_ns()
+    return "{:020d}-{}".format(timestamp, uuid.uuid4().hex[:12])
+
+
+def _pack_prefix(location: StorageLocation) -> str:
+    if location.blob_name is None:
+        raise ValueError("No blob name given")
+    return location.blob_name.rstrip("/") + "/"
+
+
+def _connector(location: StorageLocation) -> BaseConnector:
+    from wiser.gcloud.storage.services.storage_service import Storage
+
+    return Storage._connector(location=location)
+
+
+class PackWriter:
+    """
+    Append-only writer bundling many small objects into large pack blobs under a
+    prefix. The objects are encoded by the extension of their name, as by
+    `Storage.save()`, and buffered locally; every `pack_size` bytes a pack blob is
+    uploaded, followed by its index mapping the names to their byte ranges. An
+    object written again or deleted is shadowed by the later pack.
+    """
+
+    def __init__(self, location: StorageLocation, pack_size: int = DEFAULT_PACK_SIZE):
+        """
+        @param location: the location whose blob name is the prefix of the packs
+        @param pack_size: the size of the buffered objects triggering the upload of a pack
+        """
+        self.location = location
+        self.pack_size = pack_size
+        self._prefix = _pack_prefix(location=location)
+        self._lock = threading.Lock()
+        self._buffer = None
+        self._entries: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def add(self, name: str, obj: Any, raw: bool = False) -> None:
+        """
+        Adds an object to the pack being written
+
+        @param name: the logical name of the object, e.g. 'cats/1.png'
+        @param obj: the object, encoded by the extension of the name
+        @param raw: if True, the object is bytes stored as they are
+        @return: None
+        """
+        from tempfile import TemporaryFile
+
+        data = bytes(obj) if raw else codecs.encode(obj=obj, filename=name)
+        with self._lock:
+            if self._buffer is None:
+                self._buffer = TemporaryFile()
+            offset = self._buffer.tell()
+            self._buffer.write(data)
+            self._entries[name] = (offset, len(data))
+            full = self._buffer.tell() >= self.pack_size
+        if full:
+            self.flush()
+
+    def delete(self, name: str) -> None:
+        """
+        Deletes an object, hiding it from the readers once the pack is flushed
+
+        @param name: the logical name of the object
+        @return: None
+        """
+        with self._lock:
+            self._entries[name] = None
+
+    def flush(self) -> Optional[str]:
+        """
+        Uploads the buffered objects as a pack and its index
+
+        @return: the id of the pack, None if there was nothing to flush
+        """
+        with self._lock:
+            buffer, entries = self._buffer, self._entries
+            self._buffer, self._entries = None, {}
+        if not entries:
+            return None
+        return _write_pack(location=self.location, buffer=buffer, entries=entries)
+
+    def close(self) -> None:
+        """
+        Flushes the buffered objects
+
+        @return: None
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        elif self._buffer is not None:
+            self._buffer.close()
+
+
+def _write_pack(
+    location: StorageLocation,
+    buffer,
+    entries: Dict[str, Optional[Tuple[int, int]]],
+    timestamp: int = None,
+) -> str:
+    connector = _connector(location=location)
+    prefix = _pack_prefix(location=location)
+    pack_id = _new_pack_id(timestamp=timestamp)
+
+    has_data = buffer is not None and buffer.tell() > 0
+    if has_data:
+        buffer.seek(0)
+        connector.upload_from_file(
+            file_handle=buffer,
+            bucket_name=location.bucket,
+            destination_blob_name=prefix + pack_id + PACK_SUFFIX,
+            if_generation_match=0,
+        )
+    if buffer is not None:
+        buffer.close()
+
+    # The index is written last: a pack is visible only once complete
+    index = {
+        "format": FORMAT_VERSION,
+        "pack": pack_id + PACK_SUFFIX if has_data else None,
+        "entries": {
+            name: list(entry) if entry is not None else None
+            for name, entry in entries.items()
+        },
+    }
+    connector.upload_from_string(
+        data=json.dumps(index, sort_keys=True, separators=(",", ":")),
+        bucket_name=location.bucket,
+        destination_blob_name=prefix + pack_id + INDEX_SUFFIX,
+        if_generation_match=0,
+    )
+    return pack_id
+
+
+class PackReader:
+    """
+    Reader of the objects packed under a prefix. The indexes are loaded once, by
+    `refresh()`; reading an object is a single range request on its pack, and
+    reading many objects coalesces the close ranges of each pack.
+    """
+
+    def __init__(self, location: StorageLocation, max_workers: int = 8):
+        """
+        @param location: the location whose blob name is the prefix of the packs
+        @param max_workers: the number of packs read in parallel by `get_many()`
+        """
+        self.location = location
+        self.max_workers = max_workers
+        self._prefix = _pack_prefix(location=location)
+        # name -> (pack blob name, offset, size) of the live objects
+        self._objects: Dict[str, Tuple[str, int, int]] = {}
+        # index id -> index content
+        self._indexes: Dict[str, dict] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Loads the indexes of the packs written since the last refresh
+
+        @return: None
+        """
+        connector = _connector(location=self.location)
+        index_ids = sorted(
+            blob_name[len(self._prefix) : -len(INDEX_SUFFIX)]
+            for blob_name in connector.list_blobs(
+                bucket_name=self.location.bucket, prefix=self._prefix, delimiter="/"
+            )
+            if blob_name.endswith(INDEX_SUFFIX)
+        )
+        indexes = {}
+        for index_id in index_ids:
+            if index_id in self._indexes:
+                indexes[index_id] = self._indexes[index_id]
+                continue
+            index = json.loads(
+                connector.download_as_string(
+                    bucket_name=self.location.bucket,
+                    source_blob_name=self._prefix + index_id + INDEX_SUFFIX,
+                )
+            )
+            if index["format"] > FORMAT_VERSION:
+                raise ValueError("Unsupported pack index format")
+            indexes[index_id] = index
+
+        objects = {}
+        for index_id in index_ids:
+            index = indexes[index_id]
+            for name, entry in index["entries"].items():
+                if entry is None:
+                    objects.pop(name, None)
+                else:
+                    objects[name] = (self._prefix + index["pack"], entry[0], entry[1])
+        self._indexes, self._objects = indexes, objects
+
+    def _name(self, key: Union[str, StorageLocation]) -> str:
+        if isinstance(key, str):
+            return key
+        if key.bucket != self.location.bucket or not (key.blob_name or "").startswith(
+            self._prefix
+        ):
+            raise ValueError("The location is not under the prefix of the packs")
+        return key.blob_name[len(self._prefix) :]
+
+    def names(self) -> List[str]:
+        """
+        Returns the names of the packed objects
+
+        @return: the sorted list of names
+        """
+        return sorted(self._objects)
+
+    def __contains__(self, key: Union[str, StorageLocation]) -> bool:
+        return self._name(key=key) in self._objects
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def get_bytes(self, key: Union[str, StorageLocation]) -> bytes:
+        """
+        Returns the content of an object
+
+        @param key: the logical name of the object, or its location under the prefix
+        @return: the content
+        """
+        name = self._name(key=key)
+        if name not in self._objects:
+            raise KeyError(name)
+        pack, offset, size = self._objects[name]
+        if size == 0:
+            return b""
+        return _connector(location=self.location).download_range(
+            bucket_name=self.location.bucket,
+            source_blob_name=pack,
+            start=offset,
+            end=offset + size - 1,
+        )
+
+    def get(self, key: Union[str, StorageLocation]) -> Any:
+        """
+        Returns an object decoded by the extension of its name, as by `Storage.get()`
+
+        @param key: the logical name of the object, or its location under the prefix
+        @return: the decoded object
+        """
+        name = self._name(key=key)
+        return codecs.decode(data=self.get_bytes(key=name), filename=name)
+
+    def get_many(
+        self,
+        keys: List[Union[str, StorageLocation]],
+        raw: bool = False,
+        max_gap: int = DEFAULT_MAX_GAP,
+    ) -> List[Any]:
+        """
+        Returns many objects, merging the ranges of the same pack closer than
+        `max_gap` bytes into single requests
+
+        @param keys: the logical names of the objects, or their locations
+        @param raw: if True, the contents are returned without decoding
+        @param max_gap: the maximum number of unrequested bytes between two merged ranges
+        @return: the objects, in the order of the keys
+        """
+        names = [self._name(key=key) for key in keys]
+        for name in names:
+            if name not in self._objects:
+                raise KeyError(name)
+
+        by_pack: Dict[str, List[str]] = {}
+        for name in set(names):
+            by_pack.setdefault(self._objects[name][0], []).append(name)
+
+        connector = _connector(location=self.location)
+        contents = {}
+
+        def read(pack: str) -> None:
+            ranges = [
+                (
+                    self._objects[name][1],
+                    self._objects[name][1] + self._objects[name][2],
+                )
+                for name in by_pack[pack]
+            ]
+            requests = coalesce_ranges(ranges=ranges, max_gap=max_gap)
+            data = [
+                connector.download_range(
+                    bucket_name=self.location.bucket,
+                    source_blob_name=pack,
+                    start=start,
+                    end=stop - 1,
+                )
+                for start, stop in requests
+            ]
+            for name, byte_range in zip(by_pack[pack], ranges):
+                contents[name] = bytes(
+                    extract_ranges(ranges=[byte_range], requests=requests, data=data)
+                )
+
+        packs = list(by_pack)
+        if len(packs) <= 1 or self.max_workers <= 1:
+            for pack in packs:
+                read(pack)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(read, packs))
+
+        if raw:
+            return [contents[name] for name in names]
+        return [codecs.decode(data=contents[name], filename=name) for name in names]
+
+    def compact(
+        self,
+        min_live_ratio: float = 0.5,
+        small_pack_size: int = DEFAULT_PACK_SIZE // 4,
+        pack_size: int = DEFAULT_PACK_SIZE,
+    ) -> List[str]:
+        """
+        Rewrites the live objects of the packs mostly made of shadowed or deleted
+        objects, and of the small packs, into new packs, then deletes the rewritten
+        packs. Packs written concurrently are not rewritten and still take precedence
+
+        @param min_live_ratio: packs whose live bytes are below this ratio are rewritten
+        @param small_pack_size: packs smaller than this are merged together
+        @param pack_size: the size of the packs written
+        @return: the ids of the rewritten packs
+        """
+        from tempfile import TemporaryFile
+
+        self.refresh()
+        live_bytes: Dict[str, int] = {}
+        for pack, _, size in self._objects.values():
+            live_bytes[pack] = live_bytes.get(pack, 0) + size
+
+        rewritten = []
+        for index_id, index in self._indexes.items():
+            total = sum(entry[1] for entry in index["entries"].values() if entry)
+            pack = self._prefix + index["pack"] if index["pack"] else None
+            live = live_bytes.get(pack, 0)
+            if total == 0 or live < min_live_ratio * total or total < small_pack_size:
+                rewritten.append(index_id)
+        if not rewritten:
+            return []
+        # A single pack without garbage would be rewritten as it is
+        if len(rewritten) == 1:
+            index = self._indexes[rewritten[0]]
+            pack = self._prefix + index["pack"] if index["pack"] else None
+            total = sum(entry[1] for entry in index["entries"].values() if entry)
+            if total > 0 and live_bytes.get(pack, 0) == total:
+                return []
+
+        rewritten_packs = {
+            self._prefix + self._indexes[index_id]["pack"]
+            for index_id in rewritten
+            if self._indexes[index_id]["pack"]
+        }
+        moved = sorted(
+            name for name, entry in self._objects.items() if entry[0] in rewritten_packs
+        )
+        # Deletions still shadowing objects of the kept packs are carried over
+        kept_names = set()
+        for index_id, index in self._indexes.items():
+            if index_id not in rewritten:
+                kept_names.update(index["entries"])
+        tombstones = {
+            name
+            for index_id in rewritten
+            for name, entry in self._indexes[index_id]["entries"].items()
+            if entry is None and name in kept_names and name not in self._objects
+        }
+
+        # The new packs take the time of the newest rewritten pack, so that they keep
+        # their precedence over the other packs
+        timestamp = int(max(rewritten).split("-")[0])
+        buffer, entries = None, {name: None for name in tombstones}
+        for start in range(0, len(moved), 256):
+            batch = moved[start : start + 256]
+            for name, data in zip(batch, self.get_many(keys=batch, raw=True)):
+                if buffer is None:
+                    buffer = TemporaryFile()
+                entries[name] = (buffer.tell(), len(data))
+                buffer.write(data)
+                if buffer.tell() >= pack_size:
+                    _write_pack(
+                        location=self.location,
+                        buffer=buffer,
+                        entries=entries,
+                        timestamp=timestamp,
+                    )
+                    buffer, entries = None, {}
+        if entries:
+            _write_pack(
+                location=self.location,
+                buffer=buffer,
+                entries=entries,
+                timestamp=timestamp,
+            )
+        elif buffer is not None:
+            buffer.close()
+
+        connector = _connector(location=self.location)
+        for index_id in rewritten:
+            # The index goes first, so that readers never see an index without pack
+            connector.delete(
+                bucket_name=self.location.bucket,
+                blob_name=self._prefix + index_id + INDEX_SUFFIX,
+            )
+            if self._indexes[index_id]["pack"]:
+                connector.delete(
+                    bucket_name=self.location.bucket,
+                    blob_name=self._prefix + self._indexes[index_id]["pack"],
+                )
+        self.refresh()
+        return sorted(rewritten)
@@ -1,136 +1,1405 @@
+from __future__ import annotations
+
 import json
+import os
+import threading
 
 from tempfile import TemporaryFile, NamedTemporaryFile
-from typing import Any
-
-import numpy as np
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from wiser.gcloud.storage.connectors.storage_connector import StorageConnector
-from wiser.gcloud.storage.types.location import (
-    StorageLocation,
-    StorageLocationBuilder,
+from wiser.gcloud.storage.connectors.registry import ConnectorRegistry
+from wiser.gcloud.storage.utils import checksums, profiling
+from wiser.gcloud.storage.utils.dataframes import (
+    FEATHER,
+    PARQUET,
+    dataframe_extension,
+)
+from wiser.gcloud.storage.utils.single_flight import SingleFlight
+from wiser.gcloud.storage.utils.ranges import (
+    DEFAULT_MAX_GAP,
+    coalesce_ranges,
+    extract_ranges,
 )
 from wiser.core.types.extensions import FileExtension
 
+# numpy, pydantic and the Google Cloud client are imported by the code paths needing
+# them, so that importing this module stays fast
+if TYPE_CHECKING:
+    import numpy as np
+
+    from concurrent.futures import Executor, Future
+
+    from wiser.gcloud.storage.connectors.base_connector import BaseConnector
+    from wiser.gcloud.storage.services.background_writer import BackgroundWriter
+    from wiser.gcloud.storage.services.chunked_array import ChunkedArray
+    from wiser.gcloud.storage.services.content_store import ContentStore
+    from wiser.gcloud.storage.services.decode_pool import DecodePool
+    from wiser.gcloud.storage.services.listing_cache import ListingCache
+    from wiser.gcloud.storage.services.pack_store import PackReader, PackWriter
+    from wiser.gcloud.storage.utils.profiling import Profile
+    from wiser.gcloud.storage.utils.range_file import RangeFile
+    from wiser.gcloud.storage.types.location import StorageLocation
+    from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+    from wiser.gcloud.storage.types.usage import PrefixUsage
+
+# Size of the ranges downloaded while indexing the lines of a text file
+LINE_INDEX_CHUNK_SIZE = 8 * 1024 * 1024
+# Size of the ranges downloaded while filling a shared memory segment
+SHARED_MEMORY_CHUNK_SIZE = 64 * 1024 * 1024
+# Size of the chunks .csv blobs are downloaded and parsed by
+CSV_CHUNK_SIZE = 8 * 1024 * 1024
+# Chunks parsed ahead of the rows returned, with a decode pool
+CSV_PREFETCH_CHUNKS = 8
+# Size of the ranges local files are downloaded by, and retries of a corrupted download
+FILE_CHUNK_SIZE = 32 * 1024 * 1024
+FILE_DOWNLOAD_RETRIES = 3
+# Methods URLs are signed for, and the longest validity of V4 signed URLs in seconds
+SIGNED_URL_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+MAX_SIGNED_URL_TTL = 7 * 24 * 3600
+
 
 class Storage:
+    # Calls made with `coalesce=True` share the in-flight call for the same location
+    _single_flight = SingleFlight()
+    # Cache of the listings of `get_list_content()`, see `set_listing_cache()`
+    _listing_cache: Optional[ListingCache] = None
+    # Writer of `save_async()` and `append_async()`, see `set_background_writer()`
+    _background_writer: Optional[BackgroundWriter] = None
+    _background_writer_lock = threading.Lock()
+
+    @staticmethod
+    def set_listing_cache(cache: Optional[ListingCache]) -> None:
+        """
+        Sets the cache of the listings of `get_list_content()`, shared by all the calls
+        of the process
+
+        @param cache: the listing cache, None to list on every call
+        @return: None
+        """
+        Storage._listing_cache = cache
+
+    @staticmethod
+    def set_background_writer(writer: Optional[BackgroundWriter]) -> None:
+        """
+        Sets the writer of `save_async()` and `append_async()`, shared by all the calls
+        of the process
+
+        @param writer: the background writer, None for a default one built on first use
+        @return: None
+        """
+        with Storage._background_writer_lock:
+            Storage._background_writer = writer
+
+    @staticmethod
+    def _writer() -> BackgroundWriter:
+        if Storage._background_writer is None:
+            with Storage._background_writer_lock:
+                if Storage._background_writer is None:
+                    from wiser.gcloud.storage.services.background_writer import (
+                        BackgroundWriter,
+                    )
+
+                    Storage._background_writer = BackgroundWriter()
+        return Storage._background_writer
+
+    @staticmethod
+    def profile() -> Profile:
+        """
+        Returns a profile recording the wall and CPU time of the operations of this
+        process, per phase, while used as context manager, e.g.
+        `with Storage.profile() as profile: ...` then `print(profile.report())` or
+        `profile.dump_chrome_trace(path="trace.json")`
+
+        @return: the profile, recording within its `with` block
+        """
+        from wiser.gcloud.storage.utils.profiling import Profile
+
+        return Profile()
+
     @staticmethod
-    def get(location: StorageLocation = None) -> Any:
+    @profiling.profiled(name="get")
+    def get(
+        location: StorageLocation = None,
+        decode_pool: DecodePool = None,
+        shared_memory: bool = False,
+        coalesce: bool = False,
+    ) -> Any:
         if location.blob_name is None:
             raise ValueError("No blob name given")
 
+        if coalesce:
+            # Concurrent callers receive the same object, which must not be modified
+            return Storage._single_flight.do(
+                key=("get", location.complete_path(), shared_memory),
+                fn=lambda: Storage.get(
+                    location=location,
+                    decode_pool=decode_pool,
+                    shared_memory=shared_memory,
+                ),
+            )
+
+        if shared_memory:
+            if not location.filename.endswith(FileExtension.NUMPY):
+                raise ValueError("Only .npy blobs can be shared")
+            return Storage._get_shared_array(location=location)
+
+        if decode_pool is not None:
+            return decode_pool.get(location=location)
+
         if location.filename.endswith(FileExtension.NUMPY):
-            tmp_file = NamedTemporaryFile()
-            StorageConnector.download_to_filename(
+            import numpy as np
+
+            with profiling.phase(name=profiling.TEMPFILE):
+                tmp_file = NamedTemporaryFile()
+            Storage._connector(location=location).download_to_filename(
                 filename=tmp_file.name,
                 bucket_name=location.bucket,
                 source_blob_name=location.blob_name,
             )
-            tmp_file.seek(0)
-            data = np.load(tmp_file)
-            tmp_file.close()
+            with profiling.phase(name=profiling.DECODE):
+                tmp_file.seek(0)
+                data = np.load(tmp_file)
+            with profiling.phase(name=profiling.TEMPFILE):
+                tmp_file.close()
             return data
 
         elif location.filename.endswith(
             FileExtension.JPG
         ) or location.filename.endswith(FileExtension.PNG):
-            return StorageConnector.download_as_bytes(
+            return Storage._connector(location=location).download_as_bytes(
                 bucket_name=location.bucket, source_blob_name=location.blob_name
             )
 
         elif location.filename.endswith(FileExtension.JSON):
-            data = StorageConnector.download_as_string(
+            data = Storage._connector(location=location).download_as_string(
                 bucket_name=location.bucket, source_blob_name=location.blob_name
             )
-            return json.loads(data)
+            with profiling.phase(name=profiling.DECODE):
+                return json.loads(data)
         elif location.filename.endswith(FileExtension.TEXT):
-            data = StorageConnector.download_as_string(
+            data = Storage._connector(location=location).download_as_string(
                 bucket_name=location.bucket, source_blob_name=location.blob_name
             )
             return data
         elif location.filename.endswith(FileExtension.CSV):
-            data = StorageConnector.download_as_string(
+            data = Storage._connector(location=location).download_as_string(
                 bucket_name=location.bucket, source_blob_name=location.blob_name
             )
             return data
         elif location.filename.endswith(FileExtension.PDF):
-            data = StorageConnector.download_as_bytes(
+            data = Storage._connector(location=location).download_as_bytes(
                 bucket_name=location.bucket, source_blob_name=location.blob_name
             )
             return data
+        elif location.filename.endswith(PARQUET) or location.filename.endswith(FEATHER):
+            return Storage.get_dataframe(location=location)
         else:
             raise ValueError("File extension not managed")
 
     @staticmethod
-    def save(obj, location: StorageLocation = None) -> None:
-        if location.filename.endswith(FileExtension.NUMPY):
-            tmp_file = TemporaryFile()
-            np.save(tmp_file, obj)
-            tmp_file.seek(0)
-            StorageConnector.upload_from_file(
-                tmp_file,
-                bucket_name=location.bucket,
-                destination_blob_name=location.blob_name,
+    @profiling.profiled(name="get_dataframe")
+    def get_dataframe(
+        location: StorageLocation,
+        columns: List[str] = None,
+        filters: List = None,
+        row_groups: List[int] = None,
+        as_arrow: bool = False,
+    ) -> Any:
+        """
+        Reads a .parquet, .feather or .csv blob as a DataFrame. Parquet and Feather
+        blobs are read with range requests: only the footer and the chunks of the
+        requested columns and row groups are downloaded
+
+        @param location: the location of the blob
+        @param columns: the columns to read, None for all
+        @param filters: Parquet only, row filters in pyarrow format, e.g. [("year", ">=", 2020)]
+        @param row_groups: Parquet only, the indexes of the row groups to read
+        @param as_arrow: True to return a pyarrow Table instead of a pandas DataFrame
+        @return: the pandas DataFrame or pyarrow Table
+        """
+        from wiser.gcloud.storage.utils.dataframes import _import_pyarrow, read_table
+
+        pa = _import_pyarrow()
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        extension = dataframe_extension(filename=location.filename)
+        if extension is None:
+            raise ValueError("Only .parquet, .feather and .csv blobs are DataFrames")
+
+        if extension == FileExtension.CSV:
+            # The whole file is parsed: it is downloaded at once, without decoding
+            file = pa.BufferReader(
+                Storage._connector(location=location).download_as_bytes(
+                    bucket_name=location.bucket, source_blob_name=location.blob_name
+                )
+            )
+        else:
+            file = Storage.open_range_file(location=location)
+
+        with profiling.phase(name=profiling.DECODE):
+            table = read_table(
+                file=file,
+                extension=extension,
+                columns=columns,
+                filters=filters,
+                row_groups=row_groups,
+            )
+            return table if as_arrow else table.to_pandas()
+
+    @staticmethod
+    def open_range_file(location: StorageLocation) -> RangeFile:
+        """
+        Returns a read-only seekable file over a blob, whose reads are range requests
+        pinned to the current generation of the blob
+
+        @param location: the location of the blob
+        @return: the file
+        """
+        from wiser.gcloud.storage.utils.range_file import RangeFile
+
+        metadata = Storage._connector(location=location).get_metadata(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        if metadata is None:
+            raise ValueError("Blob does not exist")
+
+        return RangeFile(
+            read_range=lambda start, end: Storage.get_range(
+                location=location,
+                start=start,
+                end=end,
+                generation=metadata.generation,
+            ),
+            size=metadata.size,
+        )
+
+    @staticmethod
+    @profiling.profiled(name="get_range")
+    def get_range(
+        location: StorageLocation, start: int, end: int, generation: int = None
+    ) -> bytes:
+        """
+        Returns a range of the content of a blob as bytes
+
+        @param location: the location of the blob
+        @param start: the first byte to read
+        @param end: the last byte to read (included)
+        @param generation: the generation of the blob to read, the live one if None
+        @return: the content of the range
+        """
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+
+        return Storage._connector(location=location).download_range(
+            bucket_name=location.bucket,
+            source_blob_name=location.blob_name,
+            start=start,
+            end=end,
+            generation=generation,
+        )
+
+    @staticmethod
+    def _get_npy_header(location: StorageLocation, generation: int = None) -> bytes:
+        from wiser.gcloud.storage.utils.npy import (
+            NPY_HEADER_PROBE_SIZE,
+            npy_header_size,
+        )
+
+        header = Storage.get_range(
+            location=location,
+            start=0,
+            end=NPY_HEADER_PROBE_SIZE - 1,
+            generation=generation,
+        )
+        header_size = npy_header_size(header)
+        if header_size > len(header):
+            header = Storage.get_range(
+                location=location, start=0, end=header_size - 1, generation=generation
+            )
+        return header
+
+    @staticmethod
+    def _get_shared_array(location: StorageLocation) -> np.ndarray:
+        from wiser.gcloud.storage.utils.npy import parse_npy_header
+        from wiser.gcloud.storage.utils.shared_registry import acquire_shared_array
+
+        metadata = Storage._connector(location=location).get_metadata(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        if metadata is None:
+            raise ValueError("Blob does not exist")
+        generation = metadata.generation
+
+        def read_header() -> bytes:
+            header = Storage._get_npy_header(location=location, generation=generation)
+            if parse_npy_header(header)[2].hasobject:
+                raise ValueError("Arrays of Python objects cannot be shared")
+            return header
+
+        def fill(buffer: memoryview, data_offset: int) -> None:
+            for start in range(0, len(buffer), SHARED_MEMORY_CHUNK_SIZE):
+                stop = min(start + SHARED_MEMORY_CHUNK_SIZE, len(buffer))
+                buffer[start:stop] = Storage.get_range(
+                    location=location,
+                    start=data_offset + start,
+                    end=data_offset + stop - 1,
+                    generation=generation,
+                )
+
+        return acquire_shared_array(
+            key="{}{}/{}#{}".format(
+                location.prefix, location.bucket, location.blob_name, generation
+            ),
+            read_header=read_header,
+            fill=fill,
+        )
+
+    @staticmethod
+    @profiling.profiled(name="get_array_slice")
+    def get_array_slice(
+        location: StorageLocation,
+        index: Union[int, slice, tuple],
+        max_gap: int = DEFAULT_MAX_GAP,
+    ) -> np.ndarray:
+        """
+        Returns `array[index]` of a .npy blob downloading only the bytes needed
+
+        @param location: the location of the .npy blob
+        @param index: an integer, a slice or a tuple of integers and slices
+        @param max_gap: ranges closer than `max_gap` bytes are downloaded with one request
+        @return: the selected part of the array
+        """
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        if not location.filename.endswith(FileExtension.NUMPY):
+            raise ValueError("Slices can be read only from .npy blobs")
+
+        import numpy as np
+        from wiser.gcloud.storage.utils.npy import npy_slice_ranges, parse_npy_header
+
+        # The header and the data are read from the same generation, so that an
+        # overwrite meanwhile fails the read instead of mixing two arrays
+        metadata = Storage._connector(location=location).get_metadata(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        if metadata is None:
+            raise ValueError("Blob does not exist")
+        generation = metadata.generation
+
+        header = Storage._get_npy_header(location=location, generation=generation)
+        shape, fortran_order, dtype, data_offset = parse_npy_header(header)
+        if fortran_order or dtype.hasobject:
+            raise ValueError("Only C-contiguous arrays of plain data can be sliced")
+
+        ranges, out_shape = npy_slice_ranges(
+            shape=shape, itemsize=dtype.itemsize, index=index
+        )
+        ranges = [(start + data_offset, stop + data_offset) for start, stop in ranges]
+        requests = coalesce_ranges(ranges=ranges, max_gap=max_gap)
+        data = [
+            Storage.get_range(
+                location=location, start=start, end=stop - 1, generation=generation
+            )
+            for start, stop in requests
+        ]
+
+        array = np.frombuffer(
+            extract_ranges(ranges=ranges, requests=requests, data=data), dtype=dtype
+        ).reshape(out_shape)
+        if len(out_shape) == 0:
+            return array[()]
+        return array
+
+    @staticmethod
+    def get_line_index(
+        location: StorageLocation, chunk_size: int = LINE_INDEX_CHUNK_SIZE
+    ) -> np.ndarray:
+        """
+        Returns the offsets of the lines of a text blob, reading it in chunks
+
+        @param location: the location of the text blob
+        @param chunk_size: the size in bytes of each downloaded chunk
+        @return: the offset of the start of each line followed by the size of the blob
+        """
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+
+        import numpy as np
+
+        size = Storage._connector(location=location).get_size(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+
+        offsets = [np.zeros(1, dtype=np.int64)]
+        for start in range(0, size, chunk_size):
+            chunk = Storage.get_range(
+                location=location, start=start, end=min(start + chunk_size, size) - 1
             )
-            tmp_file.close()
+            newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+            offsets.append(newlines.astype(np.int64) + start + 1)
+        index = np.concatenate(offsets)
+
+        if index[-1] != size:
+            index = np.append(index, size)
+        return index
+
+    @staticmethod
+    @profiling.profiled(name="get_lines")
+    def get_lines(
+        location: StorageLocation,
+        start: int = None,
+        stop: int = None,
+        index: np.ndarray = None,
+    ) -> List[str]:
+        """
+        Returns the lines in [start, stop) of a .csv or .txt blob with a single range request
+
+        @param location: the location of the text blob
+        @param start: the first line to read
+        @param stop: the line where to stop reading (excluded)
+        @param index: the index returned by `get_line_index()`, built if not given
+        @return: the lines, without line terminators
+        """
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        if not (
+            location.filename.endswith(FileExtension.CSV)
+            or location.filename.endswith(FileExtension.TEXT)
+        ):
+            raise ValueError("Lines can be read only from .csv and .txt blobs")
+
+        if index is None:
+            index = Storage.get_line_index(location=location)
+        start, stop, _ = slice(start, stop).indices(len(index) - 1)
+        if start >= stop:
+            return []
+
+        text = Storage.get_range(
+            location=location, start=int(index[start]), end=int(index[stop]) - 1
+        ).decode("utf-8")
+        lines = text.split("\n")
+        if text.endswith("\n"):
+            lines.pop()
+        return [line.rstrip("\r") for line in lines]
+
+    @staticmethod
+    def iter_csv(
+        location: StorageLocation,
+        chunk_size: int = CSV_CHUNK_SIZE,
+        decode_pool: DecodePool = None,
+        **fmtparams,
+    ) -> Iterator[List[str]]:
+        """
+        Streams the rows of a .csv blob, downloaded by range requests of `chunk_size`
+        bytes pinned to its current generation, so that the memory used does not depend
+        on the size of the blob. With a decode pool, chunks split on newlines are parsed
+        in parallel by its workers, up to `CSV_PREFETCH_CHUNKS` ahead of the returned
+        rows: quoted fields must then not hold newlines
+
+        @param location: the location of the .csv blob
+        @param chunk_size: the size of the downloaded chunks, in bytes
+        @param decode_pool: the pool of worker processes parsing the chunks, if any
+        @param fmtparams: the formatting parameters of `csv.reader()`, e.g. delimiter=';'
+        @return: an iterator over the rows, lists of strings
+        """
+        import csv
+        import io
+        from collections import deque
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        if not location.filename.endswith(FileExtension.CSV):
+            raise ValueError("Rows can be read only from .csv blobs")
+        if chunk_size <= 0:
+            raise ValueError("The chunk size must be positive")
+
+        if decode_pool is None:
+            file = io.BufferedReader(
+                Storage.open_range_file(location=location), buffer_size=chunk_size
+            )
+            yield from csv.reader(
+                io.TextIOWrapper(file, encoding="utf-8", newline=""), **fmtparams
+            )
+            return
+
+        metadata = Storage._connector(location=location).get_metadata(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        if metadata is None:
+            raise ValueError("Blob does not exist")
+        pending = deque()
+        for start in range(0, metadata.size, chunk_size):
+            pending.append(
+                decode_pool.submit_csv_chunk(
+                    location=location,
+                    size=metadata.size,
+                    start=start,
+                    end=start + chunk_size,
+                    generation=metadata.generation,
+                    **fmtparams,
+                )
+            )
+            if len(pending) >= CSV_PREFETCH_CHUNKS:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+    @staticmethod
+    @profiling.profiled(name="write_csv")
+    def write_csv(
+        location: StorageLocation,
+        rows: Iterable[Sequence],
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        metadata: ObjectMetadata = None,
+        **fmtparams,
+    ) -> int:
+        """
+        Streams rows to a .csv blob, encoded by blocks and uploaded as they are produced
+        (a resumable upload on Google Cloud Storage), so that the rows are never all in
+        memory. The blob is not written if iterating the rows raises
+
+        @param location: the location of the .csv blob
+        @param rows: the rows, sequences of values
+        @param if_generation_match: save only if the current generation of the blob matches
+        @param if_not_exists: save only if the blob does not exist yet
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @param fmtparams: the formatting parameters of `csv.writer()`, e.g. delimiter=';'
+        @return: the number of rows written
+        """
+        from wiser.gcloud.storage.utils.csv_stream import write_rows
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        if not location.filename.endswith(FileExtension.CSV):
+            raise ValueError("Rows can be written only to .csv blobs")
+
+        upload_kwargs = Storage._upload_kwargs(
+            location=location,
+            if_generation_match=if_generation_match,
+            if_not_exists=if_not_exists,
+            metadata=metadata,
+        )
+        with Storage._connector(location=location).open_writer(
+            bucket_name=location.bucket,
+            destination_blob_name=location.blob_name,
+            if_generation_match=upload_kwargs["if_generation_match"],
+            metadata=upload_kwargs["metadata"],
+        ) as file:
+            count = write_rows(file=file, rows=rows, **fmtparams)
+            size = file.tell()
+
+        if Storage._listing_cache is not None:
+            Storage._listing_cache.record_write(location=location, size=size)
+        return count
+
+    @staticmethod
+    @profiling.profiled(name="save")
+    def save(
+        obj,
+        location: StorageLocation = None,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        skip_if_identical: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        """
+        Saves an object to a blob, encoding it according to the extension of the blob
+
+        @param obj: the object to save
+        @param location: the destination location
+        @param if_generation_match: save only if the current generation of the blob matches
+        @param if_not_exists: save only if the blob does not exist yet
+        @param skip_if_identical: do not upload if the blob already holds the same content and metadata
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @return: None
+        """
+        upload_kwargs = Storage._upload_kwargs(
+            location=location,
+            if_generation_match=if_generation_match,
+            if_not_exists=if_not_exists,
+            skip_if_identical=skip_if_identical,
+            metadata=metadata,
+        )
+
+        if location.filename.endswith(FileExtension.NUMPY):
+            import numpy as np
+
+            with profiling.phase(name=profiling.TEMPFILE):
+                tmp_file = TemporaryFile()
+            with profiling.phase(name=profiling.ENCODE):
+                np.save(tmp_file, obj)
+                tmp_file.seek(0)
+            Storage._upload(file_handle=tmp_file, **upload_kwargs)
+            with profiling.phase(name=profiling.TEMPFILE):
+                tmp_file.close()
 
         elif location.filename.endswith(
             FileExtension.JPG
         ) or location.filename.endswith(FileExtension.PNG):
-            tmp_file = NamedTemporaryFile()
-            tmp_file.name = location.filename
-            obj.save(tmp_file)
-            tmp_file.seek(0)
-            StorageConnector.upload_from_file(
-                tmp_file,
-                bucket_name=location.bucket,
-                destination_blob_name=location.blob_name,
-            )
-            tmp_file.close()
+            Storage.save_image(obj=obj, **upload_kwargs)
 
         elif location.filename.endswith(FileExtension.TEXT):
             data = obj
-            StorageConnector.upload_from_string(
-                data=data,
-                bucket_name=location.bucket,
-                destination_blob_name=location.blob_name,
-            )
+            Storage._upload(data=data, **upload_kwargs)
         elif location.filename.endswith(FileExtension.CSV):
             data = obj
-            StorageConnector.upload_from_string(
-                data=data,
+            Storage._upload(data=data, **upload_kwargs)
+        elif location.filename.endswith(FileExtension.JSON):
+            with profiling.phase(name=profiling.ENCODE):
+                data = json.dumps(obj=obj, sort_keys=True, indent=4, ensure_ascii=False)
+            Storage._upload(data=data, **upload_kwargs)
+        elif location.filename.endswith(FileExtension.PDF):
+            from wiser.gcloud.storage.utils.local_files import open_mapped
+
+            with open_mapped(path=obj) as f:
+                Storage._upload(file_handle=f, **upload_kwargs)
+        elif location.filename.endswith(PARQUET) or location.filename.endswith(FEATHER):
+            Storage.save_dataframe(obj=obj, **upload_kwargs)
+        else:
+            raise ValueError("File extension not managed")
+
+    @staticmethod
+    def save_async(
+        obj,
+        location: StorageLocation,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> Future:
+        """
+        Saves an object to a blob in background: the object is encoded, then uploaded by
+        the background writer, see `set_background_writer()`
+
+        @param obj: the object to save
+        @param location: the destination location
+        @param if_generation_match: save only if the current generation of the blob matches
+        @param if_not_exists: save only if the blob does not exist yet
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @return: the future of the upload, raising its error if any
+        """
+        return Storage._writer().save(
+            obj=obj,
+            location=location,
+            if_generation_match=if_generation_match,
+            if_not_exists=if_not_exists,
+            metadata=metadata,
+        )
+
+    @staticmethod
+    def append_async(record, location: StorageLocation) -> None:
+        """
+        Appends a JSON-serializable record to a folder in background: the records are
+        grouped into JSON array objects uploaded by the background writer
+
+        @param record: the record
+        @param location: the location of the folder
+        @return: None
+        """
+        Storage._writer().append(record=record, location=location)
+
+    @staticmethod
+    def flush_async() -> None:
+        """
+        Uploads the pending writes of `save_async()` and `append_async()`, raising the
+        first upload error since the last flush, if any
+
+        @return: None
+        """
+        if Storage._background_writer is not None:
+            Storage._background_writer.flush()
+
+    @staticmethod
+    @profiling.profiled(name="upload_file")
+    def upload_file(
+        path: str,
+        location: StorageLocation,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        skip_if_identical: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        """
+        Uploads a local file of any type to a blob, streamed through a memory map
+
+        @param path: the path of the local file
+        @param location: the destination location
+        @param if_generation_match: upload only if the current generation of the blob matches
+        @param if_not_exists: upload only if the blob does not exist yet
+        @param skip_if_identical: do not upload if the blob already holds the same content and metadata
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @return: None
+        """
+        from wiser.gcloud.storage.utils.local_files import open_mapped
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        upload_kwargs = Storage._upload_kwargs(
+            location=location,
+            if_generation_match=if_generation_match,
+            if_not_exists=if_not_exists,
+            skip_if_identical=skip_if_identical,
+            metadata=metadata,
+        )
+
+        with open_mapped(path=path) as f:
+            Storage._upload(file_handle=f, **upload_kwargs)
+
+    @staticmethod
+    @profiling.profiled(name="download_file")
+    def download_file(
+        location: StorageLocation,
+        path: str,
+        chunk_size: int = FILE_CHUNK_SIZE,
+        max_workers: int = 4,
+        slice_threshold: int = None,
+        executor: Executor = None,
+    ) -> int:
+        """
+        Downloads a blob to a local file, as ranges of its current generation written in
+        parallel to a preallocated temporary file. The file is checked against the
+        CRC32C of the blob, downloaded again while corrupted, then renamed to the path:
+        the path never holds a partial file
+
+        @param location: the location of the blob
+        @param path: the destination path, its folders are created if needed
+        @param chunk_size: the size of the ranges
+        @param max_workers: the number of ranges downloaded in parallel
+        @param slice_threshold: the size from which blobs are downloaded as ranges,
+        smaller ones with one request, default `chunk_size`
+        @param executor: the pool downloading the ranges, e.g. shared by concurrent
+        downloads, default a pool of `max_workers` threads per download
+        @return: the size of the file
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from wiser.gcloud.storage.utils.local_files import atomic_file, preallocate
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        if chunk_size <= 0 or max_workers <= 0:
+            raise ValueError("chunk_size and max_workers must be positive")
+        connector = Storage._connector(location=location)
+        metadata = connector.get_metadata(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        if metadata is None:
+            raise ValueError("Blob does not exist")
+        if metadata.size < (slice_threshold or chunk_size):
+            chunk_size = max(metadata.size, 1)
+
+        with atomic_file(path=path) as fd:
+            with profiling.phase(name=profiling.TEMPFILE):
+                preallocate(fd=fd, size=metadata.size)
+
+            def fetch(start: int) -> Tuple[int, int]:
+                # The ranges are pinned to one generation, so that they are consistent
+                data = connector.download_range(
+                    bucket_name=location.bucket,
+                    source_blob_name=location.blob_name,
+                    start=start,
+                    end=min(start + chunk_size, metadata.size) - 1,
+                    generation=metadata.generation,
+                )
+                with profiling.phase(name=profiling.TEMPFILE):
+                    os.pwrite(fd, data, start)
+                # Checked while the range is in memory, instead of reading the file again
+                return checksums.crc32c_value(data), len(data)
+
+            starts = range(0, metadata.size, chunk_size)
+            for _ in range(FILE_DOWNLOAD_RETRIES + 1):
+                if len(starts) <= 1 or (executor is None and max_workers <= 1):
+                    blocks = [fetch(start) for start in starts]
+                elif executor is not None:
+                    blocks = list(executor.map(fetch, starts))
+                else:
+                    with ThreadPoolExecutor(
+                        max_workers=min(max_workers, len(starts))
+                    ) as pool:
+                        blocks = list(pool.map(fetch, starts))
+                # Ranges are not verified by the backends: their checksums are combined
+                # into the one of the whole blob
+                crc32c = checksums.combine_crc32c(blocks=blocks)
+                if metadata.crc32c is None or crc32c == metadata.crc32c:
+                    return metadata.size
+            # Raised within the block, so that the corrupted file is removed
+            raise IOError(
+                "Checksum mismatch downloading {}: {} instead of {}".format(
+                    location.complete_path(), crc32c, metadata.crc32c
+                )
+            )
+
+    @staticmethod
+    def upload_files(
+        paths: Sequence[str],
+        locations: Sequence[StorageLocation],
+        max_workers: int = 8,
+        if_not_exists: bool = False,
+        skip_if_identical: bool = False,
+    ) -> None:
+        """
+        Uploads many local files concurrently, see `upload_file()`
+
+        @param paths: the paths of the local files
+        @param locations: the destination locations, in the order of the paths
+        @param max_workers: the number of files uploaded in parallel
+        @param if_not_exists: upload only the blobs that do not exist yet
+        @param skip_if_identical: do not upload the blobs already holding the same content
+        @return: None
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if len(paths) != len(locations):
+            raise ValueError("One location is needed per path")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(
+                lambda path, location: Storage.upload_file(
+                    path=path,
+                    location=location,
+                    if_not_exists=if_not_exists,
+                    skip_if_identical=skip_if_identical,
+                ),
+                paths,
+                locations,
+            ):
+                pass
+
+    @staticmethod
+    def download_files(
+        locations: Sequence[StorageLocation],
+        paths: Sequence[str],
+        max_workers: int = 8,
+    ) -> List[int]:
+        """
+        Downloads many blobs to local files concurrently, one range at a time per file,
+        see `download_file()`
+
+        @param locations: the locations of the blobs
+        @param paths: the destination paths, in the order of the locations
+        @param max_workers: the number of files downloaded in parallel
+        @return: the sizes of the files, in the order of the locations
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if len(paths) != len(locations):
+            raise ValueError("One path is needed per location")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda location, path: Storage.download_file(
+                        location=location, path=path, max_workers=1
+                    ),
+                    locations,
+                    paths,
+                )
+            )
+
+    @staticmethod
+    @profiling.profiled(name="save_dataframe")
+    def save_dataframe(
+        obj,
+        location: StorageLocation,
+        compression: str = None,
+        row_group_size: int = None,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        skip_if_identical: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        """
+        Saves a pandas DataFrame or a pyarrow Table to a .parquet, .feather or .csv blob
+
+        @param obj: the DataFrame or Table
+        @param location: the destination location
+        @param compression: the compression codec, e.g. 'snappy', 'zstd' or 'lz4', None for the format default
+        @param row_group_size: Parquet only, the maximum number of rows of a row group
+        @param if_generation_match: save only if the current generation of the blob matches
+        @param if_not_exists: save only if the blob does not exist yet
+        @param skip_if_identical: do not upload if the blob already holds the same content and metadata
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @return: None
+        """
+        from wiser.gcloud.storage.utils.dataframes import to_table, write_table
+
+        extension = dataframe_extension(filename=location.filename)
+        if extension is None:
+            raise ValueError("Only .parquet, .feather and .csv blobs are DataFrames")
+
+        upload_kwargs = Storage._upload_kwargs(
+            location=location,
+            if_generation_match=if_generation_match,
+            if_not_exists=if_not_exists,
+            skip_if_identical=skip_if_identical,
+            metadata=metadata,
+        )
+        with TemporaryFile() as tmp_file:
+            with profiling.phase(name=profiling.ENCODE):
+                write_table(
+                    table=to_table(obj=obj),
+                    file=tmp_file,
+                    extension=extension,
+                    compression=compression,
+                    row_group_size=row_group_size,
+                )
+                tmp_file.seek(0)
+            Storage._upload(file_handle=tmp_file, **upload_kwargs)
+
+    @staticmethod
+    @profiling.profiled(name="get_image")
+    def get_image(
+        location: StorageLocation,
+        size: Tuple[int, int] = None,
+        mode: str = None,
+        as_array: bool = False,
+    ) -> Any:
+        """
+        Downloads and decodes a .jpg or .png blob. With a target size, JPEG images are
+        decoded directly at a reduced scale instead of at full size
+
+        @param location: the location of the image
+        @param size: the (width, height) box the image is resized to fit, keeping its aspect ratio
+        @param mode: the Pillow mode to convert the image to, e.g. 'RGB' or 'L'
+        @param as_array: if True, a numpy array is returned instead of a PIL image
+        @return: the decoded image
+        """
+        from wiser.gcloud.storage.utils.images import decode_image, image_format
+
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        image_format(filename=location.filename)
+
+        data = Storage._connector(location=location).download_as_bytes(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
+        )
+        with profiling.phase(name=profiling.DECODE):
+            return decode_image(data=data, size=size, mode=mode, as_array=as_array)
+
+    @staticmethod
+    def get_images(
+        locations: List[StorageLocation],
+        size: Tuple[int, int] = None,
+        mode: str = None,
+        as_array: bool = False,
+        decode_pool: DecodePool = None,
+    ) -> Iterator[Any]:
+        """
+        Downloads and decodes many images in worker processes, see `get_image()`
+
+        @param locations: the locations of the images
+        @param size: the (width, height) box the images are resized to fit
+        @param mode: the Pillow mode to convert the images to
+        @param as_array: if True, numpy arrays are returned, through shared memory
+        @param decode_pool: the pool of worker processes, by default a pool with one worker
+        per CPU, shut down once the images are returned
+        @return: an iterator over the decoded images, in the order of the locations
+        """
+        from wiser.gcloud.storage.services.decode_pool import DecodePool
+
+        if decode_pool is not None:
+            yield from decode_pool.map_images(
+                locations=locations, size=size, mode=mode, as_array=as_array
+            )
+            return
+
+        with DecodePool() as pool:
+            yield from pool.map_images(
+                locations=locations, size=size, mode=mode, as_array=as_array
+            )
+
+    @staticmethod
+    @profiling.profiled(name="save_image")
+    def save_image(
+        obj,
+        location: StorageLocation,
+        quality: int = None,
+        optimize: bool = False,
+        progressive: bool = False,
+        compress_level: int = None,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        skip_if_identical: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        """
+        Encodes an image in memory, in the format of the extension of the blob, and uploads it
+
+        @param obj: the PIL image, a numpy array of shape (H, W) or (H, W, C), or encoded bytes
+        @param location: the destination location, a .jpg or .png blob
+        @param quality: the JPEG quality, from 1 to 95, by default the one of Pillow
+        @param optimize: if True, JPEG Huffman tables and PNG filters are optimized, slower but smaller
+        @param progressive: if True, JPEG images are progressive
+        @param compress_level: the PNG zlib level, from 0 (fastest) to 9 (smallest)
+        @param if_generation_match: save only if the current generation of the blob matches
+        @param if_not_exists: save only if the blob does not exist yet
+        @param skip_if_identical: do not upload if the blob already holds the same content and metadata
+        @param metadata: the object metadata, the content type is inferred from the extension if not given
+        @return: None
+        """
+        import io
+
+        from wiser.gcloud.storage.utils.images import encode_image
+
+        with profiling.phase(name=profiling.ENCODE):
+            data = encode_image(
+                obj=obj,
+                filename=location.filename,
+                quality=quality,
+                optimize=optimize,
+                progressive=progressive,
+                compress_level=compress_level,
+            )
+        Storage._upload(
+            file_handle=io.BytesIO(data),
+            **Storage._upload_kwargs(
+                location=location,
+                if_generation_match=if_generation_match,
+                if_not_exists=if_not_exists,
+                skip_if_identical=skip_if_identical,
+                metadata=metadata,
+            ),
+        )
+
+    @staticmethod
+    def save_chunked(
+        obj: np.ndarray,
+        location: StorageLocation,
+        chunks: Tuple[int, ...] = None,
+        compression: Optional[str] = "zlib",
+        max_workers: int = 8,
+    ) -> ChunkedArray:
+        """
+        Saves an array as a chunked array: a metadata blob and one compressed blob per
+        chunk under the prefix given by the blob name, uploaded in parallel
+
+        @param obj: the numpy array
+        @param location: the location whose blob name is the prefix of the array
+        @param chunks: the shape of the chunks, default chunks of about 8 MiB
+        @param compression: 'zlib' or None
+        @param max_workers: the number of chunks uploaded in parallel
+        @return: the chunked array, for further reads and partial writes
+        """
+        from wiser.gcloud.storage.services.chunked_array import ChunkedArray
+
+        array = ChunkedArray.create(
+            location=location,
+            shape=obj.shape,
+            dtype=obj.dtype,
+            chunks=chunks,
+            compression=compression,
+            max_workers=max_workers,
+        )
+        array[...] = obj
+        return array
+
+    @staticmethod
+    def open_array(location: StorageLocation, max_workers: int = 8) -> ChunkedArray:
+        """
+        Opens a chunked array. Indexing it downloads only the chunks overlapping the
+        selection, assigning to a selection writes only the chunks overlapping it
+
+        @param location: the location whose blob name is the prefix of the array
+        @param max_workers: the number of chunks transferred in parallel
+        @return: the chunked array
+        """
+        from wiser.gcloud.storage.services.chunked_array import ChunkedArray
+
+        return ChunkedArray.open(location=location, max_workers=max_workers)
+
+    @staticmethod
+    def pack_writer(location: StorageLocation, pack_size: int = None) -> PackWriter:
+        """
+        Returns a writer bundling many small objects into pack blobs under a prefix,
+        instead of one blob per object
+
+        @param location: the location whose blob name is the prefix of the packs
+        @param pack_size: the size of the packs, default 64 MiB
+        @return: the pack writer, to be closed to flush the last pack
+        """
+        from wiser.gcloud.storage.services.pack_store import (
+            DEFAULT_PACK_SIZE,
+            PackWriter,
+        )
+
+        return PackWriter(
+            location=location,
+            pack_size=pack_size if pack_size is not None else DEFAULT_PACK_SIZE,
+        )
+
+    @staticmethod
+    def open_packs(location: StorageLocation, max_workers: int = 8) -> PackReader:
+        """
+        Opens the packs under a prefix. Reading an object downloads only its range
+
+        @param location: the location whose blob name is the prefix of the packs
+        @param max_workers: the number of packs read in parallel
+        @return: the pack reader
+        """
+        from wiser.gcloud.storage.services.pack_store import PackReader
+
+        return PackReader(location=location, max_workers=max_workers)
+
+    @staticmethod
+    def content_store(
+        location: StorageLocation, grace_period: float = None
+    ) -> ContentStore:
+        """
+        Returns a deduplicating store under a prefix: identical contents saved under
+        different names are uploaded and stored once
+
+        @param location: the location whose blob name is the prefix of the store
+        @param grace_period: the age, in seconds, before an unreferenced content can be deleted, default one hour
+        @return: the content store
+        """
+        from wiser.gcloud.storage.services.content_store import (
+            DEFAULT_GRACE_PERIOD,
+            ContentStore,
+        )
+
+        return ContentStore(
+            location=location,
+            grace_period=(
+                grace_period if grace_period is not None else DEFAULT_GRACE_PERIOD
+            ),
+        )
+
+    @staticmethod
+    def _upload_kwargs(
+        location: StorageLocation,
+        if_generation_match: int = None,
+        if_not_exists: bool = False,
+        skip_if_identical: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> dict:
+        from wiser.gcloud.storage.types.metadata import ObjectMetadata
+        from wiser.gcloud.storage.utils.codecs import content_type
+
+        if if_not_exists:
+            if if_generation_match not in (None, 0):
+                raise ValueError(
+                    "if_not_exists cannot be combined with a generation to match"
+                )
+            if_generation_match = 0
+
+        if metadata is None or metadata.content_type is None:
+            metadata = (metadata or ObjectMetadata()).copy(
+                update={"content_type": content_type(filename=location.filename or "")}
+            )
+
+        return dict(
+            location=location,
+            if_generation_match=if_generation_match,
+            skip_if_identical=skip_if_identical,
+            metadata=metadata,
+        )
+
+    @staticmethod
+    def _upload(
+        location: StorageLocation,
+        data: Union[bytes, str] = None,
+        file_handle: BinaryIO = None,
+        if_generation_match: int = None,
+        skip_if_identical: bool = False,
+        metadata: ObjectMetadata = None,
+    ) -> None:
+        if skip_if_identical and Storage._is_identical(
+            location=location,
+            content=file_handle if file_handle is not None else data,
+            if_generation_match=if_generation_match,
+            metadata=metadata,
+        ):
+            return
+
+        if file_handle is not None:
+            Storage._connector(location=location).upload_from_file(
+                file_handle=file_handle,
                 bucket_name=location.bucket,
                 destination_blob_name=location.blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
             )
-        elif location.filename.endswith(FileExtension.JSON):
-            data = json.dumps(obj=obj, sort_keys=True, indent=4, ensure_ascii=False)
-            StorageConnector.upload_from_string(
+        else:
+            Storage._connector(location=location).upload_from_string(
                 data=data,
                 bucket_name=location.bucket,
                 destination_blob_name=location.blob_name,
+                if_generation_match=if_generation_match,
+                metadata=metadata,
+            )
+
+        if Storage._listing_cache is not None:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            Storage._listing_cache.record_write(
+                location=location, size=None if data is None else len(data)
             )
-        elif location.filename.endswith(FileExtension.PDF):
-            with open(obj, "rb") as f:
-                StorageConnector.upload_from_file(
-                    file_handle=f,
-                    bucket_name=location.bucket,
-                    destination_blob_name=location.blob_name,
-                )
-        else:
-            raise ValueError("File extension not managed")
 
     @staticmethod
-    def exists(location: StorageLocation) -> bool:
-        return StorageConnector.exists(
+    def _is_identical(
+        location: StorageLocation,
+        content: Union[bytes, str, BinaryIO],
+        if_generation_match: int = None,
+        metadata: ObjectMetadata = None,
+    ) -> bool:
+        current = Storage._connector(location=location).get_metadata(
             bucket_name=location.bucket, source_blob_name=location.blob_name
         )
+        if current is None:
+            return False
+        # A precondition on another generation must still be enforced by the upload
+        if if_generation_match not in (None, 0, current.generation):
+            return False
+        if metadata is not None and not Storage._has_metadata(
+            current=current, metadata=metadata
+        ):
+            return False
+
+        if current.crc32c is not None:
+            return checksums.crc32c(content) == current.crc32c
+        if current.md5_hash is not None:
+            return checksums.md5(content) == current.md5_hash
+        return False
+
+    @staticmethod
+    def _has_metadata(current: BlobMetadata, metadata: ObjectMetadata) -> bool:
+        """
+        Returns True if a blob already has the requested object metadata, so that an
+        upload changing only the metadata is not skipped
+        """
+        # Headers the blob metadata does not report cannot be compared
+        if metadata.content_disposition is not None:
+            return False
+        if metadata.content_language is not None:
+            return False
+        # The content type is inferred from the extension by default: it is compared
+        # only with backends storing it
+        if current.content_type is not None and (
+            metadata.content_type != current.content_type
+        ):
+            return False
+        if metadata.cache_control != current.cache_control:
+            return False
+        if metadata.storage_class not in (None, current.storage_class):
+            return False
+        return (metadata.metadata or {}) == (current.metadata or {})
 
     @staticmethod
-    def get_list_content(location: StorageLocation) -> [StorageLocation]:
-        blobs = StorageConnector.list_blobs(
-            bucket_name=location.bucket, prefix=location.folders
+    def signed_url(
+        location: StorageLocation,
+        method: str = "GET",
+        ttl: int = 3600,
+        content_type: str = None,
+    ) -> str:
+        """
+        Returns a URL granting access to a blob without credentials, e.g. to let clients
+        download it directly instead of through `Storage.get()`
+
+        @param location: the location of the blob
+        @param method: the HTTP method the URL is signed for: 'GET', 'HEAD', 'PUT' or 'DELETE'
+        @param ttl: the validity of the URL, in seconds, up to 7 days
+        @param content_type: the content type the request must send, for 'PUT' URLs
+        @return: the signed URL
+        """
+        return Storage.signed_urls(
+            locations=[location], method=method, ttl=ttl, content_type=content_type
+        )[0]
+
+    @staticmethod
+    def signed_urls(
+        locations: List[StorageLocation],
+        method: str = "GET",
+        ttl: int = 3600,
+        content_type: str = None,
+    ) -> List[str]:
+        """
+        Returns the signed URLs of many blobs, see `signed_url()`. The URLs are signed
+        locally with the cached credentials, one batch per bucket, without a request per blob
+
+        @param locations: the locations of the blobs
+        @param method: the HTTP method the URLs are signed for: 'GET', 'HEAD', 'PUT' or 'DELETE'
+        @param ttl: the validity of the URLs, in seconds, up to 7 days
+        @param content_type: the content type the requests must send, for 'PUT' URLs
+        @return: the signed URLs, in the order of the locations
+        """
+        if method not in SIGNED_URL_METHODS:
+            raise ValueError("Method {} cannot be signed".format(method))
+        if not 0 < ttl <= MAX_SIGNED_URL_TTL:
+            raise ValueError(
+                "The ttl must be between 1 and {} seconds".format(MAX_SIGNED_URL_TTL)
+            )
+
+        batches = {}
+        for i, location in enumerate(locations):
+            if location.blob_name is None:
+                raise ValueError("No blob name given")
+            batches.setdefault((location.prefix, location.bucket), []).append(i)
+
+        urls = [None] * len(locations)
+        for indexes in batches.values():
+            first = locations[indexes[0]]
+            signed = Storage._connector(location=first).generate_signed_urls(
+                bucket_name=first.bucket,
+                blob_names=[locations[i].blob_name for i in indexes],
+                method=method,
+                expiration=ttl,
+                content_type=content_type,
+            )
+            for i, url in zip(indexes, signed):
+                urls[i] = url
+        return urls
+
+    @staticmethod
+    @profiling.profiled(name="exists")
+    def exists(location: StorageLocation, coalesce: bool = False) -> bool:
+        if coalesce:
+            return Storage._single_flight.do(
+                key=("exists", location.complete_path()),
+                fn=lambda: Storage.exists(location=location),
+            )
+
+        return Storage._connector(location=location).exists(
+            bucket_name=location.bucket, source_blob_name=location.blob_name
         )
 
+    @staticmethod
+    @profiling.profiled(name="get_list_content")
+    def get_list_content(
+        location: StorageLocation, coalesce: bool = False
+    ) -> [StorageLocation]:
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+
+        if coalesce:
+            # Concurrent callers receive the same list, which must not be modified
+            return Storage._single_flight.do(
+                key=("list", location.complete_path()),
+                fn=lambda: Storage.get_list_content(location=location),
+            )
+
+        if Storage._listing_cache is not None:
+            blobs = [
+                entry.name
+                for entry in Storage._listing_cache.entries(
+                    location=location, connector=Storage._connector(location=location)
+                )
+            ]
+        else:
+            blobs = Storage._connector(location=location).list_blobs(
+                bucket_name=location.bucket, prefix=location.folders
+            )
+
         locations_list = []
         for blob_name in blobs:
             if blob_name == location.folders:
@@ -138,6 +1407,7 @@ class Storage:
                 continue
             base_location = (
                 StorageLocationBuilder()
+                .set_prefix(prefix=location.prefix)
                 .set_bucket(bucket=location.bucket)
                 .set_blob_name(blob_name=blob_name)
                 .build()
@@ -146,18 +1416,227 @@ class Storage:
 
         return locations_list
 
+    @staticmethod
+    def glob(
+        pattern: Union[str, StorageLocation], regex: str = None
+    ) -> Iterator[StorageLocation]:
+        """
+        Yields lazily the locations of the blobs matching a glob pattern, e.g.
+        'gs://bucket/data/*/2024-*/part-*.npy'. Listing starts at the longest literal
+        prefix and descends only into the folders matching the wildcard levels; the
+        last level, and the rest of the pattern from a '**', are matched by the
+        server where supported. See `utils.glob.translate()` for the syntax
+
+        @param pattern: the URI pattern, or a location whose blob name is the pattern
+        @param regex: a regular expression the blob names must also match, anywhere
+        @return: an iterator over the matching locations
+        """
+        import re
+
+        from wiser.gcloud.storage.types.location import StorageLocationBuilder
+        from wiser.gcloud.storage.utils.glob import (
+            compile_pattern,
+            has_magic,
+            split_pattern,
+        )
+
+        location = pattern
+        if isinstance(pattern, str):
+            location = StorageLocationBuilder().from_uri(uri=pattern).build()
+        if location.blob_name is None:
+            raise ValueError("No blob name given")
+        connector = Storage._connector(location=location)
+        name_pattern = compile_pattern(pattern=location.blob_name)
+        name_regex = re.compile(regex) if regex is not None else None
+
+        def walk(prefix: str, segments: List[str]) -> Iterator[str]:
+            # Literal folders are descended into without listing
+            while len(segments) > 1 and not has_magic(segments[0]):
+                prefix, segments = prefix + segments[0] + "/", segments[1:]
+
+            recursive = any("**" in segment for segment in segments)
+            if recursive or len(segments) == 1:
+                for entry in connector.scan(
+                    bucket_name=location.bucket,
+                    prefix=prefix,
+                    delimiter=None if recursive else "/",
+                    match_glob=prefix + "/".join(segments),
+                ):
+                    if not entry.is_prefix and name_pattern.match(entry.name):
+                        yield entry.name
+                return
+
+            segment_pattern = compile_pattern(pattern=segments[0])
+            for entry in connector.scan(
+                bucket_name=location.bucket, prefix=prefix, delimiter="/"
+            ):
+                if entry.is_prefix and segment_pattern.match(
+                    entry.name[len(prefix) : -1]
+                ):
+                    yield from walk(prefix=entry.name, segments=segments[1:])
+
+        prefix, segments = split_pattern(pattern=location.blob_name)
+        for blob_name in walk(prefix=prefix, segments=segments):
+            if name_regex is not None and not name_regex.search(blob_name):
+                continue
+            yield (
+                StorageLocationBuilder()
+                .set_prefix(prefix=location.prefix)
+                .set_bucket(bucket=location.bucket)
+                .set_blob_name(blob_name=blob_name)
+                .build()
+            )
+
+    @staticmethod
+    def du(
+        location: StorageLocation, depth: int = 1, max_workers: int = 16
+    ) -> Iterator[PrefixUsage]:
+        """
+        Measures the number and the size of the blobs under a location, per prefix down
+        to `depth` folders below it. The folders are discovered by delimiter listings
+        and listed in parallel; the listings return the sizes, and only counters are
+        kept, so the memory does not grow with the number of blobs. The usages are
+        yielded as soon as known, the prefixes before their parent and the location last
+
+        @param location: the location, its blob name is the folder to measure
+        @param depth: the number of folder levels reported below the location
+        @param max_workers: the number of listings run in parallel
+        @return: an iterator over the usages of the prefixes
+        """
+        import queue
+        from concurrent.futures import ThreadPoolExecutor
+
+        from wiser.gcloud.storage.types.usage import PrefixUsage
+
+        if depth < 0:
+            raise ValueError("The depth must not be negative")
+        connector = Storage._connector(location=location)
+        root_prefix = (location.blob_name or "").rstrip("/")
+        root_prefix = root_prefix + "/" if root_prefix else ""
+
+        class Node:
+            def __init__(self, prefix: str, level: int, parent: Optional[Node]):
+                self.prefix, self.level, self.parent = prefix, level, parent
+                self.objects, self.size, self.pending, self.scanned = 0, 0, 0, False
+
+        results = queue.Queue()
+        lock = threading.Lock()
+        stopped = threading.Event()
+
+        def complete(node: Node) -> None:
+            # A prefix is complete once listed and once all its sub-prefixes are
+            while node is not None and node.scanned and node.pending == 0:
+                results.put(
+                    PrefixUsage(
+                        bucket=location.bucket,
+                        prefix=node.prefix,
+                        depth=node.level,
+                        objects=node.objects,
+                        size=node.size,
+                    )
+                )
+                if node.parent is not None:
+                    node.parent.objects += node.objects
+                    node.parent.size += node.size
+                    node.parent.pending -= 1
+                node = node.parent
+
+        def run(node: Node) -> None:
+            try:
+                objects, size, children = 0, 0, []
+                # The prefixes at the last level are listed without delimiter
+                for entry in connector.scan(
+                    bucket_name=location.bucket,
+                    prefix=node.prefix,
+                    delimiter="/" if node.level < depth else None,
+                ):
+                    if stopped.is_set():
+                        return
+                    if entry.is_prefix:
+                        children.append(Node(entry.name, node.level + 1, node))
+                    else:
+                        objects += 1
+                        size += entry.size or 0
+                with lock:
+                    node.objects += objects
+                    node.size += size
+                    node.pending += len(children)
+                    node.scanned = True
+                    for child in children:
+                        executor.submit(run, child)
+                    complete(node)
+            except BaseException as e:
+                results.put(e)
+
+        root = Node(root_prefix, 0, None)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            executor.submit(run, root)
+            while True:
+                result = results.get()
+                if isinstance(result, BaseException):
+                    raise result
+                yield result
+                if result.depth == 0:
+                    return
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False)
+
     @staticmethod
     def move(
         source_location: StorageLocation,
         dest_location: StorageLocation,
     ) -> None:
-        StorageConnector.copy(
-            source_bucket_name=source_location.bucket,
+        source_connector = Storage._connector(location=source_location)
+        dest_connector = Storage._connector(location=dest_location)
+
+        metadata = source_connector.get_metadata(
+            bucket_name=source_location.bucket,
             source_blob_name=source_location.blob_name,
-            dest_bucket_name=dest_location.bucket,
-            dest_blob_name=dest_location.blob_name,
         )
-        StorageConnector.delete(
+        if metadata is None:
+            raise ValueError("Source blob does not exist")
+
+        # Copying and deleting the same generation, a concurrent overwrite of the
+        # source makes the move fail instead of deleting content never copied
+        if source_connector is dest_connector:
+            source_connector.copy(
+                source_bucket_name=source_location.bucket,
+                source_blob_name=source_location.blob_name,
+                dest_bucket_name=dest_location.bucket,
+                dest_blob_name=dest_location.blob_name,
+                if_source_generation_match=metadata.generation,
+            )
+        else:
+            # Across backends the content goes through this process
+            dest_connector.upload_from_string(
+                data=source_connector.download_as_bytes(
+                    bucket_name=source_location.bucket,
+                    source_blob_name=source_location.blob_name,
+                ),
+                bucket_name=dest_location.bucket,
+                destination_blob_name=dest_location.blob_name,
+            )
+        source_connector.delete(
             bucket_name=source_location.bucket,
             blob_name=source_location.blob_name,
+            if_generation_match=metadata.generation,
+        )
+        if Storage._listing_cache is not None:
+            Storage._listing_cache.record_write(
+                location=dest_location, size=metadata.size
+            )
+            Storage._listing_cache.record_delete(location=source_location)
+
+    @staticmethod
+    def _connector(location: StorageLocation) -> BaseConnector:
+        """
+        Returns the connector serving the location, chosen by its prefix
+
+        @param location: the location
+        @return: the connector
+        """
+        return profiling.profiled_connector(
+            connector=ConnectorRegistry.get(prefix=location.prefix)
         )
@@ -1,3 +1,11 @@
 from wiser.gcloud.storage.types.location import StorageLocationBuilder, StorageLocation
+from wiser.gcloud.storage.types.metadata import BlobMetadata, ObjectMetadata
+from wiser.gcloud.storage.types.usage import PrefixUsage
 
-__all__ = ["StorageLocation", "StorageLocationBuilder"]
+__all__ = [
+    "BlobMetadata",
+    "ObjectMetadata",
+    "PrefixUsage",
+    "StorageLocation",
+    "StorageLocationBuilder",
+]
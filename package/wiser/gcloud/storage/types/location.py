@@ -8,9 +8,8 @@ from pydantic import BaseModel, Field
 class StorageLocation(BaseModel):
     prefix: str = Field(
         default="gs://",
-        description="Google Cloud Storage prefix",
+        description="Storage prefix, selecting the connector",
         example="gs://",
-        const=True,
     )
     bucket: str = Field(
         ...,
@@ -39,12 +38,18 @@ class StorageLocation(BaseModel):
         tail = ""
         if self.blob_name is not None:
             tail = str(self.blob_name)
-        return str(self.prefix) + str(self.bucket) + "/" + tail
+        prefix = str(self.prefix)
+        if prefix == "file://":
+            # The bucket of a local location is the first folder of an absolute path
+            prefix += "/"
+        return prefix + str(self.bucket) + "/" + tail
 
 
 class StorageLocationBuilder(BaseModel):
     prefix: str = Field(
-        default="gs://", description="Google Cloud Storage prefix", example="gs://"
+        default="gs://",
+        description="Storage prefix, selecting the connector",
+        example="gs://",
     )
     bucket: str = Field(
         default=None,
@@ -79,15 +84,31 @@ class StorageLocationBuilder(BaseModel):
         return self
 
     def from_uri(self, uri: str) -> StorageLocationBuilder:
-        prefix = uri.split("//")[0]
-        if prefix != "gs:":
-            raise ValueError("Accepted prefix is 'gs://'")
+        from wiser.gcloud.storage.connectors.registry import ConnectorRegistry
+
+        prefix = uri.split("//")[0] + "//"
+        if prefix not in ConnectorRegistry.prefixes():
+            raise ValueError(
+                "Accepted prefixes are {prefixes}".format(
+                    prefixes=ConnectorRegistry.prefixes()
+                )
+            )
+        self.prefix = prefix
 
-        bucket_and_blob = uri.split("//")[1]
+        bucket_and_blob = uri.split("//", 1)[1]
+        if prefix == "file://":
+            # 'file:///tmp/data/x.csv' is the blob 'data/x.csv' of the bucket 'tmp'
+            if not bucket_and_blob.startswith("/"):
+                raise ValueError(
+                    "Local paths must be absolute, e.g. 'file:///tmp/x.csv'"
+                )
+            bucket_and_blob = bucket_and_blob[1:]
 
         bucket = bucket_and_blob.split("/")[0]
         if len(bucket) == 0:
             raise ValueError("Bucket must have at least one character")
+        if "/" not in bucket_and_blob:
+            raise ValueError("Bucket must be followed by '/' and the blob name, if any")
         self.bucket = bucket
 
         if len(bucket_and_blob.split("/")[1]) > 0:
@@ -106,6 +127,7 @@ class StorageLocationBuilder(BaseModel):
                 self.folders = "/".join(values[:-1])
 
         return StorageLocation(
+            prefix=self.prefix,
             bucket=self.bucket,
             folders=self.folders,
             blob_name=self.blob_name,
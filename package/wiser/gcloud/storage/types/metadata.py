@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+
+class BlobMetadata(BaseModel):
+    bucket: str = Field(
+        ...,
+        description="Google Cloud Storage bucket",
+        example="my-bucket",
+        min_length=1,
+    )
+    name: str = Field(
+        ...,
+        description="Google Cloud Storage blob path",
+        example="path/to/something.ext",
+    )
+    size: Optional[int] = Field(
+        default=None, description="Size of the blob in bytes", example=1024
+    )
+    generation: Optional[int] = Field(
+        default=None,
+        description="Generation of the blob content",
+        example=1637661396212549,
+    )
+    crc32c: Optional[str] = Field(
+        default=None,
+        description="Base64-encoded CRC32C checksum of the blob content",
+        example="4qIpNg==",
+    )
+    md5_hash: Optional[str] = Field(
+        default=None,
+        description="Base64-encoded MD5 hash of the blob content",
+        example="GHAagv4m4jWgsoYhUCSvNg==",
+    )
+    updated: Optional[datetime] = Field(
+        default=None, description="Last modification time of the blob"
+    )
+    content_type: Optional[str] = Field(
+        default=None, description="Content type of the blob", example="image/png"
+    )
+    cache_control: Optional[str] = Field(
+        default=None,
+        description="Cache-Control header served with the blob",
+        example="public, max-age=3600",
+    )
+    storage_class: Optional[str] = Field(
+        default=None, description="Storage class of the blob", example="STANDARD"
+    )
+    metadata: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Custom metadata of the blob",
+        example={"source": "camera-1"},
+    )
+
+
+class ObjectMetadata(BaseModel):
+    content_type: Optional[str] = Field(
+        default=None,
+        description="Content type of the blob, inferred from the extension by Storage.save() if not given",
+        example="application/json",
+    )
+    cache_control: Optional[str] = Field(
+        default=None,
+        description="Cache-Control header served with the blob, used by HTTP caches and CDNs",
+        example="public, max-age=3600",
+    )
+    content_disposition: Optional[str] = Field(
+        default=None,
+        description="Content-Disposition header served with the blob",
+        example='attachment; filename="report.pdf"',
+    )
+    content_language: Optional[str] = Field(
+        default=None, description="Language of the content", example="en"
+    )
+    storage_class: Optional[str] = Field(
+        default=None,
+        description="Storage class of the blob, the default one of the bucket if not given",
+        example="NEARLINE",
+    )
+    metadata: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Custom metadata of the blob",
+        example={"source": "camera-1"},
+    )
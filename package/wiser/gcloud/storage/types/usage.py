@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+
+
+class PrefixUsage(BaseModel):
+    bucket: str = Field(
+        ...,
+        description="Google Cloud Storage bucket",
+        example="my-bucket",
+        min_length=1,
+    )
+    prefix: str = Field(
+        ...,
+        description="Prefix of the blobs, empty for the whole bucket",
+        example="path/to/",
+    )
+    depth: int = Field(
+        ...,
+        description="Number of folders between the prefix and the measured location",
+        example=1,
+    )
+    objects: int = Field(
+        default=0, description="Number of blobs under the prefix", example=1000
+    )
+    size: int = Field(
+        default=0, description="Total size of the blobs under the prefix, in bytes"
+    )
@@ -0,0 +1,16 @@
+from wiser.gcloud.storage.utils.ranges import coalesce_ranges, extract_ranges
+from wiser.gcloud.storage.utils.rate_limit import (
+    AdaptiveConcurrencyLimiter,
+    TokenBucket,
+    hashed_blob_name,
+)
+from wiser.gcloud.storage.utils.single_flight import SingleFlight
+
+__all__ = [
+    "AdaptiveConcurrencyLimiter",
+    "SingleFlight",
+    "TokenBucket",
+    "coalesce_ranges",
+    "extract_ranges",
+    "hashed_blob_name",
+]
@@ -0,0 +1,159 @@
+import base64
+import hashlib
+from typing import BinaryIO, Iterable, List, Tuple, Union
+
+# Size of the chunks read while hashing a file
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+# Reversed polynomial of CRC32C (Castagnoli)
+_CRC32C_POLYNOMIAL = 0x82F63B78
+
+
+def _update(hasher, data: Union[bytes, str, BinaryIO]) -> None:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        hasher.update(data)
+        return
+
+    # File handle: hashing starts at the current position, which is restored after
+    position = data.tell()
+    chunk = data.read(CHECKSUM_CHUNK_SIZE)
+    while chunk:
+        hasher.update(chunk)
+        chunk = data.read(CHECKSUM_CHUNK_SIZE)
+    data.seek(position)
+
+
+def crc32c(data: Union[bytes, str, BinaryIO]) -> str:
+    """
+    Returns the CRC32C checksum of data as Google Cloud Storage reports it
+
+    @param data: bytes, a string (utf-8 encoded) or a binary file handle
+    @return: the base64-encoded big-endian CRC32C checksum
+    """
+    import google_crc32c
+
+    hasher = google_crc32c.Checksum()
+    _update(hasher=hasher, data=data)
+    return base64.b64encode(hasher.digest()).decode("utf-8")
+
+
+def md5(data: Union[bytes, str, BinaryIO]) -> str:
+    """
+    Returns the MD5 hash of data as Google Cloud Storage reports it
+
+    @param data: bytes, a string (utf-8 encoded) or a binary file handle
+    @return: the base64-encoded MD5 hash
+    """
+    hasher = hashlib.md5()
+    _update(hasher=hasher, data=data)
+    return base64.b64encode(hasher.digest()).decode("utf-8")
+
+
+def sha256(data: Union[bytes, str, BinaryIO]) -> str:
+    """
+    Returns the SHA-256 hash of data, reading file handles by chunks
+
+    @param data: bytes, a string (utf-8 encoded) or a binary file handle
+    @return: the hexadecimal SHA-256 hash
+    """
+    hasher = hashlib.sha256()
+    _update(hasher=hasher, data=data)
+    return hasher.hexdigest()
+
+
+def transfer_checksum() -> str:
+    """
+    Returns the checksum the Google Cloud client computes while streaming a transfer:
+    CRC32C if its C implementation is installed, else MD5, also computed in C
+
+    @return: 'crc32c' or 'md5'
+    """
+    import google_crc32c
+
+    return "crc32c" if google_crc32c.implementation == "c" else "md5"
+
+
+def crc32c_value(data: Union[bytes, bytearray, memoryview]) -> int:
+    """
+    Returns the CRC32C checksum of data as an integer, see `crc32c_combine()`
+
+    @param data: the bytes
+    @return: the checksum
+    """
+    import google_crc32c
+
+    return google_crc32c.value(bytes(data))
+
+
+def crc32c_to_base64(value: int) -> str:
+    """
+    Encodes a CRC32C checksum as Google Cloud Storage reports it
+
+    @param value: the checksum
+    @return: the base64-encoded big-endian checksum
+    """
+    return base64.b64encode(value.to_bytes(4, "big")).decode("utf-8")
+
+
+def _gf2_times(matrix: List[int], vector: int) -> int:
+    result, row = 0, 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[row]
+        vector >>= 1
+        row += 1
+    return result
+
+
+def _gf2_square(matrix: List[int]) -> List[int]:
+    return [_gf2_times(matrix, row) for row in matrix]
+
+
+def crc32c_combine(crc1: int, crc2: int, length2: int) -> int:
+    """
+    Returns the CRC32C checksum of the concatenation of two blocks from their
+    checksums, without reading them again (the algorithm of zlib `crc32_combine`)
+
+    @param crc1: the checksum of the first block
+    @param crc2: the checksum of the second block
+    @param length2: the length of the second block
+    @return: the checksum of the first block followed by the second one
+    """
+    if length2 == 0:
+        return crc1
+
+    # Operators appending zero bits to a checksum: one bit, then two, then four
+    odd = [_CRC32C_POLYNOMIAL] + [1 << n for n in range(31)]
+    even = _gf2_square(odd)
+    odd = _gf2_square(even)
+    # Appends the zero bytes of the second block to the first checksum, squaring
+    # the operator for each bit of the length
+    while True:
+        even = _gf2_square(odd)
+        if length2 & 1:
+            crc1 = _gf2_times(even, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+        odd = _gf2_square(even)
+        if length2 & 1:
+            crc1 = _gf2_times(odd, crc1)
+        length2 >>= 1
+        if not length2:
+            break
+    return crc1 ^ crc2
+
+
+def combine_crc32c(blocks: Iterable[Tuple[int, int]]) -> str:
+    """
+    Returns the CRC32C checksum of consecutive blocks, e.g. the ranges of a blob
+    downloaded in parallel, from the checksums computed while they were transferred
+
+    @param blocks: the (checksum, length) pairs of the blocks, in order
+    @return: the base64-encoded big-endian checksum, as Google Cloud Storage reports it
+    """
+    value = 0
+    for crc, length in blocks:
+        value = crc32c_combine(crc1=value, crc2=crc, length2=length)
+    return crc32c_to_base64(value=value)
@@ -0,0 +1,92 @@
+import io
+import json
+from typing import Any, Optional
+
+from wiser.core.types.extensions import FileExtension
+
+# Content types of the blobs by extension, served to HTTP clients, caches and CDNs
+CONTENT_TYPES = {
+    FileExtension.NUMPY: "application/octet-stream",
+    FileExtension.JPG: "image/jpeg",
+    FileExtension.PNG: "image/png",
+    FileExtension.TEXT: "text/plain; charset=utf-8",
+    FileExtension.CSV: "text/csv; charset=utf-8",
+    FileExtension.JSON: "application/json",
+    FileExtension.PDF: "application/pdf",
+    ".parquet": "application/vnd.apache.parquet",
+    ".feather": "application/vnd.apache.arrow.file",
+}
+
+
+def content_type(filename: str) -> Optional[str]:
+    """
+    Returns the content type of a blob by its extension
+
+    @param filename: the name of the blob
+    @return: the content type, None if the extension is not managed
+    """
+    for extension, value in CONTENT_TYPES.items():
+        if filename.endswith(extension):
+            return value
+    return None
+
+
+def encode(obj: Any, filename: str) -> bytes:
+    """
+    Encodes an object to the content `Storage.save()` uploads for a blob with the
+    same extension
+
+    @param obj: the object to encode
+    @param filename: the name of the blob, selecting the codec by its extension
+    @return: the encoded content
+    """
+    if filename.endswith(FileExtension.NUMPY):
+        import numpy as np
+
+        buffer = io.BytesIO()
+        np.save(buffer, obj)
+        return buffer.getvalue()
+    elif filename.endswith(FileExtension.JPG) or filename.endswith(FileExtension.PNG):
+        from wiser.gcloud.storage.utils.images import encode_image
+
+        return encode_image(obj=obj, filename=filename)
+    elif filename.endswith(FileExtension.TEXT) or filename.endswith(FileExtension.CSV):
+        return obj.encode("utf-8") if isinstance(obj, str) else bytes(obj)
+    elif filename.endswith(FileExtension.JSON):
+        return json.dumps(obj=obj, sort_keys=True, indent=4, ensure_ascii=False).encode(
+            "utf-8"
+        )
+    elif filename.endswith(FileExtension.PDF):
+        if isinstance(obj, (bytes, bytearray)):
+            return bytes(obj)
+        with open(obj, "rb") as f:
+            return f.read()
+    else:
+        raise ValueError("File extension not managed")
+
+
+def decode(data: bytes, filename: str) -> Any:
+    """
+    Decodes a content to the object `Storage.get()` returns for a blob with the same
+    extension
+
+    @param data: the content
+    @param filename: the name of the blob, selecting the codec by its extension
+    @return: the decoded object
+    """
+    if filename.endswith(FileExtension.NUMPY):
+        import numpy as np
+
+        return np.load(io.BytesIO(data))
+    elif (
+        filename.endswith(FileExtension.JPG)
+        or filename.endswith(FileExtension.PNG)
+        or filename.endswith(FileExtension.PDF)
+    ):
+        return bytes(data)
+    elif filename.endswith(FileExtension.TEXT) or filename.endswith(FileExtension.CSV):
+        return bytes(data).decode("utf-8")
+    elif filename.endswith(FileExtension.JSON):
+        return json.loads(bytes(data).decode("utf-8"))
+    else:
+        raise ValueError("File extension not managed")
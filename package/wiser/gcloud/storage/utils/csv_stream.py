@@ -0,0 +1,86 @@
+import csv
+import io
+from typing import BinaryIO, Callable, Iterable, List, Sequence
+
+# Bytes read past the end of a chunk at a time, looking for the end of its last row
+LOOKAHEAD = 64 * 1024
+# Encoded rows are written to the file in blocks of about this many characters
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+
+def _read_rows_bytes(
+    read_range: Callable[[int, int], bytes], start: int, end: int, size: int
+) -> bytes:
+    """
+    Reads [start, end) extended up to the first newline at or after `end - 1`, included
+    """
+    data = read_range(start, min(end + LOOKAHEAD, size) - 1)
+    searched = max(end - 1 - start, 0)
+    while True:
+        newline = data.find(b"\n", searched)
+        if newline >= 0:
+            return data[: newline + 1]
+        if start + len(data) >= size:
+            return data
+        searched = len(data)
+        data += read_range(
+            start + len(data), min(start + len(data) + LOOKAHEAD, size) - 1
+        )
+
+
+def read_chunk(
+    read_range: Callable[[int, int], bytes],
+    size: int,
+    start: int,
+    end: int,
+    **fmtparams,
+) -> List[List[str]]:
+    """
+    Parses the rows of a CSV file starting in the byte range [start, end): the chunks
+    of a file split at any offsets return each row once. Rows are split on newlines,
+    so quoted fields must not hold newlines
+
+    @param read_range: a function returning the bytes in [start, end] of the file
+    @param size: the size of the file
+    @param start: the first byte of the chunk
+    @param end: the byte where the chunk stops (excluded)
+    @param fmtparams: the formatting parameters of `csv.reader()`, e.g. delimiter=';'
+    @return: the rows starting in the chunk
+    """
+    if start >= min(end, size):
+        return []
+
+    # The row at `start` begins in this chunk only if the previous byte is a newline
+    origin = start - 1 if start > 0 else 0
+    data = _read_rows_bytes(read_range=read_range, start=origin, end=end, size=size)
+    if start > 0:
+        newline = data.find(b"\n")
+        if newline < 0 or origin + newline + 1 >= end:
+            return []
+        data = data[newline + 1 :]
+
+    return list(csv.reader(io.StringIO(data.decode("utf-8"), newline=""), **fmtparams))
+
+
+def write_rows(file: BinaryIO, rows: Iterable[Sequence], **fmtparams) -> int:
+    """
+    Writes rows to a binary file as UTF-8 CSV, encoded by blocks so that the memory
+    used does not depend on the number of rows
+
+    @param file: the destination file
+    @param rows: the rows, sequences of values
+    @param fmtparams: the formatting parameters of `csv.writer()`, e.g. delimiter=';'
+    @return: the number of rows written
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, **fmtparams)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if buffer.tell() >= WRITE_BLOCK_SIZE:
+            file.write(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+    file.write(buffer.getvalue().encode("utf-8"))
+    return count
@@ -0,0 +1,140 @@
+from typing import IO, Any, List, Optional
+
+from wiser.core.types.extensions import FileExtension
+
+# Columnar formats read with column projection
+PARQUET = ".parquet"
+FEATHER = ".feather"
+DATAFRAME_EXTENSIONS = [PARQUET, FEATHER, FileExtension.CSV]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "DataFrames require pandas and pyarrow, install them with "
+            "'pip install wiser-gcloud-storage[dataframe]'"
+        ) from e
+    return pyarrow
+
+
+def dataframe_extension(filename: str) -> Optional[str]:
+    """
+    Returns the DataFrame format of a file
+
+    @param filename: the file name
+    @return: the extension of the format, None if the file is not a DataFrame
+    """
+    for extension in DATAFRAME_EXTENSIONS:
+        if filename.endswith(extension):
+            return extension
+    return None
+
+
+def to_table(obj: Any):
+    """
+    Converts a pandas DataFrame to an Arrow table, Arrow tables are returned as they are
+
+    @param obj: a pandas DataFrame or a pyarrow Table
+    @return: the pyarrow Table
+    """
+    pa = _import_pyarrow()
+    if isinstance(obj, pa.Table):
+        return obj
+    return pa.Table.from_pandas(obj, preserve_index=False)
+
+
+def read_table(
+    file: IO[bytes],
+    extension: str,
+    columns: List[str] = None,
+    filters: List = None,
+    row_groups: List[int] = None,
+):
+    """
+    Reads an Arrow table. Parquet and Feather files are read through seeks, so only
+    the footer and the chunks of the requested columns are read
+
+    @param file: a seekable binary file
+    @param extension: the format, one of DATAFRAME_EXTENSIONS
+    @param columns: the columns to read, None for all
+    @param filters: Parquet only, row filters in pyarrow format, e.g. [("year", ">=", 2020)]; the row groups excluded by their statistics are not read
+    @param row_groups: Parquet only, the indexes of the row groups to read, None for all
+    @return: the pyarrow Table
+    """
+    _import_pyarrow()
+    if extension != PARQUET and (filters is not None or row_groups is not None):
+        raise ValueError("Filters and row groups apply to Parquet files only")
+
+    if extension == PARQUET:
+        import pyarrow.parquet as pq
+
+        if row_groups is not None:
+            table = pq.ParquetFile(file).read_row_groups(
+                row_groups=row_groups, columns=columns
+            )
+            if filters is not None:
+                expression = pq.filters_to_expression(filters)
+                table = table.filter(expression)
+            return table
+        return pq.read_table(file, columns=columns, filters=filters)
+
+    if extension == FEATHER:
+        import pyarrow.feather as feather
+
+        return feather.read_table(file, columns=columns)
+
+    if extension == FileExtension.CSV:
+        import pyarrow.csv as csv
+
+        convert_options = None
+        if columns is not None:
+            convert_options = csv.ConvertOptions(include_columns=columns)
+        return csv.read_csv(file, convert_options=convert_options)
+
+    raise ValueError("File extension not managed")
+
+
+def write_table(
+    table,
+    file: IO[bytes],
+    extension: str,
+    compression: str = None,
+    row_group_size: int = None,
+) -> None:
+    """
+    Writes an Arrow table
+
+    @param table: the pyarrow Table
+    @param file: a binary file
+    @param extension: the format, one of DATAFRAME_EXTENSIONS
+    @param compression: the compression codec, e.g. 'snappy', 'zstd' or 'lz4', None for the format default
+    @param row_group_size: Parquet only, the maximum number of rows of a row group
+    @return: None
+    """
+    _import_pyarrow()
+    if extension != PARQUET and row_group_size is not None:
+        raise ValueError("The row group size applies to Parquet files only")
+
+    if extension == PARQUET:
+        import pyarrow.parquet as pq
+
+        pq.write_table(
+            table,
+            file,
+            compression=compression or "snappy",
+            row_group_size=row_group_size,
+        )
+    elif extension == FEATHER:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, file, compression=compression)
+    elif extension == FileExtension.CSV:
+        import pyarrow.csv as csv
+
+        if compression is not None:
+            raise ValueError("CSV files are not compressed")
+        csv.write_csv(table, file)
+    else:
+        raise ValueError("File extension not managed")
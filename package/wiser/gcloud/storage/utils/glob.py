@@ -0,0 +1,92 @@
+import re
+from typing import List, Tuple
+
+_MAGIC = re.compile(r"[*?\[{]")
+
+
+def has_magic(pattern: str) -> bool:
+    """
+    Returns True if a pattern has wildcards
+
+    @param pattern: the glob pattern
+    @return: True if the pattern has wildcards
+    """
+    return _MAGIC.search(pattern) is not None
+
+
+def split_pattern(pattern: str) -> Tuple[str, List[str]]:
+    """
+    Splits a blob name pattern into its longest literal folder prefix and the
+    remaining segments, e.g. 'data/*/2024-*/part-*.npy' -> ('data/', ['*', '2024-*', 'part-*.npy'])
+
+    @param pattern: the glob pattern of the blob names
+    @return: the literal prefix, ending with '/' unless empty, and the remaining segments
+    """
+    segments = pattern.split("/")
+    literal = 0
+    while literal < len(segments) - 1 and not has_magic(segments[literal]):
+        literal += 1
+    prefix = "/".join(segments[:literal])
+    return (prefix + "/" if prefix else ""), segments[literal:]
+
+
+def translate(pattern: str) -> str:
+    """
+    Translates a glob pattern into a regular expression with the syntax of the
+    Google Cloud Storage `matchGlob` listings: '*' and '?' do not match '/', '**'
+    matches any number of folders, '[a-z]' and '[!a-z]' are character classes and
+    '{a,b}' are alternatives
+
+    @param pattern: the glob pattern
+    @return: the regular expression matching the whole names
+    """
+    regex, i, n = [], 0, len(pattern)
+    depth = 0
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        i += 1
+        if c == "*":
+            regex.append("[^/]*")
+        elif c == "?":
+            regex.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1 if pattern[i : i + 1] in ("!", "^") else i)
+            if end < 0:
+                regex.append(re.escape(c))
+                continue
+            content = pattern[i:end]
+            if content[:1] in ("!", "^"):
+                content = "^" + content[1:]
+            regex.append("[" + content.replace("\\", "\\\\") + "]")
+            i = end + 1
+        elif c == "{":
+            regex.append("(?:")
+            depth += 1
+        elif c == "," and depth:
+            regex.append("|")
+        elif c == "}" and depth:
+            regex.append(")")
+            depth -= 1
+        else:
+            regex.append(re.escape(c))
+    if depth:
+        raise ValueError("Unbalanced braces in pattern {}".format(pattern))
+    return "".join(regex) + r"\Z"
+
+
+def compile_pattern(pattern: str) -> "re.Pattern":
+    """
+    Compiles a glob pattern, see `translate()`
+
+    @param pattern: the glob pattern
+    @return: the compiled regular expression, to be used with `match()`
+    """
+    return re.compile(translate(pattern=pattern), re.DOTALL)
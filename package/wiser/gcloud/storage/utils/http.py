@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Union
+
+# urllib3 is imported when the first pool is built, the Google Cloud client is never
+# imported: these transfers only need the signed URLs, not the credentials
+if TYPE_CHECKING:
+    import urllib3
+
+# Transient statuses retried with exponential backoff
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+RETRIES = 5
+# Connections kept open per host
+POOL_SIZE = 32
+# Size of the chunks streamed to files
+CHUNK_SIZE = 1024 * 1024
+
+_pool: urllib3.PoolManager = None
+_pool_pid: int = None
+_pool_lock = threading.Lock()
+
+
+def pool_manager() -> urllib3.PoolManager:
+    """
+    Returns the HTTP connection pool of the current process, built on first use and
+    after a fork, so that connections are never shared with a forked child
+
+    @return: the pool manager
+    """
+    global _pool, _pool_pid
+
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                import urllib3
+
+                # Signed URLs are bound to their method and resource: retrying any
+                # of them, PUT included, cannot do more than the original request
+                retries = urllib3.Retry(
+                    total=RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=None,
+                    raise_on_status=False,
+                )
+                _pool = urllib3.PoolManager(maxsize=POOL_SIZE, retries=retries)
+                _pool_pid = os.getpid()
+
+    return _pool
+
+
+def _check(response: urllib3.BaseHTTPResponse, method: str, url: str) -> None:
+    if response.status < 400:
+        return
+
+    from google.api_core import exceptions
+
+    # The query of a signed URL holds its signature, never reported
+    raise exceptions.from_http_status(
+        response.status, "{} {}".format(method, url.split("?", 1)[0])
+    )
+
+
+def download_url(url: str, start: int = None, end: int = None) -> bytes:
+    """
+    Downloads the content of a signed URL, or a range of it
+
+    @param url: the signed URL, for the GET method
+    @param start: the first byte to download, the whole content if None
+    @param end: the last byte to download (included), the end of the content if None
+    @return: the content as bytes
+    """
+    headers = {}
+    if start is not None:
+        headers["Range"] = "bytes={}-{}".format(start, "" if end is None else end)
+    response = pool_manager().request("GET", url, headers=headers)
+    _check(response=response, method="GET", url=url)
+    return response.data
+
+
+def download_url_to_filename(url: str, filename: str) -> None:
+    """
+    Downloads the content of a signed URL to a file, streamed by chunks
+
+    @param url: the signed URL, for the GET method
+    @param filename: the destination file
+    @return: None
+    """
+    response = pool_manager().request("GET", url, preload_content=False)
+    try:
+        _check(response=response, method="GET", url=url)
+        with open(filename, "wb") as f:
+            shutil.copyfileobj(response, f, CHUNK_SIZE)
+    finally:
+        response.release_conn()
+
+
+def upload_url(
+    url: str, data: Union[bytes, BinaryIO], content_type: str = None
+) -> None:
+    """
+    Uploads a content to a signed URL
+
+    @param url: the signed URL, for the PUT method
+    @param data: the content, as bytes or as a seekable file handle rewound on retries
+    @param content_type: the content type, the one the URL was signed with if any
+    @return: None
+    """
+    headers = {}
+    if content_type is not None:
+        headers["Content-Type"] = content_type
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        # Sent with its length instead of chunked, from the current position
+        position = data.tell()
+        headers["Content-Length"] = str(data.seek(0, os.SEEK_END) - position)
+        data.seek(position)
+    response = pool_manager().request("PUT", url, body=data, headers=headers)
+    _check(response=response, method="PUT", url=url)
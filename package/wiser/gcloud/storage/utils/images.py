@@ -0,0 +1,111 @@
+import io
+from typing import Any, Tuple
+
+from wiser.core.types.extensions import FileExtension
+
+# Pillow is imported by the functions, so that importing this module stays fast
+
+# Modes JPEG cannot store, converted to RGB before encoding
+_NON_JPEG_MODES = ("RGBA", "LA", "P", "PA")
+
+
+def image_format(filename: str) -> str:
+    """
+    Returns the Pillow format of an image blob by its extension
+
+    @param filename: the name of the blob
+    @return: 'JPEG' or 'PNG'
+    """
+    if filename.endswith(FileExtension.JPG):
+        return "JPEG"
+    elif filename.endswith(FileExtension.PNG):
+        return "PNG"
+    raise ValueError("File extension not managed")
+
+
+def decode_image(
+    data: bytes,
+    size: Tuple[int, int] = None,
+    mode: str = None,
+    as_array: bool = False,
+) -> Any:
+    """
+    Decodes an image, reduced to fit a target size if given. JPEG images are decoded
+    directly at the smallest DCT scale (1/2, 1/4 or 1/8) keeping twice the target
+    size, so that the full-size image is never decoded; other formats are reduced by
+    an integer factor before the final resampling
+
+    @param data: the encoded image
+    @param size: the (width, height) box the image is resized to fit, keeping its aspect
+    ratio; images smaller than the box are not enlarged
+    @param mode: the Pillow mode to convert the image to, e.g. 'RGB' or 'L'
+    @param as_array: if True, a numpy array is returned instead of a PIL image
+    @return: the decoded image
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    if size is not None:
+        width, height = size
+        if width <= 0 or height <= 0:
+            raise ValueError("The size must be positive")
+        # Drafts JPEG images at a reduced scale, reduces the other formats by an
+        # integer factor, then resamples to the target size
+        image.thumbnail((width, height), reducing_gap=2.0)
+    else:
+        image.load()
+    if mode is not None and image.mode != mode:
+        image = image.convert(mode)
+
+    if as_array:
+        import numpy as np
+
+        return np.asarray(image)
+    return image
+
+
+def encode_image(
+    obj: Any,
+    filename: str,
+    quality: int = None,
+    optimize: bool = False,
+    progressive: bool = False,
+    compress_level: int = None,
+) -> bytes:
+    """
+    Encodes an image in memory, in the format of the extension of the blob
+
+    @param obj: the PIL image, a numpy array of shape (H, W) or (H, W, C), or encoded bytes
+    returned as they are
+    @param filename: the name of the blob, selecting the format by its extension
+    @param quality: the JPEG quality, from 1 to 95, by default the one of Pillow
+    @param optimize: if True, JPEG Huffman tables and PNG filters are optimized, slower
+    but smaller
+    @param progressive: if True, JPEG images are progressive
+    @param compress_level: the PNG zlib level, from 0 (fastest) to 9 (smallest)
+    @return: the encoded image
+    """
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj)
+
+    from PIL import Image
+
+    image_format_ = image_format(filename=filename)
+    image = obj if isinstance(obj, Image.Image) else Image.fromarray(obj)
+
+    options = {}
+    if image_format_ == "JPEG":
+        if image.mode in _NON_JPEG_MODES:
+            image = image.convert("RGB")
+        if quality is not None:
+            options["quality"] = quality
+        if progressive:
+            options["progressive"] = True
+    elif compress_level is not None:
+        options["compress_level"] = compress_level
+    if optimize:
+        options["optimize"] = True
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format_, **options)
+    return buffer.getvalue()
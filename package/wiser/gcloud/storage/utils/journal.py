@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+
+class TransferJournal:
+    """
+    Append-only journal of the completed tasks of a job, one JSON line per task
+    flushed as soon as the task completes, so that an interrupted job restarted with
+    the same journal skips them. A line truncated by a crash is ignored.
+    """
+
+    def __init__(self, path: str):
+        """
+        @param path: the path of the journal file, created if missing
+        """
+        self.path = path
+        self._done = set()
+        self._lock = threading.Lock()
+
+        ends_with_newline = True
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    ends_with_newline = line.endswith("\n")
+                    try:
+                        self._done.add(json.loads(line)["key"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        self._file = open(path, "a", encoding="utf-8")
+        if not ends_with_newline:
+            # The next record must not be appended to a truncated line
+            self._file.write("\n")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def record(self, key: str, **details) -> None:
+        """
+        Records a completed task
+
+        @param key: the key of the task
+        @param details: other JSON-serializable values saved with the key
+        @return: None
+        """
+        line = json.dumps(dict(details, key=key), sort_keys=True) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._done.add(key)
+
+    def close(self) -> None:
+        """
+        Closes the journal file
+
+        @return: None
+        """
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
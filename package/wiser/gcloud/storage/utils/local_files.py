@@ -0,0 +1,129 @@
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+# Prefix of the temporary files written next to their destination, hidden from listings
+TMP_PREFIX = ".wiser-tmp-"
+
+
+class MappedReader(io.RawIOBase):
+    """
+    Read-only seekable file over a memory map: reads are copied from the page cache,
+    without read system calls nor an intermediate buffer
+    """
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._view = memoryview(mapped)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position : self._position + len(buffer)]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._position + size
+        data = self._view[self._position : end].tobytes()
+        self._position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("Negative seek position {}".format(offset))
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+            self._mapped.close()
+        super().close()
+
+
+def open_mapped(path: str) -> BinaryIO:
+    """
+    Opens a local file for reading through a memory map, or as a regular file if it is
+    empty, since empty files cannot be mapped
+
+    @param path: the path of the file
+    @return: the file, to be closed
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return open(path, "rb")
+        # The map holds its own reference to the file, which can be closed
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return MappedReader(mapped=mapped)
+
+
+def preallocate(fd: int, size: int) -> None:
+    """
+    Allocates the blocks of a file up to a size, so that writing it at any offset does
+    not fragment it nor fail on a full disk midway
+
+    @param fd: the descriptor of the file, open for writing
+    @param size: the size of the file
+    @return: None
+    """
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as error:
+            import errno
+
+            # Filesystems without allocation support fall back to a sparse file
+            if error.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    os.ftruncate(fd, size)
+
+
+@contextmanager
+def atomic_file(path: str) -> Iterator[int]:
+    """
+    Context manager opening a temporary file next to a path, moved to the path once
+    synced to disk when the block succeeds and removed when it fails, so that the path
+    never holds a partial file
+
+    @param path: the destination path, its folders are created if needed
+    @return: the descriptor of the temporary file, open for writing
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(
+        directory, "{}{}-{}".format(TMP_PREFIX, name, os.urandom(6).hex())
+    )
+    # Created with the default permissions, as a regular file would be
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        yield fd
+        os.fsync(fd)
+        os.close(fd)
+        fd = None
+        os.replace(tmp_path, path)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        os.remove(tmp_path)
+        raise
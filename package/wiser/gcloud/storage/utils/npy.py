@@ -0,0 +1,126 @@
+import io
+import itertools
+import operator
+from typing import List, Tuple, Union
+
+import numpy as np
+
+# Bytes downloaded to read the header of a .npy file: headers are padded to a multiple
+# of 64 bytes and are usually 128 bytes long
+NPY_HEADER_PROBE_SIZE = 4096
+
+# Length of the magic string, the version and the header length fields
+_NPY_PREAMBLE_SIZE = {(1, 0): 10, (2, 0): 12, (3, 0): 12}
+
+
+def npy_header_size(prefix: bytes) -> int:
+    """
+    Returns the size of the header of a .npy file, i.e. the offset of the array data
+
+    @param prefix: at least the first 12 bytes of the .npy file
+    @return: the offset of the array data
+    """
+    version = np.lib.format.read_magic(io.BytesIO(prefix))
+    if version not in _NPY_PREAMBLE_SIZE:
+        raise ValueError("Unsupported .npy format version {}".format(version))
+
+    if version == (1, 0):
+        header_len = int.from_bytes(prefix[8:10], "little")
+    else:
+        header_len = int.from_bytes(prefix[8:12], "little")
+
+    return _NPY_PREAMBLE_SIZE[version] + header_len
+
+
+def parse_npy_header(header: bytes) -> Tuple[Tuple[int, ...], bool, np.dtype, int]:
+    """
+    Parses the header of a .npy file
+
+    @param header: the first bytes of the .npy file, containing at least the whole header
+    @return: the shape, whether the array is in Fortran order, the dtype and the offset of the data
+    """
+    buffer = io.BytesIO(header)
+    version = np.lib.format.read_magic(buffer)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+
+    return shape, fortran_order, dtype, buffer.tell()
+
+
+def npy_slice_ranges(
+    shape: Tuple[int, ...], itemsize: int, index: Union[int, slice, tuple]
+) -> Tuple[List[Tuple[int, int]], Tuple[int, ...]]:
+    """
+    Computes the byte ranges of a C-contiguous array touched by a basic index
+
+    @param shape: the shape of the array
+    @param itemsize: the size in bytes of each element
+    @param index: an integer, a slice or a tuple of integers and slices
+    @return: the (start, stop) byte ranges relative to the array data, in C order, and the shape of the result
+    """
+    if not isinstance(index, tuple):
+        index = (index,)
+    if len(index) > len(shape):
+        raise IndexError(
+            "Too many indices for array: array is {}-dimensional, but {} were indexed".format(
+                len(shape), len(index)
+            )
+        )
+
+    selection = []
+    out_shape = []
+    for axis, dim in enumerate(shape):
+        item = index[axis] if axis < len(index) else slice(None)
+        if isinstance(item, slice):
+            selected = range(*item.indices(dim))
+            out_shape.append(len(selected))
+        else:
+            try:
+                i = operator.index(item)
+            except TypeError:
+                raise TypeError("Only integers and slices are valid indices")
+            if not -dim <= i < dim:
+                raise IndexError(
+                    "Index {} is out of bounds for axis {} with size {}".format(
+                        i, axis, dim
+                    )
+                )
+            i = i % dim
+            selected = range(i, i + 1)
+        selection.append(selected)
+
+    strides = [
+        int(np.prod(shape[axis + 1 :], dtype=np.int64)) for axis in range(len(shape))
+    ]
+    if any(len(selected) == 0 for selected in selection):
+        return [], tuple(out_shape)
+
+    # Axes after the last partially selected one are contiguous in memory
+    partial = [
+        axis
+        for axis, (selected, dim) in enumerate(zip(selection, shape))
+        if selected != range(dim)
+    ]
+    if len(partial) == 0:
+        total = int(np.prod(shape, dtype=np.int64)) * itemsize
+        return [(0, total)], tuple(out_shape)
+
+    last = partial[-1]
+    inner = selection[last]
+    if inner.step == 1:
+        run_starts = [inner.start]
+        run_length = len(inner) * strides[last]
+    else:
+        run_starts = list(inner)
+        run_length = strides[last]
+
+    ranges = []
+    for outer in itertools.product(*selection[:last]):
+        base = sum(i * stride for i, stride in zip(outer, strides))
+        for start in run_starts:
+            offset = (base + start * strides[last]) * itemsize
+            ranges.append((offset, offset + run_length * itemsize))
+
+    return ranges, tuple(out_shape)
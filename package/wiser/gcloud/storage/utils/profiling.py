@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from wiser.gcloud.storage.types.location import StorageLocation
+
+# Phases the time of the operations is attributed to
+CLIENT = "client"
+NETWORK = "network"
+DECODE = "decode"
+ENCODE = "encode"
+TEMPFILE = "tempfile"
+# Time of an operation spent out of its phases, e.g. dispatching and copies
+OTHER = "other"
+
+# Keys the spans are aggregated by
+GROUP_KEYS = ("operation", "extension", "bucket")
+
+# Profiles recording the spans, usually none: spans are not even built then
+_profiles: List[Profile] = []
+_profiles_lock = threading.Lock()
+_local = threading.local()
+# One proxy per connector while recording, so that connectors compare by identity
+_proxies: Dict[int, _ProfiledConnector] = {}
+
+
+class Span(NamedTuple):
+    """
+    Time spent in a phase of an operation, or in the operation out of its phases
+    """
+
+    operation: Optional[str]
+    phase: str
+    bucket: Optional[str]
+    extension: Optional[str]
+    # perf_counter() at the start and duration including the nested spans, in seconds
+    start: float
+    duration: float
+    # Wall and CPU time of the thread excluding the nested spans, in seconds
+    wall: float
+    cpu: float
+    thread: int
+
+
+class PhaseStats(NamedTuple):
+    count: int
+    wall: float
+    cpu: float
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _OpenSpan:
+    __slots__ = (
+        "operation",
+        "phase",
+        "bucket",
+        "extension",
+        "start",
+        "cpu_start",
+        "nested_wall",
+        "nested_cpu",
+    )
+
+    def __init__(
+        self,
+        phase: str,
+        operation: str = None,
+        location: StorageLocation = None,
+    ):
+        self.phase = phase
+        self.operation = operation
+        self.bucket = None
+        self.extension = None
+        if location is not None:
+            self.bucket = location.prefix + location.bucket
+            if location.filename is not None:
+                self.extension = os.path.splitext(location.filename)[1]
+
+    def __enter__(self):
+        stack = _stack()
+        if self.operation is None and stack:
+            # Phases belong to the operation they are nested in
+            parent = stack[-1]
+            self.operation = parent.operation
+            self.bucket = parent.bucket
+            self.extension = parent.extension
+        self.nested_wall = 0.0
+        self.nested_cpu = 0.0
+        stack.append(self)
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter() - self.start
+        cpu = time.thread_time() - self.cpu_start
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].nested_wall += duration
+            stack[-1].nested_cpu += cpu
+
+        span = Span(
+            operation=self.operation,
+            phase=self.phase,
+            bucket=self.bucket,
+            extension=self.extension,
+            start=self.start,
+            duration=duration,
+            wall=duration - self.nested_wall,
+            cpu=max(cpu - self.nested_cpu, 0.0),
+            thread=threading.get_ident(),
+        )
+        for profile in list(_profiles):
+            profile._add(span=span)
+        return False
+
+
+def _stack() -> List[_OpenSpan]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def phase(name: str):
+    """
+    Returns a context manager attributing the time of its block to a phase of the
+    current operation, a no-op unless a profile is recording
+
+    @param name: the phase, e.g. NETWORK or DECODE
+    @return: the context manager
+    """
+    if not _profiles:
+        return _NULL_SPAN
+    return _OpenSpan(phase=name)
+
+
+def operation(name: str, location: StorageLocation = None):
+    """
+    Returns a context manager recording its block as an operation on a location, a
+    no-op unless a profile is recording
+
+    @param name: the operation, e.g. 'get'
+    @param location: the location the operation is about
+    @return: the context manager
+    """
+    if not _profiles:
+        return _NULL_SPAN
+    return _OpenSpan(phase=OTHER, operation=name, location=location)
+
+
+def profiled(name: str):
+    """
+    Decorator recording the calls of a function as operations, on the location passed
+    as `location` keyword argument or as first argument with a bucket
+
+    @param name: the operation, e.g. 'get'
+    @return: the decorator
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _profiles:
+                return fn(*args, **kwargs)
+            location = kwargs.get("location")
+            if location is None:
+                location = next((a for a in args if hasattr(a, "bucket")), None)
+            with operation(name=name, location=location):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Connector methods returning lazy listings, whose iteration sends the requests
+_LISTING_METHODS = ("scan", "list_entries")
+
+
+class _ProfiledConnector:
+    """
+    Proxy of a connector attributing the time of its calls to the NETWORK phase,
+    including the iteration of the listings it returns
+    """
+
+    def __init__(self, connector):
+        self._connector = connector
+
+    def __getattr__(self, item: str) -> Any:
+        attribute = getattr(self._connector, item)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            with phase(name=NETWORK):
+                result = attribute(*args, **kwargs)
+            # Only the lazy listings are wrapped: file objects are iterators too
+            if item in _LISTING_METHODS:
+                return _profiled_iterator(iterator=iter(result))
+            return result
+
+        return call
+
+
+def _profiled_iterator(iterator):
+    while True:
+        with phase(name=NETWORK):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def profiled_connector(connector):
+    """
+    Returns the connector, wrapped so that its calls are attributed to the NETWORK
+    phase while a profile is recording
+
+    @param connector: the connector
+    @return: the connector or its profiling proxy
+    """
+    if not _profiles:
+        return connector
+    # The proxy holds the connector, whose id cannot be reused meanwhile
+    proxy = _proxies.get(id(connector))
+    if proxy is None:
+        proxy = _proxies.setdefault(id(connector), _ProfiledConnector(connector))
+    return proxy
+
+
+class Profile:
+    """
+    Wall and CPU time of the `Storage` operations of the process while recording,
+    attributed to the phases CLIENT (building the Google Cloud client), NETWORK
+    (connector calls), TEMPFILE, ENCODE, DECODE and OTHER. The time of nested phases
+    is excluded from their parent, so that phase times add up to the operation time.
+    Operations of all the threads are recorded; worker processes are not.
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._started: Optional[float] = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        with _profiles_lock:
+            _profiles.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with _profiles_lock:
+            _profiles.remove(self)
+            if not _profiles:
+                _proxies.clear()
+        return False
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self, by: str = "operation") -> Dict[str, Dict[str, PhaseStats]]:
+        """
+        Returns the time per phase, aggregated by operation, extension or bucket
+
+        @param by: 'operation', 'extension' or 'bucket'
+        @return: for each key, the number of spans and their wall and CPU time in
+        seconds, per phase
+        """
+        if by not in GROUP_KEYS:
+            raise ValueError("Spans are aggregated by one of {}".format(GROUP_KEYS))
+
+        totals: Dict[str, Dict[str, List[float]]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            key = getattr(span, by) or "-"
+            stats = totals.setdefault(key, {}).setdefault(span.phase, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += span.wall
+            stats[2] += span.cpu
+        return {
+            key: {name: PhaseStats(*stats) for name, stats in phases.items()}
+            for key, phases in totals.items()
+        }
+
+    def report(self) -> str:
+        """
+        Returns a text report of the time per phase, by operation, extension and bucket,
+        the slowest first
+
+        @return: the report
+        """
+        lines = []
+        for by in GROUP_KEYS:
+            lines.append(
+                "{:<32}{:<10}{:>8}{:>12}{:>12}{:>8}".format(
+                    by, "phase", "count", "wall ms", "cpu ms", "wall %"
+                )
+            )
+            summary = self.summary(by=by)
+            ranked = sorted(
+                summary.items(),
+                key=lambda item: -sum(stats.wall for stats in item[1].values()),
+            )
+            for key, phases in ranked:
+                total = sum(stats.wall for stats in phases.values()) or 1.0
+                for name, stats in sorted(phases.items(), key=lambda p: -p[1].wall):
+                    lines.append(
+                        "{:<32}{:<10}{:>8}{:>12.2f}{:>12.2f}{:>8.1f}".format(
+                            key[:31],
+                            name,
+                            stats.count,
+                            stats.wall * 1000,
+                            stats.cpu * 1000,
+                            100 * stats.wall / total,
+                        )
+                    )
+            lines.append("")
+        return "\n".join(lines)
+
+    def dump_chrome_trace(self, path: str) -> None:
+        """
+        Writes the spans as a Chrome trace-event JSON file, to be opened with
+        chrome://tracing or https://ui.perfetto.dev
+
+        @param path: the destination file
+        @return: None
+        """
+        import json
+
+        started = self._started if self._started is not None else 0.0
+        with self._lock:
+            spans = list(self.spans)
+        events = [
+            {
+                "name": span.phase if span.phase != OTHER else span.operation,
+                "cat": span.operation or span.phase,
+                "ph": "X",
+                "ts": (span.start - started) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": span.thread,
+                "args": {
+                    "bucket": span.bucket,
+                    "extension": span.extension,
+                    "self_ms": span.wall * 1000,
+                    "cpu_ms": span.cpu * 1000,
+                },
+            }
+            for span in spans
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import TextIO
+
+_UNITS = ["B", "KiB", "MiB", "GiB", "TiB", "PiB"]
+
+
+def format_bytes(size: float) -> str:
+    """
+    Formats a number of bytes with a binary unit, e.g. 1536 -> '1.5 KiB'
+
+    @param size: the number of bytes
+    @return: the formatted size
+    """
+    for unit in _UNITS[:-1]:
+        if abs(size) < 1024:
+            break
+        size /= 1024
+    else:
+        unit = _UNITS[-1]
+    if unit == "B":
+        return "{} B".format(int(size))
+    return "{:.1f} {}".format(size, unit)
+
+
+class Progress:
+    """
+    Thread-safe counter of the files and bytes processed by a job, reporting the
+    progress and the throughput to a stream at most every `interval` seconds
+    """
+
+    def __init__(self, stream: TextIO = None, interval: float = 1.0):
+        """
+        @param stream: the stream the reports are written to, None for no report
+        @param interval: the minimum time between two reports, in seconds
+        """
+        self.stream = stream
+        self.interval = interval
+        self.total_files = 0
+        self.files = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes = 0
+        self._start = time.monotonic()
+        self._last_report = self._start
+        self._lock = threading.Lock()
+
+    def add_total(self, files: int) -> None:
+        """
+        Adds files to process, as they are discovered
+
+        @param files: the number of files
+        @return: None
+        """
+        with self._lock:
+            self.total_files += files
+
+    def update(
+        self,
+        files: int = 1,
+        nbytes: int = 0,
+        failed: bool = False,
+        skipped: bool = False,
+    ) -> None:
+        """
+        Records processed files
+
+        @param files: the number of files processed
+        @param nbytes: the number of bytes transferred
+        @param failed: True if the files failed
+        @param skipped: True if the files were already up to date
+        @return: None
+        """
+        with self._lock:
+            self.files += files
+            self.bytes += nbytes
+            if failed:
+                self.failed += files
+            if skipped:
+                self.skipped += files
+            now = time.monotonic()
+            report = now - self._last_report >= self.interval
+            if report:
+                self._last_report = now
+        if report:
+            self._write(self.summary())
+
+    def throughput(self) -> float:
+        """
+        Returns the average throughput since the start, in bytes per second
+
+        @return: the throughput
+        """
+        elapsed = time.monotonic() - self._start
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        """
+        Returns the progress as a line, e.g. '10/20 files, 1.5 MiB, 3.0 MiB/s'
+
+        @return: the progress
+        """
+        line = "{}/{} files, {}, {}/s".format(
+            self.files,
+            self.total_files,
+            format_bytes(self.bytes),
+            format_bytes(self.throughput()),
+        )
+        if self.skipped:
+            line += ", {} skipped".format(self.skipped)
+        if self.failed:
+            line += ", {} failed".format(self.failed)
+        return line
+
+    def close(self) -> None:
+        """
+        Writes the final report
+
+        @return: None
+        """
+        self._write(self.summary())
+
+    def _write(self, line: str) -> None:
+        if self.stream is not None:
+            self.stream.write(line + "\n")
+            self.stream.flush()
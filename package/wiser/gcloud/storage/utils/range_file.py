@@ -0,0 +1,69 @@
+import io
+from typing import Callable
+
+
+class RangeFile(io.RawIOBase):
+    """
+    Read-only seekable file whose reads are served by byte-range requests, so that
+    readers seeking through a file, e.g. Parquet readers, download only the parts
+    they read
+    """
+
+    def __init__(self, read_range: Callable[[int, int], bytes], size: int):
+        """
+        @param read_range: a function returning the bytes from start to end, both included
+        @param size: the size of the file
+        """
+        super().__init__()
+        self._read_range = read_range
+        self._size = size
+        self._position = 0
+        self.requests = 0
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError("Invalid whence: {}".format(whence))
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        end = self._size if size is None or size < 0 else self._position + size
+        end = min(end, self._size)
+        if end <= self._position:
+            return b""
+
+        data = self._read_range(self._position, end - 1)
+        self.requests += 1
+        self.bytes_read += len(data)
+        self._position += len(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    @property
+    def size(self) -> int:
+        return self._size
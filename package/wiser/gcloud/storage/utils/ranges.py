@@ -0,0 +1,47 @@
+from bisect import bisect_right
+from typing import List, Tuple
+
+# Ranges closer than this are fetched with a single request: downloading the gap is
+# cheaper than paying the latency of another round trip
+DEFAULT_MAX_GAP = 1024 * 1024
+
+
+def coalesce_ranges(
+    ranges: List[Tuple[int, int]], max_gap: int = DEFAULT_MAX_GAP
+) -> List[Tuple[int, int]]:
+    """
+    Merges byte ranges that overlap or are separated by less than `max_gap` bytes
+
+    @param ranges: list of (start, stop) byte ranges, `stop` excluded
+    @param max_gap: maximum number of unrequested bytes allowed between two merged ranges
+    @return: the sorted list of merged (start, stop) ranges
+    """
+    merged = []
+    for start, stop in sorted(r for r in ranges if r[1] > r[0]):
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+
+    return merged
+
+
+def extract_ranges(
+    ranges: List[Tuple[int, int]], requests: List[Tuple[int, int]], data: List[bytes]
+) -> bytearray:
+    """
+    Concatenates the bytes of `ranges`, in the given order, out of the downloaded requests
+
+    @param ranges: list of (start, stop) byte ranges to extract
+    @param requests: the merged (start, stop) ranges that have been downloaded
+    @param data: the content downloaded for each request
+    @return: the content of the ranges concatenated
+    """
+    starts = [start for start, _ in requests]
+    buffer = bytearray()
+    for start, stop in ranges:
+        i = bisect_right(starts, start) - 1
+        offset = requests[i][0]
+        buffer += data[i][start - offset : stop - offset]
+
+    return buffer
@@ -0,0 +1,148 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` acquisitions per second on average and bursts of up
+    to `burst` acquisitions. The rate is lowered on throttling and recovers
+    additively up to the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: float = None, min_rate: float = 1.0):
+        """
+        @param rate: the maximum rate, in acquisitions per second
+        @param burst: the maximum number of acquisitions without waiting, default the rate
+        @param min_rate: the minimum rate reached by decreases
+        """
+        if rate <= 0:
+            raise ValueError("The rate must be positive")
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        """
+        Takes a token, waiting for it if none is available
+
+        @return: None
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def decrease(self, factor: float = 0.5) -> None:
+        """
+        Lowers the rate multiplicatively, down to the minimum rate
+
+        @param factor: the factor applied to the rate
+        @return: None
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * factor)
+
+    def increase(self, step: float = 1.0) -> None:
+        """
+        Raises the rate additively, up to the configured rate
+
+        @param step: the rate increase, in acquisitions per second
+        @return: None
+        """
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + step)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of calls in flight with an AIMD controller: the limit grows by
+    one every `limit` successful calls and is multiplied by `backoff_ratio` on
+    throttling, at most once per `cooldown` seconds so that the throttled calls of
+    one congestion episode count once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff_ratio: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        """
+        @param initial_limit: the initial number of calls in flight
+        @param min_limit: the minimum number of calls in flight
+        @param max_limit: the maximum number of calls in flight
+        @param backoff_ratio: the factor applied to the limit on throttling
+        @param cooldown: the minimum time between two decreases, in seconds
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min <= initial <= max")
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """
+        Waits until a call can start
+
+        @return: None
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        """
+        Records the end of a call
+
+        @param throttled: True if the call was throttled by the server
+        @return: None
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+def hashed_blob_name(blob_name: str, length: int = 4) -> str:
+    """
+    Prepends a short hash to a blob name, e.g. 'logs/0001.json' -> '3f2a/logs/0001.json',
+    so that sequential names are spread across the key range and the writes are
+    not throttled as a hotspot. The hash is stable: the name can be rebuilt for reads.
+
+    @param blob_name: the blob name
+    @param length: the number of hexadecimal characters of the hash
+    @return: the blob name with the hashed prefix
+    """
+    import hashlib
+
+    digest = hashlib.md5(blob_name.encode("utf-8")).hexdigest()
+    return digest[:length] + "/" + blob_name
@@ -0,0 +1,127 @@
+import ctypes
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+class SharedArrayHandle(NamedTuple):
+    """
+    Picklable reference to a numpy array stored in a shared memory segment
+    """
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: np.dtype
+
+
+class _SharedMemoryBuffer:
+    """
+    Exposes a shared memory segment to numpy through the array interface. The segment
+    stays mapped as long as an array built on it is alive
+    """
+
+    def __init__(
+        self,
+        shm: SharedMemory,
+        shape: Tuple[int, ...],
+        dtype: np.dtype,
+        offset: int = 0,
+        readonly: bool = False,
+    ):
+        self._shm = shm
+        # The pointer is taken without keeping an export of the buffer, so that the
+        # segment can be closed once the last array is garbage collected
+        pointer = ctypes.c_char.from_buffer(shm.buf)
+        address = ctypes.addressof(pointer)
+        del pointer
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": tuple(shape),
+            "typestr": dtype.str,
+            "descr": dtype.descr,
+            "data": (address + offset, readonly),
+        }
+
+
+def untrack(shm: SharedMemory) -> None:
+    """
+    Stops the resource tracker from unlinking a segment when the current process exits
+
+    @param shm: the shared memory segment
+    @return: None
+    """
+    if os.name == "posix":
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def unlink(shm: SharedMemory) -> None:
+    """
+    Unlinks a segment that has been untracked with `untrack()`
+
+    @param shm: the shared memory segment
+    @return: None
+    """
+    if os.name == "posix":
+        # Unlinking unregisters the segment from the resource tracker
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+def shared_memory_array(
+    shm: SharedMemory,
+    shape: Tuple[int, ...],
+    dtype: np.dtype,
+    offset: int = 0,
+    readonly: bool = False,
+) -> np.ndarray:
+    """
+    Returns an array backed by a shared memory segment, which is closed when the array is garbage collected
+
+    @param shm: the shared memory segment
+    @param shape: the shape of the array
+    @param dtype: the dtype of the array
+    @param offset: the offset of the array data in the segment
+    @param readonly: whether the array must be read-only
+    @return: the array, without copying the data
+    """
+    return np.asarray(
+        _SharedMemoryBuffer(
+            shm=shm,
+            shape=shape,
+            dtype=np.dtype(dtype),
+            offset=offset,
+            readonly=readonly,
+        )
+    )
+
+
+def export_array(array: np.ndarray) -> SharedArrayHandle:
+    """
+    Copies an array into a new shared memory segment, to be imported by another process
+
+    @param array: the array to export, must not contain Python objects
+    @return: the handle to pass to `import_array()`
+    """
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = shared_memory_array(shm=shm, shape=array.shape, dtype=array.dtype)
+    shared[...] = array
+    # The importing process owns the segment: the resource tracker of this process
+    # must not unlink it when this process exits
+    untrack(shm=shm)
+    return SharedArrayHandle(name=shm.name, shape=array.shape, dtype=array.dtype)
+
+
+def import_array(handle: SharedArrayHandle) -> np.ndarray:
+    """
+    Maps an array exported by `export_array()` and unlinks its segment, which is freed
+    when the array is garbage collected
+
+    @param handle: the handle returned by `export_array()`
+    @return: the array, without copying the data
+    """
+    shm = SharedMemory(name=handle.name)
+    shm.unlink()
+    return shared_memory_array(shm=shm, shape=handle.shape, dtype=handle.dtype)
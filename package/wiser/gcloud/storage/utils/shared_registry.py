@@ -0,0 +1,130 @@
+import hashlib
+import os
+import struct
+import tempfile
+import weakref
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+
+import numpy as np
+
+from wiser.gcloud.storage.utils.npy import parse_npy_header
+from wiser.gcloud.storage.utils.shared_memory import (
+    shared_memory_array,
+    unlink,
+    untrack,
+)
+
+# Layout of a segment: a control block (state, reference count, length of the .npy
+# header), the .npy header and the array data aligned to 64 bytes
+_CONTROL = struct.Struct("<qqq")
+_CONTROL_SIZE = 64
+_ALIGNMENT = 64
+
+_STATE_EMPTY = 0
+_STATE_READY = 1
+
+
+def _segment_name(key: str) -> str:
+    # Short enough for the 31 characters limit of macOS
+    return "wiser_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+@contextmanager
+def _file_lock(name: str, kind: str):
+    import fcntl
+
+    # Lock files are never removed: deleting a locked file would let another
+    # process lock a new file with the same name
+    path = os.path.join(tempfile.gettempdir(), "{}.{}.lock".format(name, kind))
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _data_offset(header_length: int) -> int:
+    return -(-(_CONTROL_SIZE + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+
+def _release(shm: SharedMemory, name: str) -> None:
+    with _file_lock(name=name, kind="registry"):
+        state, references, header_length = _CONTROL.unpack_from(shm.buf, 0)
+        references -= 1
+        _CONTROL.pack_into(shm.buf, 0, state, references, header_length)
+        if references == 0:
+            unlink(shm=shm)
+    shm.close()
+
+
+def acquire_shared_array(
+    key: str,
+    read_header: Callable[[], bytes],
+    fill: Callable[[memoryview, int], None],
+) -> np.ndarray:
+    """
+    Returns a read-only array stored in a shared memory segment shared by all the
+    processes of the host acquiring the same key. The first process creates the
+    segment, the array data is filled once and the segment is unlinked when no
+    process holds an array of it anymore. POSIX only.
+
+    @param key: the key identifying the array, e.g. bucket, blob name and generation
+    @param read_header: returns the .npy header of the array, invoked when the segment is created
+    @param fill: writes the array data, found at the given offset of the .npy file, into the given buffer. It is invoked once per segment
+    @return: a read-only view of the shared array
+    """
+    name = _segment_name(key=key)
+
+    with _file_lock(name=name, kind="registry"):
+        try:
+            shm = SharedMemory(name=name)
+            untrack(shm=shm)
+            state, references, header_length = _CONTROL.unpack_from(shm.buf, 0)
+        except FileNotFoundError:
+            header = read_header()
+            shape, _, dtype, header_length = parse_npy_header(header)
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            shm = SharedMemory(
+                name=name, create=True, size=_data_offset(header_length) + nbytes
+            )
+            untrack(shm=shm)
+            shm.buf[_CONTROL_SIZE : _CONTROL_SIZE + header_length] = header[
+                :header_length
+            ]
+            state, references = _STATE_EMPTY, 0
+        _CONTROL.pack_into(shm.buf, 0, state, references + 1, header_length)
+
+    header = bytes(shm.buf[_CONTROL_SIZE : _CONTROL_SIZE + header_length])
+    shape, fortran_order, dtype, _ = parse_npy_header(header)
+    offset = _data_offset(header_length)
+    nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+
+    # The first process getting the lock fills the data, the others wait for it. If
+    # it fails, the next one in line retries
+    try:
+        with _file_lock(name=name, kind="fill"):
+            if _CONTROL.unpack_from(shm.buf, 0)[0] != _STATE_READY:
+                with shm.buf[offset : offset + nbytes] as buffer:
+                    fill(buffer, header_length)
+                with _file_lock(name=name, kind="registry"):
+                    _, references, _ = _CONTROL.unpack_from(shm.buf, 0)
+                    _CONTROL.pack_into(
+                        shm.buf, 0, _STATE_READY, references, header_length
+                    )
+    except BaseException:
+        _release(shm=shm, name=name)
+        raise
+
+    # Fortran-ordered data is the C-ordered data of the transposed array
+    array = shared_memory_array(
+        shm=shm,
+        shape=shape[::-1] if fortran_order else shape,
+        dtype=dtype,
+        offset=offset,
+        readonly=True,
+    )
+    weakref.finalize(array.base, _release, shm, name)
+    return array.T if fortran_order else array
@@ -0,0 +1,74 @@
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls: while a call for a key is in flight, the calls for
+    the same key wait for it and receive its result or its error instead of running
+    again. Calls made after the first one completed run again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        _instances.add(self)
+
+    def _after_fork_in_child(self) -> None:
+        # The parent's lock may have been held while forking, and its calls in flight
+        # never complete in the child
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Runs the function, unless a call for the same key is in flight
+
+        @param key: the key identifying the call
+        @param fn: the function to run
+        @return: the result of the function, shared by the concurrent callers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_instances: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+def _after_fork_in_child() -> None:
+    for single_flight in list(_instances):
+        single_flight._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)